@@ -0,0 +1,110 @@
+"""
+中文字詞屬性知識競技場 - 準確率置信區間
+合併結果文件的遊戲歷史，以詞語為單位分層 bootstrap 重抽樣，輸出每位玩家總體與各屬性
+準確率、以及每對玩家準確率差的置信區間（不調用任何 API）
+
+用法:
+    python src/accuracy_ci.py results/game_results_*.json
+    python src/accuracy_ci.py --resamples 5000 --output results/accuracy_ci.json results/game_results_*.json
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+import time
+from pathlib import Path
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.bootstrap import bootstrap_accuracy, word_length_stratum, DEFAULT_RESAMPLES
+from arena.sharding import load_results, find_results
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="以詞語分層 bootstrap 計算準確率與準確率差的置信區間")
+    parser.add_argument("inputs", nargs="*", help="結果文件或分片結果目錄（默認 results/game_results_*.json 及分片結果）")
+    parser.add_argument("--output", default=None, help="置信區間輸出 JSON 文件（可選）")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES,
+                        help=f"重抽樣次數（默認 {DEFAULT_RESAMPLES}）")
+    parser.add_argument("--confidence", type=float, default=0.95, help="置信區間水平（默認 0.95）")
+    parser.add_argument("--no-stratify", action="store_true", help="不按詞語字數分層")
+    parser.add_argument("--seed", type=int, default=None, help="隨機種子")
+    return parser.parse_args(argv)
+
+
+def _format_interval(interval, percent: bool = True) -> str:
+    if interval["estimate"] is None:
+        return "-"
+    if percent:
+        return f"{interval['estimate']:.1%} [{interval['ci_low']:.1%}, {interval['ci_high']:.1%}]"
+    return f"{interval['estimate']:+.1%} [{interval['ci_low']:+.1%}, {interval['ci_high']:+.1%}]"
+
+
+def print_intervals(summary):
+    """打印總體準確率與兩兩差值的置信區間"""
+    if not summary["players"]:
+        return
+    level = f"{summary['confidence']:.0%}"
+    print("\n" + "=" * 100)
+    print(f"準確率（{level} 置信區間，{summary['words']} 個詞語，{summary['resamples']} 次重抽樣）".center(100))
+    print("=" * 100)
+    for stat in summary["players"]:
+        print(f"{stat['name']:<20} {_format_interval(stat['overall'])}")
+
+    if summary["differences"]:
+        print("-" * 100)
+        print(f"{'玩家對':<32} {'準確率差':<28} {'相對提升':<28} {'p 值':<8}")
+        for difference in summary["differences"]:
+            overall = difference["overall"]
+            pair = " vs ".join(difference["players"])
+            p_value = f"{overall['p_value']:.4f}" if overall.get("p_value") is not None else "-"
+            relative = _format_interval(difference["relative"], percent=False)
+            print(f"{pair:<32} {_format_interval(overall, percent=False):<28} {relative:<28} {p_value:<8}")
+    print("=" * 100 + "\n")
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    project_root = Path(__file__).parent.parent
+
+    inputs = args.inputs or find_results([str(project_root / "results" / "game_results_*.json")])
+    if not inputs:
+        logger.error("沒有找到結果文件")
+        return
+
+    rounds = []
+    for input_path in inputs:
+        rounds.extend(load_results(input_path).get("game_history", []))
+
+    start = time.perf_counter()
+    summary = bootstrap_accuracy(
+        rounds,
+        resamples=args.resamples,
+        confidence=args.confidence,
+        stratum_of=None if args.no_stratify else word_length_stratum,
+        seed=args.seed
+    )
+    summary["sources"] = inputs
+    summary["rounds"] = len(rounds)
+    logger.info(f"{len(inputs)} 個文件、{len(rounds)} 輪，bootstrap 用時 {time.perf_counter() - start:.2f} 秒")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"置信區間已保存至: {args.output}")
+    print_intervals(summary)
+
+
+if __name__ == "__main__":
+    main()
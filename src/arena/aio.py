@@ -0,0 +1,128 @@
+"""
+共享事件循環
+異步傳輸（如 Hunyuan 的 httpx 客戶端）的協程都在一個後台線程的事件循環中運行：
+流水線通過 submit() 直接拿到 Future，在途請求不佔用線程；
+同步代碼路徑通過 run() / SyncStream 等待結果
+"""
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional
+from concurrent.futures import Future
+import asyncio
+import atexit
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+# 事件循環停止前依次執行的清理協程（如關閉連接池）
+_cleanups: List[Callable[[], Awaitable[None]]] = []
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """獲取（必要時啟動）共享事件循環"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="arena-aio", daemon=True)
+            _thread.start()
+        return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    """
+    把協程提交到共享事件循環
+
+    Args:
+        coro: 協程
+
+    Returns:
+        Future: 可跨線程等待的結果
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Coroutine) -> Any:
+    """
+    在共享事件循環中運行協程並阻塞等待結果（供同步代碼路徑使用）
+
+    Args:
+        coro: 協程
+
+    Returns:
+        Any: 協程的返回值
+    """
+    if _thread is not None and threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("不能在共享事件循環線程中同步等待協程")
+    return submit(coro).result()
+
+
+def register_cleanup(cleanup: Callable[[], Awaitable[None]]):
+    """註冊事件循環停止前執行的清理協程"""
+    _cleanups.append(cleanup)
+
+
+class SyncStream:
+    """
+    把異步迭代器包裝為同步迭代器
+
+    每次取下一項都在共享事件循環中完成；close() 轉發給異步迭代器的 aclose()，
+    以便提前關閉底層連接。
+    """
+
+    def __init__(self, stream):
+        """
+        Args:
+            stream: 異步迭代器（需支持 aclose()）
+        """
+        self._stream = stream
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        try:
+            return run(self._stream.__anext__())
+        except StopAsyncIteration:
+            self.close()
+            raise StopIteration
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            run(self._stream.aclose())
+
+
+async def _run_cleanups():
+    for cleanup in _cleanups:
+        try:
+            await cleanup()
+        except Exception as e:
+            logger.debug("事件循環清理失敗: %s", e)
+    _cleanups.clear()
+
+
+def shutdown():
+    """執行清理協程並停止共享事件循環"""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop = _thread = None
+    if loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_run_cleanups(), loop).result(timeout=5)
+    except Exception as e:
+        logger.debug("事件循環清理超時或失敗: %s", e)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,473 @@
+"""
+供應商交互審計歸檔
+為了可複現，每一次發給供應商的提示與原始回答都要保留；但回答高度重複
+（「是」「否」與模板化的屬性列表），提示也只是少數模板填入不同的詞語。
+歸檔是一個目錄：audit.dat 只追加寫入壓縮幀，index.db（SQLite）按 運行/詞語/玩家
+索引每條交互在 audit.dat 中的位置。提示按 SHA-256 內容尋址，相同提示只存一次；
+每條記錄單獨壓縮（可隨機讀取），並使用從前若干條記錄訓練出的 zstd 字典，
+幀不寫魔數與字典編號（由索引記錄），小記錄也能壓縮到十幾個字節。
+壓縮與寫盤在後台線程中進行，玩家線程只負責入隊
+"""
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+DATA_NAME = "audit.dat"
+INDEX_NAME = "index.db"
+
+# 幀的編碼：大於 0 為 zstd 字典編號
+ZSTD_PLAIN = 0
+ZLIB_PLAIN = -1
+# 壓縮後不比原文小時直接存原文
+RAW = -2
+
+# 交互類型
+BOOLEAN = "boolean"
+LOGPROBS = "logprobs"
+CUSTOM_ATTRIBUTES = "custom_attributes"
+JUDGE = "judge"
+# 索引中按編號存儲
+KINDS = (BOOLEAN, LOGPROBS, CUSTOM_ATTRIBUTES, JUDGE)
+
+# 後台線程結束標記
+_STOP = object()
+
+# 索引每行只存詞語與整數編號（運行、玩家、提示各有自己的表）；交互表按
+# (運行, 詞語, 玩家, 序號) 聚簇存儲，查詢不需要額外的索引，索引本身也只是樸素日誌的一小部分
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    naive_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    UNIQUE (name, provider, model)
+);
+CREATE TABLE IF NOT EXISTS prompts (
+    id INTEGER PRIMARY KEY,
+    hash BLOB NOT NULL UNIQUE,
+    codec INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exchanges (
+    run INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    player INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    prompt INTEGER NOT NULL,
+    codec INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    created INTEGER NOT NULL,
+    PRIMARY KEY (run, word, player, seq)
+) WITHOUT ROWID;
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(os.path.join(path, INDEX_NAME))
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _zstd_parameters(level: int):
+    """zstd 幀參數：不寫魔數、字典編號與校驗和（編碼由索引記錄）"""
+    return zstandard.ZstdCompressionParameters.from_level(
+        level, format=zstandard.FORMAT_ZSTD1_MAGICLESS, write_dict_id=False, write_checksum=False
+    )
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class AuditArchive:
+    """
+    審計歸檔寫出器
+
+    record() 可在任何線程中調用，只把交互放入隊列；後台線程計算提示哈希、壓縮並追加寫入。
+    新歸檔先緩存前 train_samples 條記錄訓練字典，之後的記錄直接用字典壓縮；
+    已有字典的歸檔繼續使用最新的字典。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        run_id: str,
+        level: int = 9,
+        train_samples: int = 2000,
+        dictionary_size: int = 32 * 1024,
+        commit_every: int = 500
+    ):
+        """
+        打開（或創建）歸檔並啟動後台線程
+
+        Args:
+            path: 歸檔目錄
+            run_id: 本次運行標識（與結果文件的時間戳一致）
+            level: zstd 壓縮級別
+            train_samples: 訓練字典前緩存的記錄數
+            dictionary_size: 字典大小（字節）
+            commit_every: 每寫入多少條記錄提交一次索引
+        """
+        os.makedirs(path, exist_ok=True)
+        if not ZSTD_AVAILABLE:
+            logger.warning("zstandard 模塊未安裝，審計歸檔改用 zlib 壓縮且不使用字典（pip install zstandard）")
+        self.path = path
+        self.run_id = run_id
+        self.level = level
+        self.train_samples = train_samples
+        self.dictionary_size = dictionary_size
+        self.commit_every = commit_every
+        self.records = 0
+
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="arena-audit-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, player, word: Optional[str], kind: str, messages: List[Dict[str, str]], response: Any):
+        """
+        記錄一次交互（不阻塞）
+
+        Args:
+            player: 發出請求的玩家
+            word: 詞語
+            kind: 交互類型（boolean、logprobs、custom_attributes、judge）
+            messages: 發出的消息列表（布林題的屬性描述在提示中）
+            response: 原始回答文本（logprobs 為 token -> logprob 字典）
+        """
+        self._queue.put((player.name, player.provider, player.model, word, kind, messages, response, time.time()))
+
+    def close(self):
+        """寫出剩餘記錄（字典尚未訓練時用已有樣本訓練）並等待後台線程結束"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"寫出審計歸檔失敗: {self._error}") from self._error
+        logger.info(f"審計歸檔已寫出: {self.records} 條交互 -> {self.path}")
+
+    # ------------------------------------------------------------------
+    # 後台線程
+    # ------------------------------------------------------------------
+    def _run(self):
+        try:
+            self._open()
+        except Exception as e:
+            logger.error(f"打開審計歸檔失敗: {e}")
+            self._error = e
+            return
+
+        while True:
+            item = self._queue.get()
+            if item is not _STOP and self._error is None:
+                try:
+                    self._add(item)
+                except Exception as e:
+                    logger.error(f"寫入審計記錄失敗: {e}")
+                    self._error = e
+            # 隊列暫時為空時提交，使已寫入的記錄可讀
+            if item is _STOP or (self._uncommitted and self._queue.empty()):
+                try:
+                    if item is _STOP and self._pending:
+                        self._train_dictionary()
+                    self._commit()
+                except Exception as e:
+                    logger.error(f"提交審計索引失敗: {e}")
+                    self._error = self._error or e
+            if item is _STOP:
+                break
+        self._data.close()
+        self._connection.close()
+
+    def _open(self):
+        self._connection = _connect(self.path)
+        self._data = open(os.path.join(self.path, DATA_NAME), "ab")
+        self._offset = self._data.seek(0, os.SEEK_END)
+        self._connection.execute("INSERT OR IGNORE INTO runs (run_id) VALUES (?)", (self.run_id,))
+        (self._run_key,) = self._connection.execute(
+            "SELECT id FROM runs WHERE run_id = ?", (self.run_id,)
+        ).fetchone()
+        self._players = {
+            (name, provider, model): key
+            for key, name, provider, model in self._connection.execute("SELECT id, name, provider, model FROM players")
+        }
+        self._prompts = {bytes(digest): key for key, digest in self._connection.execute("SELECT id, hash FROM prompts")}
+        self._seq = self._connection.execute("SELECT COALESCE(MAX(seq), 0) FROM exchanges").fetchone()[0]
+        self._naive_bytes = 0
+        self._dictionary_id, self._compressor = self._latest_dictionary()
+        self._pending: List[tuple] = []
+        self._uncommitted = 0
+
+    def _latest_dictionary(self):
+        """已有歸檔沿用最新的字典"""
+        if not ZSTD_AVAILABLE:
+            return ZLIB_PLAIN, None
+        row = self._connection.execute("SELECT id, data FROM dictionaries ORDER BY id DESC LIMIT 1").fetchone()
+        if row is None:
+            return None, None
+        dictionary = zstandard.ZstdCompressionDict(row[1])
+        return row[0], zstandard.ZstdCompressor(dict_data=dictionary, compression_params=_zstd_parameters(self.level))
+
+    def _add(self, item: tuple):
+        name, provider, model, word, kind, messages, response, created = item
+        prompt = _dumps(messages)
+        payload = _dumps(response)
+        self.records += 1
+        # 樸素 JSON 日誌中這條交互的大小（按運行累計，用於統計壓縮比）
+        self._naive_bytes += len(prompt) + len(payload) + len(
+            _dumps([self.run_id, word, name, provider, model, kind, created])
+        )
+
+        player_key = self._players.get((name, provider, model))
+        if player_key is None:
+            player_key = self._connection.execute(
+                "INSERT INTO players (name, provider, model) VALUES (?, ?, ?)", (name, provider, model)
+            ).lastrowid
+            self._players[(name, provider, model)] = player_key
+        row = (word or "", player_key, KINDS.index(kind), int(created))
+
+        if self._dictionary_id is None:
+            self._pending.append((row, prompt, payload))
+            if len(self._pending) >= self.train_samples:
+                self._train_dictionary()
+            return
+        self._write(row, prompt, payload)
+
+    def _train_dictionary(self):
+        """用緩存的記錄（提示與回答）訓練字典，再寫出緩存的記錄"""
+        pending, self._pending = self._pending, []
+        samples = [prompt for _, prompt, _ in pending] + [payload for _, _, payload in pending]
+        try:
+            dictionary = zstandard.train_dictionary(self.dictionary_size, samples)
+            cursor = self._connection.execute(
+                "INSERT INTO dictionaries (created, samples, data) VALUES (?, ?, ?)",
+                (time.strftime("%Y-%m-%dT%H:%M:%S"), len(samples), dictionary.as_bytes())
+            )
+            self._dictionary_id = cursor.lastrowid
+            self._compressor = zstandard.ZstdCompressor(
+                dict_data=dictionary, compression_params=_zstd_parameters(self.level)
+            )
+            logger.info(f"審計歸檔字典已訓練: {len(samples)} 個樣本，{len(dictionary.as_bytes())} 字節")
+        except Exception as e:
+            # 樣本太少或太單一時無法訓練，先不用字典
+            logger.debug("審計歸檔字典訓練失敗，暫不使用字典: %s", e)
+            self._dictionary_id = ZSTD_PLAIN
+            self._compressor = zstandard.ZstdCompressor(compression_params=_zstd_parameters(self.level))
+        for row, prompt, payload in pending:
+            self._write(row, prompt, payload)
+
+    def _append(self, data: bytes) -> tuple:
+        """壓縮並追加一幀，返回 (編碼, 偏移, 長度)"""
+        if self._dictionary_id == ZLIB_PLAIN:
+            frame, codec = zlib.compress(data, 9), ZLIB_PLAIN
+        else:
+            frame, codec = self._compressor.compress(data), self._dictionary_id
+        if len(frame) >= len(data):
+            frame, codec = data, RAW
+        offset = self._offset
+        self._data.write(frame)
+        self._offset += len(frame)
+        return codec, offset, len(frame)
+
+    def _write(self, row: tuple, prompt: bytes, payload: bytes):
+        word, player_key, kind, created = row
+        digest = hashlib.sha256(prompt).digest()
+        prompt_key = self._prompts.get(digest)
+        if prompt_key is None:
+            prompt_key = self._connection.execute(
+                "INSERT INTO prompts (hash, codec, offset, length) VALUES (?, ?, ?, ?)",
+                (digest, *self._append(prompt))
+            ).lastrowid
+            self._prompts[digest] = prompt_key
+        self._seq += 1
+        self._connection.execute(
+            "INSERT INTO exchanges (run, word, player, seq, kind, prompt, codec, offset, length, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self._run_key, word, player_key, self._seq, kind, prompt_key, *self._append(payload), created)
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._commit()
+
+    def _commit(self):
+        # 先把數據寫到磁盤，索引才引用它（崩潰時索引不會指向不完整的幀）
+        self._data.flush()
+        os.fsync(self._data.fileno())
+        self._connection.execute(
+            "UPDATE runs SET naive_bytes = naive_bytes + ? WHERE id = ?", (self._naive_bytes, self._run_key)
+        )
+        self._naive_bytes = 0
+        self._connection.commit()
+        self._uncommitted = 0
+
+
+class AuditReader:
+    """審計歸檔讀取器：按 運行/詞語/玩家 查詢並隨機讀取單條交互"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 歸檔目錄
+        """
+        if not os.path.exists(os.path.join(path, INDEX_NAME)):
+            raise FileNotFoundError(f"不是審計歸檔: {path}")
+        self.path = path
+        self._connection = _connect(path)
+        self._data = open(os.path.join(path, DATA_NAME), "rb")
+        self._decompressors: Dict[int, Any] = {}
+
+    def close(self):
+        self._data.close()
+        self._connection.close()
+
+    def _decompressor(self, codec: int):
+        decompressor = self._decompressors.get(codec)
+        if decompressor is None:
+            if not ZSTD_AVAILABLE:
+                raise ImportError("zstandard 模塊未安裝，無法讀取 zstd 幀，請運行: pip install zstandard")
+            dictionary = None
+            if codec != ZSTD_PLAIN:
+                (data,) = self._connection.execute("SELECT data FROM dictionaries WHERE id = ?", (codec,)).fetchone()
+                dictionary = zstandard.ZstdCompressionDict(data)
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary, format=zstandard.FORMAT_ZSTD1_MAGICLESS)
+            self._decompressors[codec] = decompressor
+        return decompressor
+
+    def _read(self, codec: int, offset: int, length: int) -> Any:
+        self._data.seek(offset)
+        frame = self._data.read(length)
+        if codec == RAW:
+            raw = frame
+        elif codec == ZLIB_PLAIN:
+            raw = zlib.decompress(frame)
+        else:
+            raw = self._decompressor(codec).decompress(frame)
+        return json.loads(raw)
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """列出歸檔中的運行及其交互數"""
+        rows = self._connection.execute(
+            "SELECT r.run_id, COUNT(e.seq), MIN(e.created), MAX(e.created) "
+            "FROM runs r LEFT JOIN exchanges e ON e.run = r.id GROUP BY r.id ORDER BY r.id"
+        ).fetchall()
+        return [{"run_id": run_id, "exchanges": count, "started": started, "finished": finished}
+                for run_id, count, started, finished in rows]
+
+    def query(
+        self,
+        run_id: Optional[str] = None,
+        word: Optional[str] = None,
+        player: Optional[str] = None,
+        kind: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        查詢交互並解壓提示與回答
+
+        Args:
+            run_id: 運行標識
+            word: 詞語
+            player: 玩家名
+            kind: 交互類型
+            limit: 最多返回條數
+
+        Yields:
+            Dict: run_id、word、player、provider、model、kind、created、messages、response
+        """
+        conditions, params = [], []
+        kind = KINDS.index(kind) if kind is not None else None
+        for column, value in (("r.run_id", run_id), ("e.word", word), ("pl.name", player), ("e.kind", kind)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        sql = ("SELECT r.run_id, e.word, pl.name, pl.provider, pl.model, e.kind, e.created, "
+               "e.codec, e.offset, e.length, e.prompt, p.codec, p.offset, p.length "
+               "FROM exchanges e JOIN runs r ON r.id = e.run JOIN players pl ON pl.id = e.player "
+               "JOIN prompts p ON p.id = e.prompt")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY e.seq"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        prompts: Dict[int, Any] = {}
+        for row in self._connection.execute(sql, params).fetchall():
+            prompt_key = row[10]
+            if prompt_key not in prompts:
+                prompts[prompt_key] = self._read(*row[11:14])
+            yield {
+                "run_id": row[0],
+                "word": row[1],
+                "player": row[2],
+                "provider": row[3],
+                "model": row[4],
+                "kind": KINDS[row[5]],
+                "created": row[6],
+                "messages": prompts[prompt_key],
+                "response": self._read(*row[7:10])
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """歸檔大小與樸素 JSON 日誌的對比"""
+        exchanges, response_bytes = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM exchanges"
+        ).fetchone()
+        raw_bytes = self._connection.execute("SELECT COALESCE(SUM(naive_bytes), 0) FROM runs").fetchone()[0]
+        prompts, prompt_bytes = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM prompts"
+        ).fetchone()
+        dictionaries = self._connection.execute("SELECT COUNT(*) FROM dictionaries").fetchone()[0]
+        data_bytes = os.path.getsize(os.path.join(self.path, DATA_NAME))
+        index_bytes = os.path.getsize(os.path.join(self.path, INDEX_NAME))
+        return {
+            "exchanges": exchanges,
+            "unique_prompts": prompts,
+            "dictionaries": dictionaries,
+            "naive_json_bytes": raw_bytes,
+            "data_bytes": data_bytes,
+            "prompt_frame_bytes": prompt_bytes,
+            "response_frame_bytes": response_bytes,
+            "index_bytes": index_bytes,
+            "ratio": round((data_bytes + index_bytes) / raw_bytes, 4) if raw_bytes else None
+        }
+
+
+def attach_audit(players: Sequence[Any], archive: Optional[AuditArchive]):
+    """為玩家及其對沖備用模型、級聯便宜模型設置審計歸檔"""
+    for player in players:
+        player.audit = archive
+        if player.hedge_policy is not None and player.hedge_policy.backup is not None:
+            player.hedge_policy.backup.audit = archive
+        if player.cascade_policy is not None:
+            for tier in player.cascade_policy.cheap:
+                tier.audit = archive
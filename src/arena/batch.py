@@ -0,0 +1,420 @@
+"""
+批處理執行後端
+將整次運行的 (詞語, 屬性) 請求寫成 JSONL，通過 OpenAI 兼容的批處理接口
+（files + batches）異步提交；輪詢完成後流式讀取輸出文件，逐行回到常規的
+評判與計分流程。提交狀態按 (請求內容, 運行標識) 保存在本地，中斷後以
+resume 重新運行同一批詞語即可續接；不續接時每次運行都提交新作業。
+"""
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+import logging
+
+from .prompts import (
+    build_boolean_messages,
+    build_custom_attributes_messages,
+    parse_boolean_answer,
+    parse_custom_attributes
+)
+from .resilience import ProviderError, EMPTY_RESPONSE, UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# 批處理作業的終止狀態
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# 自定義屬性請求的槽位標記
+CUSTOM_SLOT = "custom"
+# 與 AIPlayer 交互式調用一致的採樣參數
+BOOLEAN_PARAMS = {"temperature": 0.3, "max_tokens": 10}
+CUSTOM_PARAMS = {"temperature": 0.7, "max_tokens": 500}
+NUM_CUSTOM_SLOTS = 8
+
+
+def make_custom_id(word_index: int, slot) -> str:
+    """請求標識：詞語序號 + 屬性序號（或 custom）"""
+    return f"w{word_index}-{slot}"
+
+
+def parse_custom_id(custom_id: str) -> Tuple[int, Any]:
+    """
+    解析請求標識
+
+    Returns:
+        Tuple[int, Any]: (詞語序號, 屬性序號或 CUSTOM_SLOT)
+    """
+    word_part, slot = custom_id.split("-", 1)
+    word_index = int(word_part[1:])
+    return word_index, (slot if slot == CUSTOM_SLOT else int(slot))
+
+
+def iter_batch_output(path: str) -> Iterator[Tuple[str, Optional[str], Optional[str], Optional[int]]]:
+    """
+    逐行讀取批處理輸出/錯誤文件
+
+    Args:
+        path: 本地 JSONL 文件
+
+    Yields:
+        Tuple: (custom_id, 回答文本, 錯誤信息, HTTP 狀態碼)，成功時錯誤信息為 None
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            custom_id = item.get("custom_id")
+            response = item.get("response") or {}
+            status_code = response.get("status_code")
+            error = item.get("error")
+
+            if error:
+                message = error.get("message") if isinstance(error, dict) else str(error)
+                yield custom_id, None, message or "批處理請求失敗", status_code
+                continue
+            if status_code is not None and status_code != 200:
+                body = response.get("body") or {}
+                message = (body.get("error") or {}).get("message") if isinstance(body, dict) else None
+                yield custom_id, None, message or f"HTTP {status_code}", status_code
+                continue
+
+            try:
+                text = response["body"]["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                yield custom_id, None, "批處理響應缺少回答內容", status_code
+                continue
+            yield custom_id, (text or "").strip(), None, status_code
+
+
+class BatchRunner:
+    """
+    批處理執行器
+
+    支持批處理接口的玩家（AIPlayer.supports_batch，或配置了 base_url 時的所有玩家）
+    走批處理；其餘玩家在等待批處理作業期間按常規方式交互式運行。
+    """
+
+    def __init__(
+        self,
+        game,
+        state_dir: str,
+        base_url: Optional[str] = None,
+        poll_interval: float = 30.0,
+        completion_window: str = "24h",
+        run_id: Optional[str] = None,
+        resume: bool = False
+    ):
+        """
+        初始化批處理執行器
+
+        Args:
+            game: ArenaGame 實例
+            state_dir: 保存輸入/輸出文件與作業狀態的目錄
+            base_url: 統一的批處理端點（如本地模擬服務），設置後所有玩家都走批處理
+            poll_interval: 輪詢間隔（秒）
+            completion_window: 作業完成時限
+            run_id: 運行標識（狀態文件按請求內容與運行標識區分，默認取當前時間）
+            resume: 續接同一批請求最近一次運行的作業（沿用已提交的作業與已下載的輸出）
+        """
+        self.game = game
+        self.state_dir = state_dir
+        self.base_url = base_url
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.run_id = run_id or time.strftime("%Y%m%d_%H%M%S")
+        self.resume = resume
+        self._clients = {}
+
+    # ------------------------------------------------------------------
+    # 入口
+    # ------------------------------------------------------------------
+    def run(self, words: List[str], attributes: List[Dict[str, str]]):
+        """
+        運行所有詞語，結果按輪次順序追加到 game.game_history
+
+        Args:
+            words: 詞語列表
+            attributes: 屬性列表
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        batch_players = [player for player in self.game.players if self._uses_batch(player)]
+        interactive_players = [player for player in self.game.players if player not in batch_players]
+
+        self._state_path = self._resolve_state_path(self._fingerprint(words, attributes))
+        state = self._load_state()
+        if state["jobs"]:
+            logger.warning(
+                f"續接批處理運行 {self._state_path}：沿用已提交的作業，不重新提交（"
+                + "，".join(f"{name} {job.get('batch_id', '未提交')} {job.get('status', '')}".rstrip()
+                           for name, job in state["jobs"].items())
+                + "）"
+            )
+
+        for player in batch_players:
+            job = state["jobs"].setdefault(player.name, {})
+            self._submit(player, job, words, attributes, state)
+
+        rounds = [self.game._start_round(word) for word in words]
+        results = {
+            player.name: [self.game._new_player_result(player) for _ in words]
+            for player in self.game.players
+        }
+
+        # 等待作業期間運行不支持批處理的玩家
+        for player in interactive_players:
+            logger.info(f"{player.name} 不支持批處理，交互式運行")
+            for word_index, word in enumerate(words):
+                results[player.name][word_index] = self.game.play_player_round(player, word, attributes)
+
+        self._wait(batch_players, state)
+
+        for player in batch_players:
+            job = state["jobs"][player.name]
+            self._score_job(player, job, words, attributes, results[player.name], state)
+
+        for word_index, round_results in enumerate(rounds):
+            round_results.player_results = [
+                results[player.name][word_index] for player in self.game.players
+            ]
+            self.game._record_round(round_results)
+
+    # ------------------------------------------------------------------
+    # 提交
+    # ------------------------------------------------------------------
+    def _uses_batch(self, player) -> bool:
+        # 級聯玩家要根據便宜模型的回答決定是否升級，只能交互式運行
+        cascade = player.cascade_policy
+        if cascade is not None and cascade.enabled:
+            return False
+        return self.base_url is not None or player.supports_batch
+
+    def _client(self, player):
+        """獲取玩家的批處理客戶端"""
+        client = self._clients.get(player.name)
+        if client is None:
+            if self.base_url is not None:
+                from openai import OpenAI
+                client = OpenAI(
+                    api_key=os.getenv("ARENA_BATCH_API_KEY", "local"),
+                    base_url=self.base_url
+                )
+            else:
+                client = player.batch_client()
+            self._clients[player.name] = client
+        return client
+
+    def _fingerprint(self, words: List[str], attributes: List[Dict[str, str]]) -> str:
+        """請求內容的標識：同一批詞語、屬性、玩家與端點的運行可以互相續接"""
+        payload = json.dumps({
+            "words": words,
+            "attributes": attributes,
+            "players": [(player.name, player.model) for player in self.game.players],
+            "base_url": self.base_url
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+    def _resolve_state_path(self, fingerprint: str) -> str:
+        """
+        確定本次運行的狀態文件
+
+        續接時沿用同一請求內容最近一次運行的狀態（優先本運行標識）；不續接時
+        狀態文件按運行標識區分，同一標識的狀態已存在則拒絕運行，避免靜默重用舊輸出。
+        """
+        path = os.path.join(self.state_dir, f"batch_{fingerprint}_{self.run_id}.json")
+        if self.resume:
+            if os.path.exists(path):
+                return path
+            previous = glob.glob(os.path.join(self.state_dir, f"batch_{fingerprint}_*.json"))
+            if previous:
+                return max(previous, key=os.path.getmtime)
+            logger.info("沒有可續接的批處理運行，提交新作業")
+            return path
+        if os.path.exists(path):
+            raise ValueError(f"批處理狀態已存在: {path}（續接請使用 --resume，或換一個運行標識）")
+        return path
+
+    def _load_state(self) -> Dict[str, Any]:
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"jobs": {}}
+
+    def _save_state(self, state: Dict[str, Any]):
+        """原子寫入狀態文件（中斷時不會留下半個文件）"""
+        tmp_path = self._state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._state_path)
+
+    def _job_path(self, player, suffix: str) -> str:
+        slug = re.sub(r"[^0-9A-Za-z_.-]+", "_", player.name)
+        return self._state_path[:-len(".json")] + f"_{slug}_{suffix}.jsonl"
+
+    def _write_input(self, player, words: List[str], attributes: List[Dict[str, str]], path: str) -> int:
+        """寫入玩家的全部請求，返回請求數"""
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for word_index, word in enumerate(words):
+                requests = [
+                    (make_custom_id(word_index, attr_index),
+                     build_boolean_messages(word, attr["description"]), BOOLEAN_PARAMS)
+                    for attr_index, attr in enumerate(attributes)
+                ]
+                requests.append((
+                    make_custom_id(word_index, CUSTOM_SLOT),
+                    build_custom_attributes_messages(word, NUM_CUSTOM_SLOTS), CUSTOM_PARAMS
+                ))
+                for custom_id, messages, params in requests:
+                    f.write(json.dumps({
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": BATCH_ENDPOINT,
+                        "body": {"model": player.model, "messages": messages, **params}
+                    }, ensure_ascii=False) + "\n")
+                    count += 1
+        return count
+
+    def _submit(self, player, job: Dict[str, Any], words, attributes, state: Dict[str, Any]):
+        """上傳輸入文件並創建作業；每一步完成即保存狀態，已完成的步驟不會重複"""
+        client = self._client(player)
+
+        if "input_file_id" not in job:
+            input_path = self._job_path(player, "input")
+            job["num_requests"] = self._write_input(player, words, attributes, input_path)
+            with open(input_path, "rb") as f:
+                job["input_file_id"] = client.files.create(file=f, purpose="batch").id
+            self._save_state(state)
+
+        if "batch_id" not in job:
+            batch = client.batches.create(
+                input_file_id=job["input_file_id"],
+                endpoint=BATCH_ENDPOINT,
+                completion_window=self.completion_window,
+                metadata={"player": player.name}
+            )
+            job["batch_id"] = batch.id
+            job["status"] = batch.status
+            self._save_state(state)
+            logger.info(f"{player.name} 批處理作業已提交: {batch.id}（{job['num_requests']} 個請求）")
+
+    # ------------------------------------------------------------------
+    # 輪詢
+    # ------------------------------------------------------------------
+    def _wait(self, players, state: Dict[str, Any]):
+        """輪詢所有作業直到進入終止狀態"""
+        pending = [player for player in players if state["jobs"][player.name].get("status") not in TERMINAL_STATUSES]
+        while pending:
+            still_pending = []
+            for player in pending:
+                job = state["jobs"][player.name]
+                batch = self._client(player).batches.retrieve(job["batch_id"])
+                job["status"] = batch.status
+                job["output_file_id"] = batch.output_file_id
+                job["error_file_id"] = batch.error_file_id
+                counts = batch.request_counts
+                if counts is not None:
+                    logger.info(f"{player.name} 批處理 {batch.status}: "
+                                f"{counts.completed}/{counts.total} 完成，{counts.failed} 失敗")
+                if batch.status in TERMINAL_STATUSES:
+                    if batch.status != "completed":
+                        job["errors"] = _batch_errors(batch)
+                        logger.warning(f"{player.name} 批處理作業 {batch.status}: {job['errors']}")
+                else:
+                    still_pending.append(player)
+            self._save_state(state)
+            pending = still_pending
+            if pending:
+                time.sleep(self.poll_interval)
+
+    # ------------------------------------------------------------------
+    # 評判與計分
+    # ------------------------------------------------------------------
+    def _download(self, player, file_id: Optional[str], path: str) -> Optional[str]:
+        """下載結果文件（已下載則直接使用本地副本）"""
+        if file_id is None:
+            return None
+        if os.path.exists(path):
+            logger.info(f"{player.name} 重用已下載的批處理結果: {path}")
+        else:
+            tmp_path = path + ".tmp"
+            self._client(player).files.content(file_id).write_to_file(tmp_path)
+            os.replace(tmp_path, path)
+        return path
+
+    def _score_job(self, player, job, words, attributes, player_results, state):
+        """流式讀取作業輸出，逐條評判並計分"""
+        paths = [
+            self._download(player, job.get("output_file_id"), self._job_path(player, "output")),
+            self._download(player, job.get("error_file_id"), self._job_path(player, "errors"))
+        ]
+        state_changed = any(path is not None for path in paths)
+        if state_changed:
+            self._save_state(state)
+
+        for player_result in player_results:
+            player_result.boolean_answers = [None] * len(attributes)
+        seen_custom = set()
+
+        for path in paths:
+            if path is None:
+                continue
+            for custom_id, text, error, status_code in iter_batch_output(path):
+                word_index, slot = parse_custom_id(custom_id)
+                player.record_api_call()
+                self._apply_response(
+                    player, words[word_index], attributes, player_results[word_index],
+                    slot, text, self._error(player, error, status_code)
+                )
+                if slot == CUSTOM_SLOT:
+                    seen_custom.add(word_index)
+
+        # 作業失敗或過期時未返回的請求記為錯誤
+        missing = ProviderError(player.provider, EMPTY_RESPONSE,
+                                job.get("errors") or f"批處理作業 {job.get('status')} 未返回該請求")
+        for word_index, player_result in enumerate(player_results):
+            for attr_index, record in enumerate(player_result.boolean_answers):
+                if record is None:
+                    player_result.boolean_answers[attr_index] = self.game._error_record(
+                        player, attributes[attr_index]["name"], missing
+                    )
+            if word_index not in seen_custom:
+                self.game._record_custom_error(player, player_result, missing)
+
+    def _error(self, player, message: Optional[str], status_code: Optional[int]) -> Optional[ProviderError]:
+        if message is None:
+            return None
+        if status_code is not None:
+            return ProviderError.from_status(player.provider, status_code, message)
+        return ProviderError(player.provider, UNKNOWN, message)
+
+    def _apply_response(self, player, word, attributes, player_result, slot, text, error):
+        """將一條批處理結果送入常規評判流程"""
+        if slot == CUSTOM_SLOT:
+            if error is not None:
+                self.game._record_custom_error(player, player_result, error)
+                return
+            custom_attrs = parse_custom_attributes(text, NUM_CUSTOM_SLOTS)
+            for record in self.game._evaluate_custom_attributes(word, custom_attrs):
+                self.game._apply_custom_attribute(player, player_result, record)
+            return
+
+        attr_name = attributes[slot]["name"]
+        if error is not None:
+            player_result.boolean_answers[slot] = self.game._error_record(player, attr_name, error)
+            return
+        record, judgment = self.game._judge_boolean(word, attr_name, parse_boolean_answer(text), None)
+        player_result.boolean_answers[slot] = record
+        self.game._apply_judgment(player, player_result, judgment)
+
+
+def _batch_errors(batch) -> str:
+    """提取作業級別的錯誤描述"""
+    errors = getattr(batch, "errors", None)
+    data = getattr(errors, "data", None) or []
+    messages = [item.message for item in data if getattr(item, "message", None)]
+    return "; ".join(messages) or f"批處理作業狀態: {batch.status}"
@@ -0,0 +1,223 @@
+"""
+本地批處理模擬服務
+實現 OpenAI 兼容批處理接口中 BatchRunner 用到的部分（上傳文件、創建/查詢作業、
+下載結果文件），用於在不調用真實供應商的情況下演練批處理後端
+"""
+from typing import Any, Callable, Dict, Optional
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def echo_responder(body: Dict[str, Any]) -> str:
+    """
+    默認的回答：布林問題按提示內容確定性地回答是/否，自定義屬性返回編號列表
+
+    Args:
+        body: 批處理請求的 body（model, messages, temperature, max_tokens）
+
+    Returns:
+        str: 回答文本
+    """
+    prompt = body["messages"][-1]["content"]
+    if body.get("max_tokens", 0) > 10:
+        return "\n".join(f"{i}. {body['model']} 屬性{i}" for i in range(1, 9))
+    return "是" if sum(map(ord, body["model"] + prompt)) % 2 else "否"
+
+
+class LocalBatchServer:
+    """
+    本地批處理模擬服務
+
+    作業在第 polls_until_complete 次查詢時完成並生成輸出文件；responder 拋出異常的
+    請求寫入錯誤文件（HTTP 500）。上傳與創建作業的次數記錄在 stats 中。
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        responder: Optional[Callable[[Dict[str, Any]], str]] = None,
+        polls_until_complete: int = 1
+    ):
+        """
+        初始化服務（port 為 0 時由系統分配端口）
+
+        Args:
+            host: 監聽地址
+            port: 監聽端口
+            responder: 請求 body -> 回答文本（默認 echo_responder）
+            polls_until_complete: 作業在第幾次查詢時完成
+        """
+        self.responder = responder or echo_responder
+        self.polls_until_complete = polls_until_complete
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"uploads": 0, "batches": 0, "downloads": 0}
+        self._ids = itertools.count(1)
+        self._polls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """BatchRunner 的 base_url"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "LocalBatchServer":
+        """在後台線程中開始服務"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="local-batch-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在當前線程中服務（命令行使用）"""
+        self._server.serve_forever()
+
+    def stop(self):
+        """停止服務"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "LocalBatchServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # 接口
+    # ------------------------------------------------------------------
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}-{next(self._ids)}"
+
+    def upload(self, content: bytes) -> Dict[str, Any]:
+        with self._lock:
+            file_id = self._new_id("file")
+            self.files[file_id] = content
+            self.stats["uploads"] += 1
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": f"{file_id}.jsonl", "purpose": "batch", "status": "processed"}
+
+    def create_batch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if params["input_file_id"] not in self.files:
+                raise KeyError(params["input_file_id"])
+            batch_id = self._new_id("batch")
+            self.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": params["endpoint"],
+                "input_file_id": params["input_file_id"],
+                "completion_window": params["completion_window"],
+                "metadata": params.get("metadata"),
+                "created_at": int(time.time()),
+                "status": "in_progress",
+                "output_file_id": None,
+                "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0}
+            }
+            self._polls[batch_id] = 0
+            self.stats["batches"] += 1
+            return dict(self.batches[batch_id])
+
+    def retrieve_batch(self, batch_id: str) -> Dict[str, Any]:
+        with self._lock:
+            batch = self.batches[batch_id]
+            self._polls[batch_id] += 1
+            if batch["status"] == "in_progress" and self._polls[batch_id] >= self.polls_until_complete:
+                self._complete(batch)
+            return dict(batch)
+
+    def _complete(self, batch: Dict[str, Any]):
+        """執行作業中的全部請求，生成輸出與錯誤文件"""
+        outputs, errors = [], []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            try:
+                text = self.responder(request["body"])
+            except Exception as e:
+                errors.append({"custom_id": request["custom_id"], "response": {
+                    "status_code": 500, "body": {"error": {"message": str(e)}}}})
+                continue
+            outputs.append({"custom_id": request["custom_id"], "response": {
+                "status_code": 200,
+                "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]}
+            }})
+
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs),
+                                   "failed": len(errors)}
+        batch["output_file_id"] = self._store(outputs)
+        batch["error_file_id"] = self._store(errors) if errors else None
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def _store(self, items) -> str:
+        file_id = self._new_id("file")
+        self.files[file_id] = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items).encode("utf-8")
+        return file_id
+
+    def download(self, file_id: str) -> bytes:
+        with self._lock:
+            self.stats["downloads"] += 1
+            return self.files[file_id]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+            def _send(self, status: int, payload: Any = None, raw: Optional[bytes] = None):
+                data = raw if raw is not None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if raw is not None else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                try:
+                    if self.path.rstrip("/") == "/v1/files":
+                        message = BytesParser(policy=default_policy).parsebytes(
+                            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("latin-1") + self._body()
+                        )
+                        for part in message.iter_parts():
+                            if part.get_param("name", header="content-disposition") == "file":
+                                return self._send(200, server.upload(part.get_payload(decode=True)))
+                        return self._send(400, {"error": {"message": "缺少 file 字段"}})
+                    if self.path.rstrip("/") == "/v1/batches":
+                        return self._send(200, server.create_batch(json.loads(self._body())))
+                except KeyError as e:
+                    return self._send(404, {"error": {"message": f"不存在: {e}"}})
+                self._send(404, {"error": {"message": f"未知接口: {self.path}"}})
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                try:
+                    if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+                        return self._send(200, server.retrieve_batch(parts[2]))
+                    if parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content":
+                        return self._send(200, raw=server.download(parts[2]))
+                except KeyError as e:
+                    return self._send(404, {"error": {"message": f"不存在: {e}"}})
+                self._send(404, {"error": {"message": f"未知接口: {self.path}"}})
+
+        return Handler
@@ -0,0 +1,234 @@
+"""
+準確率的 Bootstrap 置信區間
+排行榜上每位玩家只有一個準確率，無法判斷兩位玩家（或兩組陣容）的差距是否只是
+選詞的偶然。這裡以詞語為重抽樣單位（同一詞語的全部屬性和全部玩家一起抽取，
+保留它們之間的相關性），在詞語分層內有放回地抽樣，計算每位玩家總體與各屬性
+準確率、以及每對玩家準確率差的百分位區間。每次重抽樣只是一組詞語權重，
+全部重抽樣合起來是一次 (重抽樣 × 詞語) @ (詞語 × 屬性·玩家) 的矩陣乘法
+"""
+from typing import List, Dict, Any, Sequence, Tuple, Optional, Callable
+import logging
+import warnings
+import numpy as np
+
+from .ratings import _round_correctness
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESAMPLES = 2000
+
+
+def word_length_stratum(word: str) -> str:
+    """默認分層：按詞語字數（雙字詞與四字成語的難度差異很大）"""
+    return f"{len(word)}字"
+
+
+def build_word_tensors(
+    rounds: Sequence[Any],
+    stratum_of: Optional[Callable[[str], Any]] = word_length_stratum
+) -> Tuple[np.ndarray, np.ndarray, List[str], List[str], List[str], np.ndarray]:
+    """
+    把遊戲歷史整理為詞語 × 屬性 × 玩家的答對數與回答數
+
+    同一詞語在多次運行中出現時合併為一個重抽樣單位；調用失敗的回答不計。
+
+    Args:
+        rounds: 遊戲歷史（RoundRecord 或 to_dict() 後的字典，可來自多個結果文件）
+        stratum_of: 詞語到分層標籤的函數（None 表示不分層）
+
+    Returns:
+        Tuple: (答對數 float64 [詞語, 屬性, 玩家]，回答數 float64 [詞語, 屬性, 玩家]，
+        詞語列表，屬性列表，玩家列表，每個詞語的分層編號)
+    """
+    word_index: Dict[str, int] = {}
+    attribute_index: Dict[str, int] = {}
+    player_index: Dict[str, int] = {}
+    word_column, attribute_column, player_column, values = [], [], [], []
+
+    for round_results in rounds:
+        word, player_results = _round_correctness(round_results)
+        word_id = word_index.setdefault(word, len(word_index))
+        for player_name, answers in player_results:
+            if not answers:
+                continue
+            player = player_index.setdefault(player_name, len(player_index))
+            word_column.extend([word_id] * len(answers))
+            player_column.extend([player] * len(answers))
+            for attribute, correct in answers:
+                column = attribute_index.get(attribute)
+                if column is None:
+                    column = attribute_index[attribute] = len(attribute_index)
+                attribute_column.append(column)
+                values.append(correct)
+
+    shape = (len(word_index), len(attribute_index), len(player_index))
+    flat = (np.asarray(word_column, dtype=np.int64) * shape[1]
+            + np.asarray(attribute_column, dtype=np.int64)) * shape[2] \
+        + np.asarray(player_column, dtype=np.int64)
+    size = shape[0] * shape[1] * shape[2]
+    correct = np.bincount(flat, weights=np.asarray(values, dtype=np.float64), minlength=size).reshape(shape)
+    counts = np.bincount(flat, minlength=size).astype(np.float64).reshape(shape)
+
+    words = list(word_index)
+    if stratum_of is None:
+        strata = np.zeros(len(words), dtype=np.int64)
+    else:
+        _, strata = np.unique(np.array([str(stratum_of(word)) for word in words]), return_inverse=True)
+    return correct, counts, words, list(attribute_index), list(player_index), strata.reshape(-1)
+
+
+def resample_weights(strata: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    分層重抽樣的詞語權重
+
+    每個分層內有放回地抽取與該層詞語數相同的詞語；權重為每個詞語被抽中的次數。
+
+    Args:
+        strata: 每個詞語的分層編號
+        resamples: 重抽樣次數
+        rng: 隨機數生成器
+
+    Returns:
+        np.ndarray: 權重 float64 [重抽樣, 詞語]
+    """
+    weights = np.zeros((resamples, len(strata)))
+    for stratum in np.unique(strata):
+        members = np.flatnonzero(strata == stratum)
+        size = len(members)
+        draws = rng.integers(0, size, size=(resamples, size))
+        # 第 b 次重抽樣的第 k 個成員被抽中的次數：展平後一次 bincount
+        flat = (np.arange(resamples)[:, None] * size + draws).ravel()
+        weights[:, members] = np.bincount(flat, minlength=resamples * size).reshape(resamples, size)
+    return weights
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator > 0)
+
+
+def _bounds(samples: np.ndarray, alpha: float) -> Tuple[np.ndarray, np.ndarray]:
+    """沿重抽樣軸（第 0 軸）一次計算全部百分位區間；無法計算的重抽樣（NaN）不計"""
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanquantile(samples, [alpha / 2.0, 1.0 - alpha / 2.0], axis=0)
+    return low, high
+
+
+def _p_values(samples: np.ndarray) -> np.ndarray:
+    """雙側 bootstrap p 值：差值越過 0 的重抽樣比例的兩倍"""
+    valid = np.isfinite(samples)
+    total = valid.sum(axis=0)
+    below = ((samples <= 0.0) & valid).sum(axis=0)
+    above = ((samples >= 0.0) & valid).sum(axis=0)
+    tail = np.divide(np.minimum(below, above), total, out=np.full(total.shape, np.nan), where=total > 0)
+    return np.minimum(1.0, 2.0 * tail)
+
+
+def _interval(estimate, low, high, p_value=None) -> Dict[str, Optional[float]]:
+    if not (np.isfinite(estimate) and np.isfinite(low) and np.isfinite(high)):
+        return {"estimate": None, "ci_low": None, "ci_high": None}
+    interval = {"estimate": round(float(estimate), 4), "ci_low": round(float(low), 4),
+                "ci_high": round(float(high), 4)}
+    if p_value is not None:
+        interval["p_value"] = round(float(p_value), 4)
+    return interval
+
+
+def bootstrap_accuracy(
+    rounds: Sequence[Any],
+    resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = 0.95,
+    stratum_of: Optional[Callable[[str], Any]] = word_length_stratum,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    計算準確率與兩兩準確率差的分層 bootstrap 置信區間
+
+    準確率差按同一組重抽樣詞語計算（配對比較）；relative 為總體準確率的相對提升
+    （acc_a / acc_b - 1），對應「某陣容比對照組高 32%」這類結論。
+
+    Args:
+        rounds: 遊戲歷史
+        resamples: 重抽樣次數
+        confidence: 置信區間水平
+        stratum_of: 詞語到分層標籤的函數（None 表示不分層）
+        seed: 隨機種子
+
+    Returns:
+        Dict: method、confidence、resamples、words、strata、attributes、
+        players（每位玩家的 overall 與各屬性區間，按總體準確率排序）、
+        differences（每對玩家的 overall、relative 與各屬性區間及 p 值）
+    """
+    correct, counts, words, attributes, players, strata = build_word_tensors(rounds, stratum_of)
+    result = {
+        "method": "stratified-bootstrap",
+        "confidence": confidence,
+        "resamples": resamples,
+        "words": len(words),
+        "strata": int(strata.max()) + 1 if len(strata) else 0,
+        "attributes": attributes,
+        "players": [],
+        "differences": []
+    }
+    if not words or not players:
+        return result
+
+    alpha = 1.0 - confidence
+    num_words, num_attributes, num_players = correct.shape
+    weights = resample_weights(strata, resamples, np.random.default_rng(seed))
+
+    # 各屬性：[重抽樣, 屬性, 玩家]；總體：先按屬性求和再相除（按回答數加權）
+    correct_flat = correct.reshape(num_words, -1)
+    counts_flat = counts.reshape(num_words, -1)
+    sampled_correct = (weights @ correct_flat).reshape(resamples, num_attributes, num_players)
+    sampled_counts = (weights @ counts_flat).reshape(resamples, num_attributes, num_players)
+    attribute_samples = _ratio(sampled_correct, sampled_counts)
+    overall_samples = _ratio(sampled_correct.sum(axis=1), sampled_counts.sum(axis=1))
+
+    attribute_estimate = _ratio(correct.sum(axis=0), counts.sum(axis=0))
+    overall_estimate = _ratio(correct.sum(axis=(0, 1)), counts.sum(axis=(0, 1)))
+
+    attribute_low, attribute_high = _bounds(attribute_samples, alpha)
+    overall_low, overall_high = _bounds(overall_samples, alpha)
+    for player in np.argsort(-np.nan_to_num(overall_estimate, nan=-1.0), kind="stable"):
+        result["players"].append({
+            "name": players[player],
+            "answers": int(counts[:, :, player].sum()),
+            "overall": _interval(overall_estimate[player], overall_low[player], overall_high[player]),
+            "attributes": {
+                attribute: _interval(attribute_estimate[index, player],
+                                     attribute_low[index, player], attribute_high[index, player])
+                for index, attribute in enumerate(attributes)
+            }
+        })
+
+    # 兩兩差值：[重抽樣, (屬性,) 玩家對]，同一組重抽樣詞語上配對相減
+    first, second = np.triu_indices(num_players, k=1)
+    overall_differences = overall_samples[:, first] - overall_samples[:, second]
+    attribute_differences = attribute_samples[:, :, first] - attribute_samples[:, :, second]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_samples = overall_samples[:, first] / overall_samples[:, second] - 1.0
+        relative_estimate = overall_estimate[first] / overall_estimate[second] - 1.0
+    relative_samples[~np.isfinite(relative_samples)] = np.nan
+
+    overall_estimate_diff = overall_estimate[first] - overall_estimate[second]
+    attribute_estimate_diff = attribute_estimate[:, first] - attribute_estimate[:, second]
+    overall_low, overall_high = _bounds(overall_differences, alpha)
+    relative_low, relative_high = _bounds(relative_samples, alpha)
+    attribute_low, attribute_high = _bounds(attribute_differences, alpha)
+    overall_p = _p_values(overall_differences)
+    attribute_p = _p_values(attribute_differences)
+
+    for pair, (a, b) in enumerate(zip(first, second)):
+        result["differences"].append({
+            "players": [players[a], players[b]],
+            "overall": _interval(overall_estimate_diff[pair], overall_low[pair], overall_high[pair],
+                                 overall_p[pair]),
+            "relative": _interval(relative_estimate[pair], relative_low[pair], relative_high[pair]),
+            "attributes": {
+                attribute: _interval(attribute_estimate_diff[index, pair], attribute_low[index, pair],
+                                     attribute_high[index, pair], attribute_p[index, pair])
+                for index, attribute in enumerate(attributes)
+            }
+        })
+    return result
@@ -0,0 +1,130 @@
+"""
+置信度校準
+對模型輸出的原始概率做溫度縮放，並可從已標註的回答中擬合溫度
+（python src/calibrate.py 從保存的結果擬合並寫入玩家配置的 confidence_temperature）
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+
+# 避免 logit 溢出
+_EPSILON = 1e-6
+
+
+def _logit(p: float) -> float:
+    p = min(max(p, _EPSILON), 1 - _EPSILON)
+    return math.log(p / (1 - p))
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1 / (1 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1 + z)
+
+
+def calibrate(p_yes: float, temperature: float = 1.0) -> float:
+    """
+    溫度縮放校準
+
+    Args:
+        p_yes: 原始 P(是)
+        temperature: 溫度（>1 使置信度更保守，<1 更激進）
+
+    Returns:
+        float: 校準後的 P(是)
+    """
+    if temperature == 1.0:
+        return p_yes
+    return _sigmoid(_logit(p_yes) / temperature)
+
+
+def fit_temperature(
+    probabilities: Sequence[float],
+    labels: Sequence[bool],
+    grid: Optional[List[float]] = None
+) -> float:
+    """
+    在網格上擬合使負對數似然最小的溫度
+
+    Args:
+        probabilities: 原始 P(是)
+        labels: 參考答案（裁判判定的正確答案）
+        grid: 候選溫度（默認 0.25 ~ 4.0）
+
+    Returns:
+        float: 最優溫度
+    """
+    if grid is None:
+        grid = [0.25 * i for i in range(1, 17)]
+    logits = [_logit(p) for p in probabilities]
+
+    best_temperature, best_nll = 1.0, float("inf")
+    for temperature in grid:
+        nll = 0.0
+        for logit, label in zip(logits, labels):
+            p = min(max(_sigmoid(logit / temperature), _EPSILON), 1 - _EPSILON)
+            nll -= math.log(p if label else 1 - p)
+        if nll < best_nll:
+            best_temperature, best_nll = temperature, nll
+    return best_temperature
+
+
+def calibration_samples(results: Dict[str, Any]) -> Dict[str, Tuple[List[float], List[bool]]]:
+    """
+    從一份遊戲結果中提取每位玩家 logprobs 回答的原始 P(是) 與裁判判定的參考答案
+
+    結果中的置信度已按當時的溫度校準，按排行榜中記錄的 confidence_temperature
+    （未記錄即 1.0）還原為原始概率。文本解析回答的置信度是固定值，級聯中
+    便宜模型的回答來自另一個模型，均不參與擬合；調用錯誤沒有回答，自然跳過。
+
+    Args:
+        results: 遊戲結果（game_results_*.json 的結構）
+
+    Returns:
+        Dict[str, Tuple[List[float], List[bool]]]: 玩家名 -> (原始 P(是), 參考答案)
+    """
+    temperatures = {
+        stats["name"]: stats.get("confidence_temperature", 1.0)
+        for stats in results.get("leaderboard", [])
+    }
+    samples: Dict[str, Tuple[List[float], List[bool]]] = {}
+    for round_results in results.get("game_history") or []:
+        for player_result in round_results["player_results"]:
+            name = player_result["player_name"]
+            temperature = temperatures.get(name, 1.0)
+            for answer in player_result["boolean_answers"]:
+                if answer.get("answer_source") != "logprobs" or answer.get("tier") == "cheap":
+                    continue
+                p_yes = answer["confidence"] if answer["answer"] else 1 - answer["confidence"]
+                probabilities, labels = samples.setdefault(name, ([], []))
+                probabilities.append(_sigmoid(_logit(p_yes) * temperature))
+                labels.append(answer["answer"] if answer["correct"] else not answer["answer"])
+    return samples
+
+
+def fit_player_temperatures(
+    results_list: Iterable[Dict[str, Any]],
+    min_samples: int = 50
+) -> Dict[str, Dict[str, Any]]:
+    """
+    合併多份結果，為每位玩家擬合溫度
+
+    Args:
+        results_list: 遊戲結果
+        min_samples: 擬合所需的最少 logprobs 回答數（不足的玩家不擬合）
+
+    Returns:
+        Dict[str, Dict]: 玩家名 -> {temperature, samples}；樣本不足時 temperature 為 None
+    """
+    merged: Dict[str, Tuple[List[float], List[bool]]] = {}
+    for results in results_list:
+        for name, (probabilities, labels) in calibration_samples(results).items():
+            merged_probabilities, merged_labels = merged.setdefault(name, ([], []))
+            merged_probabilities.extend(probabilities)
+            merged_labels.extend(labels)
+
+    fitted = {}
+    for name, (probabilities, labels) in merged.items():
+        temperature = fit_temperature(probabilities, labels) if len(labels) >= min_samples else None
+        fitted[name] = {"temperature": temperature, "samples": len(labels)}
+    return fitted
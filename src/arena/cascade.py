@@ -0,0 +1,311 @@
+"""
+模型級聯（Cascade）
+多數供應商在所配置的大模型旁邊還有便宜、快速的檔位（glm-4-flash、hunyuan-lite、
+qwen-turbo）。級聯玩家先用便宜模型以單 token 快速模式回答，只有當置信度低於閾值、
+或多個便宜模型之間未達成一致時，才把這道題升級給玩家本身配置的大模型。
+只有 logprobs 回答帶有真實概率；文本解析回答的置信度是常數，視為低於任何正的閾值。
+每個回答都記錄由哪一檔回答。閾值可以用 bench_cascade.py 的延遲/成本/準確率基準調整
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+
+from .player import AIPlayer, BooleanAnswer
+
+logger = logging.getLogger(__name__)
+
+# 回答檔位
+CHEAP = "cheap"
+EXPENSIVE = "expensive"
+
+# 升級原因
+LOW_CONFIDENCE = "low_confidence"
+DISAGREEMENT = "disagreement"
+CHEAP_ERROR = "cheap_error"
+
+# 多個便宜模型並發提問共用的線程池（懶加載）
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """獲取共用線程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="cascade")
+        return _executor
+
+
+def as_vote(detail: BooleanAnswer) -> Tuple[bool, Optional[float]]:
+    """
+    便宜模型回答轉為投票：(回答, 置信度)，只有 logprobs 回答帶置信度
+
+    文本解析回答的置信度只是玩家的常數 text_answer_confidence，不反映模型的把握，
+    記為 None（不能通過置信度閾值）。
+    """
+    if detail.source == BooleanAnswer.LOGPROBS:
+        return detail.answer, detail.confidence
+    return detail.answer, None
+
+
+def decide(
+    votes: Sequence[Optional[Tuple[bool, Optional[float]]]],
+    confidence_threshold: float,
+    min_agreement: float
+) -> Tuple[Optional[bool], Optional[float], Optional[str]]:
+    """
+    根據便宜模型的回答決定是否升級（運行時與基準調參共用）
+
+    多數答案的置信度取同意多數的各模型置信度的平均（其中有沒有概率的文本回答時為 None，
+    視為低於任何正的閾值）；一致率為同意多數的模型比例。
+
+    Args:
+        votes: 每個便宜模型的 (回答, 置信度)，置信度 None 表示文本回答，調用失敗為 None
+        confidence_threshold: 置信度低於此值時升級（0 表示只按一致率升級）
+        min_agreement: 一致率低於此值時升級（1.0 表示要求全部一致）
+
+    Returns:
+        Tuple: (多數答案, 其置信度（未知時為 None）, 升級原因；None 表示由便宜模型回答)
+    """
+    answered = [vote for vote in votes if vote is not None]
+    if not answered:
+        return None, None, CHEAP_ERROR
+    yes = [confidence for answer, confidence in answered if answer]
+    no = [confidence for answer, confidence in answered if not answer]
+    # 票數相同時比較置信度之和（文本回答按 0.5 計）
+    majority = len(yes) > len(no) or (
+        len(yes) == len(no) and _total(yes) >= _total(no)
+    )
+    agreeing = yes if majority else no
+    confidence = None if None in agreeing else sum(agreeing) / len(agreeing)
+    if len(agreeing) / len(answered) < min_agreement:
+        return majority, confidence, DISAGREEMENT
+    if confidence_threshold > 0 and (confidence is None or confidence < confidence_threshold):
+        return majority, confidence, LOW_CONFIDENCE
+    return majority, confidence, None
+
+
+def _total(confidences: Sequence[Optional[float]]) -> float:
+    return sum(0.5 if confidence is None else confidence for confidence in confidences)
+
+
+class CascadePolicy:
+    """
+    單個玩家的級聯策略
+
+    便宜模型（可跨供應商）並發回答；不升級時直接採用其多數答案，
+    升級時由玩家本身（大模型）按遊戲的回答模式重新回答。
+    """
+
+    def __init__(
+        self,
+        cheap: List[AIPlayer],
+        enabled: bool = True,
+        confidence_threshold: float = 0.8,
+        min_agreement: float = 1.0,
+        cheap_costs: Optional[List[float]] = None,
+        expensive_cost: float = 1.0
+    ):
+        """
+        初始化級聯策略
+
+        Args:
+            cheap: 便宜檔位的玩家（按配置順序）
+            enabled: 是否啟用
+            confidence_threshold: 便宜模型置信度低於此值時升級
+            min_agreement: 便宜模型的一致率低於此值時升級
+            cheap_costs: 每個便宜模型單次調用的相對成本（默認 0.1）
+            expensive_cost: 大模型單次調用的相對成本
+        """
+        self.cheap = cheap
+        self.enabled = enabled
+        self.confidence_threshold = confidence_threshold
+        self.min_agreement = min_agreement
+        self.cheap_costs = cheap_costs if cheap_costs is not None else [0.1] * len(cheap)
+        self.expensive_cost = expensive_cost
+
+        self.questions = 0
+        self.escalations: Dict[str, int] = {LOW_CONFIDENCE: 0, DISAGREEMENT: 0, CHEAP_ERROR: 0}
+        self.cost = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], cheap: List[AIPlayer],
+                    cheap_costs: Optional[List[float]] = None) -> "CascadePolicy":
+        """
+        從玩家配置中的 cascade 段創建策略
+
+        Args:
+            config: cascade 配置
+            cheap: 已創建的便宜檔位玩家
+            cheap_costs: 每個便宜模型的相對成本
+
+        Returns:
+            CascadePolicy: 級聯策略
+        """
+        threshold = config.get("confidence_threshold", 0.8)
+        min_agreement = config.get("min_agreement", 1.0)
+        text_tiers = [tier.model for tier in cheap if not (tier.supports_logprobs and tier.use_logprobs)]
+        if text_tiers and threshold > 0:
+            logger.warning(f"便宜模型 {', '.join(text_tiers)} 不支持（或未啟用）logprobs，其回答沒有置信度，"
+                           f"每道題都會因置信度升級；只按一致率升級請設 confidence_threshold: 0")
+        elif threshold <= 0 and (len(cheap) < 2 or min_agreement <= 0):
+            logger.warning("confidence_threshold 為 0 且一致率條件無法觸發（少於兩個便宜模型），"
+                           "所有題目都由便宜模型回答")
+        return cls(
+            cheap=cheap,
+            enabled=config.get("enabled", True),
+            confidence_threshold=threshold,
+            min_agreement=min_agreement,
+            cheap_costs=cheap_costs,
+            expensive_cost=config.get("cost", 1.0)
+        )
+
+    def remove_tier(self, tier: AIPlayer):
+        """移除不可用的便宜模型（如預檢失敗），其餘檔位照常工作"""
+        with self._lock:
+            index = self.cheap.index(tier)
+            del self.cheap[index]
+            del self.cheap_costs[index]
+
+    def _ask(self, player: AIPlayer, tier: AIPlayer, word: str, attr_desc: str) -> Optional[Tuple[bool, Optional[float]]]:
+        """向一個便宜模型提問（失敗時返回 None，由大模型兜底）"""
+        player.record_api_call()
+        try:
+            detail = tier.answer_boolean_with_confidence(word, attr_desc)
+        except Exception as e:
+            logger.debug("%s 的便宜模型 %s 回答失敗: %s", player.name, tier.model, e)
+            return None
+        return as_vote(detail)
+
+    def answer(
+        self,
+        player: AIPlayer,
+        word: str,
+        attr_desc: str,
+        escalate: Callable[[], Tuple[bool, Optional[BooleanAnswer]]]
+    ) -> BooleanAnswer:
+        """
+        以級聯方式回答一道布林題
+
+        Args:
+            player: 級聯玩家（大模型）
+            word: 中文詞語
+            attr_desc: 屬性描述
+            escalate: 由大模型回答的調用（返回 (回答, 快速模式下的詳情)，可走對沖路徑）
+
+        Returns:
+            BooleanAnswer: 回答，tier 記錄由哪一檔回答
+
+        Raises:
+            ProviderError: 升級後大模型調用失敗
+        """
+        tiers = list(self.cheap)
+        if len(tiers) == 1:
+            votes = [self._ask(player, tiers[0], word, attr_desc)]
+        else:
+            executor = _get_executor()
+            futures = [executor.submit(self._ask, player, tier, word, attr_desc) for tier in tiers]
+            votes = [future.result() for future in futures]
+
+        answer, confidence, reason = decide(votes, self.confidence_threshold, self.min_agreement)
+        cost = sum(self.cheap_costs[:len(tiers)])
+        if reason is None:
+            with self._lock:
+                self.questions += 1
+                self.cost += cost
+            if confidence is None:
+                confidence = player.text_answer_confidence
+            return BooleanAnswer(answer, confidence, BooleanAnswer.CASCADE, tier=CHEAP)
+
+        with self._lock:
+            self.questions += 1
+            self.escalations[reason] += 1
+            self.cost += cost + self.expensive_cost
+        logger.debug("%s 升級至 %s (%s，便宜模型置信度 %s)", player.name, player.model, reason,
+                     "未知" if confidence is None else f"{confidence:.3f}")
+        answer, detail = escalate()
+        if detail is None:
+            return BooleanAnswer(answer, player.text_answer_confidence, BooleanAnswer.TEXT, tier=EXPENSIVE)
+        # 不修改 detail 本身（去重時可能被其他實驗共享）
+        return BooleanAnswer(detail.answer, detail.confidence, detail.source, tier=EXPENSIVE)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取級聯統計"""
+        escalated = sum(self.escalations.values())
+        return {
+            "cheap_models": [tier.model for tier in self.cheap],
+            "confidence_threshold": self.confidence_threshold,
+            "min_agreement": self.min_agreement,
+            "questions": self.questions,
+            "escalations": escalated,
+            "escalation_rate": round(escalated / self.questions, 4) if self.questions else 0.0,
+            "escalation_reasons": dict(self.escalations),
+            "relative_cost": round(self.cost / (self.questions * self.expensive_cost), 4) if self.questions else 0.0
+        }
+
+
+def sweep_thresholds(
+    samples: Sequence[Dict[str, Any]],
+    confidence_thresholds: Sequence[float],
+    min_agreements: Sequence[float],
+    cheap_costs: Sequence[float],
+    expensive_cost: float = 1.0
+) -> List[Dict[str, Any]]:
+    """
+    在基準樣本上評估不同閾值組合的延遲、成本與準確率
+
+    每個樣本是同一道題分別問過全部檔位的結果：
+    votes（每個便宜模型的 (回答, 置信度) 或 None，文本回答的置信度為 None）、cheap_correct（每個便宜模型答案是否正確，
+    僅用於多數答案）、cheap_latency（便宜模型並發時取最慢者，秒）、
+    expensive_correct、expensive_latency。
+
+    Args:
+        samples: 基準樣本
+        confidence_thresholds: 候選置信度閾值
+        min_agreements: 候選一致率閾值
+        cheap_costs: 每個便宜模型單次調用的相對成本
+        expensive_cost: 大模型單次調用的相對成本
+
+    Returns:
+        List[Dict]: 每個組合的 confidence_threshold、min_agreement、escalation_rate、
+        accuracy、mean_latency、relative_cost（相對於每題都問大模型）
+    """
+    rows = []
+    if not samples:
+        return rows
+    cheap_cost = sum(cheap_costs)
+    for min_agreement in min_agreements:
+        for threshold in confidence_thresholds:
+            escalated = correct = 0
+            latency = 0.0
+            for sample in samples:
+                answer, _, reason = decide(sample["votes"], threshold, min_agreement)
+                latency += sample["cheap_latency"]
+                if reason is None:
+                    correct += _majority_correct(sample, answer)
+                else:
+                    escalated += 1
+                    correct += sample["expensive_correct"]
+                    latency += sample["expensive_latency"]
+            count = len(samples)
+            rows.append({
+                "confidence_threshold": threshold,
+                "min_agreement": min_agreement,
+                "escalation_rate": round(escalated / count, 4),
+                "accuracy": round(correct / count, 4),
+                "mean_latency": round(latency / count, 4),
+                "relative_cost": round((cheap_cost * count + expensive_cost * escalated)
+                                       / (expensive_cost * count), 4)
+            })
+    return rows
+
+
+def _majority_correct(sample: Dict[str, Any], answer: bool) -> bool:
+    """多數答案是否正確：取任一給出該答案的便宜模型的評判"""
+    for vote, correct in zip(sample["votes"], sample["cheap_correct"]):
+        if vote is not None and vote[0] == answer:
+            return bool(correct)
+    return False
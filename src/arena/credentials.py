@@ -0,0 +1,318 @@
+"""
+API 密鑰池
+每種玩家可配置多組密鑰（如 DEEPSEEK_API_KEY、DEEPSEEK_API_KEY_1..N），
+按負載最小優先輪換，逐密鑰統計請求速率，被限流或認證失敗的密鑰自動隔離一段時間；
+同一環境變量前綴的玩家共享一個密鑰池
+"""
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from collections import deque
+from contextlib import contextmanager
+import os
+import re
+import threading
+import time
+import logging
+
+from .resilience import ProviderError, ThrottledError, RATE_LIMITED, AUTH
+
+logger = logging.getLogger(__name__)
+
+# 速率統計窗口（秒）
+RATE_WINDOW = 60.0
+
+
+def load_credentials(env_names: Sequence[str]) -> List[Tuple[str, Union[str, Tuple[str, ...]]]]:
+    """
+    從環境變量讀取一組密鑰
+
+    依次讀取不帶後綴的變量與 _1、_2 … 編號變量（按編號排序，允許跳號）；
+    需要多個變量組成一份憑證時（如 SecretId + SecretKey），按相同後綴配對。
+
+    Args:
+        env_names: 組成一份憑證的環境變量名
+
+    Returns:
+        List[Tuple[str, Any]]: (標籤, 密鑰) 列表；標籤為環境變量名，日誌中不出現密鑰本身
+    """
+    primary = env_names[0]
+    pattern = re.compile(rf"^{re.escape(primary)}_(\d+)$")
+    suffixes = [""] + [
+        f"_{number}" for number in sorted(
+            int(match.group(1)) for match in map(pattern.match, os.environ) if match
+        )
+    ]
+
+    credentials, seen = [], set()
+    for suffix in suffixes:
+        values = tuple(os.getenv(name + suffix) for name in env_names)
+        if not all(values):
+            if any(values):
+                logger.warning(f"{primary}{suffix} 的憑證不完整，已跳過")
+            continue
+        value = values[0] if len(values) == 1 else values
+        if value in seen:
+            continue
+        seen.add(value)
+        credentials.append((primary + suffix, value))
+    return credentials
+
+
+def _check_rpm(rpm: Optional[int]) -> Optional[int]:
+    """校驗每分鐘請求上限（不限速用 None，0 或負數會讓密鑰永遠不可用）"""
+    if rpm is not None and rpm <= 0:
+        raise ValueError(f"credentials.rpm 必須為正數（不限速請省略）: {rpm}")
+    return rpm
+
+
+class CredentialLimitedError(ProviderError):
+    """密鑰池中單個密鑰被服務端限流：該密鑰已隔離，立即換密鑰重試，不計入供應商熔斷器"""
+
+    breaker_failure = False
+
+    def __init__(self, provider: str, label: str, error: ProviderError):
+        super().__init__(provider, RATE_LIMITED, f"{label}: {error}",
+                         status_code=error.status_code, retry_after=0.0)
+
+
+class Credential:
+    """密鑰池中的一份憑證及其負載狀態"""
+
+    __slots__ = (
+        "label", "value", "in_flight", "recent", "quarantined_until", "quarantine_kind",
+        "consecutive_limits", "requests", "rate_limited", "auth_failures"
+    )
+
+    def __init__(self, label: str, value: Any):
+        self.label = label
+        self.value = value
+        self.in_flight = 0
+        # 最近 RATE_WINDOW 秒內的請求時間
+        self.recent = deque()
+        self.quarantined_until = 0.0
+        self.quarantine_kind = None
+        self.consecutive_limits = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.auth_failures = 0
+
+    def recent_requests(self, now: float) -> int:
+        """窗口內的請求數（順帶清理過期記錄）"""
+        recent = self.recent
+        while recent and now - recent[0] > RATE_WINDOW:
+            recent.popleft()
+        return len(recent)
+
+
+class CredentialPool:
+    """
+    密鑰池
+
+    每次調用租用負載最小（在途數最少、其次窗口內請求數最少）且未被隔離的密鑰；
+    限流錯誤按 Retry-After 或指數增長的冷卻時間隔離該密鑰，認證錯誤長時間隔離。
+    所有密鑰都不可用時拋出可重試的限流錯誤，由韌性層等待後重試
+    （全部因認證失敗被隔離時拋出不可重試的認證錯誤，不再發出請求）。
+    只有一個密鑰時不因限流隔離，行為與不使用密鑰池相同。
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        credentials: List[Tuple[str, Any]],
+        rpm: Optional[int] = None,
+        cooldown: float = 5.0,
+        max_cooldown: float = 300.0,
+        auth_cooldown: float = 3600.0
+    ):
+        """
+        初始化密鑰池
+
+        Args:
+            provider: 供應商標識
+            credentials: (標籤, 密鑰) 列表
+            rpm: 每個密鑰每分鐘最多請求數（None 表示不主動限速）
+            cooldown: 限流後的初始隔離時間（秒），連續限流時翻倍
+            max_cooldown: 限流隔離時間上限（秒）
+            auth_cooldown: 認證失敗後的隔離時間（秒）
+
+        Raises:
+            ValueError: rpm 不是正數
+        """
+        self.provider = provider
+        self.credentials = [Credential(label, value) for label, value in credentials]
+        self.rpm = _check_rpm(rpm)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.auth_cooldown = auth_cooldown
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    @property
+    def primary(self) -> Credential:
+        """第一份憑證（批處理等需要固定密鑰的場景使用）"""
+        return self.credentials[0]
+
+    def acquire(self) -> Credential:
+        """
+        租用一份憑證（用完需 release）
+
+        Returns:
+            Credential: 負載最小的可用憑證
+
+        Raises:
+            ThrottledError: 所有憑證都被隔離或達到速率上限（可重試，帶 retry_after）
+            ProviderError: 所有憑證都因認證失敗被隔離（AUTH）
+        """
+        with self._lock:
+            now = time.monotonic()
+            best, best_load, wait = None, None, None
+            for credential in self.credentials:
+                if credential.quarantined_until > now:
+                    remaining = credential.quarantined_until - now
+                    wait = remaining if wait is None else min(wait, remaining)
+                    continue
+                recent = credential.recent_requests(now)
+                if self.rpm is not None and recent >= self.rpm:
+                    remaining = RATE_WINDOW - (now - credential.recent[0])
+                    wait = remaining if wait is None else min(wait, remaining)
+                    continue
+                load = (credential.in_flight, recent)
+                if best is None or load < best_load:
+                    best, best_load = credential, load
+            if best is None:
+                if all(credential.quarantine_kind == AUTH for credential in self.credentials):
+                    raise ProviderError(self.provider, AUTH, f"{len(self.credentials)} 個密鑰均認證失敗")
+                raise ThrottledError(
+                    self.provider,
+                    f"{len(self.credentials)} 個密鑰均不可用（隔離或達到速率上限）",
+                    retry_after=wait
+                )
+            best.in_flight += 1
+            best.requests += 1
+            best.recent.append(now)
+            return best
+
+    def release(self, credential: Credential, error: Optional[ProviderError] = None):
+        """
+        歸還憑證，並根據調用結果更新隔離狀態
+
+        Args:
+            credential: acquire 返回的憑證
+            error: 調用失敗時的已分類錯誤
+        """
+        with self._lock:
+            credential.in_flight -= 1
+            if error is None or error.kind not in (RATE_LIMITED, AUTH) or \
+                    (error.kind == RATE_LIMITED and len(self.credentials) == 1):
+                if error is None:
+                    credential.consecutive_limits = 0
+                return
+            now = time.monotonic()
+            if credential.quarantined_until > now:
+                # 隔離前已發出的請求陸續失敗，不重複延長隔離
+                return
+            if error.kind == AUTH:
+                credential.auth_failures += 1
+                duration = self.auth_cooldown
+            else:
+                credential.rate_limited += 1
+                credential.consecutive_limits += 1
+                duration = error.retry_after
+                if duration is None:
+                    duration = min(self.max_cooldown,
+                                   self.cooldown * 2 ** (credential.consecutive_limits - 1))
+            credential.quarantined_until = now + duration
+            credential.quarantine_kind = error.kind
+        logger.warning("%s 密鑰 %s 已隔離 %.1fs (%s)", self.provider, credential.label,
+                       duration, error.kind,
+                       extra={"provider": self.provider, "error_kind": error.kind})
+
+    @contextmanager
+    def lease(self):
+        """
+        租用憑證的上下文管理器：異常時按錯誤類型更新隔離狀態後拋出
+        （池中有多個密鑰時，單個密鑰被限流轉為可立即換密鑰重試的 CredentialLimitedError）
+
+        用法: ``with pool.lease() as credential: ...``
+        """
+        credential = self.acquire()
+        error = None
+        try:
+            yield credential
+        except Exception as exc:
+            error = ProviderError.from_exception(self.provider, exc)
+            if error.kind == RATE_LIMITED and len(self.credentials) > 1:
+                raise CredentialLimitedError(self.provider, credential.label, error) from exc
+            raise
+        finally:
+            self.release(credential, error)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """逐密鑰的統計（不含密鑰本身）"""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "label": credential.label,
+                    "requests": credential.requests,
+                    "rate_limited": credential.rate_limited,
+                    "auth_failures": credential.auth_failures,
+                    "requests_last_minute": credential.recent_requests(now),
+                    "quarantined": credential.quarantined_until > now
+                }
+                for credential in self.credentials
+            ]
+
+
+# 每組環境變量一個密鑰池，同類玩家（含對沖備用玩家）共享
+_pools: Dict[Tuple[str, ...], CredentialPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_credential_pool(provider: str, *env_names: str) -> CredentialPool:
+    """
+    獲取（或創建）環境變量對應的密鑰池
+
+    Args:
+        provider: 供應商標識
+        *env_names: 組成一份憑證的環境變量名
+
+    Returns:
+        CredentialPool: 密鑰池
+
+    Raises:
+        ValueError: 未設置任何密鑰
+    """
+    with _pools_lock:
+        pool = _pools.get(env_names)
+        if pool is None:
+            credentials = load_credentials(env_names)
+            if not credentials:
+                raise ValueError(f"{' / '.join(env_names)} 環境變量未設置")
+            pool = CredentialPool(provider, credentials)
+            _pools[env_names] = pool
+            if len(credentials) > 1:
+                logger.info(f"{provider} 密鑰池: {len(credentials)} 個密鑰")
+        return pool
+
+
+def configure_credential_pool(pool: CredentialPool, config: Dict[str, Any]) -> CredentialPool:
+    """
+    根據配置調整密鑰池參數
+
+    Args:
+        pool: 密鑰池
+        config: credentials 配置段（rpm, cooldown, max_cooldown, auth_cooldown）
+
+    Returns:
+        CredentialPool: 密鑰池
+
+    Raises:
+        ValueError: rpm 不是正數
+    """
+    pool.rpm = _check_rpm(config.get("rpm", pool.rpm))
+    pool.cooldown = config.get("cooldown", pool.cooldown)
+    pool.max_cooldown = config.get("max_cooldown", pool.max_cooldown)
+    pool.auth_cooldown = config.get("auth_cooldown", pool.auth_cooldown)
+    return pool
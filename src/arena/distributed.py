@@ -0,0 +1,311 @@
+"""
+分佈式協調器 / Worker
+協調器將 (詞語, 玩家) 工作單元寫入持久化隊列並匯總結果；
+worker 各自持有部分供應商的 API 密鑰。內置的 SQLite 隊列只支持同一主機上的
+多個 worker 進程，跨主機需註冊網絡隊列後端（work_queue.register_work_queue_backend）
+"""
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+import os
+import socket
+import threading
+import time
+import logging
+
+from .game_engine import ArenaGame
+from .work_queue import WorkQueue, WorkUnit, DONE, FAILED, PENDING, LEASED
+
+logger = logging.getLogger(__name__)
+
+
+class Coordinator:
+    """分佈式運行的協調器"""
+
+    def __init__(self, queue: WorkQueue, run_id: Optional[str] = None):
+        """
+        初始化協調器
+
+        Args:
+            queue: 工作隊列
+            run_id: 運行標識（None 時自動生成；傳入已有 ID 可續跑/重新匯總）
+        """
+        self.queue = queue
+        self.run_id = run_id or datetime.now().strftime("run_%Y%m%d_%H%M%S")
+
+    def submit(
+        self,
+        words: List[str],
+        player_configs: List[Dict[str, Any]],
+        attributes: List[Dict[str, str]]
+    ) -> str:
+        """
+        登記運行並寫入所有工作單元（重複提交是冪等的）
+
+        Args:
+            words: 詞語列表（順序即輪次）
+            player_configs: 啟用的玩家配置（name, model）
+            attributes: 屬性列表
+
+        Returns:
+            str: 運行標識
+        """
+        players = [
+            {"name": config["name"], "model": config.get("model")}
+            for config in player_configs
+        ]
+        self.queue.create_run(self.run_id, {
+            "words": words,
+            "players": players,
+            "attributes": attributes,
+            "created_at": datetime.now().isoformat()
+        })
+        units = [
+            {"round": index + 1, "word": word, "player_name": player["name"]}
+            for index, word in enumerate(words)
+            for player in players
+        ]
+        self.queue.enqueue(self.run_id, units)
+        logger.info(f"運行 {self.run_id} 已提交: {len(words)} 詞 × {len(players)} 玩家 = {len(units)} 個工作單元")
+        return self.run_id
+
+    def wait(
+        self,
+        poll_interval: float = 5.0,
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None
+    ) -> Dict[str, int]:
+        """
+        等待所有工作單元完成或失敗
+
+        沒有單元在租、也沒有單元完成的狀態持續 stall_timeout 秒時，視為剩餘單元
+        無人領取（例如沒有 worker 持有這些玩家的密鑰），提前返回。
+
+        Args:
+            poll_interval: 輪詢間隔（秒）
+            timeout: 最長等待時間（秒，None 表示不限）
+            stall_timeout: 無人領取的判定時間（秒，None 表示不判定）
+
+        Returns:
+            Dict[str, int]: 各狀態單元數
+        """
+        start = last_progress = time.monotonic()
+        finished = None
+        while True:
+            counts = self.queue.counts(self.run_id)
+            outstanding = counts[PENDING] + counts[LEASED]
+            logger.info(f"運行 {self.run_id} 進度: 完成 {counts[DONE]}，失敗 {counts[FAILED]}，"
+                        f"待處理 {outstanding}")
+            if outstanding == 0:
+                return counts
+            now = time.monotonic()
+            if counts[LEASED] or counts[DONE] + counts[FAILED] != finished:
+                finished = counts[DONE] + counts[FAILED]
+                last_progress = now
+            if stall_timeout is not None and now - last_progress >= stall_timeout:
+                logger.warning(f"{counts[PENDING]} 個單元 {stall_timeout:.0f} 秒內無人領取"
+                               f"（是否有 worker 持有這些玩家的密鑰？）")
+                return counts
+            if timeout is not None and now - start >= timeout:
+                logger.warning(f"等待超時，仍有 {outstanding} 個單元未完成")
+                return counts
+            time.sleep(poll_interval)
+
+    def assemble(self) -> Dict[str, Any]:
+        """
+        匯總已完成的工作單元，生成與 ArenaGame.get_final_results 相同格式的結果
+
+        Returns:
+            Dict: 最終結果
+        """
+        run = self.queue.get_run(self.run_id)
+        if run is None:
+            raise ValueError(f"運行不存在: {self.run_id}")
+
+        players = run["players"]
+        order = {player["name"]: index for index, player in enumerate(players)}
+        rounds: Dict[int, Dict[str, Any]] = {}
+        api_calls = {player["name"]: 0 for player in players}
+
+        for unit in self.queue.results(self.run_id):
+            round_results = rounds.setdefault(unit["round"], {
+                "round": unit["round"],
+                "word": unit["word"],
+                "timestamp": None,
+                "player_results": []
+            })
+            if unit["status"] == DONE:
+                result = unit["result"]
+                player_result = result["player_result"]
+                api_calls[unit["player_name"]] = api_calls.get(unit["player_name"], 0) + result.get("api_calls", 0)
+                round_results["timestamp"] = round_results["timestamp"] or result.get("timestamp")
+            else:
+                player_result = {
+                    "player_name": unit["player_name"],
+                    "boolean_answers": [],
+                    "custom_attributes": [],
+                    "round_score": 0,
+                    "unit_error": unit["error"]
+                }
+            round_results["player_results"].append(player_result)
+
+        game_history = [rounds[number] for number in sorted(rounds)]
+        for round_results in game_history:
+            round_results["player_results"].sort(
+                key=lambda result: order.get(result["player_name"], len(order))
+            )
+
+        player_stats = [
+            _player_stats(player["name"], player["model"], game_history, api_calls.get(player["name"], 0))
+            for player in players
+        ]
+        return ArenaGame.build_results(player_stats, game_history, total_rounds=len(game_history))
+
+
+def _player_stats(
+    name: str,
+    model: Optional[str],
+    game_history: List[Dict[str, Any]],
+    api_calls: int
+) -> Dict[str, Any]:
+    """由遊戲歷史重建玩家統計（與 AIPlayer.get_stats 字段一致）"""
+    score = correct = total = errors = 0
+    for round_results in game_history:
+        for player_result in round_results["player_results"]:
+            if player_result["player_name"] != name:
+                continue
+            score += player_result["round_score"]
+            for answer in player_result["boolean_answers"]:
+                if "error" in answer:
+                    errors += 1
+                    continue
+                total += 1
+                correct += 1 if answer["correct"] else 0
+            if "custom_attributes_error" in player_result or "unit_error" in player_result:
+                errors += 1
+    return {
+        "name": name,
+        "model": model,
+        "score": score,
+        "correct_answers": correct,
+        "total_answers": total,
+        "accuracy": correct / total if total else 0.0,
+        "api_calls": api_calls,
+        "errors": errors
+    }
+
+
+class _Heartbeat:
+    """處理單元期間定期延長租約"""
+
+    def __init__(self, queue: WorkQueue, unit: WorkUnit, visibility_timeout: float):
+        self.queue = queue
+        self.unit = unit
+        self.visibility_timeout = visibility_timeout
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        interval = max(1.0, self.visibility_timeout / 3)
+        while not self._stop.wait(interval):
+            if not self.queue.extend(self.unit, self.visibility_timeout):
+                logger.warning(f"{self.unit} 租約已失效")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class Worker:
+    """分佈式運行的 worker：領取、執行並確認工作單元"""
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        game: ArenaGame,
+        worker_id: Optional[str] = None,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        run_id: Optional[str] = None
+    ):
+        """
+        初始化 worker
+
+        Args:
+            queue: 工作隊列
+            game: 本機的遊戲實例（只用其玩家與評判邏輯，不累積歷史）
+            worker_id: worker 標識（默認 主機名:PID）
+            visibility_timeout: 租約時長（秒）
+            max_attempts: 單元最大嘗試次數
+            run_id: 只處理指定運行（None 表示任意運行）
+        """
+        self.queue = queue
+        self.game = game
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.run_id = run_id
+        self.players = {player.name: player for player in game.players}
+        self._runs: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, exit_when_idle: bool = True, poll_interval: float = 2.0) -> int:
+        """
+        循環處理工作單元
+
+        Args:
+            exit_when_idle: 隊列中沒有可領取的單元時是否退出
+            poll_interval: 空閒時的輪詢間隔（秒）
+
+        Returns:
+            int: 處理的單元數
+        """
+        processed = 0
+        logger.info(f"Worker {self.worker_id} 啟動，可處理玩家: {list(self.players)}")
+        while True:
+            unit = self.queue.lease(
+                self.worker_id,
+                self.visibility_timeout,
+                player_names=list(self.players),
+                run_id=self.run_id,
+                max_attempts=self.max_attempts
+            )
+            if unit is None:
+                if exit_when_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+            self.process(unit)
+            processed += 1
+        logger.info(f"Worker {self.worker_id} 結束，共處理 {processed} 個單元")
+        return processed
+
+    def process(self, unit: WorkUnit):
+        """執行一個工作單元並確認"""
+        run = self._runs.get(unit.run_id)
+        if run is None:
+            run = self.queue.get_run(unit.run_id)
+            self._runs[unit.run_id] = run
+
+        player = self.players[unit.player_name]
+        try:
+            with _Heartbeat(self.queue, unit, self.visibility_timeout):
+                api_calls_before = player.api_calls
+                player_result = self.game.play_player_round(player, unit.word, run["attributes"])
+            result = {
+                "player_result": player_result.to_dict(),
+                "api_calls": player.api_calls - api_calls_before,
+                "worker_id": self.worker_id,
+                "timestamp": datetime.now().isoformat()
+            }
+        except Exception as e:
+            logger.error(f"{unit} 執行失敗: {e}", exc_info=True)
+            self.queue.fail(unit, str(e), self.max_attempts)
+            return
+
+        if not self.queue.ack(unit, result):
+            logger.warning(f"{unit} 確認失敗：租約已被其他 worker 接管，結果丟棄")
@@ -0,0 +1,157 @@
+"""
+實驗矩陣
+在一個進程中同時運行多份玩家配置（如默認陣容與血脈覺醒陣容）。
+密鑰池（含限速）、熔斷器、延遲統計和混元的連接池本來就按供應商在進程內共享；
+這裡再讓同類玩家共用 SDK 客戶端（及其連接池），並對各實驗中相同的
+(供應商, 模型, 端點, 玩家設置, 題目) 查詢去重：同一問題只調用一次 API，其他實驗直接沿用回答
+"""
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from concurrent.futures import Future
+import threading
+import logging
+
+from .player import AIPlayer
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    跨實驗的查詢去重
+
+    相同的 (供應商, 模型, 端點, 玩家設置, 方法, 參數) 只調用一次：第一個請求者發出調用，
+    同時到達的其他請求者等待同一個結果，之後的請求直接命中。
+    失敗的調用不緩存（等待中的請求者收到同一個錯誤，之後的請求重新調用）。
+    """
+
+    # 可去重的玩家方法（流式方法每次產出新的生成器，不去重）
+    CACHEABLE = frozenset({
+        "answer_boolean_question",
+        "answer_boolean_with_confidence",
+        "propose_custom_attributes"
+    })
+
+    def __init__(self):
+        self._entries: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def call(self, player: AIPlayer, method: str, args: tuple, invoke: Callable[[], Any]) -> Any:
+        """
+        去重調用玩家方法
+
+        Args:
+            player: 玩家
+            method: 方法名
+            args: 方法參數（需可哈希）
+            invoke: 實際發出調用的函數
+
+        Returns:
+            Any: 方法返回值（命中時與首次調用返回同一個對象，調用方不應修改）
+        """
+        key = (player.provider, player.model, _endpoint(player), _answer_settings(player), method, args)
+        with self._lock:
+            future = self._entries.get(key)
+            owner = future is None
+            if owner:
+                future = self._entries[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+        try:
+            result = invoke()
+        except BaseException as e:
+            with self._lock:
+                del self._entries[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取去重統計"""
+        total = self.hits + self.misses
+        return {
+            "queries": total,
+            "api_queries": self.misses,
+            "deduplicated": self.hits,
+            "dedup_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def _endpoint(player: AIPlayer) -> tuple:
+    """玩家請求的端點（同名模型可能部署在不同端點）"""
+    return getattr(player, "base_url", None), getattr(player, "host", None)
+
+
+def _answer_settings(player: AIPlayer) -> tuple:
+    """影響回答內容的玩家設置：置信度校準溫度、是否用 logprobs、對沖備用模型"""
+    hedge = player.hedge_policy
+    backup = hedge.backup if hedge is not None and hedge.enabled else None
+    return (
+        player.confidence_temperature,
+        player.use_logprobs,
+        (backup.model, _endpoint(backup)) if backup is not None else None
+    )
+
+
+def _client_key(player: AIPlayer) -> tuple:
+    """同類且指向同一端點的玩家共用客戶端"""
+    return (type(player),) + _endpoint(player)
+
+
+def _all_tiers(player: AIPlayer) -> List[AIPlayer]:
+    """玩家及其對沖備用模型、級聯便宜模型"""
+    tiers = [player]
+    if player.hedge_policy is not None and player.hedge_policy.backup is not None:
+        tiers.append(player.hedge_policy.backup)
+    if player.cascade_policy is not None:
+        tiers.extend(player.cascade_policy.cheap)
+    return tiers
+
+
+def share_clients(experiments: Sequence[Sequence[AIPlayer]]) -> int:
+    """
+    讓各實驗中同類玩家共用每個密鑰對應的 SDK 客戶端（及其連接池）
+
+    客戶端按密鑰標籤索引，與模型無關；密鑰池按環境變量在進程內共享，
+    因此同一供應商的所有玩家看到的是同一組密鑰標籤。
+
+    Args:
+        experiments: 各實驗的玩家列表
+
+    Returns:
+        int: 共用客戶端的玩家組數
+    """
+    registry: Dict[tuple, dict] = {}
+    for players in experiments:
+        for player in players:
+            for tier in _all_tiers(player):
+                tier._clients = registry.setdefault(_client_key(tier), tier._clients)
+    return len(registry)
+
+
+def model_key(player: AIPlayer) -> Tuple[str, str, tuple]:
+    """預檢按 (供應商, 模型, 端點) 識別同一個模型"""
+    return player.provider, player.model, _endpoint(player)
+
+
+def unique_players(experiments: Sequence[Sequence[AIPlayer]]) -> List[AIPlayer]:
+    """
+    各實驗中每個 (供應商, 模型, 端點) 取一位代表玩家（用於預檢，避免重複探測同一模型）
+
+    Args:
+        experiments: 各實驗的玩家列表
+
+    Returns:
+        List[AIPlayer]: 代表玩家
+    """
+    representatives: Dict[Tuple[str, str, tuple], AIPlayer] = {}
+    for players in experiments:
+        for player in players:
+            representatives.setdefault(model_key(player), player)
+    return list(representatives.values())
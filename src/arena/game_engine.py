@@ -2,13 +2,33 @@
 ArenaGame 遊戲引擎
 管理遊戲流程和玩家對戰
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from concurrent.futures import Future
 import logging
+import threading
+import time
 from datetime import datetime
 from tqdm import tqdm
 
-from .player import AIPlayer
+from .player import AIPlayer, BooleanAnswer
 from .judge import RefereeAI
+from .pipeline import ArenaPipeline
+from .batch import BatchRunner
+from .consensus import ConsensusTracker
+from .ratings import RatingEngine
+from .sharding import ShardWriter
+from .experiments import QueryCache
+from .resilience import UNKNOWN
+from .profiling import stage
+from .logging_setup import log_answer
+from .records import (
+    AnswerRecord,
+    AnswerError,
+    CustomAttributeRecord,
+    PlayerRoundResult,
+    RoundRecord,
+    intern_name
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,26 +36,512 @@ logger = logging.getLogger(__name__)
 class ArenaGame:
     """競技場遊戲引擎"""
     
-    def __init__(self, players: List[AIPlayer], referee: RefereeAI):
+    def __init__(
+        self,
+        players: List[AIPlayer],
+        referee: RefereeAI,
+        stream_custom_attributes: bool = False,
+        fast_boolean_answers: bool = False,
+        pipeline: bool = False,
+        max_in_flight: int = 8,
+        max_async_in_flight: int = 64,
+        persist_path: Optional[str] = None,
+        batch: Optional[Dict[str, Any]] = None,
+        consensus: Optional[Dict[str, Any]] = None,
+        shard_output: Optional[Dict[str, Any]] = None,
+        preflight_report: Optional[List[Dict[str, Any]]] = None,
+        query_cache: Optional[QueryCache] = None,
+        experiment: Optional[Dict[str, Any]] = None
+    ):
         """
         初始化遊戲
         
         Args:
             players: 玩家列表
             referee: 裁判實例
+            stream_custom_attributes: 是否流式生成自定義屬性（每產出一個即提交裁判，
+                規則裁判邊生成邊評估；湊滿槽位即停止生成）
+            fast_boolean_answers: 是否用單 token 快速模式回答布林問題
+                （附帶置信度）
+            pipeline: run_batch 是否使用流水線執行（階段重疊、並發調用）
+            max_in_flight: 流水線模式下的最大在途調用數（線程池）
+            max_async_in_flight: 流水線模式下原生異步玩家的最大在途調用數
+                （在共享事件循環中調度，不佔用線程）
+            persist_path: 流水線模式下每輪結果追加寫入的 JSONL 文件（可選）
+            batch: 批處理後端參數（BatchRunner 的 state_dir, base_url,
+                poll_interval, completion_window, run_id, resume；None 表示不使用批處理）
+            consensus: 增量共識參數（ConsensusTracker 的 update_every；
+                None 表示不推斷共識）
+            shard_output: 分片輸出參數（ShardWriter 的 output_dir, rounds_per_shard,
+                compression, level；None 表示不分片，遊戲歷史隨最終結果一起返回）
+            preflight_report: 啟動預檢結果（PreflightResult.to_dict() 列表，
+                寫入結果 metadata.preflight；None 表示未預檢）
+            query_cache: 與其他實驗共享的查詢去重緩存（None 表示不去重）
+            experiment: 實驗矩陣中本實驗的描述（寫入結果 metadata.experiment）
         """
         self.players = players
         self.referee = referee
+        self.stream_custom_attributes = stream_custom_attributes
+        self.fast_boolean_answers = fast_boolean_answers
+        self.pipeline = pipeline
+        self.max_in_flight = max_in_flight
+        self.max_async_in_flight = max_async_in_flight
+        self.persist_path = persist_path
+        self.batch = batch
+        self.consensus = consensus
+        self.consensus_tracker: Optional[ConsensusTracker] = None
+        self.shard_output = shard_output
+        self.shard_writer: Optional[ShardWriter] = None
+        self.preflight_report = preflight_report
+        self.query_cache = query_cache
+        self.experiment = experiment
+        # 兩兩對比的評級，逐輪增量更新
+        self.ratings = RatingEngine()
         self.game_history = []
         self.current_round = 0
         
         logger.info(f"遊戲初始化完成，{len(players)} 位玩家參賽")
     
+    def _call_player(self, player: AIPlayer, method: str, *args) -> Any:
+        """
+        調用玩家方法，配置了對沖策略的玩家走對沖路徑；
+        實驗矩陣中與其他實驗相同的查詢只調用一次
+        
+        Args:
+            player: 玩家
+            method: 方法名
+            *args: 方法參數
+            
+        Returns:
+            Any: 方法返回值
+        """
+        if self.query_cache is not None and method in QueryCache.CACHEABLE:
+            return self.query_cache.call(player, method, args, lambda: self._invoke_player(player, method, *args))
+        return self._invoke_player(player, method, *args)
+    
+    def _invoke_player(self, player: AIPlayer, method: str, *args) -> Any:
+        """實際調用玩家方法（對沖或直接調用）"""
+        policy = player.hedge_policy
+        if policy is not None and policy.enabled:
+            return policy.call(player, method, *args)
+        
+        player.record_api_call()
+        return getattr(player, method)(*args)
+    
+    def _answer_boolean(
+        self,
+        player: AIPlayer,
+        word: str,
+        attr_desc: str
+    ) -> Tuple[bool, Optional[BooleanAnswer]]:
+        """
+        獲取玩家對布林問題的回答
+        
+        Args:
+            player: 玩家
+            word: 測試詞語
+            attr_desc: 屬性描述
+            
+        Returns:
+            Tuple[bool, Optional[BooleanAnswer]]: 回答，以及快速模式（或級聯玩家）下帶置信度的詳情
+        """
+        cascade = player.cascade_policy
+        if cascade is not None and cascade.enabled:
+            detail = cascade.answer(
+                player, word, attr_desc,
+                lambda: self._answer_boolean_directly(player, word, attr_desc)
+            )
+            return detail.answer, detail
+        return self._answer_boolean_directly(player, word, attr_desc)
+    
+    def _answer_boolean_directly(
+        self,
+        player: AIPlayer,
+        word: str,
+        attr_desc: str
+    ) -> Tuple[bool, Optional[BooleanAnswer]]:
+        """由玩家本身的模型回答布林問題（級聯玩家升級時也走這裡）"""
+        if self.fast_boolean_answers:
+            detail = self._call_player(
+                player, "answer_boolean_with_confidence", word, attr_desc
+            )
+            return detail.answer, detail
+        return self._call_player(player, "answer_boolean_question", word, attr_desc), None
+    
+    def _use_async(self, player: AIPlayer) -> bool:
+        """玩家的布林問題是否走共享事件循環（原生異步傳輸、未配置對沖或級聯，且不與其他實驗去重）"""
+        hedge = player.hedge_policy
+        cascade = player.cascade_policy
+        return (player.supports_async
+                and self.query_cache is None
+                and (hedge is None or not hedge.enabled)
+                and (cascade is None or not cascade.enabled))
+    
+    async def _answer_boolean_async(
+        self,
+        player: AIPlayer,
+        word: str,
+        attr_desc: str
+    ) -> Tuple[bool, Optional[BooleanAnswer]]:
+        """
+        _answer_boolean 的協程版本（玩家需 supports_async）
+        
+        Args:
+            player: 玩家
+            word: 測試詞語
+            attr_desc: 屬性描述
+            
+        Returns:
+            Tuple[bool, Optional[BooleanAnswer]]: 回答，以及快速模式下帶置信度的詳情
+        """
+        player.record_api_call()
+        if self.fast_boolean_answers:
+            detail = await player.answer_boolean_with_confidence_async(word, attr_desc)
+            return detail.answer, detail
+        return await player.answer_boolean_question_async(word, attr_desc), None
+    
+    def _custom_attribute_source(
+        self,
+        player: AIPlayer,
+        word: str,
+        num_slots: int
+    ) -> Iterable[str]:
+        """
+        獲取玩家的自定義屬性來源
+        
+        流式模式下返回生成器，每生成一個屬性即可評估；否則等待完整列表
+        （可走對沖路徑）。
+        
+        Args:
+            player: 玩家
+            word: 測試詞語
+            num_slots: 屬性槽位數
+            
+        Returns:
+            Iterable[str]: 屬性序列
+        """
+        if self.stream_custom_attributes:
+            player.record_api_call()
+            return player.stream_custom_attributes(word, num_slots)
+        return self._call_player(player, "propose_custom_attributes", word, num_slots)
+    
+    def _start_round(self, word: str) -> RoundRecord:
+        """
+        開始新一輪，分配輪次編號
+        
+        Args:
+            word: 測試詞語
+            
+        Returns:
+            RoundRecord: 空的本輪結果
+        """
+        self.current_round += 1
+        logger.info("第 %d 輪開始: %s", self.current_round, word, extra={"round": self.current_round, "word": word})
+        return RoundRecord(self.current_round, word)
+    
+    @staticmethod
+    def _new_player_result(player: AIPlayer) -> PlayerRoundResult:
+        """創建玩家的空白本輪結果"""
+        return PlayerRoundResult(player.name)
+    
+    def _judge_boolean(
+        self,
+        word: str,
+        attr_name: str,
+        answer: bool,
+        detail: Optional[BooleanAnswer]
+    ) -> Tuple[AnswerRecord, Dict[str, Any]]:
+        """
+        裁判評判一個布林回答並生成記錄
+        
+        Args:
+            word: 測試詞語
+            attr_name: 屬性名稱
+            answer: 玩家回答
+            detail: 快速模式（或級聯玩家）下帶置信度的詳情
+            
+        Returns:
+            Tuple[AnswerRecord, Dict]: (回答記錄, 裁判結果)
+        """
+        with stage("referee"):
+            judgment = self.referee.judge_boolean_question(word, attr_name, answer)
+        
+        if detail is None:
+            answer_record = AnswerRecord.create(attr_name, answer, judgment["correct"], judgment["score"])
+        else:
+            answer_record = AnswerRecord.create(
+                attr_name, answer, judgment["correct"], judgment["score"],
+                confidence=round(detail.confidence, 4),
+                answer_source=detail.source,
+                tier=detail.tier
+            )
+        return answer_record, judgment
+    
+    @staticmethod
+    def _apply_judgment(
+        player: AIPlayer,
+        player_result: PlayerRoundResult,
+        judgment: Dict[str, Any]
+    ):
+        """根據裁判結果更新玩家狀態與本輪得分"""
+        player.record_answer(judgment["correct"])
+        player.update_score(judgment["score"])
+        player_result.round_score += judgment["score"]
+    
+    def _log_answer(
+        self,
+        player: AIPlayer,
+        word: str,
+        answer_record: AnswerRecord,
+        latency: Optional[float]
+    ):
+        """逐題結構化 DEBUG 記錄（按採樣比例保留）"""
+        log_answer(
+            logger,
+            round=self.current_round,
+            word=word,
+            player=player.name,
+            provider=player.provider,
+            attribute=answer_record.attribute,
+            latency_ms=round(latency * 1000, 1) if latency is not None else None,
+            outcome="correct" if answer_record.correct else "incorrect",
+            score=answer_record.score
+        )
+    
+    @staticmethod
+    def _error_record(player: AIPlayer, attr_name: str, error: Exception) -> AnswerError:
+        """
+        記錄布林問題的調用失敗
+        
+        調用失敗與答錯區分開：不計入答題數，單獨記錄錯誤類型。
+        """
+        error_kind = getattr(error, "kind", UNKNOWN)
+        logger.error("%s 回答 %s 時出錯: %s", player.name, attr_name, error,
+                     extra={"player": player.name, "attribute": attr_name,
+                            "outcome": "error", "error_kind": error_kind})
+        player.record_error()
+        return AnswerError(attr_name, str(error), error_kind)
+    
+    def _collect_custom_attributes(self, player: AIPlayer, word: str) -> Tuple[Future, Optional[Exception]]:
+        """
+        玩家提出自定義屬性，每產出一個即提交裁判（流式失敗時保留已產出的部分）
+        
+        流式模式下規則裁判的評估與生成重疊進行；模型裁判仍在 flush 時把
+        同一詞語的全部屬性合併為一次評審。
+        
+        Args:
+            player: 玩家
+            word: 測試詞語
+            
+        Returns:
+            Tuple[Future, Optional[Exception]]: (結果為 List[CustomAttributeRecord] 的 Future, 調用錯誤)
+        """
+        submitted = []
+        error = None
+        try:
+            for custom_attr in self._custom_attribute_source(player, word, 8):
+                submitted.append(self._submit_custom_attributes(word, [custom_attr]))
+        except Exception as e:
+            error = e
+        return self._gather_records(submitted), error
+    
+    @staticmethod
+    def _gather_records(submitted: List[Future]) -> Future:
+        """
+        把逐個提交的評估合併為一個 Future（按提交順序拼接，任一失敗則整體失敗）
+        
+        Args:
+            submitted: _submit_custom_attributes 返回的 Future 列表
+            
+        Returns:
+            Future: 結果為 List[CustomAttributeRecord]
+        """
+        records = Future()
+        if not submitted:
+            records.set_result([])
+            return records
+        remaining = [len(submitted)]
+        lock = threading.Lock()
+        
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                records.set_result([record for future in submitted for record in future.result()])
+            except Exception as e:
+                records.set_exception(e)
+        
+        for future in submitted:
+            future.add_done_callback(on_done)
+        return records
+    
+    def _submit_custom_attributes(self, word: str, custom_attrs: List[str]) -> Future:
+        """
+        把一位玩家的自定義屬性提交給裁判（同一詞語的提交在 flush 時合併評估）
+        
+        Args:
+            word: 測試詞語
+            custom_attrs: 自定義屬性
+            
+        Returns:
+            Future: 結果為 List[CustomAttributeRecord]
+        """
+        with stage("referee"):
+            evaluations = self.referee.submit_custom_attributes(word, custom_attrs)
+        records = Future()
+        
+        def to_records(future: Future):
+            try:
+                records.set_result([
+                    CustomAttributeRecord(custom_attr, evaluation["score"])
+                    for custom_attr, evaluation in zip(custom_attrs, future.result())
+                ])
+            except Exception as e:
+                records.set_exception(e)
+        
+        evaluations.add_done_callback(to_records)
+        return records
+    
+    def _evaluate_custom_attributes(self, word: str, custom_attrs: List[str]) -> List[CustomAttributeRecord]:
+        """
+        裁判評估同一詞語的一組自定義屬性（同步）
+        
+        Args:
+            word: 測試詞語
+            custom_attrs: 自定義屬性
+            
+        Returns:
+            List[CustomAttributeRecord]: 屬性記錄
+        """
+        records = self._submit_custom_attributes(word, custom_attrs)
+        self.referee.flush_custom_attributes(word)
+        with stage("referee"):
+            return records.result()
+    
+    @staticmethod
+    def _apply_custom_attribute(
+        player: AIPlayer,
+        player_result: PlayerRoundResult,
+        record: CustomAttributeRecord
+    ):
+        """記錄自定義屬性並計分"""
+        player_result.custom_attributes.append(record)
+        player.update_score(record.score)
+        player_result.round_score += record.score
+    
+    @staticmethod
+    def _record_custom_error(player: AIPlayer, player_result: PlayerRoundResult, error: Exception):
+        """記錄自定義屬性提案的調用失敗"""
+        error_kind = getattr(error, "kind", UNKNOWN)
+        logger.error("%s 提出自定義屬性時出錯: %s", player.name, error,
+                     extra={"player": player.name, "outcome": "error", "error_kind": error_kind})
+        player.record_error()
+        player_result.custom_attributes_error = str(error)
+        player_result.custom_attributes_error_kind = intern_name(error_kind)
+    
+    def _settle_custom_attributes(
+        self,
+        player: AIPlayer,
+        player_result: PlayerRoundResult,
+        records: Future,
+        error: Optional[Exception]
+    ):
+        """
+        等待裁判評估完成，記錄自定義屬性並計分
+        
+        Args:
+            player: 玩家
+            player_result: 玩家本輪結果
+            records: _submit_custom_attributes 返回的 Future
+            error: 提出屬性時的調用錯誤
+        """
+        try:
+            for record in records.result():
+                self._apply_custom_attribute(player, player_result, record)
+        except Exception as e:
+            error = error or e
+        if error is not None:
+            self._record_custom_error(player, player_result, error)
+    
+    def play_player_round(
+        self,
+        player: AIPlayer,
+        word: str,
+        attributes: List[Dict[str, str]]
+    ) -> PlayerRoundResult:
+        """
+        單個玩家完成一個詞語的全部題目
+        
+        Args:
+            player: 玩家
+            word: 測試詞語
+            attributes: 屬性列表
+            
+        Returns:
+            PlayerRoundResult: 該玩家的本輪結果
+        """
+        player_result, records, error = self._play_player_round(player, word, attributes)
+        self.referee.flush_custom_attributes(word)
+        self._settle_custom_attributes(player, player_result, records, error)
+        return player_result
+    
+    def _play_player_round(
+        self,
+        player: AIPlayer,
+        word: str,
+        attributes: List[Dict[str, str]]
+    ) -> Tuple[PlayerRoundResult, Future, Optional[Exception]]:
+        """
+        單個玩家回答全部題目並提出自定義屬性（自定義屬性的評分尚未完成）
+        
+        Args:
+            player: 玩家
+            word: 測試詞語
+            attributes: 屬性列表
+            
+        Returns:
+            Tuple: (玩家本輪結果, 自定義屬性記錄的 Future, 提出屬性時的調用錯誤)
+        """
+        player_result = self._new_player_result(player)
+        
+        # 回答基礎屬性問題
+        for attr in attributes:
+            attr_name = attr["name"]
+            attr_desc = attr["description"]
+            
+            try:
+                # 玩家回答
+                started = time.perf_counter()
+                answer, detail = self._answer_boolean(player, word, attr_desc)
+                latency = time.perf_counter() - started
+                
+                # 裁判評判
+                answer_record, judgment = self._judge_boolean(
+                    word, attr_name, answer, detail
+                )
+                
+                # 記錄結果並更新玩家狀態
+                player_result.boolean_answers.append(answer_record)
+                self._apply_judgment(player, player_result, judgment)
+                self._log_answer(player, word, answer_record, latency)
+                
+            except Exception as e:
+                player_result.boolean_answers.append(
+                    self._error_record(player, attr_name, e)
+                )
+        
+        # 玩家提出自定義屬性，逐個提交裁判（模型裁判在後台評審）
+        records, error = self._collect_custom_attributes(player, word)
+        
+        return player_result, records, error
+    
     def run_single_round(
         self, 
         word: str, 
         attributes: List[Dict[str, str]]
-    ) -> Dict[str, Any]:
+    ) -> RoundRecord:
         """
         運行單輪遊戲
         
@@ -44,86 +550,68 @@ class ArenaGame:
             attributes: 屬性列表，每個屬性包含 name 和 description
             
         Returns:
-            Dict: 本輪遊戲結果
+            RoundRecord: 本輪遊戲結果
         """
-        self.current_round += 1
-        round_results = {
-            "round": self.current_round,
-            "word": word,
-            "timestamp": datetime.now().isoformat(),
-            "player_results": []
-        }
+        round_results, pending = self._play_round(word, attributes)
+        self._finish_round(round_results, pending)
+        return round_results
+    
+    def _play_round(
+        self,
+        word: str,
+        attributes: List[Dict[str, str]]
+    ) -> Tuple[RoundRecord, List[Tuple[Future, Optional[Exception]]]]:
+        """
+        所有玩家依次答題並提交自定義屬性，最後把該詞語的屬性一起交給裁判評審
         
-        logger.info(f"第 {self.current_round} 輪開始: {word}")
+        Args:
+            word: 測試詞語
+            attributes: 屬性列表
+            
+        Returns:
+            Tuple: (本輪結果, 各玩家的 (自定義屬性記錄 Future, 調用錯誤))
+        """
+        round_results = self._start_round(word)
+        pending = []
         
         # 每個玩家回答基礎屬性問題
         for player in self.players:
-            player_result = {
-                "player_name": player.name,
-                "boolean_answers": [],
-                "custom_attributes": [],
-                "round_score": 0
-            }
-            
-            # 回答基礎屬性問題
-            for attr in attributes:
-                attr_name = attr["name"]
-                attr_desc = attr["description"]
-                
-                try:
-                    # 玩家回答
-                    answer = player.answer_boolean_question(word, attr_desc)
-                    
-                    # 裁判評判
-                    judgment = self.referee.judge_boolean_question(
-                        word, attr_name, answer
-                    )
-                    
-                    # 記錄結果
-                    player_result["boolean_answers"].append({
-                        "attribute": attr_name,
-                        "answer": answer,
-                        "correct": judgment["correct"],
-                        "score": judgment["score"]
-                    })
-                    
-                    # 更新玩家狀態
-                    player.record_answer(judgment["correct"])
-                    player.update_score(judgment["score"])
-                    player_result["round_score"] += judgment["score"]
-                    
-                except Exception as e:
-                    logger.error(f"{player.name} 回答 {attr_name} 時出錯: {e}")
-                    player_result["boolean_answers"].append({
-                        "attribute": attr_name,
-                        "error": str(e)
-                    })
-            
-            # 玩家提出自定義屬性
-            try:
-                custom_attrs = player.propose_custom_attributes(word, num_slots=8)
-                
-                for custom_attr in custom_attrs:
-                    # 評估自定義屬性
-                    evaluation = self.referee.evaluate_custom_attribute(word, custom_attr)
-                    
-                    player_result["custom_attributes"].append({
-                        "attribute": custom_attr,
-                        "score": evaluation["score"]
-                    })
-                    
-                    player.update_score(evaluation["score"])
-                    player_result["round_score"] += evaluation["score"]
-                    
-            except Exception as e:
-                logger.error(f"{player.name} 提出自定義屬性時出錯: {e}")
-                player_result["custom_attributes_error"] = str(e)
-            
-            round_results["player_results"].append(player_result)
-            logger.info(f"{player.name} 本輪得分: {player_result['round_score']}")
+            with stage("round"):
+                player_result, records, error = self._play_player_round(player, word, attributes)
+            round_results.player_results.append(player_result)
+            pending.append((records, error))
         
+        self.referee.flush_custom_attributes(word)
+        return round_results, pending
+    
+    def _finish_round(
+        self,
+        round_results: RoundRecord,
+        pending: List[Tuple[Future, Optional[Exception]]]
+    ):
+        """
+        等待自定義屬性評分，記入玩家得分並保存本輪
+        
+        Args:
+            round_results: _play_round 返回的本輪結果
+            pending: 各玩家的 (自定義屬性記錄 Future, 調用錯誤)
+        """
+        for player, player_result, (records, error) in zip(self.players, round_results.player_results, pending):
+            self._settle_custom_attributes(player, player_result, records, error)
+            logger.info("%s 本輪得分: %d", player.name, player_result.round_score,
+                        extra={"round": round_results.round, "player": player.name,
+                               "score": player_result.round_score})
+        
+        self._record_round(round_results)
+    
+    def _record_round(self, round_results: RoundRecord):
+        """保存完成的一輪（各執行路徑共用），並交給評級、增量共識與分片寫出"""
         self.game_history.append(round_results)
-        return round_results
+        if self.shard_writer is not None:
+            self.shard_writer.add(round_results)
+        self.ratings.observe(round_results)
+        if self.consensus_tracker is not None:
+            self.consensus_tracker.observe(round_results)
     
     def run_batch(
         self, 
@@ -147,21 +635,119 @@ class ArenaGame:
         else:
             num_rounds = min(num_rounds, len(words))
         
-        logger.info(f"開始批量遊戲: {num_rounds} 輪")
+        logger.info("開始批量遊戲: %d 輪", num_rounds)
         
-        # 使用進度條
-        for i in tqdm(range(num_rounds), desc="遊戲進度"):
-            word = words[i]
-            self.run_single_round(word, attributes)
+        if self.consensus is not None and self.consensus_tracker is None:
+            self.consensus_tracker = ConsensusTracker(
+                [player.name for player in self.players],
+                [attr["name"] for attr in attributes],
+                **self.consensus
+            )
+        
+        if self.shard_output is not None and self.shard_writer is None:
+            self.shard_writer = ShardWriter(**self.shard_output)
+        
+        try:
+            self._run_rounds(words[:num_rounds], attributes)
+        except BaseException:
+            # 中斷時也寫出已完成的輪次（manifest 不含匯總，標記為未完成）
+            if self.shard_writer is not None:
+                try:
+                    self.shard_writer.close()
+                except Exception as e:
+                    logger.error(f"寫出剩餘分片失敗: {e}")
+            raise
         
         # 生成最終結果
         final_results = self.get_final_results()
+        if self.shard_writer is not None:
+            final_results["metadata"]["shards"] = self.shard_writer.close(final_results)
         return final_results
     
+    def _run_rounds(self, words: List[str], attributes: List[Dict[str, str]]):
+        """按配置的執行方式（批處理、流水線或順序）運行全部詞語"""
+        num_rounds = len(words)
+        if self.batch is not None:
+            BatchRunner(self, **self.batch).run(words, attributes)
+        elif self.pipeline:
+            ArenaPipeline(
+                self,
+                max_in_flight=self.max_in_flight,
+                max_async_in_flight=self.max_async_in_flight,
+                persist_path=self.persist_path
+            ).run(words, attributes)
+        else:
+            # 使用進度條；模型裁判評審上一輪的自定義屬性時，下一輪的玩家調用已經開始
+            with tqdm(total=num_rounds, desc="遊戲進度") as progress:
+                previous = None
+                for word in words:
+                    current = self._play_round(word, attributes)
+                    if previous is not None:
+                        self._finish_round(*previous)
+                        with stage("progress"):
+                            progress.update(1)
+                    previous = current
+                    if all(records.done() for records, _ in current[1]):
+                        self._finish_round(*current)
+                        with stage("progress"):
+                            progress.update(1)
+                        previous = None
+                if previous is not None:
+                    self._finish_round(*previous)
+                    with stage("progress"):
+                        progress.update(1)
+    
     def get_final_results(self) -> Dict[str, Any]:
-        """獲取最終遊戲結果"""
-        leaderboard = sorted(
+        """
+        獲取最終遊戲結果（遊戲歷史在此轉為 JSON 格式的字典）
+        
+        分片輸出時遊戲歷史已由分片寫出器保存，結果中不再包含 game_history。
+        """
+        game_history = None
+        if self.shard_writer is None:
+            game_history = [round_results.to_dict() for round_results in self.game_history]
+        results = self.build_results(
             [player.get_stats() for player in self.players],
+            game_history,
+            total_rounds=self.current_round,
+            ratings=self.ratings.summary()
+        )
+        results["metadata"]["referee"] = self.referee.get_stats()
+        if self.preflight_report is not None:
+            results["metadata"]["preflight"] = self.preflight_report
+        if self.consensus_tracker is not None:
+            results["metadata"]["consensus"] = self.consensus_tracker.summary()
+        if self.experiment is not None:
+            results["metadata"]["experiment"] = self.experiment
+        if self.query_cache is not None:
+            results["metadata"]["query_cache"] = self.query_cache.get_stats()
+        
+        logger.info("遊戲結束，生成最終結果")
+        return results
+    
+    @staticmethod
+    def build_results(
+        player_stats: List[Dict[str, Any]],
+        game_history: Optional[List[Dict[str, Any]]],
+        total_rounds: int,
+        ratings: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        組裝最終結果（本地遊戲與分佈式協調器共用）
+        
+        Args:
+            player_stats: 各玩家統計
+            game_history: 遊戲歷史（None 表示歷史另行保存，結果中不包含）
+            total_rounds: 總輪數
+            ratings: 評級摘要（None 表示從遊戲歷史重建）
+            
+        Returns:
+            Dict: 最終結果
+        """
+        if ratings is None:
+            ratings = RatingEngine.from_history(game_history).summary()
+        leaderboard = sorted(
+            player_stats,
             key=lambda x: x["score"],
             reverse=True
         )
@@ -169,20 +755,31 @@ class ArenaGame:
         results = {
             "metadata": {
                 "timestamp": datetime.now().isoformat(),
-                "total_rounds": self.current_round,
-                "total_players": len(self.players)
+                "total_rounds": total_rounds,
+                "total_players": len(player_stats)
             },
             "leaderboard": leaderboard,
-            "game_history": self.game_history
+            "ratings": ratings
         }
-        
-        logger.info("遊戲結束，生成最終結果")
+        if game_history is not None:
+            results["game_history"] = game_history
         return results
     
     def print_leaderboard(self):
-        """打印排行榜"""
+        """打印排行榜與評級"""
+        self.print_stats_table([player.get_stats() for player in self.players])
+        self.print_ratings_table(self.ratings.summary())
+    
+    @staticmethod
+    def print_stats_table(player_stats: List[Dict[str, Any]]):
+        """
+        按分數打印玩家統計表
+        
+        Args:
+            player_stats: 玩家統計列表（get_stats 格式）
+        """
         stats = sorted(
-            [player.get_stats() for player in self.players],
+            player_stats,
             key=lambda x: x["score"],
             reverse=True
         )
@@ -198,3 +795,27 @@ class ArenaGame:
                   f"{stat['score']:<8} {stat['accuracy']:.2%}")
         
         print("=" * 60 + "\n")
+    
+    @staticmethod
+    def print_ratings_table(ratings: Dict[str, Any]):
+        """
+        打印 Bradley–Terry 評級表
+        
+        Args:
+            ratings: RatingEngine.summary() 的結果
+        """
+        if not ratings["players"]:
+            return
+        level = f"{ratings['confidence']:.0%}"
+        print("=" * 60)
+        print("評級（兩兩對比）".center(60))
+        print("=" * 60)
+        print(f"{'排名':<6} {'玩家':<15} {'評分':<8} {level + ' 區間':<18} {'Elo':<8} {'勝率':<8}")
+        print("-" * 60)
+        
+        for i, stat in enumerate(ratings["players"], 1):
+            interval = f"[{stat['ci_low']:.0f}, {stat['ci_high']:.0f}]"
+            print(f"{i:<6} {stat['name']:<15} {stat['rating']:<8.0f} {interval:<18} "
+                  f"{stat['elo']:<8.0f} {stat['win_rate']:.2%}")
+        
+        print("=" * 60 + "\n")
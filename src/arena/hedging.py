@@ -0,0 +1,272 @@
+"""
+請求對沖（Hedged Requests）
+當某次 API 調用超過該玩家觀測到的 p95 延遲仍未返回時，
+再發出一個重複請求，取先返回者，以削減長尾延遲
+"""
+from typing import Any, Dict, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+import asyncio
+import threading
+import time
+import logging
+
+from . import aio
+
+logger = logging.getLogger(__name__)
+
+# 每個 (玩家, 調用類型) 一個延遲統計器
+_trackers: Dict[str, "LatencyTracker"] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(key: str) -> "LatencyTracker":
+    """
+    獲取（或創建）指定鍵的延遲統計器
+
+    每位玩家（即每個模型）單獨統計，備用模型的延遲不混入主模型的 p95。
+
+    Args:
+        key: 統計鍵，通常為 "玩家名:調用類型"
+
+    Returns:
+        LatencyTracker: 延遲統計器
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker()
+            _trackers[key] = tracker
+        return tracker
+
+
+class LatencyTracker:
+    """滑動窗口延遲統計"""
+
+    def __init__(self, window: int = 200):
+        """
+        初始化統計器
+
+        Args:
+            window: 保留最近多少次調用的延遲
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """記錄一次調用延遲（秒）"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        計算延遲分位數
+
+        Args:
+            q: 分位數 (0~1)
+
+        Returns:
+            Optional[float]: 分位數延遲（秒），無樣本時返回 None
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class HedgePolicy:
+    """
+    單個玩家的對沖策略
+
+    主請求超過 p95 延遲仍未返回時，向同一端點（或配置的備用模型）
+    發出重複請求，先返回者勝出，另一個被取消。重複請求計入主玩家的 api_calls
+    （統計中的 hedges 為其中的對沖次數）。有原生異步傳輸的玩家在共享事件循環中發出請求，
+    落敗的請求被取消並斷開連接；同步傳輸的線程無法被強制中斷，其結果會被直接丟棄。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        max_hedge_ratio: float = 0.1,
+        max_workers: int = 16,
+        backup=None
+    ):
+        """
+        初始化對沖策略
+
+        Args:
+            enabled: 是否啟用
+            percentile: 觸發對沖的延遲分位數
+            min_samples: 樣本數少於此值時不對沖（p95 尚不可靠）
+            max_hedge_ratio: 對沖預算，對沖次數不超過調用次數的該比例
+            max_workers: 同步傳輸的對沖線程池大小（主請求與重複請求各佔一個線程，
+                應不小於該玩家在途調用數的兩倍，如流水線 max_in_flight × 2）
+            backup: 備用玩家（None 表示重複請求發往同一端點）
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.max_workers = max_workers
+        self.backup = backup
+
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], backup=None) -> "HedgePolicy":
+        """
+        從玩家配置中的 hedge 段創建策略
+
+        Args:
+            config: hedge 配置
+            backup: 備用玩家
+
+        Returns:
+            HedgePolicy: 對沖策略
+        """
+        return cls(
+            enabled=config.get("enabled", True),
+            percentile=config.get("percentile", 0.95),
+            min_samples=config.get("min_samples", 20),
+            max_hedge_ratio=config.get("max_hedge_ratio", 0.1),
+            max_workers=config.get("max_workers", 16),
+            backup=backup
+        )
+
+    def hedge_delay(self, player, method: str) -> Optional[float]:
+        """
+        計算觸發對沖的等待時間
+
+        Args:
+            player: 主玩家
+            method: 調用類型（玩家方法名）
+
+        Returns:
+            Optional[float]: 等待秒數，None 表示本次不對沖
+        """
+        tracker = get_latency_tracker(f"{player.name}:{method}")
+        if len(tracker) < self.min_samples:
+            return None
+        return tracker.percentile(self.percentile)
+
+    def _within_budget(self) -> bool:
+        """檢查對沖預算是否允許再發出一次重複請求"""
+        return self.hedges < self.max_hedge_ratio * self.calls
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """獲取本策略的線程池（懶加載）"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="hedge")
+            return self._executor
+
+    def _submit(self, target, method: str, args: tuple) -> Future:
+        """發出一次調用：有協程版本的異步玩家走共享事件循環（可取消），其餘走線程池"""
+        if target.supports_async and hasattr(target, f"{method}_async"):
+            return aio.submit(self._timed_call_async(target, method, args))
+        return self._get_executor().submit(self._timed_call, target, method, args)
+
+    def _timed_call(self, target, method: str, args: tuple):
+        """
+        執行一次調用並記錄延遲（按實際發出請求的玩家統計）
+
+        落敗的同步請求無法中斷，會在線程中跑完並記錄其真實延遲。
+        """
+        start = time.perf_counter()
+        result = getattr(target, method)(*args)
+        get_latency_tracker(f"{target.name}:{method}").record(time.perf_counter() - start)
+        return result
+
+    async def _timed_call_async(self, target, method: str, args: tuple):
+        """
+        _timed_call 的協程版本
+
+        落敗被取消時記錄已等待的時間（真實延遲的下界）：只記錄勝出者會丟掉
+        最慢的那些請求，使 p95 越來越低、對沖越發越早。
+        """
+        tracker = get_latency_tracker(f"{target.name}:{method}")
+        start = time.perf_counter()
+        try:
+            result = await getattr(target, f"{method}_async")(*args)
+        except asyncio.CancelledError:
+            tracker.record(time.perf_counter() - start)
+            raise
+        tracker.record(time.perf_counter() - start)
+        return result
+
+    def call(self, player, method: str, *args) -> Any:
+        """
+        以對沖方式調用玩家方法
+
+        Args:
+            player: 主玩家
+            method: 方法名（如 answer_boolean_question）
+            *args: 方法參數
+
+        Returns:
+            Any: 先返回的結果
+        """
+        with self._lock:
+            self.calls += 1
+        delay = self.hedge_delay(player, method)
+
+        player.record_api_call()
+        primary = self._submit(player, method, args)
+        if delay is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        with self._lock:
+            if not self._within_budget():
+                return primary.result()
+            self.hedges += 1
+
+        target = self.backup if self.backup is not None else player
+        logger.debug("%s %s 超過 p%d (%.2fs)，向 %s 發出對沖請求",
+                     player.name, method, int(self.percentile * 100), delay, target.model)
+        # 重複請求的成本記在主玩家名下
+        player.record_api_call()
+        hedge = self._submit(target, method, args)
+
+        pending = {primary, hedge}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        if other.cancel():
+                            with self._lock:
+                                self.cancelled += 1
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取對沖統計"""
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "cancelled": self.cancelled,
+            "backup_model": self.backup.model if self.backup is not None else None
+        }
@@ -2,9 +2,13 @@
 RefereeAI 裁判類
 負責評判玩家答案的正確性
 """
-from typing import Dict, Any
+from typing import Dict, Any, List, Sequence
+from concurrent.futures import Future
 import logging
 import random
+import numpy as np
+
+from .lexicon import load_lexicon, PARALLEL, MODIFIER
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +21,12 @@ class RefereeAI:
         初始化裁判
         
         Args:
-            dictionary_path: 詞典路徑（可選，暫未使用）
+            dictionary_path: 構詞詞典路徑（.npz 或 .tsv，默認 data/char_lexicon.npz）
         """
         self.dictionary_path = dictionary_path
         logger.info("初始化裁判系統")
+        # 構詞詞典：按字的詞性與語義類判斷結構屬性
+        self.lexicon = load_lexicon(dictionary_path)
         
         # 簡化版：使用預定義的正確答案（實際應用中可以用更複雜的邏輯）
         self._initialize_knowledge_base()
@@ -68,9 +74,46 @@ class RefereeAI:
             "expected_answer": correct_answer
         }
         
-        logger.debug(f"評判結果: {word} - {attribute} = {is_correct}")
+        logger.debug("評判結果: %s - %s = %s", word, attribute, is_correct)
         return result
     
+    def judge_boolean_batch(
+        self,
+        words: Sequence[str],
+        attributes: Sequence[str],
+        player_answers: Sequence[bool]
+    ) -> Dict[str, np.ndarray]:
+        """
+        批量評判布林問題的答案（向量化）
+        
+        參考答案只取決於 (詞語, 屬性)：先對去重後的詞語 × 屬性求值得到參考答案表，
+        再按索引廣播回全部回答，逐條規則判斷的次數與回答數無關。
+        評分規則與 judge_boolean_question 一致。
+        
+        Args:
+            words: 中文詞語
+            attributes: 屬性名稱
+            player_answers: 玩家的答案
+            
+        Returns:
+            Dict: correct (bool 數組), score (int 數組), expected_answer (bool 數組)
+        """
+        unique_words, word_index = np.unique(np.asarray(words, dtype=str), return_inverse=True)
+        unique_attributes, attribute_index = np.unique(np.asarray(attributes, dtype=str), return_inverse=True)
+        
+        expected_table = np.array([
+            [self._evaluate_attribute(word, attribute) for attribute in unique_attributes]
+            for word in unique_words
+        ], dtype=bool).reshape(len(unique_words), len(unique_attributes))
+        
+        expected = expected_table[word_index, attribute_index]
+        correct = np.asarray(player_answers, dtype=bool) == expected
+        return {
+            "correct": correct,
+            "score": correct.astype(np.int64),
+            "expected_answer": expected
+        }
+    
     def _evaluate_attribute(self, word: str, attribute: str) -> bool:
         """
         評估詞語是否具有某個屬性（簡化版）
@@ -81,18 +124,14 @@ class RefereeAI:
         3. AI 模型推理
         4. 專家標註數據
         
-        這裡使用簡化的啟發式規則
+        結構屬性由構詞詞典按規則判斷（見 lexicon.py），其餘屬性使用簡化的啟發式規則
         """
-        # 結構屬性判斷
+        # 結構屬性判斷：由構詞詞典按規則推出（無法判斷的詞視為不具有）
         if "並列結構" in attribute:
-            # 並列結構：如 "美醜"、"高低" 等對立詞
-            parallel_words = ["快樂", "痛苦", "美麗", "醜陋", "高山", "平原", "時間", "空間", "知識", "智慧", "勇氣", "懦弱"]
-            return word in parallel_words
+            return self.lexicon.classify(word) == PARALLEL
         
         if "偏正結構" in attribute:
-            # 偏正結構：如 "老師"、"醫生" 等
-            modifier_words = ["老師", "醫生", "火焰", "水流", "星空", "大地"]
-            return word in modifier_words
+            return self.lexicon.classify(word) == MODIFIER
         
         # 語義屬性判斷
         if "具體性" in attribute:
@@ -177,3 +216,93 @@ class RefereeAI:
             "score": score,
             "feedback": feedback
         }
+    
+    def evaluate_custom_attributes(self, word: str, attributes: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        評估同一詞語的一組自定義屬性
+        
+        Args:
+            word: 中文詞語
+            attributes: 自定義屬性
+            
+        Returns:
+            List[Dict]: 與 attributes 一一對應的評估結果
+        """
+        return [self.evaluate_custom_attribute(word, attribute) for attribute in attributes]
+    
+    def submit_custom_attributes(self, word: str, attributes: Sequence[str]) -> Future:
+        """
+        提交一組自定義屬性等待評估
+        
+        同一詞語在 flush_custom_attributes 之前提交的屬性可合併評估；
+        規則裁判直接返回已完成的 Future。
+        
+        Args:
+            word: 中文詞語
+            attributes: 自定義屬性
+            
+        Returns:
+            Future: 結果為 evaluate_custom_attributes 的返回值
+        """
+        future = Future()
+        try:
+            future.set_result(self.evaluate_custom_attributes(word, attributes))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def flush_custom_attributes(self, word: str):
+        """該詞語的自定義屬性已全部提交，開始評估（規則裁判無需處理）"""
+    
+    def word_class(self, word: str) -> str:
+        """
+        詞語的粗粒度類別（字數 + 具體/抽象），用於按類別緩存評估結果
+        
+        Args:
+            word: 中文詞語
+            
+        Returns:
+            str: 類別標籤，如「2字具體」
+        """
+        if self._evaluate_attribute(word, "具體性"):
+            kind = "具體"
+        elif self._evaluate_attribute(word, "抽象性"):
+            kind = "抽象"
+        else:
+            kind = "其他"
+        return f"{len(word)}字{kind}"
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """裁判統計"""
+        return {"mode": "heuristic"}
+    
+    def close(self):
+        """釋放裁判持有的資源"""
+    
+    def evaluate_custom_attributes_batch(
+        self,
+        words: Sequence[str],
+        attributes: Sequence[str]
+    ) -> np.ndarray:
+        """
+        批量評估自定義屬性（向量化）
+        
+        每個不同的 (詞語, 屬性) 只評估一次，評分規則與 evaluate_custom_attribute 一致。
+        
+        Args:
+            words: 中文詞語
+            attributes: 自定義屬性
+            
+        Returns:
+            np.ndarray: 分數（int 數組）
+        """
+        keys = np.char.add(
+            np.char.add(np.asarray(words, dtype=str), "\x1f"),
+            np.asarray(attributes, dtype=str)
+        )
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        unique_scores = np.array([
+            self.evaluate_custom_attribute(*key.split("\x1f", 1))["score"]
+            for key in unique_keys
+        ], dtype=np.int64)
+        return unique_scores[inverse]
@@ -0,0 +1,356 @@
+"""
+構詞規則詞典
+規則裁判用一份緊湊的單字詞典（每個字的詞性與語義類）按構詞規則判斷雙字詞的結構
+（並列、偏正、動賓、主謂、補充、附加、重疊），不依賴測試詞表，也不調用模型；
+規則推不出的詞（單純詞、詞綴的個別用法）以詞條目直接標註結構，優先於規則。
+源文件 data/char_lexicon.tsv 由 build_lexicon.py 編譯為雙數組字典樹（data/char_lexicon.npz），
+查詢每個字只需兩次數組訪問，判斷一個詞在微秒級
+"""
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from array import array
+from pathlib import Path
+import os
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+SOURCE_PATH = DATA_DIR / "char_lexicon.tsv"
+COMPILED_PATH = DATA_DIR / "char_lexicon.npz"
+
+# 詞性（位掩碼中的位置）
+POS_TAGS = ("n", "v", "a", "d", "m", "q", "f", "r", "p", "b", "h", "k")
+# 語義類（位掩碼中的位置，最多 32 類）
+SEMANTIC_CLASSES = (
+    "人", "身體", "動物", "植物", "自然", "天象", "地理", "器物", "建築", "食物", "衣物",
+    "時間", "空間", "數量", "顏色", "性質", "情感", "認知", "言語", "聲音", "行為", "運動",
+    "狀態", "社會", "抽象", "程度", "指代"
+)
+# 詞的結構
+PARALLEL = "並列"
+MODIFIER = "偏正"
+VERB_OBJECT = "動賓"
+SUBJECT_PREDICATE = "主謂"
+COMPLEMENT = "補充"
+AFFIXED = "附加"
+REDUPLICATED = "重疊"
+SIMPLE = "單純"
+STRUCTURES = (PARALLEL, MODIFIER, VERB_OBJECT, SUBJECT_PREDICATE, COMPLEMENT, AFFIXED, REDUPLICATED, SIMPLE)
+
+_BIT = {tag: 1 << index for index, tag in enumerate(POS_TAGS)}
+N, V, A, D, M, F, R, B, H, K = (_BIT[tag] for tag in "nvadmfrbhk")
+# 實詞性語素（並列要求兩字共有其一）
+CONTENT = N | V | A
+# 可作定語修飾名詞性語素
+ATTRIBUTIVE = N | A | B | M | F | R
+# 後綴前面是這些詞性時不是附加式（男子、每個）
+NOT_BEFORE_SUFFIX = B | M | R | D
+
+# 字典樹中的詞尾標記
+_END = 0
+_FREE = -1
+
+
+def parse_source(path: str) -> List[Tuple[str, int, int, int]]:
+    """
+    解析詞典源文件
+
+    Args:
+        path: TSV 源文件路徑
+
+    Returns:
+        List[Tuple]: (條目, 詞性位掩碼, 語義類位掩碼, 結構編號；單字條目為 -1)
+
+    Raises:
+        ValueError: 格式錯誤、未知標籤或重複條目
+    """
+    entries = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            entry = fields[0].strip()
+            if entry in seen:
+                raise ValueError(f"{path}:{number}: 重複條目「{entry}」")
+            seen.add(entry)
+            try:
+                if len(fields) >= 4:
+                    entries.append((entry, 0, 0, STRUCTURES.index(fields[3].strip())))
+                elif len(entry) == 1 and len(fields) == 3:
+                    pos = sum(_BIT[tag.strip()] for tag in fields[1].split(","))
+                    classes = sum(1 << SEMANTIC_CLASSES.index(name.strip()) for name in fields[2].split(","))
+                    entries.append((entry, pos, classes, -1))
+                else:
+                    raise ValueError("單字條目需要詞性與語義類，詞條目需要結構")
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"{path}:{number}: 無法解析「{line}」: {e}") from e
+    return entries
+
+
+def build_double_array(keys: Sequence[str]) -> Tuple[str, np.ndarray, np.ndarray]:
+    """
+    把條目編譯為雙數組字典樹
+
+    字符按字母表編號（1 起，0 為詞尾標記）；狀態 s 經編號 c 轉移到 t = base[s] + c，
+    當且僅當 check[t] == s。詞尾狀態的 base 存 -(條目序號 + 1)。
+
+    Args:
+        keys: 條目（順序即條目序號）
+
+    Returns:
+        Tuple: (字母表, base, check)
+    """
+    alphabet = "".join(sorted({char for key in keys for char in key}))
+    codes = {char: index + 1 for index, char in enumerate(alphabet)}
+
+    base = [0]
+    check = [0]  # 根狀態
+    next_free = 1
+
+    def ensure(size: int):
+        while len(base) < size:
+            base.append(0)
+            check.append(_FREE)
+
+    # 按共同前綴分組，逐層分配
+    stack = [(0, 0, list(range(len(keys))))]
+    while stack:
+        state, depth, members = stack.pop()
+        children: Dict[int, List[int]] = {}
+        for member in members:
+            key = keys[member]
+            code = codes[key[depth]] if depth < len(key) else _END
+            children.setdefault(code, []).append(member)
+        labels = sorted(children)
+
+        offset = max(next_free - labels[0], 1)
+        while True:
+            ensure(offset + labels[-1] + 1)
+            if all(check[offset + label] == _FREE for label in labels):
+                break
+            offset += 1
+        base[state] = offset
+        for label in labels:
+            check[offset + label] = state
+        while next_free < len(check) and check[next_free] != _FREE:
+            next_free += 1
+
+        for label in labels:
+            target = offset + label
+            if label == _END:
+                base[target] = -(children[label][0] + 1)
+            else:
+                stack.append((target, depth + 1, children[label]))
+    return alphabet, np.asarray(base, dtype=np.int32), np.asarray(check, dtype=np.int32)
+
+
+def compile_lexicon(source_path: str = str(SOURCE_PATH), output_path: str = str(COMPILED_PATH)) -> Dict[str, Any]:
+    """
+    編譯詞典源文件並寫出 .npz
+
+    Returns:
+        Dict: 條目數與編譯後大小
+    """
+    entries = parse_source(source_path)
+    keys = [entry for entry, _, _, _ in entries]
+    alphabet, base, check = build_double_array(keys)
+    np.savez_compressed(
+        output_path,
+        alphabet=np.frombuffer(alphabet.encode("utf-32-le"), dtype=np.uint32),
+        base=base,
+        check=check,
+        pos=np.asarray([pos for _, pos, _, _ in entries], dtype=np.uint16),
+        classes=np.asarray([classes for _, _, classes, _ in entries], dtype=np.uint32),
+        structure=np.asarray([structure for _, _, _, structure in entries], dtype=np.int8)
+    )
+    return {
+        "entries": len(entries),
+        "characters": sum(1 for key in keys if len(key) == 1),
+        "words": sum(1 for key in keys if len(key) > 1),
+        "states": len(base),
+        "bytes": os.path.getsize(output_path)
+    }
+
+
+class CharLexicon:
+    """構詞規則詞典：雙數組字典樹查詢與雙字詞結構判斷"""
+
+    def __init__(self, alphabet: str, base, check, pos, classes, structure):
+        """
+        Args:
+            alphabet: 字母表（第 i 個字符的編號為 i + 1）
+            base / check: 雙數組
+            pos / classes / structure: 按條目序號的詞性、語義類位掩碼與結構編號
+        """
+        self._codes = {char: index + 1 for index, char in enumerate(alphabet)}
+        # array 比 numpy 標量索引快一個數量級，且同樣緊湊
+        self._base = array("i", np.asarray(base, dtype=np.int32).tobytes())
+        self._check = array("i", np.asarray(check, dtype=np.int32).tobytes())
+        self._pos = array("H", np.asarray(pos, dtype=np.uint16).tobytes())
+        self._classes = array("I", np.asarray(classes, dtype=np.uint32).tobytes())
+        self._structure = array("b", np.asarray(structure, dtype=np.int8).tobytes())
+        self.size = len(self._pos)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "CharLexicon":
+        """
+        載入編譯後的詞典；path 為 .tsv 源文件時直接在內存中編譯
+
+        Args:
+            path: .npz 或 .tsv 路徑（默認 data/char_lexicon.npz，比源文件舊或不存在時從源文件編譯）
+
+        Returns:
+            CharLexicon: 詞典
+        """
+        if path is None:
+            stale = not COMPILED_PATH.exists() or (
+                SOURCE_PATH.exists() and SOURCE_PATH.stat().st_mtime > COMPILED_PATH.stat().st_mtime
+            )
+            path = str(SOURCE_PATH if stale else COMPILED_PATH)
+            if stale:
+                logger.info("編譯後的構詞詞典不存在或已過期，從源文件編譯（python src/build_lexicon.py 可預先編譯）")
+        if str(path).endswith(".tsv"):
+            entries = parse_source(path)
+            alphabet, base, check = build_double_array([entry for entry, _, _, _ in entries])
+            return cls(
+                alphabet, base, check,
+                [pos for _, pos, _, _ in entries],
+                [classes for _, _, classes, _ in entries],
+                [structure for _, _, _, structure in entries]
+            )
+        with np.load(path) as data:
+            alphabet = data["alphabet"].astype("<u4").tobytes().decode("utf-32-le")
+            return cls(alphabet, data["base"], data["check"], data["pos"], data["classes"], data["structure"])
+
+    def lookup(self, entry: str) -> int:
+        """
+        查詢條目序號
+
+        Args:
+            entry: 單字或詞
+
+        Returns:
+            int: 條目序號（不存在時為 -1）
+        """
+        base, check, codes = self._base, self._check, self._codes
+        state = 0
+        for char in entry:
+            code = codes.get(char)
+            if code is None:
+                return -1
+            target = base[state] + code
+            if target >= len(check) or check[target] != state:
+                return -1
+            state = target
+        target = base[state] + _END
+        if target >= len(check) or check[target] != state:
+            return -1
+        return -base[target] - 1
+
+    def features(self, char: str) -> Optional[Tuple[int, int]]:
+        """
+        單字的 (詞性位掩碼, 語義類位掩碼)
+
+        Returns:
+            Optional[Tuple]: 不在詞典中時為 None
+        """
+        index = self.lookup(char)
+        if index < 0 or self._structure[index] >= 0:
+            return None
+        return self._pos[index], self._classes[index]
+
+    def describe(self, char: str) -> Optional[Dict[str, List[str]]]:
+        """單字的詞性與語義類（可讀形式）"""
+        features = self.features(char)
+        if features is None:
+            return None
+        pos, classes = features
+        return {
+            "pos": [tag for tag in POS_TAGS if pos & _BIT[tag]],
+            "classes": [name for index, name in enumerate(SEMANTIC_CLASSES) if classes >> index & 1]
+        }
+
+    def classify(self, word: str) -> Optional[str]:
+        """
+        判斷詞的結構
+
+        詞條目直接返回標註的結構；雙字詞按規則依次判斷：
+        重疊（AA）→ 附加（前綴、或名/動/形性語素加後綴）→ 並列（共有實詞詞性且語義類相同，
+        含反義並列）→ 偏正（定語性語素加名詞性語素；副詞或形容詞性語素修飾謂詞性語素）
+        → 動賓（動 + 名）→ 補充（動 + 動/形）→ 主謂（名/代 + 動/形）。
+
+        Args:
+            word: 詞語
+
+        Returns:
+            Optional[str]: 結構；不是雙字詞、或有字不在詞典中而無法判斷時為 None
+        """
+        index = self.lookup(word)
+        if index >= 0 and self._structure[index] >= 0:
+            return STRUCTURES[self._structure[index]]
+        if len(word) != 2:
+            return None
+        if word[0] == word[1]:
+            return REDUPLICATED
+        first, second = self.features(word[0]), self.features(word[1])
+        if first is None or second is None:
+            return None
+        (pos1, classes1), (pos2, classes2) = first, second
+
+        if pos1 & H or (pos2 & K and not pos1 & NOT_BEFORE_SUFFIX):
+            return AFFIXED
+        if pos1 & pos2 & CONTENT and classes1 & classes2:
+            return PARALLEL
+        if pos2 & N and pos1 & ATTRIBUTIVE:
+            return MODIFIER
+        if (pos2 & (V | A) and pos1 & D) or (pos2 & V and pos1 & A):
+            return MODIFIER
+        if pos1 & V and pos2 & N:
+            return VERB_OBJECT
+        if pos1 & V and pos2 & (V | A):
+            return COMPLEMENT
+        if pos1 & (N | R) and pos2 & (V | A):
+            return SUBJECT_PREDICATE
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """詞典規模"""
+        words = sum(1 for structure in self._structure if structure >= 0)
+        return {
+            "entries": self.size,
+            "characters": self.size - words,
+            "words": words,
+            "states": len(self._base),
+            "bytes": sum(len(values) * values.itemsize
+                         for values in (self._base, self._check, self._pos, self._classes, self._structure))
+        }
+
+
+# 默認詞典在進程內共享（懶加載）
+_default: Optional[CharLexicon] = None
+_default_lock = threading.Lock()
+
+
+def load_lexicon(path: Optional[str] = None) -> CharLexicon:
+    """
+    獲取構詞詞典（未指定路徑時返回共享的默認詞典）
+
+    Args:
+        path: 詞典路徑（.npz 或 .tsv）
+
+    Returns:
+        CharLexicon: 詞典
+    """
+    global _default
+    if path is not None:
+        return CharLexicon.load(path)
+    with _default_lock:
+        if _default is None:
+            _default = CharLexicon.load()
+        return _default
@@ -0,0 +1,351 @@
+"""
+LLMReferee 模型裁判
+由一個模型玩家評估自定義屬性：同一詞語所有玩家提出的屬性合併為一次評審請求，
+評分按 (規範化屬性, 詞語類別) 記憶在 SQLite 緩存中，評審請求在獨立線程池中
+與玩家調用並發進行；布林問題仍按規則評判
+"""
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import logging
+
+from .judge import RefereeAI
+from .player import AIPlayer
+from .audit import JUDGE
+from .prompts import build_custom_attribute_judge_messages, parse_judge_scores
+
+logger = logging.getLogger(__name__)
+
+# 屬性名中的標點、括號、分隔符與空白（NFKC 之後全角已轉為半角）
+_ATTRIBUTE_NOISE = re.compile(r"[\s\"'`“”‘’「」『』《》〈〉()\[\]{}【】.,，。、;；:：!！?？…·_\-—–/|~]+")
+_LEADING_NUMBER = re.compile(r"^\s*(?:\d+|[a-z])\s*[.、)]\s*")
+
+
+def normalize_attribute(attribute: str) -> str:
+    """
+    規範化自定義屬性名，寫法不同的同一屬性得到相同的緩存鍵
+
+    統一全角/半角與大小寫，去掉編號、標點與分隔符，簡體「属性」歸為「屬性」，
+    例如「音韻屬性_平仄特徵」「音韻属性：平仄特徵」「1. 音韻屬性 平仄特徵」
+    都規範化為「音韻屬性平仄特徵」。
+
+    Args:
+        attribute: 自定義屬性
+
+    Returns:
+        str: 規範化後的屬性名
+    """
+    text = unicodedata.normalize("NFKC", attribute).lower()
+    text = _LEADING_NUMBER.sub("", text)
+    text = _ATTRIBUTE_NOISE.sub("", text)
+    return text.replace("属性", "屬性")
+
+
+class VerdictCache:
+    """
+    評審結果緩存
+
+    以 (規範化屬性, 詞語類別, 裁判模型) 為鍵；path 為 None 時只保存在內存中。
+    打開時把該裁判模型的全部記錄載入內存，之後只在新評分時寫盤。
+    """
+
+    def __init__(self, path: Optional[str], judge: str):
+        """
+        初始化緩存
+
+        Args:
+            path: SQLite 文件路徑（None 表示不持久化）
+            judge: 裁判模型標識（更換裁判模型後不沿用舊評分）
+        """
+        self.path = path
+        self.judge = judge
+        self._lock = threading.Lock()
+        self._verdicts: Dict[Tuple[str, str], int] = {}
+        self.conn = None
+        if path is None:
+            return
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                attribute TEXT NOT NULL,
+                word_class TEXT NOT NULL,
+                judge TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (attribute, word_class, judge)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+        rows = self.conn.execute(
+            "SELECT attribute, word_class, score FROM verdicts WHERE judge = ?", (judge,)
+        )
+        self._verdicts = {(attribute, word_class): score for attribute, word_class, score in rows}
+        logger.info(f"裁判緩存已載入: {len(self._verdicts)} 條評分 ({path})")
+
+    def __len__(self) -> int:
+        return len(self._verdicts)
+
+    def get(self, key: Tuple[str, str]) -> Optional[int]:
+        """查詢 (規範化屬性, 詞語類別) 的評分"""
+        return self._verdicts.get(key)
+
+    def put_many(self, verdicts: Sequence[Tuple[Tuple[str, str], int]]):
+        """
+        寫入一批評分
+
+        Args:
+            verdicts: ((規範化屬性, 詞語類別), 分數) 列表
+        """
+        if not verdicts:
+            return
+        with self._lock:
+            for key, score in verdicts:
+                self._verdicts[key] = score
+            if self.conn is None:
+                return
+            now = time.time()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO verdicts (attribute, word_class, judge, score, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(attribute, word_class, self.judge, score, now)
+                 for (attribute, word_class), score in verdicts]
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+class _Gather:
+    """等待一組評分 Future 全部完成後，組裝一次提交的評估結果"""
+
+    def __init__(self, future: Future, score_futures: List[Future], feedback: List[str]):
+        self.future = future
+        self.score_futures = score_futures
+        self.feedback = feedback
+        self.remaining = len(score_futures)
+        self._lock = threading.Lock()
+        if not score_futures:
+            future.set_result([])
+            return
+        for score_future in score_futures:
+            score_future.add_done_callback(self._on_done)
+
+    def _on_done(self, _):
+        with self._lock:
+            self.remaining -= 1
+            if self.remaining:
+                return
+        self.future.set_result([
+            {"score": score_future.result(), "feedback": feedback}
+            for score_future, feedback in zip(self.score_futures, self.feedback)
+        ])
+
+
+class LLMReferee(RefereeAI):
+    """
+    模型裁判
+
+    submit_custom_attributes 把屬性記入該詞語的待評批次，flush_custom_attributes
+    時去掉緩存命中與正在評審中的屬性，剩餘屬性合併為一次評審請求提交到線程池。
+    評審失敗或回答無法解析的屬性退回規則評分（不寫入緩存）。
+    """
+
+    def __init__(
+        self,
+        judge: AIPlayer,
+        cache_path: Optional[str] = None,
+        max_concurrent: int = 4,
+        dictionary_path: str = None
+    ):
+        """
+        初始化模型裁判
+
+        Args:
+            judge: 擔任裁判的模型玩家（沿用其重試、熔斷與密鑰池配置）
+            cache_path: 評分緩存的 SQLite 文件路徑（None 表示只緩存在內存中）
+            max_concurrent: 最大並發評審請求數
+            dictionary_path: 構詞詞典路徑（可選）
+        """
+        super().__init__(dictionary_path)
+        self.judge = judge
+        self.cache = VerdictCache(cache_path, f"{judge.provider}/{judge.model}")
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="arena-referee")
+        self._lock = threading.Lock()
+        # 詞語 -> [(屬性列表, Future)]，flush 前的待評批次
+        self._open: Dict[str, List[Tuple[Sequence[str], Future]]] = {}
+        # 正在評審中的 (規範化屬性, 詞語類別) -> 評分 Future
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+
+        self.requests = 0
+        self.judged = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self.fallbacks = 0
+        logger.info(f"模型裁判: {judge.name} ({judge.model})")
+
+    def evaluate_custom_attribute(self, word: str, attribute: str) -> Dict[str, Any]:
+        """
+        評估單個自定義屬性（同步）
+
+        Args:
+            word: 中文詞語
+            attribute: 自定義屬性
+
+        Returns:
+            Dict: 包含 score (int), feedback (str)
+        """
+        return self.evaluate_custom_attributes(word, [attribute])[0]
+
+    def evaluate_custom_attributes(self, word: str, attributes: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        評估同一詞語的一組自定義屬性（同步，一次評審請求）
+
+        Args:
+            word: 中文詞語
+            attributes: 自定義屬性
+
+        Returns:
+            List[Dict]: 與 attributes 一一對應的評估結果
+        """
+        future = self.submit_custom_attributes(word, attributes)
+        self.flush_custom_attributes(word)
+        return future.result()
+
+    def submit_custom_attributes(self, word: str, attributes: Sequence[str]) -> Future:
+        """
+        把一組自定義屬性記入該詞語的待評批次
+
+        Args:
+            word: 中文詞語
+            attributes: 自定義屬性
+
+        Returns:
+            Future: flush 並評審完成後得到與 attributes 一一對應的評估結果
+        """
+        future = Future()
+        with self._lock:
+            self._open.setdefault(word, []).append((list(attributes), future))
+        return future
+
+    def flush_custom_attributes(self, word: str):
+        """
+        發出該詞語待評批次的評審請求（不等待結果）
+
+        Args:
+            word: 中文詞語
+        """
+        word_class = self.word_class(word)
+        pending = []
+        with self._lock:
+            submissions = self._open.pop(word, None)
+            if not submissions:
+                return
+            score_futures: Dict[Tuple[str, str], Future] = {}
+            for attributes, _ in submissions:
+                for attribute in attributes:
+                    key = (normalize_attribute(attribute), word_class)
+                    if key in score_futures:
+                        continue
+                    score = self.cache.get(key) if key[0] else 0
+                    if score is not None:
+                        self.cache_hits += 1
+                        score_future = Future()
+                        score_future.set_result(score)
+                    elif key in self._in_flight:
+                        self.deduplicated += 1
+                        score_future = self._in_flight[key]
+                    else:
+                        score_future = Future()
+                        self._in_flight[key] = score_future
+                        pending.append((key, attribute, score_future))
+                    score_futures[key] = score_future
+
+        for attributes, future in submissions:
+            keys = [(normalize_attribute(attribute), word_class) for attribute in attributes]
+            _Gather(
+                future,
+                [score_futures[key] for key in keys],
+                [f"自定義屬性「{attribute}」評分" for attribute in attributes]
+            )
+
+        if pending:
+            self._executor.submit(self._judge_batch, word, pending)
+
+    def _judge_batch(self, word: str, pending: List[Tuple[Tuple[str, str], str, Future]]):
+        """
+        在裁判線程中發出一次評審請求並解析逐條分數
+
+        Args:
+            word: 中文詞語
+            pending: (緩存鍵, 原始屬性, 評分 Future) 列表
+        """
+        attributes = [attribute for _, attribute, _ in pending]
+        scores: List[Optional[int]] = [None] * len(attributes)
+        try:
+            self.judge.record_api_call()
+            messages = build_custom_attribute_judge_messages(word, attributes)
+            answer = self.judge._chat(messages, temperature=0.0, max_tokens=16 + 4 * len(attributes))
+            self.judge._audit(word, JUDGE, messages, answer)
+            scores = parse_judge_scores(answer, len(attributes))
+        except Exception as e:
+            self.judge.record_error()
+            logger.warning("裁判 %s 評審「%s」失敗，退回規則評分: %s", self.judge.name, word, e,
+                           extra={"player": self.judge.name, "word": word, "outcome": "error",
+                                  "error_kind": getattr(e, "kind", None)})
+
+        verdicts = []
+        results = []
+        for (key, attribute, _), score in zip(pending, scores):
+            if score is None:
+                score = RefereeAI.evaluate_custom_attribute(self, word, attribute)["score"]
+            else:
+                verdicts.append((key, score))
+            results.append(score)
+        with self._lock:
+            self.requests += 1
+            self.judged += len(verdicts)
+            self.fallbacks += len(results) - len(verdicts)
+        try:
+            self.cache.put_many(verdicts)
+        except sqlite3.Error as e:
+            logger.warning(f"裁判緩存寫入失敗: {e}")
+        finally:
+            with self._lock:
+                for key, _, _ in pending:
+                    self._in_flight.pop(key, None)
+            for (_, _, score_future), score in zip(pending, results):
+                score_future.set_result(score)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """裁判統計"""
+        return {
+            "mode": "llm",
+            "judge": self.judge.name,
+            "model": self.judge.model,
+            "requests": self.requests,
+            "judged": self.judged,
+            "cache_hits": self.cache_hits,
+            "deduplicated": self.deduplicated,
+            "fallbacks": self.fallbacks,
+            "cached_verdicts": len(self.cache)
+        }
+
+    def close(self):
+        """等待在途評審完成並關閉緩存"""
+        self._executor.shutdown(wait=True)
+        self.cache.close()
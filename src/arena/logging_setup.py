@@ -0,0 +1,133 @@
+"""
+非阻塞日誌
+調用線程只把 LogRecord 放入隊列，格式化與寫出由後台 QueueListener 線程完成；
+可選輸出結構化 JSON 記錄（輪次、玩家、屬性、延遲、結果），逐題 DEBUG 記錄按比例採樣
+"""
+from typing import Dict, Any, Optional
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+
+# 結構化記錄可攜帶的字段（通過 logger 的 extra 傳入）
+STRUCTURED_FIELDS = (
+    "round", "word", "player", "attribute", "provider",
+    "latency_ms", "outcome", "error_kind", "score"
+)
+
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# 逐題 DEBUG 記錄的採樣：每 _sample_every 條保留一條
+_sample_every = 100
+_sample_counter = itertools.count()
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每條記錄輸出一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = record.__dict__.get(field)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    不在調用線程格式化的 QueueHandler
+
+    標準 QueueHandler.prepare 會在入隊前調用 getMessage()，把格式化開銷留在熱路徑上；
+    隊列只在進程內使用，記錄可原樣傳給監聽線程再格式化。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_path: Optional[str] = None,
+    debug_sample_rate: float = 0.01,
+    console: bool = True
+) -> logging.handlers.QueueListener:
+    """
+    配置根日誌：隊列 + 後台監聽線程
+
+    Args:
+        level: 日誌級別
+        json_path: 結構化 JSON 日誌文件（JSON Lines，None 表示不輸出）
+        debug_sample_rate: 逐題 DEBUG 記錄的採樣比例（0~1）
+        console: 是否輸出到控制台
+
+    Returns:
+        QueueListener: 後台監聽器（進程退出時自動停止並刷新）
+    """
+    global _listener, _sample_every
+    if _listener is not None:
+        _listener.stop()
+
+    _sample_every = max(1, round(1 / debug_sample_rate)) if debug_sample_rate > 0 else 0
+
+    handlers = []
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(stream_handler)
+    if json_path:
+        file_handler = logging.FileHandler(json_path, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_LazyQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """停止後台監聽線程，寫出隊列中剩餘的記錄"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def log_answer(logger: logging.Logger, **fields):
+    """
+    記錄一條逐題 DEBUG 結構化記錄（按採樣比例保留）
+
+    級別未開啟或未被採樣時直接返回，不創建 LogRecord。
+
+    Args:
+        logger: 日誌器
+        **fields: STRUCTURED_FIELDS 中的字段
+    """
+    if not _sample_every or not logger.isEnabledFor(logging.DEBUG):
+        return
+    if next(_sample_counter) % _sample_every:
+        return
+    logger.debug("answer %s/%s: %s", fields.get("player"), fields.get("attribute"),
+                 fields.get("outcome"), extra=fields)
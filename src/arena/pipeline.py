@@ -0,0 +1,402 @@
+"""
+ArenaPipeline 流水線執行器
+將一輪遊戲拆分為 出題 → 供應商調用 → 評判 → 匯總 → 持久化 五個階段，
+階段之間以有界隊列連接（隊列滿時上游阻塞，形成背壓）
+"""
+from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import json
+import queue
+import threading
+import time
+import logging
+from tqdm import tqdm
+
+from . import aio
+from .profiling import stage
+
+logger = logging.getLogger(__name__)
+
+# 階段結束標記
+_STOP = object()
+
+# 阻塞等待的輪詢間隔（秒），以便在其他階段失敗時及時退出
+_POLL_INTERVAL = 0.1
+
+
+class _RoundState:
+    """一輪遊戲在流水線中的進行狀態"""
+
+    def __init__(self, round_results: Dict[str, Any], player_results: List[Dict[str, Any]], pending: int):
+        self.round_results = round_results
+        self.player_results = player_results
+        self.pending = pending
+        # 尚未提交給裁判的自定義屬性任務數（歸零時裁判合併評審該詞語）
+        self.custom_pending = len(player_results)
+
+
+class ArenaPipeline:
+    """
+    流水線執行器
+
+    網絡調用在線程池中並發進行（原生異步玩家的布林問題在共享事件循環中進行，
+    不佔用線程），評判、計分和寫盤各由一個線程負責（模型裁判的評審請求
+    在裁判自己的線程池中進行，同一詞語所有玩家的自定義屬性提交後合併評審），
+    因此 CPU 與磁盤階段與在途的網絡請求重疊，下一個詞的請求在上一個詞
+    仍在評判時即可發出。玩家分數只在匯總線程中更新，結果按輪次順序持久化。
+
+    任一階段拋出異常時記錄第一個異常並設置停止標記，其餘階段的隊列與
+    名額等待隨即返回，run() 在所有線程退出後重新拋出該異常（不會掛起）。
+    """
+
+    def __init__(
+        self,
+        game,
+        max_in_flight: int = 8,
+        max_async_in_flight: int = 64,
+        queue_size: int = 64,
+        persist_path: Optional[str] = None
+    ):
+        """
+        初始化流水線
+
+        Args:
+            game: ArenaGame 實例
+            max_in_flight: 最大在途供應商調用數（線程池）
+            max_async_in_flight: 原生異步玩家的最大在途調用數
+            queue_size: 各階段隊列容量
+            persist_path: 每輪結果追加寫入的 JSONL 文件（可選）
+        """
+        self.game = game
+        self.max_in_flight = max_in_flight
+        self.max_async_in_flight = max_async_in_flight
+        self.persist_path = persist_path
+
+        self._call_queue = queue.Queue(maxsize=queue_size)
+        self._judge_queue = queue.Queue(maxsize=queue_size)
+        self._aggregate_queue = queue.Queue(maxsize=queue_size)
+        self._persist_queue = queue.Queue(maxsize=queue_size)
+        self._in_flight = threading.Semaphore(max_in_flight)
+        self._async_in_flight = threading.Semaphore(max_async_in_flight)
+        # 異步調用完成後經此交給評判階段（事件循環線程不能在隊列上阻塞）
+        self._async_done = queue.SimpleQueue()
+        # 已提交給裁判、尚未交給匯總階段的自定義屬性任務數
+        self._referee_pending = 0
+        self._referee_done = threading.Condition()
+        # 第一個失敗階段的異常；設置停止標記後各階段盡快退出
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def run(self, words: List[str], attributes: List[Dict[str, str]]):
+        """
+        運行所有詞語，結果按輪次順序追加到 game.game_history
+
+        Args:
+            words: 詞語列表
+            attributes: 屬性列表
+        """
+        self._attributes = attributes
+        self._next_round = self.game.current_round + 1
+
+        stages = [
+            ("generate", self._generate_stage, (words,)),
+            ("dispatch", self._dispatch_stage, ()),
+            ("judge", self._judge_stage, ()),
+            ("aggregate", self._aggregate_stage, ()),
+            ("persist", self._persist_stage, (len(words),)),
+        ]
+        threads = [
+            threading.Thread(target=self._guard, args=(name, target) + args, name=f"arena-{name}", daemon=True)
+            for name, target, args in stages
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+
+    # ------------------------------------------------------------------
+    # 失敗處理：記錄第一個異常，停止所有階段
+    # ------------------------------------------------------------------
+    def _guard(self, name: str, target, *args):
+        """執行一個階段，階段拋出的異常交給 _fail 而不是讓線程靜默退出"""
+        try:
+            target(*args)
+        except BaseException as e:
+            self._fail(name, e)
+
+    def _fail(self, name: str, error: BaseException):
+        """記錄第一個異常並設置停止標記，喚醒等待裁判評審的評判階段"""
+        with self._referee_done:
+            if self._error is None:
+                self._error = error
+                logger.error("流水線 %s 階段失敗，停止所有階段: %s", name, error, exc_info=error)
+            self._stop.set()
+            self._referee_done.notify_all()
+
+    def _put(self, q, item) -> bool:
+        """放入隊列（隊列滿時阻塞）；流水線已停止時放棄並返回 False"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        """從隊列取出（隊列空時阻塞）；流水線已停止時返回 _STOP"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _acquire(self, semaphore: threading.Semaphore) -> bool:
+        """獲取在途名額；流水線已停止時放棄並返回 False"""
+        while not self._stop.is_set():
+            if semaphore.acquire(timeout=_POLL_INTERVAL):
+                return True
+        return False
+
+    # ------------------------------------------------------------------
+    # 階段 1：出題
+    # ------------------------------------------------------------------
+    def _generate_stage(self, words: List[str]):
+        """為每個詞語生成 (輪次, 玩家, 屬性) 調用任務"""
+        players = self.game.players
+        for word in words:
+            round_results = self.game._start_round(word)
+            player_results = []
+            for player in players:
+                player_result = self.game._new_player_result(player)
+                player_result.boolean_answers = [None] * len(self._attributes)
+                player_results.append(player_result)
+            state = _RoundState(
+                round_results,
+                player_results,
+                pending=len(players) * (len(self._attributes) + 1)
+            )
+
+            for player_index in range(len(players)):
+                for attr_index in range(len(self._attributes)):
+                    if not self._put(self._call_queue, (state, player_index, attr_index)):
+                        return
+                # attr_index 為 None 表示自定義屬性提案
+                if not self._put(self._call_queue, (state, player_index, None)):
+                    return
+        self._put(self._call_queue, _STOP)
+
+    # ------------------------------------------------------------------
+    # 階段 2：供應商調用
+    # ------------------------------------------------------------------
+    def _dispatch_stage(self):
+        """
+        將調用任務提交到線程池，在途數受 max_in_flight 限制
+
+        原生異步玩家的布林問題提交到共享事件循環，在途數受 max_async_in_flight 限制。
+        """
+        handoff = threading.Thread(target=self._guard, args=("async-handoff", self._async_handoff),
+                                   name="arena-async-handoff", daemon=True)
+        handoff.start()
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="arena-call")
+        try:
+            while True:
+                task = self._get(self._call_queue)
+                if task is _STOP:
+                    break
+                _, player_index, attr_index = task
+                if attr_index is not None and self.game._use_async(self.game.players[player_index]):
+                    if not self._acquire(self._async_in_flight):
+                        break
+                    future = aio.submit(self._execute_async(task))
+                    future.add_done_callback(lambda f, task=task: self._async_done.put((task, f)))
+                    continue
+                if not self._acquire(self._in_flight):
+                    break
+                future = executor.submit(self._execute, task)
+                future.add_done_callback(lambda f, task=task: self._on_call_done(task, f))
+        finally:
+            # 失敗時取消尚未開始的調用，只等待已在途的調用返回
+            executor.shutdown(wait=True, cancel_futures=self._stop.is_set())
+        # 等待所有異步調用交給評判階段
+        for _ in range(self.max_async_in_flight):
+            if not self._acquire(self._async_in_flight):
+                break
+        self._async_done.put(_STOP)
+        handoff.join()
+        self._put(self._judge_queue, _STOP)
+
+    def _execute(self, task):
+        """在工作線程中執行一次供應商調用"""
+        state, player_index, attr_index = task
+        player = self.game.players[player_index]
+        word = state.round_results.word
+
+        if attr_index is not None:
+            started = time.perf_counter()
+            answer, detail = self.game._answer_boolean(
+                player, word, self._attributes[attr_index]["description"]
+            )
+            return answer, detail, time.perf_counter() - started
+
+        # 自定義屬性：每產出一個即提交裁判，流式失敗時保留已產出的部分
+        return self.game._collect_custom_attributes(player, word)
+
+    async def _execute_async(self, task):
+        """在共享事件循環中執行一次布林問題調用"""
+        state, player_index, attr_index = task
+        started = time.perf_counter()
+        answer, detail = await self.game._answer_boolean_async(
+            self.game.players[player_index],
+            state.round_results.word,
+            self._attributes[attr_index]["description"]
+        )
+        return answer, detail, time.perf_counter() - started
+
+    def _async_handoff(self):
+        """把完成的異步調用交給評判階段，交出後才釋放在途名額（背壓與線程池路徑一致）"""
+        while True:
+            item = self._get(self._async_done)
+            if item is _STOP:
+                break
+            try:
+                self._put(self._judge_queue, item)
+            finally:
+                self._async_in_flight.release()
+
+    def _on_call_done(self, task, future: Future):
+        """調用完成：交給評判階段（隊列滿時阻塞，向上游施加背壓）"""
+        try:
+            self._put(self._judge_queue, (task, future))
+        finally:
+            self._in_flight.release()
+
+    # ------------------------------------------------------------------
+    # 階段 3：評判
+    # ------------------------------------------------------------------
+    def _judge_stage(self):
+        """裁判評判回答與自定義屬性"""
+        while True:
+            item = self._get(self._judge_queue)
+            if item is _STOP:
+                break
+            task, future = item
+            state, _, attr_index = task
+            word = state.round_results.word
+
+            if attr_index is not None:
+                try:
+                    answer, detail, latency = future.result()
+                    attr_name = self._attributes[attr_index]["name"]
+                    record, judgment = self.game._judge_boolean(word, attr_name, answer, detail)
+                except Exception as e:
+                    self._put(self._aggregate_queue, ("boolean_error", task, e, None))
+                else:
+                    self._put(self._aggregate_queue, ("boolean", task, record, (judgment, latency)))
+            else:
+                try:
+                    records, error = future.result()
+                except Exception as e:
+                    records, error = Future(), e
+                    records.set_result([])
+                self._track_custom(task, records, error)
+                state.custom_pending -= 1
+                if state.custom_pending == 0:
+                    self.game.referee.flush_custom_attributes(word)
+        # 等待裁判評審完成的自定義屬性全部交給匯總階段
+        with self._referee_done:
+            self._referee_done.wait_for(lambda: self._referee_pending == 0 or self._stop.is_set())
+        self._put(self._aggregate_queue, _STOP)
+
+    def _track_custom(self, task, records: Future, error: Optional[Exception]):
+        """自定義屬性已在調用階段逐個提交裁判；模型裁判評審完成後（在裁判線程中）再交給匯總階段"""
+        with self._referee_done:
+            self._referee_pending += 1
+        records.add_done_callback(
+            lambda f: self._on_custom_evaluated(task, f, error)
+        )
+
+    def _on_custom_evaluated(self, task, records: Future, error: Optional[Exception]):
+        try:
+            try:
+                payload = records.result()
+            except Exception as e:
+                payload, error = [], error or e
+            self._put(self._aggregate_queue, ("custom", task, payload, error))
+        finally:
+            with self._referee_done:
+                self._referee_pending -= 1
+                self._referee_done.notify_all()
+
+    # ------------------------------------------------------------------
+    # 階段 4：匯總
+    # ------------------------------------------------------------------
+    def _aggregate_stage(self):
+        """更新玩家分數，並按輪次順序釋放完成的輪次"""
+        finished = {}
+        while True:
+            item = self._get(self._aggregate_queue)
+            if item is _STOP:
+                break
+            kind, task, payload, extra = item
+            state, player_index, attr_index = task
+            player = self.game.players[player_index]
+            player_result = state.player_results[player_index]
+
+            try:
+                if kind == "boolean":
+                    judgment, latency = extra
+                    player_result.boolean_answers[attr_index] = payload
+                    self.game._apply_judgment(player, player_result, judgment)
+                    self.game._log_answer(player, state.round_results.word, payload, latency)
+                elif kind == "boolean_error":
+                    attr_name = self._attributes[attr_index]["name"]
+                    player_result.boolean_answers[attr_index] = \
+                        self.game._error_record(player, attr_name, payload)
+                else:
+                    for record in payload:
+                        self.game._apply_custom_attribute(player, player_result, record)
+                    if extra is not None:
+                        self.game._record_custom_error(player, player_result, extra)
+            finally:
+                state.pending -= 1
+
+            if state.pending == 0:
+                state.round_results.player_results = state.player_results
+                finished[state.round_results.round] = state.round_results
+                while self._next_round in finished:
+                    if not self._put(self._persist_queue, finished.pop(self._next_round)):
+                        return
+                    self._next_round += 1
+        self._put(self._persist_queue, _STOP)
+
+    # ------------------------------------------------------------------
+    # 階段 5：持久化
+    # ------------------------------------------------------------------
+    def _persist_stage(self, total_rounds: int):
+        """將完成的輪次寫入遊戲歷史與 JSONL 文件"""
+        output = open(self.persist_path, "a", encoding="utf-8") if self.persist_path else None
+        try:
+            with tqdm(total=total_rounds, desc="遊戲進度") as progress:
+                while True:
+                    round_results = self._get(self._persist_queue)
+                    if round_results is _STOP:
+                        break
+                    self.game._record_round(round_results)
+                    for player_result in round_results.player_results:
+                        logger.info("%s 第 %d 輪得分: %d", player_result.player_name,
+                                    round_results.round, player_result.round_score,
+                                    extra={"round": round_results.round,
+                                           "player": player_result.player_name,
+                                           "score": player_result.round_score})
+                    if output is not None:
+                        output.write(json.dumps(round_results.to_dict(), ensure_ascii=False) + "\n")
+                        output.flush()
+                    with stage("progress"):
+                        progress.update(1)
+        finally:
+            if output is not None:
+                output.close()
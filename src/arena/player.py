@@ -3,16 +3,118 @@ AIPlayer 抽象基類
 定義所有 AI 玩家的通用接口
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Optional, Iterator, AsyncIterator
 import os
+import sys
+import threading
 import logging
 
+from .prompts import (
+    build_boolean_messages,
+    build_custom_attributes_messages,
+    parse_boolean_answer,
+    parse_custom_attributes,
+    parse_attribute_line,
+    iter_lines,
+    classify_boolean_token,
+    yes_probability
+)
+from .audit import BOOLEAN, LOGPROBS, CUSTOM_ATTRIBUTES
+from .calibration import calibrate
+from .profiling import stage
+from .resilience import ProviderError, RetryPolicy, UNPARSEABLE, call_with_resilience, call_with_resilience_async
+
 logger = logging.getLogger(__name__)
 
 
+def iter_stream_deltas(stream) -> Iterator[str]:
+    """
+    逐項產出 OpenAI 兼容流式響應中的文本增量
+    
+    生成器被提前關閉時關閉底層流，斷開連接，服務端隨即停止生成。
+    
+    Args:
+        stream: chat.completions.create(stream=True) 返回的流
+        
+    Yields:
+        str: 文本增量
+    """
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        _close_stream(stream)
+
+
+def _close_stream(stream):
+    """關閉流式響應（部分 SDK 的流沒有 close()，只能等待迭代結束）"""
+    close = getattr(stream, "close", None)
+    if close is not None:
+        close()
+
+
+class BooleanAnswer:
+    """帶置信度的布林回答"""
+    
+    __slots__ = ("answer", "confidence", "source", "tier")
+    
+    LOGPROBS = "logprobs"
+    TEXT = "text"
+    # 級聯玩家中多個便宜模型的多數答案
+    CASCADE = "cascade"
+    
+    def __init__(self, answer: bool, confidence: float, source: str, tier: Optional[str] = None):
+        """
+        初始化回答
+        
+        Args:
+            answer: 回答
+            confidence: 所選答案的概率 (0.5~1)
+            source: 來源（logprobs、text 或 cascade）
+            tier: 級聯玩家中回答的檔位（cheap 或 expensive；非級聯玩家為 None）
+        """
+        self.answer = answer
+        self.confidence = confidence
+        self.source = source
+        self.tier = tier
+    
+    @classmethod
+    def from_probability(cls, p_yes: float, source: str) -> "BooleanAnswer":
+        """根據 P(是) 創建回答"""
+        answer = p_yes >= 0.5
+        return cls(answer, p_yes if answer else 1 - p_yes, source)
+    
+    def __repr__(self) -> str:
+        return (f"BooleanAnswer(answer={self.answer}, confidence={self.confidence:.3f}, "
+                f"source={self.source}, tier={self.tier})")
+
+
 class AIPlayer(ABC):
     """AI 玩家抽象基類"""
     
+    # 子類應聲明自己新增的實例屬性（如 __slots__ = ("client",)），避免每個實例帶 __dict__
+    __slots__ = (
+        "name", "model", "score", "correct_answers", "total_answers", "api_calls", "errors",
+        "_counter_lock", "retry_policy", "confidence_temperature", "hedge_policy", "use_logprobs",
+        "credentials", "_clients", "cascade_policy", "audit"
+    )
+    
+    # 供應商標識（子類覆蓋），同一供應商的玩家共享延遲統計等資源
+    provider = "generic"
+    # 是否支持返回首 token 的 logprobs（支持的子類需實現 _first_token_logprobs）
+    supports_logprobs = False
+    # 接口是否支持 max_tokens（不支持時用流式提前關閉代替）
+    supports_max_tokens = True
+    # 文本解析回答的默認置信度（無概率信息時使用）
+    text_answer_confidence = 0.8
+    # 是否支持 OpenAI 兼容的批處理接口（支持的子類需實現 batch_client）
+    supports_batch = False
+    # 是否有原生異步傳輸（支持的子類需實現 _achat_completion / _aopen_chat_stream）；
+    # 流水線在共享事件循環中直接調度這類玩家的布林問題，不為每個在途請求佔用線程
+    supports_async = False
+    
     def __init__(self, name: str, model: str):
         """
         初始化 AI 玩家
@@ -21,14 +123,32 @@ class AIPlayer(ABC):
             name: 玩家名稱
             model: 使用的模型名稱
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.model = model
         self.score = 0
         self.correct_answers = 0
         self.total_answers = 0
+        self.api_calls = 0
+        self.errors = 0
+        # 並發調用（對沖、流水線）時保護調用計數
+        self._counter_lock = threading.Lock()
+        # 重試策略（由 PlayerFactory 根據配置設置）
+        self.retry_policy = RetryPolicy()
+        # 置信度校準溫度（可由配置覆蓋）
+        self.confidence_temperature = 1.0
+        # 對沖策略（由 PlayerFactory 根據配置設置，None 表示不對沖）
+        self.hedge_policy = None
+        # 級聯策略（由 PlayerFactory 根據配置設置，None 表示不級聯）
+        self.cascade_policy = None
+        # 快速回答是否使用 logprobs（供應商支持時默認開啟，可由配置關閉）
+        self.use_logprobs = self.supports_logprobs
+        # 密鑰池（由子類根據環境變量設置）與每個密鑰對應的 SDK 客戶端
+        self.credentials = None
+        self._clients = {}
+        # 審計歸檔（由 attach_audit 設置，None 表示不記錄交互）
+        self.audit = None
         logger.info(f"初始化玩家: {name} (模型: {model})")
     
-    @abstractmethod
     def answer_boolean_question(self, word: str, attribute: str) -> bool:
         """
         回答布林型問題（對錯題）
@@ -39,10 +159,320 @@ class AIPlayer(ABC):
             
         Returns:
             bool: True 表示該詞語具有該屬性，False 表示不具有
+            
+        Raises:
+            ProviderError: API 調用失敗（與答錯區分開）
         """
-        pass
+        messages = build_boolean_messages(word, attribute)
+        answer_text = self._chat(messages, temperature=0.3, max_tokens=10)
+        self._audit(word, BOOLEAN, messages, answer_text)
+        with stage("parse"):
+            return parse_boolean_answer(answer_text)
+    
+    def answer_boolean_with_confidence(self, word: str, attribute: str) -> BooleanAnswer:
+        """
+        快速回答布林問題：只請求一個 token
+        
+        支持 logprobs 的供應商根據首 token 的候選分佈計算校準後的置信度；
+        其他供應商退回受約束的文本解析。
+        
+        Args:
+            word: 中文詞語
+            attribute: 屬性描述
+            
+        Returns:
+            BooleanAnswer: 回答及置信度
+            
+        Raises:
+            ProviderError: API 調用失敗，或回答無法解析為肯定/否定（UNPARSEABLE）
+        """
+        messages = build_boolean_messages(word, attribute)
+        
+        if self.use_logprobs:
+            top_logprobs = call_with_resilience(
+                self.provider,
+                lambda: self._first_token_logprobs(messages, temperature=0.3),
+                retry_policy=self.retry_policy
+            )
+            self._audit(word, LOGPROBS, messages, top_logprobs)
+            p_yes = yes_probability(top_logprobs)
+            if p_yes is not None:
+                return BooleanAnswer.from_probability(
+                    calibrate(p_yes, self.confidence_temperature), BooleanAnswer.LOGPROBS
+                )
+            logger.debug("%s 首 token 候選中無「是/否」，退回文本解析", self.name)
+        
+        answer_text = self._constrained_text_answer(messages)
+        self._audit(word, BOOLEAN, messages, answer_text)
+        return self._text_boolean_answer(answer_text)
+    
+    def _text_boolean_answer(self, answer_text: str) -> BooleanAnswer:
+        """
+        把受約束的文本回答轉為 BooleanAnswer
+        
+        Raises:
+            ProviderError: 無法識別肯定/否定（與答錯區分開，記為調用錯誤）
+        """
+        verdict = classify_boolean_token(answer_text)
+        if verdict is None:
+            raise ProviderError(self.provider, UNPARSEABLE, f"無法解析的回答: {answer_text!r}")
+        return BooleanAnswer(verdict, self.text_answer_confidence, BooleanAnswer.TEXT)
+    
+    def _constrained_text_answer(self, messages: List[Dict[str, str]]) -> str:
+        """
+        以最少的 completion tokens 獲取文本回答
+        
+        支持 max_tokens 的接口限制為 2 個 token（部分分詞器中「否」佔兩個）；
+        不支持的接口走流式，識別出肯定/否定後立即關閉連接。
+        
+        Args:
+            messages: 消息列表
+            
+        Returns:
+            str: 回答文本（可能被截斷）
+        """
+        if self.supports_max_tokens:
+            return self._chat(messages, temperature=0.3, max_tokens=2)
+        
+        chunks = self._chat_stream(messages, temperature=0.3)
+        text = ""
+        try:
+            for chunk in chunks:
+                text += chunk
+                if classify_boolean_token(text) is not None or len(text.strip()) >= 4:
+                    break
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        return text
+    
+    def _first_token_logprobs(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float
+    ) -> Dict[str, float]:
+        """
+        請求單個 token 並返回其候選 logprobs（單次，不重試）
+        
+        Args:
+            messages: 消息列表
+            temperature: 採樣溫度
+            
+        Returns:
+            Dict[str, float]: token -> logprob
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} 不支持 logprobs")
+    
+    async def answer_boolean_question_async(self, word: str, attribute: str) -> bool:
+        """
+        answer_boolean_question 的協程版本（需 supports_async）
+        
+        Args:
+            word: 中文詞語
+            attribute: 屬性描述
+            
+        Returns:
+            bool: True 表示該詞語具有該屬性，False 表示不具有
+        """
+        messages = build_boolean_messages(word, attribute)
+        answer_text = await self._achat(messages, temperature=0.3, max_tokens=10)
+        self._audit(word, BOOLEAN, messages, answer_text)
+        with stage("parse"):
+            return parse_boolean_answer(answer_text)
+    
+    async def answer_boolean_with_confidence_async(self, word: str, attribute: str) -> BooleanAnswer:
+        """
+        answer_boolean_with_confidence 的協程版本（需 supports_async）
+        
+        Args:
+            word: 中文詞語
+            attribute: 屬性描述
+            
+        Returns:
+            BooleanAnswer: 回答及置信度
+        """
+        messages = build_boolean_messages(word, attribute)
+        
+        if self.use_logprobs:
+            top_logprobs = await call_with_resilience_async(
+                self.provider,
+                lambda: self._afirst_token_logprobs(messages, temperature=0.3),
+                retry_policy=self.retry_policy
+            )
+            self._audit(word, LOGPROBS, messages, top_logprobs)
+            p_yes = yes_probability(top_logprobs)
+            if p_yes is not None:
+                return BooleanAnswer.from_probability(
+                    calibrate(p_yes, self.confidence_temperature), BooleanAnswer.LOGPROBS
+                )
+            logger.debug("%s 首 token 候選中無「是/否」，退回文本解析", self.name)
+        
+        answer_text = await self._aconstrained_text_answer(messages)
+        self._audit(word, BOOLEAN, messages, answer_text)
+        return self._text_boolean_answer(answer_text)
+    
+    async def _aconstrained_text_answer(self, messages: List[Dict[str, str]]) -> str:
+        """_constrained_text_answer 的協程版本"""
+        if self.supports_max_tokens:
+            return await self._achat(messages, temperature=0.3, max_tokens=2)
+        
+        chunks = await self._achat_stream(messages, temperature=0.3)
+        text = ""
+        try:
+            async for chunk in chunks:
+                text += chunk
+                if classify_boolean_token(text) is not None or len(text.strip()) >= 4:
+                    break
+        finally:
+            await chunks.aclose()
+        return text
+    
+    async def _afirst_token_logprobs(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float
+    ) -> Dict[str, float]:
+        """_first_token_logprobs 的協程版本（單次，不重試）"""
+        raise NotImplementedError(f"{self.__class__.__name__} 不支持異步 logprobs")
+    
+    async def _achat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """經過韌性層調用異步對話接口"""
+        return await call_with_resilience_async(
+            self.provider,
+            lambda: self._achat_completion(messages, temperature, max_tokens),
+            retry_policy=self.retry_policy
+        )
+    
+    async def _achat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """經過韌性層打開異步流式對話（只有建立連接階段會重試）"""
+        return await call_with_resilience_async(
+            self.provider,
+            lambda: self._aopen_chat_stream(messages, temperature, max_tokens),
+            retry_policy=self.retry_policy
+        )
+    
+    async def _achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """
+        異步調用供應商對話接口（單次，不重試；supports_async 的子類實現）
+        
+        Args:
+            messages: OpenAI 格式的消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
+            
+        Returns:
+            str: 模型回答文本
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} 沒有異步傳輸")
+    
+    async def _aopen_chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> AsyncIterator[str]:
+        """
+        異步打開流式對話接口
+        
+        默認實現不流式，一次性返回完整回答；返回的迭代器需支持 aclose()。
+        
+        Args:
+            messages: OpenAI 格式的消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
+            
+        Returns:
+            AsyncIterator[str]: 文本增量異步迭代器
+        """
+        text = await self._achat_completion(messages, temperature, max_tokens)
+        
+        async def single():
+            yield text
+        
+        return single()
+    
+    def _create_client(self, credential_value: Any):
+        """
+        為一份憑證創建 SDK 客戶端（使用密鑰池的子類實現）
+        
+        Args:
+            credential_value: 密鑰（或多個變量組成的憑證元組）
+            
+        Returns:
+            Any: 客戶端
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} 未實現 _create_client")
+    
+    def _client_for(self, credential) -> Any:
+        """獲取（必要時創建）憑證對應的客戶端"""
+        client = self._clients.get(credential.label)
+        if client is None:
+            client = self._clients.setdefault(credential.label, self._create_client(credential.value))
+        return client
+    
+    @contextmanager
+    def _leased_client(self):
+        """
+        從密鑰池租用負載最小的密鑰，產出其客戶端
+        
+        用法: ``with self._leased_client() as client: ...``；調用失敗時按錯誤類型隔離該密鑰。
+        """
+        with self.credentials.lease() as credential:
+            yield self._client_for(credential)
+    
+    def _leased_stream(self, create: Callable[[Any], Any]) -> Iterator[str]:
+        """
+        在密鑰租約內打開 OpenAI 兼容流式響應，產出文本增量
+        
+        請求在返回前發出（連接錯誤由韌性層重試）；租約一直保持到流讀完或被關閉，
+        流式請求同樣計入密鑰的在途數與速率窗口，流中途的錯誤也會隔離該密鑰。
+        
+        Args:
+            create: 以客戶端為參數、返回 chat.completions.create(stream=True) 結果的函數
+            
+        Returns:
+            Iterator[str]: 文本增量迭代器（支持 close() 以提前終止）
+        """
+        def generate():
+            with self._leased_client() as client:
+                stream = create(client)
+                try:
+                    # 請求已發出
+                    yield None
+                except GeneratorExit:
+                    _close_stream(stream)
+                    raise
+                yield from iter_stream_deltas(stream)
+        
+        deltas = generate()
+        next(deltas)
+        return deltas
+    
+    def batch_client(self):
+        """
+        返回 OpenAI 兼容批處理接口（files + batches）的客戶端
+        
+        Returns:
+            OpenAI: 客戶端
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} 不支持批處理接口")
     
-    @abstractmethod
     def propose_custom_attributes(self, word: str, num_slots: int = 8) -> List[str]:
         """
         提出自定義屬性
@@ -53,6 +483,156 @@ class AIPlayer(ABC):
             
         Returns:
             List[str]: 屬性列表
+            
+        Raises:
+            ProviderError: API 調用失敗
+        """
+        messages = build_custom_attributes_messages(word, num_slots)
+        answer_text = self._chat(messages, temperature=0.7, max_tokens=500)
+        self._audit(word, CUSTOM_ATTRIBUTES, messages, answer_text)
+        with stage("parse"):
+            return parse_custom_attributes(answer_text, num_slots)
+    
+    def stream_custom_attributes(self, word: str, num_slots: int = 8) -> Iterator[str]:
+        """
+        流式提出自定義屬性：模型每輸出完一行即產出一個屬性
+        
+        湊滿 num_slots 個有效屬性後立即關閉流，不再等待（也不再支付）剩餘的生成。
+        
+        Args:
+            word: 中文詞語
+            num_slots: 可提出的屬性數量
+            
+        Yields:
+            str: 屬性
+            
+        Raises:
+            ProviderError: API 調用失敗（已產出的屬性仍然有效）
+        """
+        messages = build_custom_attributes_messages(word, num_slots)
+        chunks = self._chat_stream(messages, temperature=0.7, max_tokens=500)
+        produced = 0
+        lines = []
+        try:
+            for line in iter_lines(chunks):
+                lines.append(line)
+                attribute = parse_attribute_line(line)
+                if attribute is None:
+                    continue
+                yield attribute
+                produced += 1
+                if produced >= num_slots:
+                    break
+        except ProviderError:
+            raise
+        except Exception as e:
+            raise ProviderError.from_exception(self.provider, e) from e
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            # 記錄提前關閉前實際收到的行
+            self._audit(word, CUSTOM_ATTRIBUTES, messages, "\n".join(lines))
+    
+    def _audit(
+        self,
+        word: str,
+        kind: str,
+        messages: List[Dict[str, str]],
+        response: Any
+    ):
+        """把一次交互交給審計歸檔（未設置歸檔時不做任何事）"""
+        if self.audit is not None:
+            self.audit.record(self, word, kind, messages, response)
+    
+    def _chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        經過韌性層（分類重試 + 供應商熔斷）調用對話接口
+        
+        Args:
+            messages: OpenAI 格式的消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
+            
+        Returns:
+            str: 模型回答文本
+        """
+        return call_with_resilience(
+            self.provider,
+            lambda: self._chat_completion(messages, temperature, max_tokens),
+            retry_policy=self.retry_policy
+        )
+    
+    def _chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        經過韌性層打開流式對話（只有建立連接階段會重試）
+        
+        Args:
+            messages: OpenAI 格式的消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
+            
+        Returns:
+            Iterator[str]: 文本增量迭代器
+        """
+        return call_with_resilience(
+            self.provider,
+            lambda: self._open_chat_stream(messages, temperature, max_tokens),
+            retry_policy=self.retry_policy
+        )
+    
+    def _open_chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> Iterator[str]:
+        """
+        打開供應商的流式對話接口
+        
+        默認實現不流式，一次性返回完整回答；支持流式的玩家應覆蓋此方法，
+        並在返回前發出請求，使連接錯誤能被韌性層重試。
+        
+        Args:
+            messages: OpenAI 格式的消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
+            
+        Returns:
+            Iterator[str]: 文本增量迭代器（支持 close() 以提前終止）
+        """
+        return iter([self._chat_completion(messages, temperature, max_tokens)])
+    
+    @abstractmethod
+    def _chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """
+        調用供應商對話接口（單次，不重試）
+        
+        Args:
+            messages: OpenAI 格式的消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
+            
+        Returns:
+            str: 模型回答文本
+            
+        Raises:
+            Exception: SDK 原始異常或 ProviderError，由韌性層分類
         """
         pass
     
@@ -72,7 +652,7 @@ class AIPlayer(ABC):
     def update_score(self, points: int):
         """更新分數"""
         self.score += points
-        logger.debug(f"{self.name} 得分 {points}，總分: {self.score}")
+        logger.debug("%s 得分 %d，總分: %d", self.name, points, self.score)
     
     def record_answer(self, is_correct: bool):
         """記錄答題結果"""
@@ -80,6 +660,15 @@ class AIPlayer(ABC):
         if is_correct:
             self.correct_answers += 1
     
+    def record_api_call(self):
+        """記錄一次 API 調用（含對沖產生的重複請求）"""
+        with self._counter_lock:
+            self.api_calls += 1
+    
+    def record_error(self):
+        """記錄一次調用錯誤（不計入答題）"""
+        self.errors += 1
+    
     def get_accuracy(self) -> float:
         """計算準確率"""
         if self.total_answers == 0:
@@ -88,14 +677,26 @@ class AIPlayer(ABC):
     
     def get_stats(self) -> Dict[str, Any]:
         """獲取玩家統計信息"""
-        return {
+        stats = {
             "name": self.name,
             "model": self.model,
             "score": self.score,
             "correct_answers": self.correct_answers,
             "total_answers": self.total_answers,
-            "accuracy": self.get_accuracy()
+            "accuracy": self.get_accuracy(),
+            "api_calls": self.api_calls,
+            "errors": self.errors
         }
+        # 非默認溫度時記錄，離線擬合溫度（src/calibrate.py）據此還原原始概率
+        if self.confidence_temperature != 1.0:
+            stats["confidence_temperature"] = self.confidence_temperature
+        if self.hedge_policy is not None:
+            stats["hedge"] = self.hedge_policy.get_stats()
+        if self.cascade_policy is not None:
+            stats["cascade"] = self.cascade_policy.get_stats()
+        if self.credentials is not None and len(self.credentials) > 1:
+            stats["credentials"] = self.credentials.get_stats()
+        return stats
     
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(name={self.name}, model={self.model}, score={self.score})"
@@ -6,6 +6,10 @@ from typing import List, Dict, Any
 import logging
 
 from .player import AIPlayer
+from .credentials import configure_credential_pool
+from .hedging import HedgePolicy
+from .cascade import CascadePolicy
+from .resilience import RetryPolicy, configure_circuit_breaker
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +43,19 @@ class PlayerFactory:
                 - type: 玩家類型
                 - model: 模型名稱
                 - enabled: 是否啟用
+                - retry: 重試策略（可選），包含 max_attempts, base_delay,
+                  max_delay, max_retry_after, max_throttle_wait
+                - circuit_breaker: 供應商熔斷器（可選），包含
+                  failure_threshold, recovery_timeout
+                - credentials: 密鑰池（可選），包含 rpm, cooldown,
+                  max_cooldown, auth_cooldown
+                - confidence_temperature: 置信度校準溫度（可選）
+                - logprobs: 設為 false 可禁用 logprobs 快速回答（可選）
+                - hedge: 對沖策略（可選），包含 enabled, backup_model,
+                  percentile, min_samples, max_hedge_ratio, max_workers
+                - cascade: 級聯策略（可選），包含 enabled, cheap（便宜模型列表，
+                  每項含 model，可選 type、cost、confidence_temperature），
+                  confidence_threshold, min_agreement, cost
                 
         Returns:
             List[AIPlayer]: 玩家實例列表
@@ -64,6 +81,35 @@ class PlayerFactory:
                 # 創建玩家實例
                 player_class = cls.AVAILABLE_PLAYERS[player_type]
                 player = player_class(name=player_name, model=model)
+                
+                # 可選：重試策略與供應商熔斷器
+                if config.get("retry"):
+                    player.retry_policy = RetryPolicy.from_config(config["retry"])
+                if config.get("circuit_breaker"):
+                    configure_circuit_breaker(player.provider, config["circuit_breaker"])
+                if config.get("credentials") and player.credentials is not None:
+                    configure_credential_pool(player.credentials, config["credentials"])
+                
+                # 可選：快速回答模式的置信度設置
+                if "confidence_temperature" in config:
+                    player.confidence_temperature = config["confidence_temperature"]
+                if config.get("logprobs") is False:
+                    player.use_logprobs = False
+                
+                # 可選：對沖策略
+                hedge_config = config.get("hedge")
+                if hedge_config and hedge_config.get("enabled", True):
+                    player.hedge_policy = cls._create_hedge_policy(
+                        player_class, player, hedge_config
+                    )
+                
+                # 可選：級聯策略（先問便宜模型，低置信度或不一致時才升級到本模型）
+                cascade_config = config.get("cascade")
+                if cascade_config and cascade_config.get("enabled", True):
+                    player.cascade_policy = cls._create_cascade_policy(
+                        player_type, player, cascade_config
+                    )
+                
                 players.append(player)
                 logger.info(f"成功創建玩家: {player_name} ({player_type})")
             except Exception as e:
@@ -71,6 +117,83 @@ class PlayerFactory:
         
         return players
     
+    @classmethod
+    def _create_hedge_policy(
+        cls,
+        player_class: type,
+        player: AIPlayer,
+        hedge_config: Dict[str, Any]
+    ) -> HedgePolicy:
+        """
+        根據配置創建對沖策略
+        
+        Args:
+            player_class: 玩家類
+            player: 主玩家
+            hedge_config: hedge 配置段
+            
+        Returns:
+            HedgePolicy: 對沖策略
+        """
+        backup = None
+        backup_model = hedge_config.get("backup_model")
+        if backup_model and backup_model != player.model:
+            try:
+                backup = player_class(name=f"{player.name} [hedge]", model=backup_model)
+                backup.retry_policy = player.retry_policy
+                backup.confidence_temperature = player.confidence_temperature
+                backup.use_logprobs = player.use_logprobs
+            except Exception as e:
+                logger.warning(f"創建 {player.name} 的備用模型 {backup_model} 失敗，"
+                               f"對沖請求將發往同一端點: {e}")
+        
+        target = backup.model if backup is not None else player.model
+        logger.info(f"{player.name} 啟用對沖請求 (對沖目標: {target})")
+        return HedgePolicy.from_config(hedge_config, backup=backup)
+    
+    @classmethod
+    def _create_cascade_policy(
+        cls,
+        player_type: str,
+        player: AIPlayer,
+        cascade_config: Dict[str, Any]
+    ) -> CascadePolicy:
+        """
+        根據配置創建級聯策略
+        
+        便宜模型默認與主玩家同一供應商（可用 type 指定其他供應商）；
+        創建失敗的便宜模型被跳過，全部失敗時每道題都由主玩家回答。
+        
+        Args:
+            player_type: 主玩家類型
+            player: 主玩家（大模型）
+            cascade_config: cascade 配置段
+            
+        Returns:
+            CascadePolicy: 級聯策略
+        """
+        cheap, costs = [], []
+        for tier_config in cascade_config.get("cheap", []):
+            tier_type = tier_config.get("type", player_type)
+            tier_model = tier_config.get("model")
+            try:
+                tier = cls.AVAILABLE_PLAYERS[tier_type](
+                    name=f"{player.name} [cascade:{tier_model}]", model=tier_model
+                )
+                tier.retry_policy = player.retry_policy
+                tier.confidence_temperature = tier_config.get(
+                    "confidence_temperature", player.confidence_temperature
+                )
+            except Exception as e:
+                logger.warning(f"創建 {player.name} 的便宜模型 {tier_type}/{tier_model} 失敗，已跳過: {e}")
+                continue
+            cheap.append(tier)
+            costs.append(tier_config.get("cost", 0.1))
+        
+        logger.info(f"{player.name} 啟用級聯 (便宜模型: {', '.join(tier.model for tier in cheap) or '無'}，"
+                    f"升級到: {player.model})")
+        return CascadePolicy.from_config(cascade_config, cheap, cheap_costs=costs)
+    
     @classmethod
     def create_default_chinese_team(cls) -> List[AIPlayer]:
         """
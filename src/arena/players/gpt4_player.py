@@ -2,12 +2,13 @@
 GPT4Player 實現
 使用 OpenAI GPT-4 API
 """
-from typing import List
-import os
+from typing import List, Dict, Optional, Iterator
 import logging
 from openai import OpenAI
 
 from ..player import AIPlayer
+from ..credentials import get_credential_pool
+from ..resilience import ProviderError, EMPTY_RESPONSE
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,12 @@ logger = logging.getLogger(__name__)
 class GPT4Player(AIPlayer):
     """GPT-4 AI 玩家"""
     
+    __slots__ = ()
+    
+    provider = "gpt4"
+    supports_logprobs = True
+    supports_batch = True
+    
     def __init__(self, name: str = "GPT-4", model: str = "gpt-4-turbo-preview"):
         """
         初始化 GPT-4 玩家
@@ -25,130 +32,112 @@ class GPT4Player(AIPlayer):
         """
         super().__init__(name, model)
         
-        # 初始化 OpenAI 客戶端
-        api_key = self._get_api_key()
-        self.client = OpenAI(api_key=api_key)
+        # 密鑰池（OPENAI_API_KEY 及 OPENAI_API_KEY_1..N），每個密鑰一個 OpenAI 客戶端
+        self.credentials = get_credential_pool(self.provider, "OPENAI_API_KEY")
         
         logger.info(f"GPT-4 玩家初始化完成: {name}")
     
     def _get_api_key(self) -> str:
         """
-        獲取 OpenAI API 密鑰
+        獲取 OpenAI API 密鑰（密鑰池中的第一個）
         
         Returns:
             str: API 密鑰
-            
-        Raises:
-            ValueError: 如果環境變量未設置
         """
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY 環境變量未設置")
-        return api_key
+        return self.credentials.primary.value
+    
+    def _create_client(self, credential_value: str) -> OpenAI:
+        """為一個密鑰創建 OpenAI 客戶端"""
+        return OpenAI(api_key=credential_value)
+    
+    def batch_client(self) -> OpenAI:
+        """
+        OpenAI 批處理接口固定使用第一個密鑰的客戶端
+        
+        批處理作業與上傳的文件歸屬於提交它們的密鑰，續接時必須用同一個密鑰查詢。
+        """
+        return self._client_for(self.credentials.primary)
     
-    def answer_boolean_question(self, word: str, attribute: str) -> bool:
+    def _chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
         """
-        使用 GPT-4 回答布林問題
+        調用 GPT-4 對話接口
         
         Args:
-            word: 中文詞語
-            attribute: 屬性描述
+            messages: 消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
             
         Returns:
-            bool: True 或 False
+            str: 回答文本
         """
-        try:
-            # 構造提示詞
-            prompt = f"""請判斷中文詞語「{word}」是否具有以下屬性：
-
-屬性：{attribute}
-
-請只回答「是」或「否」，不要有其他內容。"""
-            
-            # 調用 API
-            response = self.client.chat.completions.create(
+        with self._leased_client() as client:
+            response = client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位中文語言學專家，擅長分析中文詞語的語言學屬性。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=10
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
             )
-            
-            # 解析回答
-            answer_text = response.choices[0].message.content.strip()
-            
-            # 判斷回答
-            if "是" in answer_text or "yes" in answer_text.lower():
-                return True
-            else:
-                return False
-                
-        except Exception as e:
-            logger.error(f"GPT-4 API 調用失敗: {e}")
-            # 默認返回 False
-            return False
-    
-    def propose_custom_attributes(self, word: str, num_slots: int = 8) -> List[str]:
+        return response.choices[0].message.content.strip()
+
+    def _open_chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> Iterator[str]:
         """
-        使用 GPT-4 提出自定義屬性
+        打開 GPT-4 流式對話接口
         
         Args:
-            word: 中文詞語
-            num_slots: 屬性數量
+            messages: 消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
             
         Returns:
-            List[str]: 屬性列表
+            Iterator[str]: 文本增量迭代器
         """
-        try:
-            # 構造提示詞
-            prompt = f"""請為中文詞語「{word}」提出 {num_slots} 個有意義的語言學屬性。
-
-要求：
-1. 每個屬性應該是有價值的語言學特徵
-2. 屬性應該具體、明確
-3. 每行一個屬性，不要編號
-4. 屬性名稱應包含「屬性」二字
+        return self._leased_stream(lambda client: client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        ))
 
-示例格式：
-音韻屬性_平仄特徵
-構詞屬性_詞根來源
-"""
+    def _first_token_logprobs(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float
+    ) -> Dict[str, float]:
+        """
+        請求單個 token 並返回其前 5 個候選的 logprobs
+        
+        Args:
+            messages: 消息列表
+            temperature: 採樣溫度
             
-            # 調用 API
-            response = self.client.chat.completions.create(
+        Returns:
+            Dict[str, float]: token -> logprob
+        """
+        with self._leased_client() as client:
+            response = client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位中文語言學專家，擅長發現詞語的深層語言學屬性。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
+                messages=messages,
+                temperature=temperature,
+                max_tokens=1,
+                logprobs=True,
+                top_logprobs=5
             )
-            
-            # 解析回答
-            answer_text = response.choices[0].message.content.strip()
-            
-            # 提取屬性列表
-            attributes = []
-            for line in answer_text.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                # 移除編號
-                if len(line) > 0 and not line[0].isdigit():
-                    attributes.append(line)
-                elif '.' in line or '、' in line:
-                    # 移除數字編號
-                    parts = line.split('.', 1) if '.' in line else line.split('、', 1)
-                    if len(parts) > 1:
-                        attributes.append(parts[1].strip())
-            
-            # 確保返回正確數量
-            return attributes[:num_slots]
-            
-        except Exception as e:
-            logger.error(f"GPT-4 API 調用失敗: {e}")
-            # 返回空列表
-            return []
+        logprobs = response.choices[0].logprobs
+        if logprobs is None or not logprobs.content:
+            raise ProviderError(self.provider, EMPTY_RESPONSE, "GPT-4 未返回 logprobs")
+        
+        first = logprobs.content[0]
+        candidates = {item.token: item.logprob for item in (first.top_logprobs or [])}
+        candidates.setdefault(first.token, first.logprob)
+        return candidates
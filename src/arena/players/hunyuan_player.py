@@ -1,27 +1,157 @@
 """
 HunyuanPlayer 實現
-使用騰訊雲混元大模型 API
+使用騰訊雲混元大模型 API（基於 httpx 的原生異步傳輸，TC3-HMAC-SHA256 簽名）
 """
-from typing import List
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Tuple
+from datetime import datetime, timezone
 import os
+import json
+import hashlib
+import hmac
+import time
 import logging
 
 from ..player import AIPlayer
+from ..credentials import get_credential_pool
+from ..resilience import ProviderError, EMPTY_RESPONSE
+from .. import aio
 
 logger = logging.getLogger(__name__)
 
 try:
-    from tencentcloud.common import credential
-    from tencentcloud.hunyuan.v20230901 import hunyuan_client, models
-    HUNYUAN_AVAILABLE = True
+    import httpx
+    HTTPX_AVAILABLE = True
 except ImportError:
-    HUNYUAN_AVAILABLE = False
-    logger.warning("tencentcloud-sdk-python-hunyuan 模塊未安裝，HunyuanPlayer 將無法使用")
+    HTTPX_AVAILABLE = False
+    logger.warning("httpx 模塊未安裝，HunyuanPlayer 將無法使用")
+
+HUNYUAN_SERVICE = "hunyuan"
+HUNYUAN_VERSION = "2023-09-01"
+DEFAULT_ENDPOINT = "hunyuan.tencentcloudapi.com"
+
+# 同一端點的所有混元玩家共用一個連接池
+_POOL_LIMITS = dict(max_connections=256, max_keepalive_connections=64)
+_clients: Dict[str, "httpx.AsyncClient"] = {}
+
+
+def _get_client(endpoint: str) -> "httpx.AsyncClient":
+    """獲取端點的共用異步客戶端（只在共享事件循環線程中調用）"""
+    client = _clients.get(endpoint)
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url=endpoint if "://" in endpoint else f"https://{endpoint}",
+            limits=httpx.Limits(**_POOL_LIMITS),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+        _clients[endpoint] = client
+        aio.register_cleanup(client.aclose)
+    return client
+
+
+class TC3Signer:
+    """
+    騰訊雲 TC3-HMAC-SHA256 簽名
+
+    派生簽名密鑰 HMAC(HMAC(HMAC("TC3" + SecretKey, 日期), 服務), "tc3_request")
+    只與 UTC 日期有關，按日緩存，每個請求只需計算兩次哈希和一次 HMAC。
+    """
+
+    def __init__(self, secret_id: str, secret_key: str, service: str, host: str):
+        """
+        初始化簽名器
+
+        Args:
+            secret_id: SecretId
+            secret_key: SecretKey
+            service: 服務名
+            host: 請求的 Host 頭
+        """
+        self.secret_id = secret_id
+        self._secret_key = secret_key
+        self.service = service
+        self.host = host
+        # (UTC 日期, 派生密鑰)，整體替換以保證線程安全
+        self._cached_key: Tuple[str, bytes] = ("", b"")
+
+    def _signing_key(self, date: str) -> bytes:
+        cached_date, key = self._cached_key
+        if cached_date != date:
+            key = _hmac_sha256(("TC3" + self._secret_key).encode("utf-8"), date)
+            key = _hmac_sha256(key, self.service)
+            key = _hmac_sha256(key, "tc3_request")
+            self._cached_key = (date, key)
+        return key
+
+    def sign(self, payload: bytes, timestamp: int) -> str:
+        """
+        計算 Authorization 頭
+
+        Args:
+            payload: 請求體（與實際發送的字節一致）
+            timestamp: 請求時間戳（秒）
+
+        Returns:
+            str: Authorization 頭的值
+        """
+        date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+        canonical_request = (
+            "POST\n/\n\n"
+            f"content-type:application/json\nhost:{self.host}\n\n"
+            "content-type;host\n"
+            + hashlib.sha256(payload).hexdigest()
+        )
+        scope = f"{date}/{self.service}/tc3_request"
+        string_to_sign = (
+            f"TC3-HMAC-SHA256\n{timestamp}\n{scope}\n"
+            + hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+        )
+        signature = hmac.new(
+            self._signing_key(date), string_to_sign.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+        return (
+            f"TC3-HMAC-SHA256 Credential={self.secret_id}/{scope}, "
+            f"SignedHeaders=content-type;host, Signature={signature}"
+        )
+
+
+def _hmac_sha256(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+class _DeltaStream:
+    """混元 SSE 響應的文本增量異步迭代器（aclose() 關閉連接）"""
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+        self._lines = response.aiter_lines()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        async for line in self._lines:
+            if not line.startswith("data:"):
+                continue
+            data = json.loads(line[5:].strip())
+            choices = data.get("Choices") or []
+            if choices and choices[0].get("Delta", {}).get("Content"):
+                return choices[0]["Delta"]["Content"]
+        await self.aclose()
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        await self._response.aclose()
 
 
 class HunyuanPlayer(AIPlayer):
     """騰訊混元 AI 玩家"""
     
+    __slots__ = ("endpoint", "region", "host")
+    
+    provider = "hunyuan"
+    supports_max_tokens = False
+    supports_async = True
+    
     def __init__(self, name: str = "Hunyuan", model: str = "hunyuan-turbo"):
         """
         初始化 Hunyuan 玩家
@@ -32,154 +162,167 @@ class HunyuanPlayer(AIPlayer):
         """
         super().__init__(name, model)
         
-        if not HUNYUAN_AVAILABLE:
-            raise ImportError("tencentcloud-sdk-python-hunyuan 模塊未安裝，請運行: pip install tencentcloud-sdk-python-hunyuan")
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx 模塊未安裝，請運行: pip install httpx")
         
-        # 獲取 API 認證信息
-        secret_id, secret_key = self._get_api_key()
+        # 密鑰池（HUNYUAN_SECRET_ID/KEY 及按相同編號配對的 _1.._N），每組密鑰一個簽名器
+        self.credentials = get_credential_pool(self.provider, "HUNYUAN_SECRET_ID", "HUNYUAN_SECRET_KEY")
         
-        # 初始化騰訊雲客戶端
-        cred = credential.Credential(secret_id, secret_key)
-        region = os.getenv("HUNYUAN_REGION", "ap-guangzhou")
-        self.client = hunyuan_client.HunyuanClient(cred, region)
+        self.region = os.getenv("HUNYUAN_REGION", "ap-guangzhou")
+        # 可選：自定義端點（如內網域名或本地模擬服務，可帶 http:// 前綴）
+        self.endpoint = os.getenv("HUNYUAN_ENDPOINT", DEFAULT_ENDPOINT)
+        self.host = self.endpoint.split("://", 1)[-1].rstrip("/")
         
-        logger.info(f"Hunyuan 玩家初始化完成: {name} (region: {region})")
+        logger.info(f"Hunyuan 玩家初始化完成: {name} (region: {self.region})")
     
     def _get_api_key(self) -> tuple[str, str]:
         """
-        獲取騰訊雲 API 認證信息
+        獲取騰訊雲 API 認證信息（密鑰池中的第一組）
         
         Returns:
             tuple[str, str]: (secret_id, secret_key)
-            
-        Raises:
-            ValueError: 如果環境變量未設置
         """
-        secret_id = os.getenv("HUNYUAN_SECRET_ID")
-        secret_key = os.getenv("HUNYUAN_SECRET_KEY")
+        return self.credentials.primary.value
+    
+    def _create_client(self, credential_value: tuple[str, str]) -> TC3Signer:
+        """為一組密鑰創建簽名器（HTTP 連接池由所有密鑰共用）"""
+        secret_id, secret_key = credential_value
+        return TC3Signer(secret_id, secret_key, HUNYUAN_SERVICE, self.host)
+    
+    def _build_request(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        signer: TC3Signer,
+        stream: bool = False
+    ) -> Tuple[bytes, Dict[str, str]]:
+        """
+        構造並簽名混元 ChatCompletions 請求
         
-        if not secret_id:
-            raise ValueError("HUNYUAN_SECRET_ID 環境變量未設置")
-        if not secret_key:
-            raise ValueError("HUNYUAN_SECRET_KEY 環境變量未設置")
+        Args:
+            messages: OpenAI 格式的消息列表
+            temperature: 採樣溫度
+            signer: 租用的密鑰對應的簽名器
+            stream: 是否流式
         
-        return secret_id, secret_key
+        Returns:
+            Tuple[bytes, Dict[str, str]]: (請求體, 請求頭)
+        """
+        body: Dict[str, Any] = {
+            "Model": self.model,
+            "Messages": [
+                {"Role": message["role"], "Content": message["content"]}
+                for message in messages
+            ],
+            "TopP": 0.8,
+            "Temperature": temperature
+        }
+        if stream:
+            body["Stream"] = True
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        timestamp = int(time.time())
+        headers = {
+            "Authorization": signer.sign(payload, timestamp),
+            "Content-Type": "application/json",
+            "Host": self.host,
+            "X-TC-Action": "ChatCompletions",
+            "X-TC-Timestamp": str(timestamp),
+            "X-TC-Version": HUNYUAN_VERSION,
+            "X-TC-Region": self.region
+        }
+        return payload, headers
     
-    def answer_boolean_question(self, word: str, attribute: str) -> bool:
+    def _raise_for_error(self, status_code: int, data: Dict[str, Any]):
+        """把 HTTP 狀態或 Response.Error 轉換為 ProviderError"""
+        error = (data.get("Response") or {}).get("Error")
+        if error:
+            raise ProviderError.from_code(self.provider, error.get("Code", ""), error.get("Message", ""))
+        if status_code != 200:
+            raise ProviderError.from_status(self.provider, status_code, json.dumps(data, ensure_ascii=False))
+    
+    async def _achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
         """
-        使用 Hunyuan 回答布林問題
+        異步調用 Hunyuan 對話接口
         
         Args:
-            word: 中文詞語
-            attribute: 屬性描述
-            
+            messages: 消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數（混元接口暫不支持，忽略）
+        
         Returns:
-            bool: True 或 False
+            str: 回答文本
         """
-        try:
-            # 構造提示詞
-            prompt = f"""請判斷中文詞語「{word}」是否具有以下屬性：
-
-屬性：{attribute}
-
-請只回答「是」或「否」，不要有其他內容。"""
-            
-            # 構造請求
-            req = models.ChatCompletionsRequest()
-            req.Model = self.model
-            req.Messages = [
-                {"Role": "system", "Content": "你是一位中文語言學專家，擅長分析中文詞語的語言學屬性。"},
-                {"Role": "user", "Content": prompt}
-            ]
-            req.TopP = 0.8
-            req.Temperature = 0.3
-            
-            # 調用 API
-            resp = self.client.ChatCompletions(req)
-            
-            # 解析回答
-            if resp.Choices and len(resp.Choices) > 0:
-                answer_text = resp.Choices[0].Message.Content.strip()
-                
-                # 判斷回答
-                if "是" in answer_text or "yes" in answer_text.lower():
-                    return True
-                else:
-                    return False
-            else:
-                logger.error("Hunyuan API 返回空響應")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Hunyuan API 調用失敗: {e}")
-            # 默認返回 False
-            return False
+        with self._leased_client() as signer:
+            payload, headers = self._build_request(messages, temperature, signer)
+            response = await _get_client(self.endpoint).post("/", content=payload, headers=headers)
+            try:
+                data = response.json()
+            except ValueError:
+                raise ProviderError.from_status(self.provider, response.status_code, response.text)
+            self._raise_for_error(response.status_code, data)
+        
+        choices = data["Response"].get("Choices")
+        if not choices:
+            raise ProviderError(self.provider, EMPTY_RESPONSE, "Hunyuan API 返回空響應")
+        return choices[0]["Message"]["Content"].strip()
     
-    def propose_custom_attributes(self, word: str, num_slots: int = 8) -> List[str]:
+    async def _aopen_chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> AsyncIterator[str]:
         """
-        使用 Hunyuan 提出自定義屬性
+        異步打開 Hunyuan 流式對話接口（SSE）
+        
+        響應頭到達後才返回，出錯時（非 SSE 的 JSON 響應）在此拋出以便韌性層重試。
         
         Args:
-            word: 中文詞語
-            num_slots: 屬性數量
-            
+            messages: 消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數（混元接口暫不支持，忽略）
+        
         Returns:
-            List[str]: 屬性列表
+            AsyncIterator[str]: 文本增量異步迭代器
         """
-        try:
-            # 構造提示詞
-            prompt = f"""請為中文詞語「{word}」提出 {num_slots} 個有意義的語言學屬性。
-
-要求：
-1. 每個屬性應該是有價值的語言學特徵
-2. 屬性應該具體、明確
-3. 每行一個屬性，不要編號
-4. 屬性名稱應包含「屬性」二字
-
-示例格式：
-音韻屬性_平仄特徵
-構詞屬性_詞根來源
-"""
-            
-            # 構造請求
-            req = models.ChatCompletionsRequest()
-            req.Model = self.model
-            req.Messages = [
-                {"Role": "system", "Content": "你是一位中文語言學專家，擅長發現詞語的深層語言學屬性。"},
-                {"Role": "user", "Content": prompt}
-            ]
-            req.TopP = 0.8
-            req.Temperature = 0.7
-            
-            # 調用 API
-            resp = self.client.ChatCompletions(req)
-            
-            # 解析回答
-            if resp.Choices and len(resp.Choices) > 0:
-                answer_text = resp.Choices[0].Message.Content.strip()
-                
-                # 提取屬性列表
-                attributes = []
-                for line in answer_text.split('\n'):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    # 移除編號
-                    if len(line) > 0 and not line[0].isdigit():
-                        attributes.append(line)
-                    elif '.' in line or '、' in line:
-                        # 移除數字編號
-                        parts = line.split('.', 1) if '.' in line else line.split('、', 1)
-                        if len(parts) > 1:
-                            attributes.append(parts[1].strip())
-                
-                # 確保返回正確數量
-                return attributes[:num_slots]
-            else:
-                logger.error("Hunyuan API 返回空響應")
-                return []
-            
-        except Exception as e:
-            logger.error(f"Hunyuan API 調用失敗: {e}")
-            # 返回空列表
-            return []
+        with self._leased_client() as signer:
+            payload, headers = self._build_request(messages, temperature, signer, stream=True)
+            client = _get_client(self.endpoint)
+            request = client.build_request("POST", "/", content=payload, headers=headers)
+            response = await client.send(request, stream=True)
+            if "text/event-stream" not in response.headers.get("content-type", ""):
+                try:
+                    body = await response.aread()
+                finally:
+                    await response.aclose()
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise ProviderError.from_status(self.provider, response.status_code,
+                                                    body.decode("utf-8", "replace"))
+                self._raise_for_error(response.status_code, data)
+                raise ProviderError(self.provider, EMPTY_RESPONSE, "Hunyuan API 未返回流式響應")
+        return _DeltaStream(response)
+    
+    def _chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """同步調用：在共享事件循環中運行異步傳輸"""
+        return aio.run(self._achat_completion(messages, temperature, max_tokens))
+    
+    def _open_chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> Iterator[str]:
+        """同步流式調用：在共享事件循環中打開流，逐項取回增量"""
+        return aio.SyncStream(aio.run(self._aopen_chat_stream(messages, temperature, max_tokens)))
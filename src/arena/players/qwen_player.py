@@ -2,16 +2,17 @@
 QwenPlayer 實現
 使用阿里雲 Qwen API (DashScope SDK)
 """
-from typing import List
+from typing import List, Dict, Optional, Iterator
 import os
 import logging
 
 from ..player import AIPlayer
+from ..credentials import get_credential_pool
+from ..resilience import ProviderError
 
 logger = logging.getLogger(__name__)
 
 try:
-    import dashscope
     from dashscope import Generation
     DASHSCOPE_AVAILABLE = True
 except ImportError:
@@ -22,6 +23,11 @@ except ImportError:
 class QwenPlayer(AIPlayer):
     """通義千問 AI 玩家"""
     
+    __slots__ = ()
+    
+    provider = "qwen"
+    supports_batch = True
+    
     def __init__(self, name: str = "Qwen", model: str = "qwen-max"):
         """
         初始化 Qwen 玩家
@@ -35,144 +41,124 @@ class QwenPlayer(AIPlayer):
         if not DASHSCOPE_AVAILABLE:
             raise ImportError("dashscope 模塊未安裝，請運行: pip install dashscope")
         
-        # 設置 API Key
-        api_key = self._get_api_key()
-        dashscope.api_key = api_key
+        # 密鑰池（DASHSCOPE_API_KEY 及 DASHSCOPE_API_KEY_1..N）；密鑰隨每次調用傳入，
+        # 不設置進程全局的 dashscope.api_key，多個 Qwen 玩家互不覆蓋
+        self.credentials = get_credential_pool(self.provider, "DASHSCOPE_API_KEY")
         
         logger.info(f"Qwen 玩家初始化完成: {name}")
     
     def _get_api_key(self) -> str:
         """
-        獲取 DashScope API 密鑰
+        獲取 DashScope API 密鑰（密鑰池中的第一個）
         
         Returns:
             str: API 密鑰
-            
-        Raises:
-            ValueError: 如果環境變量未設置
         """
-        api_key = os.getenv("DASHSCOPE_API_KEY")
-        if not api_key:
-            raise ValueError("DASHSCOPE_API_KEY 環境變量未設置")
-        return api_key
+        return self.credentials.primary.value
     
-    def answer_boolean_question(self, word: str, attribute: str) -> bool:
+    def batch_client(self):
         """
-        使用 Qwen 回答布林問題
+        DashScope 批處理走 OpenAI 兼容模式（files + batches 接口），
+        固定使用第一個密鑰（作業歸屬於提交它的密鑰）
         
-        Args:
-            word: 中文詞語
-            attribute: 屬性描述
-            
         Returns:
-            bool: True 或 False
+            OpenAI: 指向兼容模式端點的客戶端
         """
-        try:
-            # 構造提示詞
-            prompt = f"""請判斷中文詞語「{word}」是否具有以下屬性：
-
-屬性：{attribute}
-
-請只回答「是」或「否」，不要有其他內容。"""
-            
-            # 調用 API
-            messages = [
-                {"role": "system", "content": "你是一位中文語言學專家，擅長分析中文詞語的語言學屬性。"},
-                {"role": "user", "content": prompt}
-            ]
-            
-            response = Generation.call(
-                model=self.model,
-                messages=messages,
-                result_format='message',
-                temperature=0.3,
-                max_tokens=10
-            )
-            
-            # 檢查響應
-            if response.status_code == 200:
-                answer_text = response.output.choices[0].message.content.strip()
-                
-                # 判斷回答
-                if "是" in answer_text or "yes" in answer_text.lower():
-                    return True
-                else:
-                    return False
-            else:
-                logger.error(f"Qwen API 調用失敗: {response.message}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Qwen API 調用失敗: {e}")
-            # 默認返回 False
-            return False
+        from openai import OpenAI
+        
+        base_url = os.getenv(
+            "DASHSCOPE_COMPATIBLE_BASE_URL",
+            "https://dashscope.aliyuncs.com/compatible-mode/v1"
+        )
+        return OpenAI(api_key=self._get_api_key(), base_url=base_url)
     
-    def propose_custom_attributes(self, word: str, num_slots: int = 8) -> List[str]:
+    def _chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
         """
-        使用 Qwen 提出自定義屬性
+        調用 Qwen 對話接口
         
         Args:
-            word: 中文詞語
-            num_slots: 屬性數量
+            messages: 消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
             
         Returns:
-            List[str]: 屬性列表
+            str: 回答文本
         """
-        try:
-            # 構造提示詞
-            prompt = f"""請為中文詞語「{word}」提出 {num_slots} 個有意義的語言學屬性。
-
-要求：
-1. 每個屬性應該是有價值的語言學特徵
-2. 屬性應該具體、明確
-3. 每行一個屬性，不要編號
-4. 屬性名稱應包含「屬性」二字
-
-示例格式：
-音韻屬性_平仄特徵
-構詞屬性_詞根來源
-"""
-            
-            # 調用 API
-            messages = [
-                {"role": "system", "content": "你是一位中文語言學專家，擅長發現詞語的深層語言學屬性。"},
-                {"role": "user", "content": prompt}
-            ]
-            
+        with self.credentials.lease() as credential:
             response = Generation.call(
                 model=self.model,
                 messages=messages,
                 result_format='message',
-                temperature=0.7,
-                max_tokens=500
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=credential.value
             )
             
-            # 檢查響應
-            if response.status_code == 200:
-                answer_text = response.output.choices[0].message.content.strip()
-                
-                # 提取屬性列表
-                attributes = []
-                for line in answer_text.split('\n'):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    # 移除編號
-                    if len(line) > 0 and not line[0].isdigit():
-                        attributes.append(line)
-                    elif '.' in line or '、' in line:
-                        # 移除數字編號
-                        parts = line.split('.', 1) if '.' in line else line.split('、', 1)
-                        if len(parts) > 1:
-                            attributes.append(parts[1].strip())
-                
-                # 確保返回正確數量
-                return attributes[:num_slots]
-            else:
-                logger.error(f"Qwen API 調用失敗: {response.message}")
-                return []
+            # DashScope 以狀態碼表示失敗而非拋出異常
+            if response.status_code != 200:
+                raise ProviderError.from_status(
+                    self.provider, response.status_code, f"Qwen API 調用失敗: {response.message}"
+                )
+        return response.output.choices[0].message.content.strip()
+
+    def _open_chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> Iterator[str]:
+        """
+        打開 Qwen 流式對話接口（增量輸出模式）
+        
+        DashScope 的流式調用是惰性的，請求在第一次迭代時才發出；因此在密鑰租約內
+        讀到首個響應後才返回（連接錯誤由韌性層重試），租約一直保持到流讀完或被關閉，
+        流式請求同樣計入密鑰的在途數與速率窗口，流中途的錯誤也會隔離該密鑰。
+        
+        Args:
+            messages: 消息列表
+            temperature: 採樣溫度
+            max_tokens: 最大生成 token 數
             
-        except Exception as e:
-            logger.error(f"Qwen API 調用失敗: {e}")
-            # 返回空列表
-            return []
+        Returns:
+            Iterator[str]: 文本增量迭代器
+        """
+        def read(responses):
+            response = next(responses, None)
+            if response is not None and response.status_code != 200:
+                raise ProviderError.from_status(
+                    self.provider, response.status_code, f"Qwen API 調用失敗: {response.message}"
+                )
+            return response
+        
+        def generate():
+            with self.credentials.lease() as credential:
+                responses = Generation.call(
+                    model=self.model,
+                    messages=messages,
+                    result_format='message',
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    incremental_output=True,
+                    api_key=credential.value
+                )
+                try:
+                    response = read(responses)
+                    # 請求已發出並收到首個響應
+                    yield None
+                    while response is not None:
+                        content = response.output.choices[0].message.content
+                        if content:
+                            yield content
+                        response = read(responses)
+                finally:
+                    responses.close()
+        
+        stream = generate()
+        next(stream)
+        return stream
@@ -0,0 +1,228 @@
+"""
+啟動預檢
+正式運行前並發地向每位玩家發出極短的請求：驗證密鑰與連通性、測量基線延遲，
+並以多個並發請求預先建立連接池中的連接（含 TLS 會話），第一輪不再承擔冷啟動開銷。
+預檢失敗的玩家在運行開始前被剔除，而不是在每道題上靜默答錯
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
+import statistics
+import time
+import logging
+
+from .player import AIPlayer
+from .resilience import (
+    ProviderError,
+    RetryPolicy,
+    call_with_resilience,
+    EMPTY_RESPONSE,
+    UNKNOWN
+)
+
+logger = logging.getLogger(__name__)
+
+# 探測請求：只需要服務端返回一個極短的回答
+PROBE_MESSAGES = [{"role": "user", "content": "請只回答「是」。"}]
+PROBE_MAX_TOKENS = 2
+# 探測只重試一次：密鑰錯誤等不可重試的錯誤立即失敗
+PROBE_RETRY_POLICY = RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=2.0)
+# 超時未完成的預檢
+TIMEOUT = "timeout"
+
+
+class PreflightResult:
+    """一位玩家的預檢結果"""
+
+    __slots__ = (
+        "name", "provider", "model", "ok", "cold_latency", "latency",
+        "warmed", "warm_failures", "error", "error_kind", "backup_ok", "cascade_failures"
+    )
+
+    def __init__(self, player: AIPlayer):
+        self.name = player.name
+        self.provider = player.provider
+        self.model = player.model
+        self.ok = False
+        # 首個請求的延遲（含建立連接與 TLS 握手）
+        self.cold_latency: Optional[float] = None
+        # 連接預熱後的延遲中位數
+        self.latency: Optional[float] = None
+        self.warmed = 0
+        self.warm_failures = 0
+        self.error: Optional[str] = None
+        self.error_kind: Optional[str] = None
+        # 對沖備用模型是否可用（None 表示沒有備用模型）
+        self.backup_ok: Optional[bool] = None
+        # 預檢失敗、已移出級聯的便宜模型
+        self.cascade_failures: List[str] = []
+
+    def fail(self, error: Exception):
+        """記錄預檢失敗"""
+        self.ok = False
+        self.error = str(error)
+        self.error_kind = getattr(error, "kind", UNKNOWN)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "name": self.name,
+            "provider": self.provider,
+            "model": self.model,
+            "ok": self.ok,
+            "cold_latency_ms": _to_ms(self.cold_latency),
+            "latency_ms": _to_ms(self.latency),
+            "warmed_connections": self.warmed
+        }
+        if self.warm_failures:
+            result["warm_failures"] = self.warm_failures
+        if self.backup_ok is not None:
+            result["backup_ok"] = self.backup_ok
+        if self.cascade_failures:
+            result["cascade_failures"] = self.cascade_failures
+        if self.error is not None:
+            result["error"] = self.error
+            result["error_kind"] = self.error_kind
+        return result
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def probe(player: AIPlayer) -> float:
+    """
+    向玩家的供應商發出一次探測請求（不計入玩家的調用次數）
+
+    返回空內容也說明密鑰與連通性正常，視為成功。
+
+    Args:
+        player: 玩家
+
+    Returns:
+        float: 延遲（秒）
+
+    Raises:
+        ProviderError: 探測失敗
+    """
+    started = time.perf_counter()
+    try:
+        call_with_resilience(
+            player.provider,
+            lambda: player._chat_completion(PROBE_MESSAGES, 0.0, PROBE_MAX_TOKENS),
+            retry_policy=PROBE_RETRY_POLICY
+        )
+    except ProviderError as e:
+        if e.kind != EMPTY_RESPONSE:
+            raise
+    return time.perf_counter() - started
+
+
+def check_player(player: AIPlayer, warm_connections: int = 2) -> PreflightResult:
+    """
+    預檢一位玩家
+
+    先發出一個探測請求驗證密鑰與連通性，再並發發出 warm_connections 個請求
+    （至少每個密鑰一個），使連接池中保有相應數量的已握手連接；
+    密鑰池中認證失敗的密鑰此時即被隔離，不會在正式運行中被租用；
+    對沖備用模型與級聯的便宜模型也各探測一次，不可用的不再參與運行。
+
+    Args:
+        player: 玩家
+        warm_connections: 預熱的並發連接數
+
+    Returns:
+        PreflightResult: 預檢結果
+    """
+    result = PreflightResult(player)
+    try:
+        result.cold_latency = probe(player)
+    except Exception as e:
+        result.fail(e)
+        return result
+    result.ok = True
+
+    num_warm = max(warm_connections, len(player.credentials) if player.credentials is not None else 0)
+    latencies = []
+    if num_warm > 0:
+        with ThreadPoolExecutor(max_workers=num_warm, thread_name_prefix="arena-preflight-warm") as executor:
+            futures = [executor.submit(probe, player) for _ in range(num_warm)]
+        for future in futures:
+            if future.exception() is None:
+                latencies.append(future.result())
+            else:
+                result.warm_failures += 1
+    result.warmed = len(latencies)
+    result.latency = statistics.median(latencies) if latencies else result.cold_latency
+
+    backup = player.hedge_policy.backup if player.hedge_policy is not None else None
+    if backup is not None:
+        try:
+            probe(backup)
+            result.backup_ok = True
+        except Exception as e:
+            # 備用模型不可用時對沖請求改發同一端點
+            logger.warning(f"{player.name} 的對沖備用模型 {backup.model} 預檢失敗，"
+                           f"對沖請求將發往同一端點: {e}")
+            player.hedge_policy.backup = None
+            result.backup_ok = False
+
+    cascade = player.cascade_policy
+    if cascade is not None:
+        for tier in list(cascade.cheap):
+            try:
+                probe(tier)
+            except Exception as e:
+                # 不可用的便宜模型不再參與回答，題目由其餘檔位或大模型回答
+                logger.warning(f"{player.name} 的便宜模型 {tier.model} 預檢失敗，已移出級聯: {e}")
+                cascade.remove_tier(tier)
+                result.cascade_failures.append(tier.model)
+    return result
+
+
+def preflight_players(
+    players: List[AIPlayer],
+    timeout: float = 30.0,
+    warm_connections: int = 2
+) -> Tuple[List[AIPlayer], List[PreflightResult]]:
+    """
+    並發預檢全部玩家，剔除失敗或超時的玩家
+
+    Args:
+        players: 玩家列表
+        timeout: 整體超時（秒），超時未完成的玩家視為失敗
+        warm_connections: 每位玩家預熱的並發連接數
+
+    Returns:
+        Tuple[List[AIPlayer], List[PreflightResult]]: (通過預檢的玩家, 每位玩家的結果)
+    """
+    if not players:
+        return [], []
+
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(players), thread_name_prefix="arena-preflight")
+    futures = [executor.submit(check_player, player, warm_connections) for player in players]
+    done, _ = wait(futures, timeout=timeout)
+    # 超時的探測不再等待（其線程在請求返回後自行結束）
+    executor.shutdown(wait=False)
+
+    healthy, results = [], []
+    for player, future in zip(players, futures):
+        if future in done:
+            result = future.result()
+        else:
+            result = PreflightResult(player)
+            result.error = f"預檢超過 {timeout:.0f} 秒未完成"
+            result.error_kind = TIMEOUT
+        results.append(result)
+
+        if result.ok:
+            healthy.append(player)
+            logger.info(f"預檢通過: {player.name} (首次 {_to_ms(result.cold_latency)} ms，"
+                        f"預熱後 {_to_ms(result.latency)} ms，{result.warmed} 個連接)")
+        else:
+            logger.error(f"預檢失敗，已剔除玩家 {player.name}: {result.error}",
+                         extra={"player": player.name, "provider": player.provider,
+                                "outcome": "error", "error_kind": result.error_kind})
+
+    logger.info(f"預檢完成: {len(healthy)}/{len(players)} 位玩家可用，"
+                f"用時 {time.perf_counter() - started:.2f} 秒")
+    return healthy, results
@@ -0,0 +1,309 @@
+"""
+性能剖析
+低開銷的分階段計時器、全線程調用棧採樣（輸出 collapsed stacks，可直接生成火焰圖）
+以及可選的 cProfile；未啟用時 stage() 只是一次全局變量判斷
+"""
+from typing import List, Dict, Any, Optional
+from collections import Counter
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _NullStage:
+    """未啟用剖析時的空計時器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+# 當前啟用的剖析器（None 表示未啟用）
+_active: Optional["StageProfiler"] = None
+
+
+def stage(name: str):
+    """
+    為一個階段計時
+
+    用法: ``with stage("referee"): ...``；未啟用剖析時返回空計時器。
+
+    Args:
+        name: 階段名稱
+    """
+    profiler = _active
+    if profiler is None:
+        return _NULL_STAGE
+    return _StageTimer(profiler._totals(), name)
+
+
+class _StageTimer:
+    __slots__ = ("totals", "name", "start")
+
+    def __init__(self, totals: Dict[str, List[int]], name: str):
+        self.totals = totals
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter_ns() - self.start
+        entry = self.totals.get(self.name)
+        if entry is None:
+            self.totals[self.name] = [1, elapsed, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+        return False
+
+
+class StageProfiler:
+    """
+    分階段計時器
+
+    每個線程累積到自己的字典，計時路徑上沒有鎖；報告時再合併。
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._all_totals: List[Dict[str, List[int]]] = []
+        self._lock = threading.Lock()
+
+    def _totals(self) -> Dict[str, List[int]]:
+        totals = getattr(self._local, "totals", None)
+        if totals is None:
+            totals = self._local.totals = {}
+            with self._lock:
+                self._all_totals.append(totals)
+        return totals
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        合併各線程的統計
+
+        Returns:
+            Dict: 階段 -> {count, total_ms, mean_ms, max_ms}
+        """
+        merged: Dict[str, List[int]] = {}
+        with self._lock:
+            all_totals = list(self._all_totals)
+        for totals in all_totals:
+            for name, (count, total, maximum) in list(totals.items()):
+                entry = merged.setdefault(name, [0, 0, 0])
+                entry[0] += count
+                entry[1] += total
+                entry[2] = max(entry[2], maximum)
+        return {
+            name: {
+                "count": count,
+                "total_ms": total / 1e6,
+                "mean_ms": total / count / 1e6,
+                "max_ms": maximum / 1e6
+            }
+            for name, (count, total, maximum) in merged.items()
+        }
+
+
+def measure_timer_cost(iterations: int = 100000) -> float:
+    """
+    測量一次 stage() 計時的開銷
+
+    Returns:
+        float: 每次計時的開銷（秒）
+    """
+    global _active
+    previous, _active = _active, StageProfiler()
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with stage("calibration"):
+                pass
+        return (time.perf_counter() - start) / iterations
+    finally:
+        _active = previous
+
+
+class StackSampler:
+    """
+    定期採樣所有線程的調用棧，輸出 collapsed stacks（flamegraph.pl / speedscope 可讀）
+    """
+
+    def __init__(self, interval: float = 0.01):
+        """
+        初始化採樣器
+
+        Args:
+            interval: 採樣間隔（秒）
+        """
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        # 採樣本身佔用的時間（持有 GIL，計入剖析開銷）
+        self.busy_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="arena-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        labels = {}
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = \
+                            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    frames.append(label)
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+            self.busy_seconds += time.perf_counter() - start
+
+    def write_collapsed(self, path: str):
+        """寫出 collapsed stacks 文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _TimedHandler(logging.Handler):
+    """包裝已有的日誌處理器，統計日誌輸出耗時"""
+
+    def __init__(self, inner: logging.Handler):
+        super().__init__(inner.level)
+        self.inner = inner
+
+    def handle(self, record):
+        with stage("logging"):
+            return self.inner.handle(record)
+
+
+class ProfileSession:
+    """
+    一次運行的剖析會話：分階段計時 + 棧採樣 +（可選）cProfile
+    """
+
+    def __init__(self, output_dir: str, use_cprofile: bool = False, sample_interval: float = 0.01):
+        """
+        初始化會話
+
+        Args:
+            output_dir: 輸出目錄
+            use_cprofile: 是否同時開啟 cProfile（確定性剖析，開銷大，只覆蓋主線程）
+            sample_interval: 棧採樣間隔（秒）
+        """
+        self.output_dir = output_dir
+        self.use_cprofile = use_cprofile
+        self.profiler = StageProfiler()
+        self.sampler = StackSampler(sample_interval)
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        self._wrapped_handlers = []
+
+    def start(self):
+        """開始剖析"""
+        global _active
+        self.timer_cost = measure_timer_cost()
+        root = logging.getLogger()
+        self._wrapped_handlers = list(root.handlers)
+        root.handlers = [_TimedHandler(handler) for handler in self._wrapped_handlers]
+
+        _active = self.profiler
+        self.sampler.start()
+        self._start = time.perf_counter()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def stop(self) -> Dict[str, Any]:
+        """
+        停止剖析並寫出報告
+
+        Returns:
+            Dict: 報告（wall_seconds, overhead, stages）
+        """
+        global _active
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        wall = time.perf_counter() - self._start
+        self.sampler.stop()
+        _active = None
+        logging.getLogger().handlers = self._wrapped_handlers
+
+        stages = self.profiler.snapshot()
+        timer_count = sum(stats["count"] for stats in stages.values())
+        timer_overhead = timer_count * self.timer_cost
+        overhead = timer_overhead + self.sampler.busy_seconds
+        report = {
+            "wall_seconds": wall,
+            "overhead": {
+                "timer_calls": timer_count,
+                "timer_cost_us": self.timer_cost * 1e6,
+                "timer_seconds": timer_overhead,
+                "sampler_samples": self.sampler.samples,
+                "sampler_seconds": self.sampler.busy_seconds,
+                "total_seconds": overhead,
+                "fraction": overhead / wall if wall > 0 else 0.0,
+                "cprofile": self.cprofile is not None
+            },
+            "stages": {
+                name: dict(stats, share=stats["total_ms"] / 1000 / wall if wall > 0 else 0.0)
+                for name, stats in sorted(stages.items(), key=lambda item: -item[1]["total_ms"])
+            }
+        }
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, "stages.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.sampler.write_collapsed(os.path.join(self.output_dir, "stacks.collapsed"))
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(os.path.join(self.output_dir, "profile.prof"))
+        return report
+
+
+def print_report(report: Dict[str, Any]):
+    """打印分階段耗時"""
+    wall = report["wall_seconds"]
+    print("\n" + "=" * 72)
+    print("分階段耗時".center(72))
+    print("=" * 72)
+    print(f"{'階段':<28} {'次數':>8} {'總計(s)':>10} {'平均(ms)':>10} {'最大(ms)':>10} {'佔比':>6}")
+    print("-" * 72)
+    for name, stats in report["stages"].items():
+        print(f"{name:<28} {stats['count']:>8} {stats['total_ms'] / 1000:>10.3f} "
+              f"{stats['mean_ms']:>10.3f} {stats['max_ms']:>10.1f} {stats['share']:>6.1%}")
+    print("-" * 72)
+    overhead = report["overhead"]
+    print(f"總耗時 {wall:.3f}s；剖析開銷 {overhead['total_seconds'] * 1000:.1f}ms "
+          f"({overhead['fraction']:.2%}：{overhead['timer_calls']} 次計時 × "
+          f"{overhead['timer_cost_us']:.2f}µs + {overhead['sampler_samples']} 次棧採樣"
+          f"{'，另有 cProfile 開銷未計入' if overhead['cprofile'] else ''})")
+    print("並發模式下各階段時間可重疊，佔比之和可超過 100%")
+    print("=" * 72 + "\n")
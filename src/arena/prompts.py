@@ -0,0 +1,258 @@
+"""
+提示詞與回答解析
+所有玩家共用的提示詞模板和回答解析邏輯
+"""
+from typing import List, Dict, Iterable, Iterator, Optional
+import json
+import math
+import re
+
+BOOLEAN_SYSTEM_PROMPT = "你是一位中文語言學專家，擅長分析中文詞語的語言學屬性。"
+CUSTOM_ATTRIBUTES_SYSTEM_PROMPT = "你是一位中文語言學專家，擅長發現詞語的深層語言學屬性。"
+REFEREE_SYSTEM_PROMPT = "你是一位嚴格公正的中文語言學評審，負責評估他人提出的詞語屬性。"
+
+# LLM 裁判對自定義屬性的評分上限（0 = 無效，1 = 成立但寬泛，2 = 準確且有價值）
+MAX_CUSTOM_ATTRIBUTE_SCORE = 2
+
+
+def build_boolean_messages(word: str, attribute: str) -> List[Dict[str, str]]:
+    """
+    構造布林問題的對話消息
+
+    Args:
+        word: 中文詞語
+        attribute: 屬性描述
+
+    Returns:
+        List[Dict[str, str]]: OpenAI 格式的消息列表
+    """
+    prompt = f"""請判斷中文詞語「{word}」是否具有以下屬性：
+
+屬性：{attribute}
+
+請只回答「是」或「否」，不要有其他內容。"""
+
+    return [
+        {"role": "system", "content": BOOLEAN_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def build_custom_attributes_messages(word: str, num_slots: int) -> List[Dict[str, str]]:
+    """
+    構造自定義屬性提案的對話消息
+
+    Args:
+        word: 中文詞語
+        num_slots: 屬性數量
+
+    Returns:
+        List[Dict[str, str]]: OpenAI 格式的消息列表
+    """
+    prompt = f"""請為中文詞語「{word}」提出 {num_slots} 個有意義的語言學屬性。
+
+要求：
+1. 每個屬性應該是有價值的語言學特徵
+2. 屬性應該具體、明確
+3. 每行一個屬性，不要編號
+4. 屬性名稱應包含「屬性」二字
+
+示例格式：
+音韻屬性_平仄特徵
+構詞屬性_詞根來源
+"""
+
+    return [
+        {"role": "system", "content": CUSTOM_ATTRIBUTES_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def build_custom_attribute_judge_messages(word: str, attributes: List[str]) -> List[Dict[str, str]]:
+    """
+    構造自定義屬性評審的對話消息（同一詞語的所有屬性合併為一次請求）
+
+    Args:
+        word: 中文詞語
+        attributes: 待評估的自定義屬性
+
+    Returns:
+        List[Dict[str, str]]: OpenAI 格式的消息列表
+    """
+    numbered = "\n".join(f"{index}. {attribute}" for index, attribute in enumerate(attributes, 1))
+    prompt = f"""以下是為中文詞語「{word}」提出的自定義語言學屬性，請逐條評分：
+
+2 分：準確、具體，對該詞有區分價值的語言學屬性
+1 分：成立，但寬泛或價值有限
+0 分：不成立、與該詞無關，或不是語言學屬性
+
+{numbered}
+
+請只輸出一個 JSON 數組，按順序給出每條屬性的分數，例如 [2, 0, 1]。"""
+
+    return [
+        {"role": "system", "content": REFEREE_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_judge_scores(answer_text: str, count: int) -> List[Optional[int]]:
+    """
+    從裁判回答中提取逐條分數
+
+    優先解析 JSON 數組，否則退回「序號. 分數」格式的逐行解析；
+    分數截斷到 0..MAX_CUSTOM_ATTRIBUTE_SCORE。
+
+    Args:
+        answer_text: 裁判模型的回答
+        count: 屬性數量
+
+    Returns:
+        List[Optional[int]]: 每條屬性的分數，無法解析的位置為 None
+    """
+    scores: List[Optional[int]] = [None] * count
+    match = re.search(r"\[[^\[\]]*\]", answer_text)
+    if match:
+        try:
+            values = json.loads(match.group(0))
+        except ValueError:
+            values = []
+        for index, value in enumerate(values[:count]):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                scores[index] = min(max(int(value), 0), MAX_CUSTOM_ATTRIBUTE_SCORE)
+        if any(score is not None for score in scores):
+            return scores
+
+    for line_match in re.finditer(r"^\s*(\d+)\s*[.、:：)）]\s*(\d+)", answer_text, re.MULTILINE):
+        index = int(line_match.group(1)) - 1
+        if 0 <= index < count:
+            scores[index] = min(int(line_match.group(2)), MAX_CUSTOM_ATTRIBUTE_SCORE)
+    return scores
+
+
+# 布林回答的肯定/否定前綴（否定優先匹配，避免「不是」被當作「是」）
+NEGATIVE_PREFIXES = ("否", "不", "非", "沒", "没", "no", "false", "n")
+POSITIVE_PREFIXES = ("是", "對", "对", "有", "yes", "true", "y")
+
+
+def classify_boolean_token(text: str) -> Optional[bool]:
+    """
+    將回答（或其首個 token）歸類為肯定/否定
+
+    Args:
+        text: 回答文本或 token
+
+    Returns:
+        Optional[bool]: True/False，無法識別時返回 None
+    """
+    text = text.strip().strip("「」\"'*").lower()
+    if not text:
+        return None
+    if text.startswith(NEGATIVE_PREFIXES):
+        return False
+    if text.startswith(POSITIVE_PREFIXES):
+        return True
+    return None
+
+
+def parse_boolean_answer(answer_text: str) -> bool:
+    """
+    解析布林問題的文本回答（受約束解析：只看開頭的肯定/否定詞）
+
+    Args:
+        answer_text: 模型回答
+
+    Returns:
+        bool: True 或 False（無法識別時為 False）
+    """
+    return classify_boolean_token(answer_text) is True
+
+
+def yes_probability(top_logprobs: Dict[str, float]) -> Optional[float]:
+    """
+    根據首個 token 的候選 logprobs 計算「是」的概率
+
+    只在肯定/否定兩類候選之間歸一化，其餘候選（標點、字節片段等）忽略。
+
+    Args:
+        top_logprobs: token -> logprob
+
+    Returns:
+        Optional[float]: P(是)，候選中沒有可識別的肯定/否定 token 時返回 None
+    """
+    yes_mass = 0.0
+    no_mass = 0.0
+    for token, logprob in top_logprobs.items():
+        verdict = classify_boolean_token(token)
+        if verdict is True:
+            yes_mass += math.exp(logprob)
+        elif verdict is False:
+            no_mass += math.exp(logprob)
+    if yes_mass + no_mass <= 0.0:
+        return None
+    return yes_mass / (yes_mass + no_mass)
+
+
+def parse_attribute_line(line: str) -> Optional[str]:
+    """
+    解析單行屬性提案
+
+    Args:
+        line: 一行模型輸出
+
+    Returns:
+        Optional[str]: 去除編號後的屬性，無效行返回 None
+    """
+    line = line.strip()
+    if not line:
+        return None
+    # 移除編號
+    if not line[0].isdigit():
+        return line
+    if '.' in line or '、' in line:
+        # 移除數字編號
+        parts = line.split('.', 1) if '.' in line else line.split('、', 1)
+        if len(parts) > 1:
+            return parts[1].strip()
+    return None
+
+
+def parse_custom_attributes(answer_text: str, num_slots: int) -> List[str]:
+    """
+    從模型回答中提取屬性列表
+
+    Args:
+        answer_text: 模型回答
+        num_slots: 最多返回的屬性數量
+
+    Returns:
+        List[str]: 屬性列表
+    """
+    attributes = []
+    for line in answer_text.strip().split('\n'):
+        attribute = parse_attribute_line(line)
+        if attribute is not None:
+            attributes.append(attribute)
+
+    # 確保返回正確數量
+    return attributes[:num_slots]
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    將流式輸出的文本片段重新切分為完整的行
+
+    Args:
+        chunks: 文本片段（token 增量）
+
+    Yields:
+        str: 每一行（不含換行符），最後一個未換行的片段在流結束時輸出
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            yield line
+    if buffer:
+        yield buffer
@@ -0,0 +1,300 @@
+"""
+模型評級
+排行榜的總分不處理缺席的輪次，也無法比較不同實驗中的玩家。這裡把每個
+(詞語, 屬性) 格子上的回答對錯轉換為玩家兩兩之間的勝負（一對一錯為勝負，
+同對或同錯為平局），逐輪增量更新 Elo，並可隨時由累積的勝負矩陣擬合
+Bradley–Terry 評分及其置信區間；勝負統計都是 (格子 × 玩家) 矩陣的乘法
+"""
+from typing import List, Dict, Any, Sequence, Tuple
+from statistics import NormalDist
+import math
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Elo 刻度：評分差 400 分對應 10 倍勝率比
+ELO_SCALE = 400.0 / math.log(10.0)
+BASE_RATING = 1500.0
+
+
+def build_correctness_matrix(rounds: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray, List[str], np.ndarray]:
+    """
+    把遊戲歷史整理為格子 × 玩家的答對率矩陣
+
+    格子為 (詞語, 屬性)；多次運行中同一玩家對同一格子的多次回答取平均，
+    不同運行的玩家因此可以在相同格子上比較。調用失敗的回答不計。
+
+    Args:
+        rounds: 遊戲歷史（RoundRecord 或 to_dict() 後的字典，可來自多個結果文件）
+
+    Returns:
+        Tuple: (答對率 float32 [格子, 玩家]，有回答 bool [格子, 玩家]，玩家列表，
+        每個格子的詞語編號（按首次出現順序編號，格子按詞語編號排列）)
+    """
+    word_index: Dict[str, int] = {}
+    attribute_index: Dict[str, int] = {}
+    player_index: Dict[str, int] = {}
+    word_column, attribute_column, player_column, values = [], [], [], []
+
+    for round_results in rounds:
+        word, player_results = _round_correctness(round_results)
+        word_id = word_index.setdefault(word, len(word_index))
+        for player_name, answers in player_results:
+            if not answers:
+                continue
+            player = player_index.setdefault(player_name, len(player_index))
+            word_column.extend([word_id] * len(answers))
+            player_column.extend([player] * len(answers))
+            for attribute, correct in answers:
+                column = attribute_index.get(attribute)
+                if column is None:
+                    column = attribute_index[attribute] = len(attribute_index)
+                attribute_column.append(column)
+                values.append(correct)
+
+    # 格子編號：(詞語編號, 屬性編號) 排序去重，詞語編號按首次出現分配，格子因此按詞語分組
+    keys = np.asarray(word_column, dtype=np.int64) * max(len(attribute_index), 1) \
+        + np.asarray(attribute_column, dtype=np.int64)
+    unique_keys, cells = np.unique(keys, return_inverse=True)
+    shape = (len(unique_keys), len(player_index))
+    flat = cells * len(player_index) + np.asarray(player_column, dtype=np.int64)
+    size = shape[0] * shape[1]
+    totals = np.bincount(flat, weights=np.asarray(values, dtype=np.float64), minlength=size)
+    counts = np.bincount(flat, minlength=size)
+    totals = totals.reshape(shape).astype(np.float32)
+    counts = counts.reshape(shape)
+    answered = counts > 0
+    correct = np.divide(totals, counts, out=np.zeros(shape, dtype=np.float32), where=answered)
+    return correct, answered, list(player_index), unique_keys // max(len(attribute_index), 1)
+
+
+def _round_correctness(round_results) -> Tuple[str, List[Tuple[str, List[Tuple[str, bool]]]]]:
+    """提取一輪的詞語與各玩家的 (屬性, 是否答對)（兼容記錄對象與字典）"""
+    if isinstance(round_results, dict):
+        return round_results["word"], [
+            (player_result["player_name"], [
+                (record["attribute"], record["correct"])
+                for record in player_result["boolean_answers"] if "error" not in record
+            ])
+            for player_result in round_results["player_results"]
+        ]
+    return round_results.word, [
+        (player_result.player_name, [
+            (record.attribute, record.correct)
+            for record in player_result.boolean_answers
+            if record is not None and not record.is_error
+        ])
+        for player_result in round_results.player_results
+    ]
+
+
+def pairwise_outcomes(correct: np.ndarray, answered: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由答對率矩陣計算兩兩勝負
+
+    Args:
+        correct: 答對率 [格子, 玩家]
+        answered: 有回答 [格子, 玩家]
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (勝場矩陣 wins[i, j]，平局計半場；
+        對局矩陣 games[i, j] = 兩人都回答了的格子數)
+    """
+    mask = answered.astype(np.float32)
+    right = correct * mask
+    wrong = (1.0 - correct) * mask
+    # i 對 j 錯為 i 勝；同對或同錯為平局
+    wins = (right.T @ wrong).astype(np.float64)
+    draws = (right.T @ right + wrong.T @ wrong).astype(np.float64)
+    games = (mask.T @ mask).astype(np.float64)
+    wins += 0.5 * draws
+    np.fill_diagonal(wins, 0.0)
+    np.fill_diagonal(games, 0.0)
+    return wins, games
+
+
+def fit_bradley_terry(
+    wins: np.ndarray,
+    games: np.ndarray,
+    prior_games: float = 1.0,
+    max_iter: int = 1000,
+    tol: float = 1e-9
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    擬合 Bradley–Terry 強度（MM 算法）
+
+    每位玩家與一個固定強度為 1 的虛擬對手各勝負 prior_games 場作為正則化，
+    從未比較過的玩家也有有限的評分與區間；評分平移到平均為 BASE_RATING，
+    標準誤按同樣的中心化變換（只反映玩家之間的相對差異）。
+
+    Args:
+        wins: 勝場矩陣
+        games: 對局矩陣
+        prior_games: 對虛擬對手的偽勝場數（同樣數量的偽負場）
+        max_iter: 最大迭代次數
+        tol: 對數強度的收斂閾值
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (Elo 刻度評分，評分標準誤)
+    """
+    num_players = len(wins)
+    strength = np.ones(num_players)
+    total_wins = wins.sum(axis=1) + prior_games
+    for _ in range(max_iter):
+        denominator = (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        denominator += 2.0 * prior_games / (strength + 1.0)
+        updated = total_wins / denominator
+        converged = np.max(np.abs(np.log(updated) - np.log(strength))) < tol
+        strength = updated
+        if converged:
+            break
+
+    # 對數強度的 Fisher 信息矩陣（虛擬對手固定，矩陣正定）
+    theta = np.log(strength)
+    p = 1.0 / (1.0 + np.exp(theta[None, :] - theta[:, None]))
+    information = -games * p * p.T
+    np.fill_diagonal(information, 0.0)
+    prior_p = 1.0 / (1.0 + np.exp(-theta))
+    diagonal = (games * p * p.T).sum(axis=1) + 2.0 * prior_games * prior_p * (1.0 - prior_p)
+    information[np.diag_indices(num_players)] = diagonal
+    centering = np.eye(num_players) - 1.0 / num_players
+    covariance = centering @ np.linalg.inv(information) @ centering
+    theta = theta - theta.mean()
+    return BASE_RATING + ELO_SCALE * theta, ELO_SCALE * np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+
+
+class RatingEngine:
+    """
+    評級引擎
+
+    observe() 逐輪增量更新：該輪各屬性格子的勝負累加到勝場/對局矩陣，
+    並按該輪的平均得分做一次批量 Elo 更新（每對玩家每輪算一局）；
+    summary() 由累積矩陣擬合 Bradley–Terry 評分與置信區間。
+    """
+
+    def __init__(self, k_factor: float = 16.0, prior_games: float = 1.0, confidence: float = 0.95):
+        """
+        Args:
+            k_factor: Elo 的 K 值
+            prior_games: Bradley–Terry 正則化的偽局數
+            confidence: 置信區間水平
+        """
+        self.k_factor = k_factor
+        self.prior_games = prior_games
+        self.confidence = confidence
+        self.players: List[str] = []
+        self._player_index: Dict[str, int] = {}
+        self.elo = np.zeros(0)
+        self.wins = np.zeros((0, 0))
+        self.games = np.zeros((0, 0))
+        self.rounds = 0
+
+    @classmethod
+    def from_history(cls, rounds: Sequence[Any], **options) -> "RatingEngine":
+        """
+        從完整歷史（可跨多次運行）重建評級
+
+        勝負矩陣一次性計算；Elo 按詞語首次出現的順序，每個詞語（其全部格子）
+        更新一次。
+
+        Args:
+            rounds: 遊戲歷史
+            **options: RatingEngine 的參數
+
+        Returns:
+            RatingEngine: 評級引擎
+        """
+        engine = cls(**options)
+        correct, answered, players, cell_words = build_correctness_matrix(rounds)
+        engine._ensure_players(players)
+        engine.wins, engine.games = pairwise_outcomes(correct, answered)
+        engine.rounds = len(rounds)
+
+        boundaries = np.flatnonzero(np.diff(cell_words)) + 1
+        everyone = np.arange(len(players))
+        for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(cell_words)]):
+            if start == stop:
+                continue
+            wins, games = pairwise_outcomes(correct[start:stop], answered[start:stop])
+            engine._apply_elo(wins, games, everyone)
+        return engine
+
+    def observe(self, round_results):
+        """
+        吸收一輪完成的結果
+
+        Args:
+            round_results: RoundRecord 或 to_dict() 後的字典
+        """
+        wins, games, index = self._round_outcomes(round_results)
+        if index is None:
+            return
+        self.wins[np.ix_(index, index)] += wins
+        self.games[np.ix_(index, index)] += games
+        self._apply_elo(wins, games, index)
+
+    def _round_outcomes(self, round_results):
+        correct, answered, players, _ = build_correctness_matrix([round_results])
+        self.rounds += 1
+        if len(players) < 2:
+            return None, None, None
+        self._ensure_players(players)
+        index = np.array([self._player_index[name] for name in players])
+        wins, games = pairwise_outcomes(correct, answered)
+        return wins, games, index
+
+    def _apply_elo(self, wins: np.ndarray, games: np.ndarray, index: np.ndarray):
+        """本輪每對玩家以平均得分算一局，同時更新"""
+        ratings = self.elo[index]
+        played = games > 0
+        score = np.divide(wins, games, out=np.zeros_like(wins), where=played)
+        expected = 1.0 / (1.0 + 10.0 ** ((ratings[None, :] - ratings[:, None]) / 400.0))
+        self.elo[index] += self.k_factor * np.where(played, score - expected, 0.0).sum(axis=1)
+
+    def _ensure_players(self, players: Sequence[str]):
+        added = [name for name in players if name not in self._player_index]
+        if not added:
+            return
+        for name in added:
+            self._player_index[name] = len(self.players)
+            self.players.append(name)
+        size = len(self.players)
+        self.elo = np.concatenate([self.elo, np.full(len(added), BASE_RATING)])
+        wins = np.zeros((size, size))
+        games = np.zeros((size, size))
+        old = len(self.wins)
+        wins[:old, :old] = self.wins
+        games[:old, :old] = self.games
+        self.wins, self.games = wins, games
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        擬合 Bradley–Terry 評分，與增量 Elo 一起輸出（寫入結果 JSON）
+
+        Returns:
+            Dict: method、confidence 與按評分排序的玩家列表（rating, ci_low, ci_high,
+            elo, comparisons, win_rate）
+        """
+        if not self.players:
+            return {"method": "bradley-terry", "confidence": self.confidence, "players": []}
+        ratings, errors = fit_bradley_terry(self.wins, self.games, prior_games=self.prior_games)
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2.0)
+        comparisons = self.games.sum(axis=1)
+        win_rate = np.divide(self.wins.sum(axis=1), comparisons,
+                             out=np.zeros_like(comparisons), where=comparisons > 0)
+        players = [
+            {
+                "name": name,
+                "rating": round(float(ratings[index]), 1),
+                "ci_low": round(float(ratings[index] - z * errors[index]), 1),
+                "ci_high": round(float(ratings[index] + z * errors[index]), 1),
+                "elo": round(float(self.elo[index]), 1),
+                "comparisons": int(comparisons[index]),
+                "win_rate": round(float(win_rate[index]), 4)
+            }
+            for index, name in enumerate(self.players)
+        ]
+        players.sort(key=lambda item: item["rating"], reverse=True)
+        return {"method": "bradley-terry", "confidence": self.confidence, "players": players}
+
@@ -0,0 +1,174 @@
+"""
+遊戲記錄類型
+回答、玩家本輪結果與輪次使用 __slots__ 記錄代替逐條創建的字典：
+不再為每條記錄保存一份鍵，屬性名與玩家名駐留（intern）後全程共享同一個字符串對象，
+不帶置信度的回答記錄按值共享（不可變），時間戳以浮點數保存；
+需要 JSON 時通過 to_dict() 生成與原有格式一致的字典
+"""
+from typing import List, Dict, Any, Optional, Union
+from datetime import datetime
+import sys
+import time
+
+
+def intern_name(name: str) -> str:
+    """駐留屬性名/玩家名，重複出現的名稱共享同一對象"""
+    return sys.intern(name)
+
+
+class AnswerRecord:
+    """
+    一個布林問題的回答與評判結果（創建後不可修改）
+
+    請通過 create() 創建：不帶置信度的記錄只有 屬性 × 回答 × 對錯 × 分數 幾種取值，
+    相同取值的回答共享同一個實例。
+    """
+
+    __slots__ = ("attribute", "answer", "correct", "score", "confidence", "answer_source", "tier")
+
+    is_error = False
+
+    def __init__(
+        self,
+        attribute: str,
+        answer: bool,
+        correct: bool,
+        score: int,
+        confidence: Optional[float] = None,
+        answer_source: Optional[str] = None,
+        tier: Optional[str] = None
+    ):
+        self.attribute = intern_name(attribute)
+        self.answer = answer
+        self.correct = correct
+        self.score = score
+        self.confidence = confidence
+        self.answer_source = answer_source
+        self.tier = tier
+
+    @classmethod
+    def create(
+        cls,
+        attribute: str,
+        answer: bool,
+        correct: bool,
+        score: int,
+        confidence: Optional[float] = None,
+        answer_source: Optional[str] = None,
+        tier: Optional[str] = None
+    ) -> "AnswerRecord":
+        """創建回答記錄，不帶置信度時返回共享實例"""
+        if answer_source is not None:
+            return cls(attribute, answer, correct, score, confidence, answer_source, tier)
+        key = (attribute, answer, correct, score)
+        record = _SHARED_ANSWERS.get(key)
+        if record is None:
+            record = _SHARED_ANSWERS.setdefault(key, cls(attribute, answer, correct, score))
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            "attribute": self.attribute,
+            "answer": self.answer,
+            "correct": self.correct,
+            "score": self.score
+        }
+        if self.answer_source is not None:
+            record["confidence"] = self.confidence
+            record["answer_source"] = self.answer_source
+        if self.tier is not None:
+            record["tier"] = self.tier
+        return record
+
+
+# 共享的回答記錄：(屬性, 回答, 對錯, 分數) -> AnswerRecord
+_SHARED_ANSWERS: Dict[tuple, AnswerRecord] = {}
+
+
+class AnswerError:
+    """一個布林問題的調用失敗（不計入答題）"""
+
+    __slots__ = ("attribute", "error", "error_kind")
+
+    is_error = True
+
+    def __init__(self, attribute: str, error: str, error_kind: str):
+        self.attribute = intern_name(attribute)
+        self.error = error
+        self.error_kind = intern_name(error_kind)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "attribute": self.attribute,
+            "error": self.error,
+            "error_kind": self.error_kind
+        }
+
+
+class CustomAttributeRecord:
+    """一個自定義屬性及其評分"""
+
+    __slots__ = ("attribute", "score")
+
+    def __init__(self, attribute: str, score: int):
+        # 模型常重複提出相同的屬性名，駐留後共享
+        self.attribute = intern_name(attribute)
+        self.score = score
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"attribute": self.attribute, "score": self.score}
+
+
+class PlayerRoundResult:
+    """一位玩家在一輪中的結果"""
+
+    __slots__ = (
+        "player_name", "boolean_answers", "custom_attributes", "round_score",
+        "custom_attributes_error", "custom_attributes_error_kind"
+    )
+
+    def __init__(self, player_name: str):
+        self.player_name = intern_name(player_name)
+        self.boolean_answers: List[Union[AnswerRecord, AnswerError, None]] = []
+        self.custom_attributes: List[CustomAttributeRecord] = []
+        self.round_score = 0
+        self.custom_attributes_error: Optional[str] = None
+        self.custom_attributes_error_kind: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "player_name": self.player_name,
+            "boolean_answers": [record.to_dict() for record in self.boolean_answers],
+            "custom_attributes": [record.to_dict() for record in self.custom_attributes],
+            "round_score": self.round_score
+        }
+        if self.custom_attributes_error is not None:
+            result["custom_attributes_error"] = self.custom_attributes_error
+            result["custom_attributes_error_kind"] = self.custom_attributes_error_kind
+        return result
+
+
+class RoundRecord:
+    """一輪遊戲"""
+
+    __slots__ = ("round", "word", "created", "player_results")
+
+    def __init__(self, round_number: int, word: str, created: Optional[float] = None):
+        self.round = round_number
+        self.word = word
+        # time.time() 時間戳，序列化時才轉為 ISO 字符串
+        self.created = time.time() if created is None else created
+        self.player_results: List[PlayerRoundResult] = []
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.created).isoformat()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "round": self.round,
+            "word": self.word,
+            "timestamp": self.timestamp,
+            "player_results": [player_result.to_dict() for player_result in self.player_results]
+        }
+
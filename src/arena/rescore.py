@@ -0,0 +1,165 @@
+"""
+離線重新計分
+用當前的裁判規則重新評判已保存的遊戲結果，不發出任何 API 調用
+"""
+from typing import List, Dict, Any, Tuple
+from datetime import datetime
+import logging
+import numpy as np
+
+from .judge import RefereeAI
+from .consensus import build_answer_tensor, infer_consensus, ConsensusReferee
+from .ratings import RatingEngine
+
+logger = logging.getLogger(__name__)
+
+
+def rescore_results(results: Dict[str, Any], referee: RefereeAI) -> Dict[str, Any]:
+    """
+    重新評判結果中的全部回答，並重建每輪得分、排行榜與評級
+
+    所有布林回答與自定義屬性先展平為數組，交給裁判的批量接口一次評判，
+    再用 bincount 按玩家結果與玩家匯總，避免逐條調用。調用失敗的回答保持原樣。
+
+    Args:
+        results: game_results_*.json 的內容（會被原地更新）
+        referee: 裁判
+
+    Returns:
+        Dict: 更新後的結果
+    """
+    game_history = results.get("game_history", [])
+    leaderboard = results.get("leaderboard", [])
+
+    player_names = [stats["name"] for stats in leaderboard]
+    player_index = {name: index for index, name in enumerate(player_names)}
+
+    player_results = []
+    answer_records, answer_words, answer_attributes, answer_values, answer_owner = [], [], [], [], []
+    custom_records, custom_words, custom_attributes, custom_owner = [], [], [], []
+
+    for round_results in game_history:
+        word = round_results["word"]
+        for player_result in round_results["player_results"]:
+            name = player_result["player_name"]
+            if name not in player_index:
+                player_index[name] = len(player_names)
+                player_names.append(name)
+            owner = len(player_results)
+            player_results.append(player_result)
+
+            for record in player_result["boolean_answers"]:
+                if "error" in record:
+                    continue
+                answer_records.append(record)
+                answer_words.append(word)
+                answer_attributes.append(record["attribute"])
+                answer_values.append(record["answer"])
+                answer_owner.append(owner)
+
+            for record in player_result["custom_attributes"]:
+                custom_records.append(record)
+                custom_words.append(word)
+                custom_attributes.append(record["attribute"])
+                custom_owner.append(owner)
+
+    judgments = referee.judge_boolean_batch(answer_words, answer_attributes, answer_values)
+    custom_scores = referee.evaluate_custom_attributes_batch(custom_words, custom_attributes)
+
+    for record, correct, score in zip(answer_records, judgments["correct"].tolist(), judgments["score"].tolist()):
+        record["correct"] = correct
+        record["score"] = score
+    for record, score in zip(custom_records, custom_scores.tolist()):
+        record["score"] = score
+
+    # 每個玩家結果的本輪得分
+    answer_owner = np.asarray(answer_owner, dtype=np.int64)
+    custom_owner = np.asarray(custom_owner, dtype=np.int64)
+    num_results = len(player_results)
+    round_scores = (
+        np.bincount(answer_owner, weights=judgments["score"], minlength=num_results)
+        + np.bincount(custom_owner, weights=custom_scores, minlength=num_results)
+    ).astype(np.int64)
+    for player_result, round_score in zip(player_results, round_scores.tolist()):
+        player_result["round_score"] = round_score
+
+    # 按玩家匯總
+    result_player = np.array(
+        [player_index[player_result["player_name"]] for player_result in player_results],
+        dtype=np.int64
+    )
+    num_players = len(player_names)
+    scores = np.bincount(result_player, weights=round_scores, minlength=num_players)
+    answer_player = result_player[answer_owner]
+    totals = np.bincount(answer_player, minlength=num_players)
+    corrects = np.bincount(answer_player, weights=judgments["correct"], minlength=num_players)
+
+    previous = {stats["name"]: stats for stats in leaderboard}
+    new_leaderboard = []
+    for index, name in enumerate(player_names):
+        stats = dict(previous.get(name, {"name": name, "model": ""}))
+        stats["score"] = int(scores[index])
+        stats["correct_answers"] = int(corrects[index])
+        stats["total_answers"] = int(totals[index])
+        stats["accuracy"] = stats["correct_answers"] / stats["total_answers"] if stats["total_answers"] else 0.0
+        new_leaderboard.append(stats)
+    new_leaderboard.sort(key=lambda x: x["score"], reverse=True)
+
+    results["leaderboard"] = new_leaderboard
+    results["ratings"] = RatingEngine.from_history(game_history).summary()
+    results.setdefault("metadata", {})["rescored_at"] = datetime.now().isoformat()
+    logger.info(f"重新評判 {len(answer_records)} 個回答、{len(custom_records)} 個自定義屬性"
+                f"（{len(game_history)} 輪）")
+    return results
+
+
+def consensus_referee(results_list: List[Dict[str, Any]], method: str) -> Tuple[ConsensusReferee, Dict[str, Any]]:
+    """
+    從全部結果的玩家回答推斷共識真值，構造以共識為參考答案的裁判
+
+    Args:
+        results_list: 遊戲結果（跨文件合併推斷）
+        method: dawid-skene 或 majority
+
+    Returns:
+        Tuple: (裁判, 寫入 metadata.consensus 的摘要)
+    """
+    rounds = [round_results for results in results_list for round_results in results.get("game_history", [])]
+    answers, words, attributes, players = build_answer_tensor(rounds)
+    labels, _, model = infer_consensus(answers, method=method)
+    summary = {
+        "method": method,
+        "words": len(words),
+        "undecided_cells": int((labels == -1).sum())
+    }
+    if model is not None:
+        summary["iterations"] = model.iterations
+        summary["players"] = model.player_stats(players)
+    return ConsensusReferee(labels, words, attributes), summary
+
+
+def merge_leaderboards(results_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    合併多個結果文件的排行榜（同名玩家累加）
+
+    Args:
+        results_list: 重新計分後的結果
+
+    Returns:
+        List[Dict]: 合併後的排行榜
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for results in results_list:
+        for stats in results["leaderboard"]:
+            total = merged.setdefault(stats["name"], {
+                "name": stats["name"],
+                "model": stats.get("model", ""),
+                "score": 0,
+                "correct_answers": 0,
+                "total_answers": 0
+            })
+            for key in ("score", "correct_answers", "total_answers"):
+                total[key] += stats[key]
+    for stats in merged.values():
+        stats["accuracy"] = stats["correct_answers"] / stats["total_answers"] if stats["total_answers"] else 0.0
+    return sorted(merged.values(), key=lambda x: x["score"], reverse=True)
@@ -0,0 +1,555 @@
+"""
+供應商調用韌性層
+分類重試（抖動指數退避，遵循 Retry-After）與按供應商共享的熔斷器
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import random
+import threading
+import time
+import logging
+
+from .profiling import stage
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    # httpx 的傳輸錯誤（連接、讀寫、超時、對端協議錯誤、代理）均屬網絡故障；
+    # 本地協議誤用（不支持的 URL 協議、非法請求頭等）是程序錯誤，不重試
+    _HTTPX_TRANSPORT_ERRORS: tuple = (httpx.TransportError,)
+    _HTTPX_MISUSE_ERRORS: tuple = (httpx.UnsupportedProtocol, httpx.LocalProtocolError)
+except ImportError:
+    _HTTPX_TRANSPORT_ERRORS = ()
+    _HTTPX_MISUSE_ERRORS = ()
+
+# 錯誤類型
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+AUTH = "auth"
+INVALID_REQUEST = "invalid_request"
+EMPTY_RESPONSE = "empty_response"
+# 回答無法解析為肯定/否定（記為錯誤而不是答錯，不重試）
+UNPARSEABLE = "unparseable"
+CIRCUIT_OPEN = "circuit_open"
+UNKNOWN = "unknown"
+
+# 可重試的錯誤類型
+RETRYABLE_KINDS = {RATE_LIMITED, TRANSIENT, EMPTY_RESPONSE}
+
+# 說明供應商本身不可用的錯誤類型（網絡錯誤、5xx、限流），只有這些計入熔斷器；
+# 認證失敗只涉及單個玩家或密鑰（由密鑰池隔離），未知錯誤多為本地程序錯誤
+BREAKER_KINDS = {RATE_LIMITED, TRANSIENT}
+
+# 騰訊雲等以錯誤碼字符串表示的錯誤前綴
+_CODE_PREFIXES = [
+    ("RequestLimitExceeded", RATE_LIMITED),
+    ("LimitExceeded", RATE_LIMITED),
+    ("Throttling", RATE_LIMITED),
+    ("InternalError", TRANSIENT),
+    ("ServiceUnavailable", TRANSIENT),
+    ("ClientNetworkError", TRANSIENT),
+    ("ServerNetworkError", TRANSIENT),
+    ("AuthFailure", AUTH),
+    ("InvalidApiKey", AUTH),
+    ("InvalidParameter", INVALID_REQUEST),
+]
+
+
+class ProviderError(Exception):
+    """供應商調用失敗（已分類）"""
+
+    # 是否說明供應商本身不可用（計入熔斷器）；只針對單個密鑰的限流等錯誤覆蓋為 False
+    breaker_failure = True
+
+    def __init__(
+        self,
+        provider: str,
+        kind: str,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        """
+        初始化錯誤
+
+        Args:
+            provider: 供應商標識
+            kind: 錯誤類型
+            message: 錯誤信息
+            status_code: HTTP 狀態碼（如有）
+            retry_after: 服務端建議的重試等待秒數（如有）
+        """
+        super().__init__(f"[{provider}/{kind}] {message}")
+        self.provider = provider
+        self.kind = kind
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        """是否值得重試"""
+        return self.kind in RETRYABLE_KINDS
+
+    @classmethod
+    def from_status(cls, provider: str, status_code: int, message: str) -> "ProviderError":
+        """根據 HTTP 狀態碼創建錯誤（用於返回響應對象而非拋異常的 SDK）"""
+        return cls(provider, _kind_from_status(status_code), message, status_code=status_code)
+
+    @classmethod
+    def from_code(cls, provider: str, code: str, message: str) -> "ProviderError":
+        """根據錯誤碼字符串創建錯誤（如騰訊雲 Response.Error.Code）"""
+        return cls(provider, _kind_from_code(code), f"{code}: {message}")
+
+    @classmethod
+    def from_exception(cls, provider: str, exc: Exception) -> "ProviderError":
+        """
+        對任意 SDK 異常進行分類
+
+        Args:
+            provider: 供應商標識
+            exc: 原始異常
+
+        Returns:
+            ProviderError: 分類後的錯誤
+        """
+        if isinstance(exc, ProviderError):
+            return exc
+
+        response = getattr(exc, "response", None)
+        status_code = getattr(exc, "status_code", None)
+        if status_code is None:
+            status_code = getattr(response, "status_code", None)
+        if not isinstance(status_code, int):
+            status_code = None
+
+        kind = UNKNOWN
+        if status_code is not None:
+            kind = _kind_from_status(status_code)
+        else:
+            code = getattr(exc, "code", None)
+            if isinstance(code, str):
+                kind = _kind_from_code(code)
+            if kind == UNKNOWN:
+                name = type(exc).__name__
+                if isinstance(exc, (ConnectionError, TimeoutError)) or \
+                        "Timeout" in name or "Connection" in name:
+                    kind = TRANSIENT
+                elif isinstance(exc, _HTTPX_TRANSPORT_ERRORS) and \
+                        not isinstance(exc, _HTTPX_MISUSE_ERRORS):
+                    kind = TRANSIENT
+
+        headers = getattr(response, "headers", None)
+        return cls(
+            provider,
+            kind,
+            str(exc),
+            status_code=status_code,
+            retry_after=parse_retry_after(headers)
+        )
+
+
+class CircuitOpenError(ProviderError):
+    """熔斷器打開，調用被直接拒絕"""
+
+    def __init__(self, provider: str, remaining: float):
+        super().__init__(provider, CIRCUIT_OPEN, f"熔斷中，{remaining:.1f}s 後重試")
+
+
+class ThrottledError(ProviderError):
+    """
+    本地限速（如密鑰池中的密鑰均被隔離或達到速率上限）：請求未發出，
+    韌性層等待 retry_after 後重試，不計入熔斷器也不消耗重試次數，
+    累計等待超過 RetryPolicy.max_throttle_wait 後拋出
+    """
+
+    breaker_failure = False
+
+    def __init__(self, provider: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(provider, RATE_LIMITED, message, retry_after=retry_after)
+
+    def wait_seconds(self) -> float:
+        """等待時間（加少量抖動，避免等待者同時醒來）"""
+        wait = self.retry_after or 0.0
+        return wait + random.uniform(0, max(0.05, wait * 0.1))
+
+
+def _kind_from_status(status_code: int) -> str:
+    """HTTP 狀態碼到錯誤類型的映射"""
+    if status_code == 429:
+        return RATE_LIMITED
+    if status_code in (401, 403):
+        return AUTH
+    if status_code in (408, 409) or status_code >= 500:
+        return TRANSIENT
+    if 400 <= status_code < 500:
+        return INVALID_REQUEST
+    return UNKNOWN
+
+
+def _kind_from_code(code: str) -> str:
+    """錯誤碼字符串到錯誤類型的映射"""
+    for prefix, code_kind in _CODE_PREFIXES:
+        if code.startswith(prefix):
+            return code_kind
+    return UNKNOWN
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """
+    解析 Retry-After / retry-after-ms 響應頭
+
+    Args:
+        headers: 響應頭（大小寫不敏感的映射，或 None）
+
+    Returns:
+        Optional[float]: 等待秒數，無法解析時返回 None
+    """
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    except AttributeError:
+        return None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """分類重試策略（full jitter 指數退避）"""
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        max_retry_after: float = 60.0,
+        max_throttle_wait: float = 300.0
+    ):
+        """
+        初始化重試策略
+
+        Args:
+            max_attempts: 最大嘗試次數（含首次）
+            base_delay: 退避基數（秒）
+            max_delay: 單次退避上限（秒）
+            max_retry_after: 遵循 Retry-After 的上限（秒）
+            max_throttle_wait: 一次調用因本地限速累計等待的上限（秒）
+        """
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts 必須大於 0: {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.max_throttle_wait = max_throttle_wait
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RetryPolicy":
+        """從玩家配置中的 retry 段創建策略"""
+        return cls(
+            max_attempts=config.get("max_attempts", 4),
+            base_delay=config.get("base_delay", 0.5),
+            max_delay=config.get("max_delay", 20.0),
+            max_retry_after=config.get("max_retry_after", 60.0),
+            max_throttle_wait=config.get("max_throttle_wait", 300.0)
+        )
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        計算第 attempt 次失敗後的等待時間
+
+        Args:
+            attempt: 已失敗次數（從 1 開始）
+            retry_after: 服務端建議的等待秒數
+
+        Returns:
+            float: 等待秒數
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    供應商熔斷器
+
+    連續失敗達到閾值後打開，拒絕所有調用；冷卻期過後進入半開狀態，
+    只放行一個探測請求，成功則關閉，失敗則重新打開。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, provider: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        初始化熔斷器
+
+        Args:
+            provider: 供應商標識
+            failure_threshold: 連續失敗多少次後打開
+            recovery_timeout: 打開後多久進入半開狀態（秒）
+        """
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """檢查是否允許本次調用"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def remaining(self) -> float:
+        """距離進入半開狀態的剩餘秒數"""
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def cancel(self):
+        """本次放行的調用未發出（如本地限速）：釋放半開狀態的探測名額"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        """記錄一次成功"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.provider} 熔斷器恢復關閉")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """記錄一次失敗"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"{self.provider} 熔斷器打開 "
+                                   f"(連續失敗 {self.consecutive_failures} 次)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# 每個供應商一個熔斷器，所有同供應商玩家共享
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """獲取（或創建）供應商的熔斷器"""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider)
+            _breakers[provider] = breaker
+        return breaker
+
+
+def configure_circuit_breaker(provider: str, config: Dict[str, Any]) -> CircuitBreaker:
+    """
+    根據配置調整供應商熔斷器參數
+
+    Args:
+        provider: 供應商標識
+        config: circuit_breaker 配置段
+
+    Returns:
+        CircuitBreaker: 熔斷器
+    """
+    breaker = get_circuit_breaker(provider)
+    breaker.failure_threshold = config.get("failure_threshold", breaker.failure_threshold)
+    breaker.recovery_timeout = config.get("recovery_timeout", breaker.recovery_timeout)
+    return breaker
+
+
+def call_with_resilience(
+    provider: str,
+    fn: Callable[[], Any],
+    retry_policy: Optional[RetryPolicy] = None,
+    sleep: Callable[[float], None] = time.sleep
+) -> Any:
+    """
+    帶分類重試與熔斷的調用
+
+    Args:
+        provider: 供應商標識
+        fn: 無參調用
+        retry_policy: 重試策略（None 使用默認策略）
+        sleep: 等待函數（便於替換）
+
+    Returns:
+        Any: fn 的返回值
+
+    Raises:
+        ProviderError: 重試耗盡、錯誤不可重試、熔斷器打開或本地限速等待超時
+    """
+    policy = retry_policy or RetryPolicy()
+    breaker = get_circuit_breaker(provider)
+
+    attempt = 1
+    throttled = 0.0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(provider, breaker.remaining())
+        try:
+            with stage(f"provider.{provider}"):
+                result = fn()
+        except ThrottledError as exc:
+            # 本地限速：請求未發出，等待後重試，不消耗重試次數
+            breaker.cancel()
+            delay = _throttle_delay(provider, policy, throttled, exc)
+            throttled += delay
+            with stage("throttle_wait"):
+                sleep(delay)
+            continue
+        except Exception as exc:
+            delay = _handle_failure(provider, breaker, policy, attempt, exc)
+            with stage("retry_backoff"):
+                sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def call_with_resilience_async(
+    provider: str,
+    fn: Callable[[], Awaitable[Any]],
+    retry_policy: Optional[RetryPolicy] = None
+) -> Any:
+    """
+    call_with_resilience 的協程版本（供異步傳輸使用，退避時不佔用線程）
+
+    Args:
+        provider: 供應商標識
+        fn: 返回 awaitable 的無參調用
+        retry_policy: 重試策略（None 使用默認策略）
+
+    Returns:
+        Any: fn 的結果
+
+    Raises:
+        ProviderError: 重試耗盡、錯誤不可重試、熔斷器打開或本地限速等待超時
+    """
+    policy = retry_policy or RetryPolicy()
+    breaker = get_circuit_breaker(provider)
+
+    attempt = 1
+    throttled = 0.0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(provider, breaker.remaining())
+        try:
+            with stage(f"provider.{provider}"):
+                result = await fn()
+        except ThrottledError as exc:
+            breaker.cancel()
+            delay = _throttle_delay(provider, policy, throttled, exc)
+            throttled += delay
+            await asyncio.sleep(delay)
+            continue
+        except Exception as exc:
+            delay = _handle_failure(provider, breaker, policy, attempt, exc)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+def _throttle_delay(
+    provider: str,
+    policy: RetryPolicy,
+    throttled: float,
+    exc: ThrottledError
+) -> float:
+    """
+    計算本地限速後的等待時間，累計等待達到上限時拋出
+
+    Args:
+        provider: 供應商標識
+        policy: 重試策略
+        throttled: 本次調用已累計等待的秒數
+        exc: 本地限速錯誤
+
+    Returns:
+        float: 等待秒數（不超過剩餘的等待額度）
+
+    Raises:
+        ThrottledError: 累計等待已達 max_throttle_wait
+    """
+    remaining = policy.max_throttle_wait - throttled
+    if remaining <= 0:
+        logger.warning("%s 本地限速累計等待 %.1fs，放棄本次調用", provider, throttled,
+                       extra={"provider": provider, "outcome": "throttled", "error_kind": exc.kind})
+        raise exc
+    return min(exc.wait_seconds(), remaining)
+
+
+def _handle_failure(
+    provider: str,
+    breaker: CircuitBreaker,
+    policy: RetryPolicy,
+    attempt: int,
+    exc: Exception
+) -> float:
+    """
+    處理一次失敗的調用：更新熔斷器，不再重試時拋出錯誤
+
+    Returns:
+        float: 下次嘗試前的等待秒數
+
+    Raises:
+        ProviderError: 錯誤不可重試或重試耗盡
+    """
+    error = ProviderError.from_exception(provider, exc)
+    if error.kind in BREAKER_KINDS and error.breaker_failure:
+        breaker.record_failure()
+    elif error.status_code is not None:
+        # 服務端已正常響應（參數錯誤、單個密鑰被限流或認證失敗），說明供應商本身可用
+        breaker.record_success()
+    else:
+        # 未發出請求或本地出錯（認證隔離、解析失敗、程序錯誤）：不改變熔斷狀態
+        breaker.cancel()
+    if not error.retryable or attempt >= policy.max_attempts:
+        if error is exc:
+            raise exc
+        raise error from exc
+    delay = policy.compute_delay(attempt, error.retry_after)
+    logger.warning("%s 調用失敗 (%s)，%.2fs 後第 %d 次嘗試: %s",
+                   provider, error.kind, delay, attempt + 1, exc,
+                   extra={"provider": provider, "outcome": "retry", "error_kind": error.kind})
+    return delay
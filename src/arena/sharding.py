@@ -0,0 +1,414 @@
+"""
+分片壓縮結果輸出
+大規模運行時把遊戲歷史按每 N 輪切成 JSONL 分片，以 zstd（未安裝 zstandard 時
+退回 gzip）壓縮，由後台線程寫盤，遊戲循環只負責把完成的輪次放入隊列；
+manifest.json 記錄每個分片的輪次範圍、大小與 SHA-256 校驗和，以及排行榜等匯總。
+讀取時可以只選部分分片，並行解壓與解析，組裝回與 game_results_*.json 相同的結構
+"""
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+import glob
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import logging
+
+from . import toon
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = "arena-shards"
+MANIFEST_VERSION = 1
+# 壓縮方式 -> 分片文件擴展名
+SHARD_EXTENSIONS = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz"}
+DEFAULT_LEVELS = {"zstd": 3, "gzip": 6}
+
+# 後台線程結束標記
+_STOP = object()
+
+
+def resolve_compression(compression: str) -> str:
+    """
+    確定實際使用的壓縮方式（zstd 不可用時退回 gzip）
+
+    Args:
+        compression: zstd 或 gzip
+
+    Returns:
+        str: 實際使用的壓縮方式
+    """
+    if compression not in SHARD_EXTENSIONS:
+        raise ValueError(f"未知的壓縮方式: {compression}（可選: {list(SHARD_EXTENSIONS)}）")
+    if compression == "zstd" and not ZSTD_AVAILABLE:
+        logger.warning("zstandard 模塊未安裝，分片改用 gzip 壓縮（pip install zstandard）")
+        return "gzip"
+    return compression
+
+
+def compress(data: bytes, compression: str, level: Optional[int] = None) -> bytes:
+    """壓縮一個分片"""
+    level = DEFAULT_LEVELS[compression] if level is None else level
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    # mtime 固定為 0，相同內容得到相同的文件與校驗和
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    """解壓一個分片"""
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard 模塊未安裝，無法讀取 zstd 分片，請運行: pip install zstandard")
+        # 流式解壓：不依賴幀頭中的內容大小
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+
+def _write_json_atomic(path: str, payload: Dict[str, Any]):
+    """先寫臨時文件再替換，讀者不會看到寫了一半的 manifest"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ShardWriter:
+    """
+    分片寫出器
+
+    add() 在遊戲線程中調用，只把輪次加入當前分片；分片湊滿後整體交給後台線程，
+    由後台線程轉為 JSON、壓縮、計算校驗和並寫盤，每寫完一個分片即更新 manifest，
+    運行中斷時已寫出的分片仍可讀取。
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        rounds_per_shard: int = 1000,
+        compression: str = "zstd",
+        level: Optional[int] = None
+    ):
+        """
+        初始化寫出器並啟動後台線程
+
+        Args:
+            output_dir: 輸出目錄（存放分片與 manifest.json）
+            rounds_per_shard: 每個分片的輪數
+            compression: zstd 或 gzip
+            level: 壓縮級別（None 使用默認值）
+        """
+        if rounds_per_shard < 1:
+            raise ValueError("rounds_per_shard 必須大於 0")
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.rounds_per_shard = rounds_per_shard
+        self.compression = resolve_compression(compression)
+        self.level = level
+
+        self._buffer = []
+        self._next_index = 0
+        self._shards: List[Dict[str, Any]] = []
+        self._created = datetime.now().isoformat()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        # 不設上限：遊戲線程從不因寫盤而阻塞（待寫的輪次本來就保存在遊戲歷史中）
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="arena-shard-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, round_results):
+        """
+        加入一輪完成的結果（RoundRecord 或同格式的字典）
+
+        Args:
+            round_results: 本輪結果
+        """
+        self._buffer.append(round_results)
+        if len(self._buffer) >= self.rounds_per_shard:
+            self._submit()
+
+    def _submit(self):
+        if not self._buffer:
+            return
+        self._queue.put((self._next_index, self._buffer))
+        self._next_index += 1
+        self._buffer = []
+
+    def close(self, results: Optional[Dict[str, Any]] = None) -> str:
+        """
+        寫出剩餘的輪次，等待後台線程完成並寫入最終 manifest
+
+        Args:
+            results: 最終結果（get_final_results 格式）；其中除 game_history 外的
+                metadata / leaderboard / ratings 等寫入 manifest。None 表示運行未完成
+
+        Returns:
+            str: manifest.json 路徑
+        """
+        if not self._closed:
+            self._closed = True
+            self._submit()
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"寫出結果分片失敗: {self._error}") from self._error
+
+        summary = None
+        if results is not None:
+            summary = {key: value for key, value in results.items() if key != "game_history"}
+        self._write_manifest(summary, complete=summary is not None)
+        logger.info(f"結果分片已寫出: {len(self._shards)} 個分片 -> {self.manifest_path}")
+        return self.manifest_path
+
+    def _run(self):
+        """後台線程：逐個壓縮並寫出分片"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if self._error is not None:
+                continue
+            index, rounds = item
+            try:
+                self._shards.append(self._write_shard(index, rounds))
+                self._write_manifest(None, complete=False)
+            except Exception as e:
+                logger.error(f"寫出分片 {index} 失敗: {e}")
+                self._error = e
+
+    def _write_shard(self, index: int, rounds: List[Any]) -> Dict[str, Any]:
+        rows = [
+            round_results if isinstance(round_results, dict) else round_results.to_dict()
+            for round_results in rounds
+        ]
+        raw = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+        data = compress(raw, self.compression, self.level)
+
+        file_name = f"shard_{index:06d}{SHARD_EXTENSIONS[self.compression]}"
+        path = os.path.join(self.output_dir, file_name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        return {
+            "index": index,
+            "file": file_name,
+            "first_round": rows[0]["round"],
+            "last_round": rows[-1]["round"],
+            "rounds": len(rows),
+            "bytes": len(data),
+            "raw_bytes": len(raw),
+            "sha256": hashlib.sha256(data).hexdigest()
+        }
+
+    def _write_manifest(self, summary: Optional[Dict[str, Any]], complete: bool):
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "created": self._created,
+            "complete": complete,
+            "compression": self.compression,
+            "rounds_per_shard": self.rounds_per_shard,
+            "total_rounds": sum(shard["rounds"] for shard in self._shards),
+            "shards": sorted(self._shards, key=lambda shard: shard["index"])
+        }
+        if summary is not None:
+            manifest["results"] = summary
+        _write_json_atomic(self.manifest_path, manifest)
+
+
+# ----------------------------------------------------------------------
+# 讀取
+# ----------------------------------------------------------------------
+def manifest_path_for(path: str) -> str:
+    """分片目錄或 manifest 文件路徑 -> manifest 文件路徑"""
+    return os.path.join(path, MANIFEST_NAME) if os.path.isdir(path) else path
+
+
+def is_sharded(path: str) -> bool:
+    """路徑是否為分片結果（目錄或 manifest.json）"""
+    return os.path.basename(manifest_path_for(path)) == MANIFEST_NAME and os.path.exists(manifest_path_for(path))
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """
+    讀取 manifest
+
+    Args:
+        path: 分片目錄或 manifest.json
+
+    Returns:
+        Dict: manifest 內容
+    """
+    with open(manifest_path_for(path), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"不是結果分片的 manifest: {path}")
+    return manifest
+
+
+def select_shards(
+    manifest: Dict[str, Any],
+    shards: Optional[Iterable[int]] = None,
+    rounds: Optional[Tuple[int, int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    按分片序號或輪次範圍選擇分片
+
+    Args:
+        manifest: load_manifest 的結果
+        shards: 分片序號（None 表示全部）
+        rounds: (起始輪次, 結束輪次)，含兩端；選出與範圍有交集的分片
+
+    Returns:
+        List[Dict]: 選中的分片條目（按序號排列）
+    """
+    selected = manifest["shards"]
+    if shards is not None:
+        wanted = set(shards)
+        selected = [shard for shard in selected if shard["index"] in wanted]
+    if rounds is not None:
+        first, last = rounds
+        selected = [shard for shard in selected if shard["last_round"] >= first and shard["first_round"] <= last]
+    return selected
+
+
+def _read_shard(path: str, compression: str, sha256: Optional[str]) -> List[Dict[str, Any]]:
+    """讀取、校驗並解析一個分片（模塊級函數，可在進程池中執行）"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256:
+        raise ValueError(f"分片校驗和不一致: {path}")
+    return [json.loads(line) for line in decompress(data, compression).splitlines() if line]
+
+
+def read_shards(
+    path: str,
+    shards: Optional[Iterable[int]] = None,
+    rounds: Optional[Tuple[int, int]] = None,
+    max_workers: Optional[int] = None,
+    processes: bool = False,
+    verify: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    並行讀取分片中的輪次
+
+    默認使用線程池（文件讀取與解壓時釋放 GIL）；分片很多且 JSON 解析成為瓶頸時
+    可以改用進程池。
+
+    Args:
+        path: 分片目錄或 manifest.json
+        shards: 只讀取這些分片序號（None 表示全部）
+        rounds: 只讀取與 (起始輪次, 結束輪次) 有交集的分片，並按範圍過濾輪次
+        max_workers: 並行數（None 使用執行器默認值）
+        processes: 是否使用進程池
+        verify: 是否校驗 SHA-256
+
+    Returns:
+        List[Dict]: 按輪次順序排列的輪次字典
+    """
+    manifest = load_manifest(path)
+    directory = os.path.dirname(manifest_path_for(path))
+    selected = select_shards(manifest, shards, rounds)
+    if not selected:
+        return []
+
+    compression = manifest["compression"]
+    args = [
+        (os.path.join(directory, shard["file"]), compression, shard["sha256"] if verify else None)
+        for shard in selected
+    ]
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        parts = list(executor.map(_read_shard, *zip(*args)))
+
+    history = [round_results for part in parts for round_results in part]
+    if rounds is not None:
+        first, last = rounds
+        history = [round_results for round_results in history if first <= round_results["round"] <= last]
+    return history
+
+
+def verify_shards(path: str) -> List[str]:
+    """
+    校驗全部分片文件的存在性與 SHA-256（不解壓）
+
+    Returns:
+        List[str]: 有問題的分片文件名（空列表表示全部完好）
+    """
+    manifest = load_manifest(path)
+    directory = os.path.dirname(manifest_path_for(path))
+    bad = []
+    for shard in manifest["shards"]:
+        shard_path = os.path.join(directory, shard["file"])
+        try:
+            with open(shard_path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() != shard["sha256"]:
+                    bad.append(shard["file"])
+        except OSError:
+            bad.append(shard["file"])
+    return bad
+
+
+def load_results(path: str, **kwargs) -> Dict[str, Any]:
+    """
+    讀取結果：分片結果組裝為 game_results_*.json 的結構，.toon 文件按 TOON 解碼，
+    其餘按 JSON 文件讀取
+
+    Args:
+        path: 結果 JSON / TOON 文件、分片目錄或 manifest.json
+        **kwargs: 傳給 read_shards（shards, rounds, max_workers, processes, verify）
+
+    Returns:
+        Dict: 遊戲結果
+    """
+    if not is_sharded(path):
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".toon"):
+                return toon.decode(f.read())
+            return json.load(f)
+
+    manifest = load_manifest(path)
+    results = dict(manifest.get("results") or {})
+    # 未完成的運行沒有排行榜等匯總，只有已寫出的遊戲歷史
+    results.setdefault("metadata", {"total_rounds": manifest["total_rounds"]})
+    results["game_history"] = read_shards(path, **kwargs)
+    return results
+
+
+def results_stem(path: str) -> str:
+    """結果的名稱（分片結果取目錄名），用於派生輸出文件名"""
+    if is_sharded(path):
+        return os.path.basename(os.path.dirname(os.path.abspath(manifest_path_for(path))))
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def find_results(patterns: Sequence[str]) -> List[str]:
+    """
+    展開結果文件的 glob 模式，並加入同名的 TOON 結果與分片結果（目錄下的 manifest.json）
+
+    Args:
+        patterns: glob 模式，如 results/game_results_*.json
+
+    Returns:
+        List[str]: 排序後的路徑
+    """
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(pattern))
+        if pattern.endswith(".json"):
+            stem = pattern[:-len(".json")]
+            paths.update(glob.glob(stem + ".toon"))
+            paths.update(glob.glob(os.path.join(stem, MANIFEST_NAME)))
+    return sorted(paths)
@@ -0,0 +1,428 @@
+"""
+TOON（Token-Oriented Object Notation）序列化
+結果中的 game_history 由大量鍵相同的小對象組成（如 boolean_answers），
+JSON 為每條記錄重複寫出全部鍵名；TOON 把這類均勻數組寫成一行表頭加逐行數據：
+
+    boolean_answers[12]{attribute,answer,correct,score}:
+      具體性,true,true,1
+      ...
+
+實現 TOON 的常用子集：對象以縮進（每級 2 個空格）表示嵌套，基本類型數組寫在一行，
+鍵相同且值均為基本類型的對象數組寫成表格，其餘數組逐項以 "- " 列出。
+與 JSON 可以無損互轉（字符串、整數、浮點數、布林值、null、對象與數組）
+"""
+from typing import Any, Dict, List, Tuple
+from functools import lru_cache
+import json
+import re
+
+INDENT = "  "
+DELIMITER = ","
+
+# 可不加引號的鍵
+_BARE_KEY = re.compile(r"[A-Za-z_][A-Za-z0-9_.]*")
+# 解碼時識別為數字的記號（與 JSON 數字語法一致）
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+# 編碼時需要加引號的「像數字」的字符串（含前導零等寬鬆形式）
+_NUMBER_LIKE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|-?\.\d.*")
+# 未加引號時會產生歧義的字符
+_SPECIAL = re.compile(r'[:"\\\[\]{}\n\r\t,]|^\s|\s$|^-|^#')
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_UNESCAPES = {"\\": "\\", '"': '"', "n": "\n", "r": "\r", "t": "\t"}
+
+
+# ----------------------------------------------------------------------
+# 編碼
+# ----------------------------------------------------------------------
+def _quote(text: str) -> str:
+    return '"' + "".join(_ESCAPES.get(char, char) for char in text) + '"'
+
+
+# 屬性名、玩家名等字符串大量重複，判斷是否需要引號的結果按值緩存
+@lru_cache(maxsize=65536)
+def _encode_string(text: str) -> str:
+    if text == "" or text in _LITERALS or _SPECIAL.search(text) or _NUMBER_LIKE.fullmatch(text):
+        return _quote(text)
+    return text
+
+
+def _encode_key(key: str) -> str:
+    return key if _BARE_KEY.fullmatch(key) else _quote(key)
+
+
+def _encode_primitive(value: Any) -> str:
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, str):
+        return _encode_string(value)
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if value != value or value in (float("inf"), float("-inf")):
+            raise ValueError(f"TOON 不支持非有限浮點數: {value}")
+        # repr 保證往返一致
+        return repr(value)
+    raise TypeError(f"無法序列化為 TOON 的類型: {type(value).__name__}")
+
+
+def _is_primitive(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _table_fields(items: List[Any]):
+    """數組可寫成表格時返回字段列表，否則返回 None"""
+    first = items[0]
+    if not isinstance(first, dict) or not first:
+        return None
+    fields = list(first)
+    for item in items:
+        if not isinstance(item, dict) or list(item) != fields:
+            return None
+        for value in item.values():
+            if not _is_primitive(value):
+                return None
+    return fields
+
+
+def _encode_array(key: str, items: List[Any], depth: int, out: List[str]):
+    prefix = INDENT * depth + key
+    count = len(items)
+    if all(_is_primitive(item) for item in items):
+        values = DELIMITER.join(_encode_primitive(item) for item in items)
+        out.append(f"{prefix}[{count}]: {values}" if count else f"{prefix}[0]:")
+        return
+
+    fields = _table_fields(items)
+    if fields is not None:
+        header = DELIMITER.join(_encode_key(field) for field in fields)
+        out.append(f"{prefix}[{count}]{{{header}}}:")
+        row_prefix = INDENT * (depth + 1)
+        for item in items:
+            out.append(row_prefix + DELIMITER.join(_encode_primitive(value) for value in item.values()))
+        return
+
+    out.append(f"{prefix}[{count}]:")
+    for item in items:
+        _encode_list_item(item, depth + 1, out)
+
+
+def _encode_list_item(item: Any, depth: int, out: List[str]):
+    marker = INDENT * depth + "- "
+    if _is_primitive(item):
+        out.append(marker + _encode_primitive(item))
+    elif isinstance(item, list):
+        start = len(out)
+        _encode_array("", item, depth, out)
+        out[start] = marker + out[start][len(INDENT * depth):]
+    elif not item:
+        out.append(INDENT * depth + "-")
+    else:
+        # 第一個字段寫在 "- " 所在行，其餘字段縮進一級
+        start = len(out)
+        _encode_object(item, depth + 1, out)
+        out[start] = marker + out[start][len(INDENT * (depth + 1)):]
+
+
+def _encode_object(obj: Dict[str, Any], depth: int, out: List[str]):
+    indent = INDENT * depth
+    for key, value in obj.items():
+        key = _encode_key(key)
+        if isinstance(value, dict):
+            out.append(f"{indent}{key}:")
+            _encode_object(value, depth + 1, out)
+        elif isinstance(value, list):
+            _encode_array(key, value, depth, out)
+        else:
+            out.append(f"{indent}{key}: {_encode_primitive(value)}")
+
+
+def encode(value: Any) -> str:
+    """
+    把 JSON 兼容的值編碼為 TOON 文本
+
+    Args:
+        value: 對象、數組或基本類型
+
+    Returns:
+        str: TOON 文本
+    """
+    out: List[str] = []
+    if isinstance(value, dict):
+        _encode_object(value, 0, out)
+    elif isinstance(value, list):
+        _encode_array("", value, 0, out)
+    else:
+        out.append(_encode_primitive(value))
+    return "\n".join(out) + "\n"
+
+
+# ----------------------------------------------------------------------
+# 解碼
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=65536)
+def _parse_scalar(token: str) -> Any:
+    """解析一個未加引號的記號（記號大量重複，結果按值緩存；返回值都不可變）"""
+    token = token.strip()
+    if token in _LITERALS:
+        return _LITERALS[token]
+    if token and (token[0].isdigit() or token[0] == "-") and _NUMBER.fullmatch(token):
+        if "." in token or "e" in token or "E" in token:
+            return float(token)
+        return int(token)
+    return token
+
+
+def _read_quoted(text: str, start: int) -> Tuple[str, int]:
+    """讀取 text[start] 處開始的帶引號字符串，返回 (內容, 結束引號之後的位置)"""
+    chars = []
+    index = start + 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            escaped = text[index + 1:index + 2]
+            if escaped not in _UNESCAPES:
+                raise ValueError(f"無效的轉義序列: \\{escaped}")
+            chars.append(_UNESCAPES[escaped])
+            index += 2
+        elif char == '"':
+            return "".join(chars), index + 1
+        else:
+            chars.append(char)
+            index += 1
+    raise ValueError(f"字符串缺少結束引號: {text}")
+
+
+def _split_values(text: str) -> List[Any]:
+    """按分隔符拆分一行基本類型值（支持帶引號的字符串）"""
+    if '"' not in text:
+        return [_parse_scalar(token) for token in text.split(DELIMITER)]
+    values = []
+    index = 0
+    while True:
+        while index < len(text) and text[index] == " ":
+            index += 1
+        if index < len(text) and text[index] == '"':
+            value, index = _read_quoted(text, index)
+            values.append(value)
+            end = text.find(DELIMITER, index)
+            if end == -1:
+                break
+            index = end + 1
+        else:
+            end = text.find(DELIMITER, index)
+            if end == -1:
+                values.append(_parse_scalar(text[index:]))
+                break
+            values.append(_parse_scalar(text[index:end]))
+            index = end + 1
+    return values
+
+
+def _parse_value(text: str) -> Any:
+    text = text.strip()
+    if text.startswith('"'):
+        value, end = _read_quoted(text, 0)
+        if text[end:].strip():
+            raise ValueError(f"引號後有多餘內容: {text}")
+        return value
+    return _parse_scalar(text)
+
+
+def _split_key(content: str) -> Tuple[str, str]:
+    """拆分 "鍵: ..." 或 "鍵[N]...: ..."，返回 (鍵, 鍵之後的內容)"""
+    if content.startswith('"'):
+        key, end = _read_quoted(content, 0)
+        return key, content[end:]
+    end = len(content)
+    for marker in (":", "["):
+        position = content.find(marker)
+        if position != -1 and position < end:
+            end = position
+    return content[:end].strip(), content[end:]
+
+
+def _parse_header(rest: str) -> Tuple[int, Any, str]:
+    """
+    解析數組表頭 "[N]{字段}: 值"
+
+    Returns:
+        Tuple: (元素數, 字段列表或 None, 冒號之後的內容)
+    """
+    close = rest.index("]")
+    count = int(rest[1:close])
+    rest = rest[close + 1:]
+    fields = None
+    if rest.startswith("{"):
+        if '"' in rest:
+            fields, index = [], 1
+            while rest[index] != "}":
+                if rest[index] == '"':
+                    field, index = _read_quoted(rest, index)
+                else:
+                    end = min(position for position in (rest.find(DELIMITER, index), rest.find("}", index))
+                              if position != -1)
+                    field, index = rest[index:end].strip(), end
+                fields.append(field)
+                if rest[index] == DELIMITER:
+                    index += 1
+            rest = rest[index + 1:]
+        else:
+            close = rest.index("}")
+            fields = rest[1:close].split(DELIMITER)
+            rest = rest[close + 1:]
+    if not rest.startswith(":"):
+        raise ValueError(f"數組表頭缺少冒號: {rest}")
+    return count, fields, rest[1:].strip()
+
+
+def _has_unquoted_colon(text: str) -> bool:
+    in_quotes = False
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == "\\" and in_quotes:
+            index += 2
+            continue
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ":" and not in_quotes:
+            return True
+        index += 1
+    return False
+
+
+class _Decoder:
+    """按縮進層級解析 TOON 文本"""
+
+    def __init__(self, text: str):
+        self.lines: List[Tuple[int, str, int]] = []
+        # 只按 \n 分行（字符串中的其他換行類字符原樣保留）
+        for number, line in enumerate(text.split("\n"), 1):
+            stripped = line.lstrip(" ")
+            if not stripped:
+                continue
+            spaces = len(line) - len(stripped)
+            if spaces % len(INDENT):
+                raise ValueError(f"第 {number} 行縮進不是 {len(INDENT)} 的倍數")
+            self.lines.append((spaces // len(INDENT), stripped.rstrip(), number))
+        self.index = 0
+
+    def _peek(self):
+        return self.lines[self.index] if self.index < len(self.lines) else None
+
+    def decode(self) -> Any:
+        if not self.lines:
+            return {}
+        _, content, _ = self.lines[0]
+        if content.startswith("["):
+            self.index = 1
+            value = self._parse_array(_parse_header(content), 0, self.lines[0][2])
+        elif len(self.lines) == 1 and not _has_unquoted_colon(content):
+            self.index = 1
+            value = _parse_value(content)
+        else:
+            value = self._parse_object(0)
+        if self.index != len(self.lines):
+            raise ValueError(f"第 {self.lines[self.index][2]} 行縮進不正確")
+        return value
+
+    def _parse_object(self, depth: int) -> Dict[str, Any]:
+        obj = {}
+        while True:
+            line = self._peek()
+            if line is None or line[0] < depth:
+                return obj
+            line_depth, content, number = line
+            if line_depth > depth or content.startswith("- ") or content == "-":
+                raise ValueError(f"第 {number} 行縮進不正確")
+            self.index += 1
+            key, rest = _split_key(content)
+            obj[key] = self._parse_field(rest, depth, number)
+
+    def _parse_field(self, rest: str, depth: int, number: int) -> Any:
+        if rest.startswith("["):
+            return self._parse_array(_parse_header(rest), depth, number)
+        if not rest.startswith(":"):
+            raise ValueError(f"第 {number} 行缺少冒號")
+        value = rest[1:].strip()
+        if value:
+            return _parse_value(value)
+        following = self._peek()
+        if following is not None and following[0] > depth:
+            return self._parse_object(depth + 1)
+        return {}
+
+    def _parse_array(self, header: Tuple[int, Any, str], depth: int, number: int) -> List[Any]:
+        count, fields, inline = header
+        if inline:
+            items = _split_values(inline)
+        elif fields is not None:
+            items = []
+            row_depth, width = depth + 1, len(fields)
+            for line_depth, content, line_number in self.lines[self.index:self.index + count]:
+                if line_depth != row_depth:
+                    break
+                values = _split_values(content)
+                if len(values) != width:
+                    raise ValueError(f"第 {line_number} 行有 {len(values)} 個值，表頭有 {width} 個字段")
+                items.append(dict(zip(fields, values)))
+            self.index += len(items)
+        else:
+            items = []
+            for _ in range(count):
+                line = self._peek()
+                if line is None or line[0] != depth + 1:
+                    break
+                items.append(self._parse_list_item(depth + 1))
+        if len(items) != count:
+            raise ValueError(f"第 {number} 行聲明 {count} 個元素，實際 {len(items)} 個")
+        return items
+
+    def _parse_list_item(self, depth: int) -> Any:
+        _, content, number = self.lines[self.index]
+        if content == "-":
+            self.index += 1
+            return {}
+        if not content.startswith("- "):
+            raise ValueError(f"第 {number} 行應為列表項")
+        rest = content[2:]
+        if rest.startswith("["):
+            self.index += 1
+            return self._parse_array(_parse_header(rest), depth, number)
+        if not _has_unquoted_colon(rest):
+            self.index += 1
+            return _parse_value(rest)
+        # 對象：第一個字段在 "- " 所在行，視為縮進加一級的字段
+        self.lines[self.index] = (depth + 1, rest, number)
+        return self._parse_object(depth + 1)
+
+
+def decode(text: str) -> Any:
+    """
+    把 TOON 文本解碼為 JSON 兼容的值
+
+    Args:
+        text: TOON 文本
+
+    Returns:
+        Any: 對象、數組或基本類型
+
+    Raises:
+        ValueError: 文本格式錯誤（縮進、元素數或字段數不一致等）
+    """
+    return _Decoder(text).decode()
+
+
+def json_to_toon(json_text: str) -> str:
+    """JSON 文本 -> TOON 文本"""
+    return encode(json.loads(json_text))
+
+
+def toon_to_json(toon_text: str, indent: int = None) -> str:
+    """TOON 文本 -> JSON 文本"""
+    return json.dumps(decode(toon_text), ensure_ascii=False, indent=indent)
@@ -0,0 +1,304 @@
+"""
+跨運行結果倉庫
+把 results/ 下各次運行的結果 JSON 規範化寫入帶索引的 SQLite 數據庫
+（runs / run_players / rounds / answers / custom_attributes），支持增量導入，
+跨運行的統計查詢無需再整體載入每個結果文件
+"""
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from datetime import datetime
+import os
+import sqlite3
+import logging
+
+from .sharding import load_results, manifest_path_for
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    source_path TEXT NOT NULL UNIQUE,
+    file_size INTEGER NOT NULL,
+    file_mtime REAL NOT NULL,
+    timestamp TEXT,
+    rescored_at TEXT,
+    total_rounds INTEGER,
+    total_players INTEGER,
+    ingested_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp);
+
+CREATE TABLE IF NOT EXISTS run_players (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    player_name TEXT NOT NULL,
+    model TEXT,
+    score INTEGER,
+    correct_answers INTEGER,
+    total_answers INTEGER,
+    api_calls INTEGER,
+    errors INTEGER,
+    PRIMARY KEY (run_id, player_name)
+);
+CREATE INDEX IF NOT EXISTS idx_run_players_model ON run_players (model);
+
+CREATE TABLE IF NOT EXISTS rounds (
+    round_id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    round_number INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rounds_run ON rounds (run_id);
+CREATE INDEX IF NOT EXISTS idx_rounds_word ON rounds (word);
+
+CREATE TABLE IF NOT EXISTS answers (
+    round_id INTEGER NOT NULL REFERENCES rounds (round_id) ON DELETE CASCADE,
+    run_id INTEGER NOT NULL,
+    player_name TEXT NOT NULL,
+    attribute TEXT NOT NULL,
+    answer INTEGER,
+    correct INTEGER,
+    score INTEGER,
+    confidence REAL,
+    answer_source TEXT,
+    error_kind TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_answers_run_player_attr ON answers (run_id, player_name, attribute);
+CREATE INDEX IF NOT EXISTS idx_answers_round ON answers (round_id);
+
+CREATE TABLE IF NOT EXISTS custom_attributes (
+    round_id INTEGER NOT NULL REFERENCES rounds (round_id) ON DELETE CASCADE,
+    run_id INTEGER NOT NULL,
+    player_name TEXT NOT NULL,
+    attribute TEXT NOT NULL,
+    score INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_custom_run_player ON custom_attributes (run_id, player_name);
+
+-- 導入時預聚合的 (運行, 玩家, 屬性) 答題統計，跨運行的準確率查詢只需掃描此表
+CREATE TABLE IF NOT EXISTS answer_summary (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    player_name TEXT NOT NULL,
+    attribute TEXT NOT NULL,
+    answers INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    PRIMARY KEY (run_id, player_name, attribute)
+);
+"""
+
+# 預定義查詢的分組維度
+GROUP_COLUMNS = {
+    "model": "p.model",
+    "player": "a.player_name",
+    "attribute": "a.attribute",
+    "word": "r.word",
+    "run": "a.run_id",
+}
+
+
+class ResultsWarehouse:
+    """結果倉庫（SQLite）"""
+
+    def __init__(self, path: str):
+        """
+        打開（必要時創建）倉庫
+
+        Args:
+            path: 數據庫文件路徑
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 導入
+    # ------------------------------------------------------------------
+    def ingest(self, paths: Sequence[str]) -> Dict[str, int]:
+        """
+        增量導入結果文件
+
+        路徑、大小和修改時間都未變的文件跳過；變化過的文件（如原地重新計分）
+        先刪除舊記錄再重新導入。每個文件在一個事務內導入。
+
+        Args:
+            paths: 結果 JSON 文件或分片結果（目錄或 manifest.json，按 manifest 的大小和修改時間判斷變化）
+
+        Returns:
+            Dict[str, int]: ingested / updated / skipped 文件數
+        """
+        stats = {"ingested": 0, "updated": 0, "skipped": 0}
+        for path in paths:
+            source_path = os.path.abspath(manifest_path_for(path))
+            stat = os.stat(source_path)
+            existing = self.conn.execute(
+                "SELECT run_id, file_size, file_mtime FROM runs WHERE source_path = ?",
+                (source_path,)
+            ).fetchone()
+            if existing is not None and existing["file_size"] == stat.st_size \
+                    and existing["file_mtime"] == stat.st_mtime:
+                stats["skipped"] += 1
+                continue
+
+            results = load_results(source_path)
+            if "game_history" not in results or "leaderboard" not in results:
+                logger.debug(f"跳過非遊戲結果文件: {path}")
+                stats["skipped"] += 1
+                continue
+
+            with self.conn:
+                if existing is not None:
+                    self.conn.execute("DELETE FROM runs WHERE run_id = ?", (existing["run_id"],))
+                self._insert_run(source_path, stat, results)
+            stats["updated" if existing is not None else "ingested"] += 1
+            logger.info(f"已導入: {path}")
+        return stats
+
+    def _insert_run(self, source_path: str, stat: os.stat_result, results: Dict[str, Any]):
+        metadata = results.get("metadata", {})
+        cursor = self.conn.execute(
+            "INSERT INTO runs (source_path, file_size, file_mtime, timestamp, rescored_at, "
+            "total_rounds, total_players, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                source_path, stat.st_size, stat.st_mtime,
+                metadata.get("timestamp"), metadata.get("rescored_at"),
+                metadata.get("total_rounds"), metadata.get("total_players"),
+                datetime.now().isoformat()
+            )
+        )
+        run_id = cursor.lastrowid
+
+        self.conn.executemany(
+            "INSERT INTO run_players (run_id, player_name, model, score, correct_answers, "
+            "total_answers, api_calls, errors) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, stats["name"], stats.get("model"), stats.get("score"),
+                 stats.get("correct_answers"), stats.get("total_answers"),
+                 stats.get("api_calls"), stats.get("errors"))
+                for stats in results["leaderboard"]
+            ]
+        )
+
+        answers, custom_attributes = [], []
+        for round_results in results["game_history"]:
+            round_id = self.conn.execute(
+                "INSERT INTO rounds (run_id, round_number, word, timestamp) VALUES (?, ?, ?, ?)",
+                (run_id, round_results["round"], round_results["word"], round_results.get("timestamp"))
+            ).lastrowid
+            for player_result in round_results["player_results"]:
+                name = player_result["player_name"]
+                for record in player_result["boolean_answers"]:
+                    answers.append((
+                        round_id, run_id, name, record["attribute"],
+                        record.get("answer"), record.get("correct"), record.get("score"),
+                        record.get("confidence"), record.get("answer_source"),
+                        (record.get("error_kind") or "unknown") if "error" in record else None
+                    ))
+                for record in player_result["custom_attributes"]:
+                    custom_attributes.append((round_id, run_id, name, record["attribute"], record["score"]))
+
+        self.conn.executemany(
+            "INSERT INTO answers (round_id, run_id, player_name, attribute, answer, correct, score, "
+            "confidence, answer_source, error_kind) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            answers
+        )
+        self.conn.executemany(
+            "INSERT INTO custom_attributes (round_id, run_id, player_name, attribute, score) "
+            "VALUES (?, ?, ?, ?, ?)",
+            custom_attributes
+        )
+        self.conn.execute(
+            "INSERT INTO answer_summary (run_id, player_name, attribute, answers, correct, errors) "
+            "SELECT run_id, player_name, attribute, "
+            "SUM(error_kind IS NULL), COALESCE(SUM(correct), 0), SUM(error_kind IS NOT NULL) "
+            "FROM answers WHERE run_id = ? GROUP BY player_name, attribute",
+            (run_id,)
+        )
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+    def query(self, sql: str, params: Sequence[Any] = ()) -> Tuple[List[str], List[Tuple]]:
+        """
+        執行只讀 SQL
+
+        Returns:
+            Tuple[List[str], List[Tuple]]: (列名, 行)
+        """
+        cursor = self.conn.execute(sql, params)
+        columns = [description[0] for description in cursor.description or []]
+        return columns, [tuple(row) for row in cursor.fetchall()]
+
+    def accuracy(
+        self,
+        group_by: Sequence[str] = ("model", "attribute"),
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> Tuple[List[str], List[Tuple]]:
+        """
+        按維度統計布林問題準確率（調用失敗不計入）
+        
+        不按詞語分組時只掃描預聚合的 answer_summary 表；按詞語分組時掃描 answers。
+
+        Args:
+            group_by: 分組維度（model, player, attribute, word, run）
+            since: 只統計此時間（ISO 格式，含）之後的運行
+            until: 只統計此時間之前的運行
+
+        Returns:
+            Tuple[List[str], List[Tuple]]: (列名, 行)
+        """
+        unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"未知的分組維度: {unknown}（可選: {list(GROUP_COLUMNS)}）")
+
+        columns = [f"{GROUP_COLUMNS[name]} AS {name}" for name in group_by]
+        joins = ["JOIN runs ru ON ru.run_id = a.run_id"]
+        if "model" in group_by:
+            joins.append("JOIN run_players p ON p.run_id = a.run_id AND p.player_name = a.player_name")
+
+        if "word" in group_by:
+            source = "answers a"
+            joins.append("JOIN rounds r ON r.round_id = a.round_id")
+            conditions = ["a.error_kind IS NULL"]
+            aggregates = ["COUNT(*) AS answers", "SUM(a.correct) AS correct"]
+        else:
+            source = "answer_summary a"
+            conditions = ["1"]
+            aggregates = ["SUM(a.answers) AS answers", "SUM(a.correct) AS correct"]
+        aggregates.append("ROUND(CAST(SUM(a.correct) AS REAL) / NULLIF(SUM(" +
+                          ("1" if "word" in group_by else "a.answers") + "), 0), 4) AS accuracy")
+
+        params = []
+        if since:
+            conditions.append("ru.timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("ru.timestamp < ?")
+            params.append(until)
+
+        group_clause = ", ".join(str(index + 1) for index in range(len(group_by)))
+        sql = (
+            f"SELECT {', '.join(columns + aggregates)} "
+            f"FROM {source} {' '.join(joins)} "
+            f"WHERE {' AND '.join(conditions)} "
+            + (f"GROUP BY {group_clause} ORDER BY {group_clause}" if group_by else "")
+        )
+        return self.query(sql, params)
+
+    def runs(self) -> Tuple[List[str], List[Tuple]]:
+        """列出已導入的運行"""
+        return self.query(
+            "SELECT run_id, timestamp, total_rounds, total_players, rescored_at, source_path "
+            "FROM runs ORDER BY timestamp"
+        )
@@ -0,0 +1,498 @@
+"""
+持久化工作隊列
+協調器把 (詞語, 玩家) 工作單元寫入隊列，任意數量的 worker 進程
+以租約（可見性超時）方式領取、執行並確認；租約過期的單元會重新可見，
+嘗試次數用盡後標記為失敗
+"""
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Callable
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 工作單元狀態
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkUnit:
+    """一個已租出的工作單元"""
+
+    def __init__(
+        self,
+        unit_id: int,
+        run_id: str,
+        round_number: int,
+        word: str,
+        player_name: str,
+        lease_token: str,
+        attempts: int
+    ):
+        self.unit_id = unit_id
+        self.run_id = run_id
+        self.round_number = round_number
+        self.word = word
+        self.player_name = player_name
+        self.lease_token = lease_token
+        self.attempts = attempts
+
+    def __repr__(self) -> str:
+        return (f"WorkUnit(id={self.unit_id}, run={self.run_id}, round={self.round_number}, "
+                f"word={self.word}, player={self.player_name})")
+
+
+class WorkQueue(ABC):
+    """工作隊列後端接口"""
+
+    @abstractmethod
+    def create_run(self, run_id: str, metadata: Dict[str, Any]):
+        """登記一次運行及其元數據（詞表、玩家、屬性等）"""
+        pass
+
+    @abstractmethod
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """獲取運行元數據"""
+        pass
+
+    @abstractmethod
+    def enqueue(self, run_id: str, units: List[Dict[str, Any]]):
+        """
+        批量寫入工作單元
+
+        Args:
+            run_id: 運行標識
+            units: 每個單元包含 round, word, player_name
+        """
+        pass
+
+    @abstractmethod
+    def lease(
+        self,
+        worker_id: str,
+        visibility_timeout: float,
+        player_names: Optional[List[str]] = None,
+        run_id: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> Optional[WorkUnit]:
+        """
+        領取一個可見的工作單元
+
+        租約過期的單元重新可見；已用盡 max_attempts 次嘗試的過期單元
+        （多半是 worker 在處理中崩潰）不再租出，而是與 fail() 一樣標記為失敗。
+
+        Args:
+            worker_id: worker 標識
+            visibility_timeout: 租約時長（秒），超時未確認則重新可見
+            player_names: 只領取這些玩家的單元（worker 持有的 API 密鑰決定）
+            run_id: 只領取指定運行的單元
+            max_attempts: 單元最大嘗試次數（None 表示不限）
+
+        Returns:
+            Optional[WorkUnit]: 工作單元，沒有可領取的單元時返回 None
+        """
+        pass
+
+    @abstractmethod
+    def extend(self, unit: WorkUnit, visibility_timeout: float) -> bool:
+        """延長租約，租約已失效時返回 False"""
+        pass
+
+    @abstractmethod
+    def ack(self, unit: WorkUnit, result: Dict[str, Any]) -> bool:
+        """確認完成並寫入結果，租約已失效（被他人重新領取）時返回 False"""
+        pass
+
+    @abstractmethod
+    def fail(self, unit: WorkUnit, error: str, max_attempts: int) -> bool:
+        """報告失敗：未達最大嘗試次數時放回隊列，否則標記為失敗"""
+        pass
+
+    @abstractmethod
+    def counts(self, run_id: str) -> Dict[str, int]:
+        """各狀態的單元數"""
+        pass
+
+    @abstractmethod
+    def results(self, run_id: str) -> List[Dict[str, Any]]:
+        """
+        獲取已完成/失敗單元
+
+        Returns:
+            List[Dict]: 每項包含 round, word, player_name, status, result, error
+        """
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    基於 SQLite 的工作隊列（僅限單機多進程）
+
+    領取在 BEGIN IMMEDIATE 事務內完成，同一單元不會被兩個 worker 同時租出。
+    WAL 模式依賴同一主機上的共享內存，數據庫文件不能放在 NFS/SMB 等網絡文件系統上
+    供多台主機共用；跨主機運行需通過 register_work_queue_backend 註冊網絡後端。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化隊列
+
+        Args:
+            path: 數據庫文件路徑
+        """
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                metadata TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS work_units (
+                unit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                round INTEGER NOT NULL,
+                word TEXT NOT NULL,
+                player_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                lease_token TEXT,
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                UNIQUE (run_id, round, player_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_units_status
+                ON work_units (status, lease_expires);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """每個線程一個連接（autocommit 模式，事務由 _Transaction 顯式控制）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _connect(self) -> "_Transaction":
+        """開啟一個事務"""
+        return _Transaction(self._connection())
+
+    def create_run(self, run_id: str, metadata: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, metadata, created_at) VALUES (?, ?, ?)",
+                (run_id, json.dumps(metadata, ensure_ascii=False), time.time())
+            )
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT metadata FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def enqueue(self, run_id: str, units: List[Dict[str, Any]]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_units (run_id, round, word, player_name, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, unit["round"], unit["word"], unit["player_name"], PENDING, now) for unit in units]
+            )
+
+    def lease(
+        self,
+        worker_id: str,
+        visibility_timeout: float,
+        player_names: Optional[List[str]] = None,
+        run_id: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> Optional[WorkUnit]:
+        now = time.time()
+        scope = ""
+        scope_params: List[Any] = []
+        if run_id is not None:
+            scope += " AND run_id = ?"
+            scope_params.append(run_id)
+        if player_names is not None:
+            scope += f" AND player_name IN ({','.join('?' * len(player_names))})"
+            scope_params.extend(player_names)
+        query = ("SELECT unit_id, run_id, round, word, player_name, attempts FROM work_units "
+                 "WHERE (status = ? OR (status = ? AND lease_expires < ?))" + scope + " ORDER BY unit_id LIMIT 1")
+
+        token = uuid.uuid4().hex
+        with self._connect_immediate() as conn:
+            if max_attempts is not None:
+                conn.execute(
+                    "UPDATE work_units SET status = ?, error = ?, lease_token = NULL, updated_at = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= ?" + scope,
+                    [FAILED, _expired_error(max_attempts), now, LEASED, now, max_attempts] + scope_params
+                )
+            row = conn.execute(query, [PENDING, LEASED, now] + scope_params).fetchone()
+            if row is None:
+                return None
+            unit_id, unit_run, round_number, word, player_name, attempts = row
+            conn.execute(
+                "UPDATE work_units SET status = ?, lease_token = ?, lease_owner = ?, "
+                "lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE unit_id = ?",
+                (LEASED, token, worker_id, now + visibility_timeout, now, unit_id)
+            )
+        return WorkUnit(unit_id, unit_run, round_number, word, player_name, token, attempts + 1)
+
+    def _connect_immediate(self) -> "_Transaction":
+        """以 BEGIN IMMEDIATE 開啟寫事務（領取時先取得寫鎖）"""
+        transaction = self._connect()
+        transaction.immediate = True
+        return transaction
+
+    def extend(self, unit: WorkUnit, visibility_timeout: float) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE work_units SET lease_expires = ?, updated_at = ? "
+                "WHERE unit_id = ? AND lease_token = ? AND status = ?",
+                (now + visibility_timeout, now, unit.unit_id, unit.lease_token, LEASED)
+            )
+        return cursor.rowcount == 1
+
+    def ack(self, unit: WorkUnit, result: Dict[str, Any]) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE work_units SET status = ?, result = ?, lease_token = NULL, updated_at = ? "
+                "WHERE unit_id = ? AND lease_token = ? AND status = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(),
+                 unit.unit_id, unit.lease_token, LEASED)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, unit: WorkUnit, error: str, max_attempts: int) -> bool:
+        status = FAILED if unit.attempts >= max_attempts else PENDING
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE work_units SET status = ?, error = ?, lease_token = NULL, updated_at = ? "
+                "WHERE unit_id = ? AND lease_token = ? AND status = ?",
+                (status, error, time.time(), unit.unit_id, unit.lease_token, LEASED)
+            )
+        return cursor.rowcount == 1
+
+    def counts(self, run_id: str) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM work_units WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def results(self, run_id: str) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT round, word, player_name, status, result, error FROM work_units "
+                "WHERE run_id = ? AND status IN (?, ?) ORDER BY round, unit_id",
+                (run_id, DONE, FAILED)
+            ).fetchall()
+        return [
+            {
+                "round": round_number,
+                "word": word,
+                "player_name": player_name,
+                "status": status,
+                "result": json.loads(result) if result else None,
+                "error": error
+            }
+            for round_number, word, player_name, status, result, error in rows
+        ]
+
+
+class _Transaction:
+    """SQLite 事務上下文（autocommit 連接上顯式 BEGIN/COMMIT）"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.immediate = False
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE" if self.immediate else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+class InMemoryWorkQueue(WorkQueue):
+    """
+    進程內工作隊列
+
+    語義與 SQLiteWorkQueue 相同，用作本地替身（同一進程內的多線程 worker）。
+    """
+
+    def __init__(self):
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._units: List[Dict[str, Any]] = []
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def create_run(self, run_id: str, metadata: Dict[str, Any]):
+        with self._lock:
+            self._runs[run_id] = json.loads(json.dumps(metadata))
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def enqueue(self, run_id: str, units: List[Dict[str, Any]]):
+        with self._lock:
+            for unit in units:
+                key = (run_id, unit["round"], unit["player_name"])
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                self._units.append({
+                    "unit_id": len(self._units) + 1,
+                    "run_id": run_id,
+                    "round": unit["round"],
+                    "word": unit["word"],
+                    "player_name": unit["player_name"],
+                    "status": PENDING,
+                    "lease_token": None,
+                    "lease_expires": 0.0,
+                    "attempts": 0,
+                    "result": None,
+                    "error": None
+                })
+
+    def lease(
+        self,
+        worker_id: str,
+        visibility_timeout: float,
+        player_names: Optional[List[str]] = None,
+        run_id: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> Optional[WorkUnit]:
+        now = time.time()
+        with self._lock:
+            for unit in self._units:
+                visible = unit["status"] == PENDING or \
+                    (unit["status"] == LEASED and unit["lease_expires"] < now)
+                if not visible:
+                    continue
+                if run_id is not None and unit["run_id"] != run_id:
+                    continue
+                if player_names is not None and unit["player_name"] not in player_names:
+                    continue
+                if unit["status"] == LEASED and max_attempts is not None and unit["attempts"] >= max_attempts:
+                    unit.update(status=FAILED, error=_expired_error(max_attempts), lease_token=None)
+                    continue
+                unit["status"] = LEASED
+                unit["lease_token"] = uuid.uuid4().hex
+                unit["lease_expires"] = now + visibility_timeout
+                unit["attempts"] += 1
+                return WorkUnit(unit["unit_id"], unit["run_id"], unit["round"], unit["word"],
+                                unit["player_name"], unit["lease_token"], unit["attempts"])
+        return None
+
+    def _owned(self, unit: WorkUnit) -> Optional[Dict[str, Any]]:
+        record = self._units[unit.unit_id - 1]
+        if record["status"] != LEASED or record["lease_token"] != unit.lease_token:
+            return None
+        return record
+
+    def extend(self, unit: WorkUnit, visibility_timeout: float) -> bool:
+        with self._lock:
+            record = self._owned(unit)
+            if record is None:
+                return False
+            record["lease_expires"] = time.time() + visibility_timeout
+            return True
+
+    def ack(self, unit: WorkUnit, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            record = self._owned(unit)
+            if record is None:
+                return False
+            record.update(status=DONE, result=json.loads(json.dumps(result)), lease_token=None)
+            return True
+
+    def fail(self, unit: WorkUnit, error: str, max_attempts: int) -> bool:
+        with self._lock:
+            record = self._owned(unit)
+            if record is None:
+                return False
+            status = FAILED if unit.attempts >= max_attempts else PENDING
+            record.update(status=status, error=error, lease_token=None)
+            return True
+
+    def counts(self, run_id: str) -> Dict[str, int]:
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for unit in self._units:
+                if unit["run_id"] == run_id:
+                    counts[unit["status"]] += 1
+        return counts
+
+    def results(self, run_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            units = [
+                unit for unit in self._units
+                if unit["run_id"] == run_id and unit["status"] in (DONE, FAILED)
+            ]
+        units.sort(key=lambda unit: (unit["round"], unit["unit_id"]))
+        return [
+            {key: unit[key] for key in ("round", "word", "player_name", "status", "result", "error")}
+            for unit in units
+        ]
+
+
+def _expired_error(max_attempts: int) -> str:
+    """租約過期且嘗試次數用盡時記錄的錯誤"""
+    return f"租約過期且已達最大嘗試次數 ({max_attempts})，worker 可能在處理中退出"
+
+
+# 隊列後端註冊表：URL scheme -> 工廠函數
+_BACKENDS: Dict[str, Callable[[str], WorkQueue]] = {
+    "sqlite": SQLiteWorkQueue,
+    "memory": lambda _: InMemoryWorkQueue(),
+}
+
+
+def register_work_queue_backend(scheme: str, factory: Callable[[str], WorkQueue]):
+    """
+    註冊隊列後端
+
+    Args:
+        scheme: URL scheme（如 redis）
+        factory: 接收 URL 中 scheme:// 之後部分的工廠函數
+    """
+    _BACKENDS[scheme] = factory
+    logger.debug(f"註冊工作隊列後端: {scheme}")
+
+
+def create_work_queue(url: str) -> WorkQueue:
+    """
+    根據 URL 創建隊列
+
+    Args:
+        url: 如 sqlite:///results/work_queue.db、memory://；不含 scheme 時視為 SQLite 文件路徑
+
+    Returns:
+        WorkQueue: 隊列實例
+    """
+    if "://" not in url:
+        return SQLiteWorkQueue(url)
+    scheme, location = url.split("://", 1)
+    if scheme not in _BACKENDS:
+        raise ValueError(f"不支持的工作隊列後端: {scheme}")
+    if scheme == "sqlite" and location.startswith("/"):
+        # sqlite:///relative/path 與 sqlite:////absolute/path
+        location = location[1:]
+    return _BACKENDS[scheme](location)
@@ -0,0 +1,100 @@
+"""
+中文字詞屬性知識競技場 - 審計歸檔查看
+查看審計歸檔的大小與壓縮比，或按 運行/詞語/玩家 取出原始提示與回答（不調用任何 API）
+
+用法:
+    python src/audit.py stats
+    python src/audit.py show --word 蘋果 --player DeepSeek
+    python src/audit.py show --run 20250101_120000 --kind judge --limit 5 --output judge.jsonl
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+from pathlib import Path
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.audit import AuditReader
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="查看供應商交互審計歸檔")
+    parser.add_argument("--archive", default=None, help="歸檔目錄（默認 results/audit）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("stats", help="運行列表、交互數與相對樸素 JSON 日誌的壓縮比")
+
+    show = subparsers.add_parser("show", help="按 運行/詞語/玩家 取出交互")
+    show.add_argument("--run", default=None, help="運行標識")
+    show.add_argument("--word", default=None, help="詞語")
+    show.add_argument("--player", default=None, help="玩家名")
+    show.add_argument("--kind", default=None, choices=["boolean", "logprobs", "custom_attributes", "judge"],
+                      help="交互類型")
+    show.add_argument("--limit", type=int, default=20, help="最多輸出條數（默認 20）")
+    show.add_argument("--output", default=None, help="寫為 JSON Lines 文件（默認打印）")
+    return parser.parse_args(argv)
+
+
+def print_stats(reader: AuditReader):
+    """打印運行列表與歸檔大小"""
+    stats = reader.stats()
+    print("\n" + "=" * 72)
+    print("審計歸檔".center(72))
+    print("=" * 72)
+    for run in reader.runs():
+        print(f"{run['run_id']:<40} {run['exchanges']:>10} 條交互")
+    print("-" * 72)
+    print(f"交互數: {stats['exchanges']}（不重複提示 {stats['unique_prompts']} 條，字典 {stats['dictionaries']} 個）")
+    print(f"樸素 JSON 日誌: {stats['naive_json_bytes'] / 1024:.1f} KB")
+    print(f"歸檔: 數據 {stats['data_bytes'] / 1024:.1f} KB + 索引 {stats['index_bytes'] / 1024:.1f} KB")
+    if stats["ratio"] is not None:
+        print(f"相對大小: {stats['ratio']:.1%}")
+    print("=" * 72 + "\n")
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    project_root = Path(__file__).parent.parent
+    archive = args.archive or str(project_root / "results" / "audit")
+
+    try:
+        reader = AuditReader(archive)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return
+
+    try:
+        if args.command == "stats":
+            print_stats(reader)
+            return
+
+        exchanges = reader.query(run_id=args.run, word=args.word, player=args.player,
+                                 kind=args.kind, limit=args.limit)
+        if args.output:
+            count = 0
+            with open(args.output, "w", encoding="utf-8") as f:
+                for exchange in exchanges:
+                    f.write(json.dumps(exchange, ensure_ascii=False) + "\n")
+                    count += 1
+            logger.info(f"已寫出 {count} 條交互至: {args.output}")
+            return
+        for exchange in exchanges:
+            print(json.dumps(exchange, ensure_ascii=False, indent=2))
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+中文字詞屬性知識競技場 - 本地批處理模擬服務
+在本機提供 OpenAI 兼容的批處理接口，配合 game.batch.base_url 演練批處理後端（不調用任何 API）
+
+用法:
+    python src/batch_server.py --port 8000
+    # config/players.yaml: game.batch.enabled: true, base_url: "http://localhost:8000/v1"
+"""
+import os
+import sys
+import argparse
+import logging
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.batch_server import LocalBatchServer
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容批處理模擬服務")
+    parser.add_argument("--host", default="127.0.0.1", help="監聽地址（默認 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=8000, help="監聽端口（默認 8000）")
+    parser.add_argument("--polls", type=int, default=2, help="作業在第幾次查詢時完成（默認 2）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    server = LocalBatchServer(args.host, args.port, polls_until_complete=args.polls)
+    logger.info(f"本地批處理服務: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("服務已停止")
+
+
+if __name__ == "__main__":
+    main()
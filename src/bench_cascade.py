@@ -0,0 +1,163 @@
+"""
+中文字詞屬性知識競技場 - 級聯閾值基準
+對配置了 cascade 的玩家，把抽樣的題目分別問一遍全部便宜模型與大模型，記錄延遲與對錯，
+再在這些樣本上掃描 confidence_threshold / min_agreement，輸出每種組合的升級率、
+準確率、平均延遲與相對成本，用於選擇 players.yaml 中的級聯閾值
+
+用法:
+    python src/bench_cascade.py --words 50
+    python src/bench_cascade.py --save results/cascade_samples.json
+    python src/bench_cascade.py --samples results/cascade_samples.json   # 只重新掃描，不調用 API
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import logging
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena import RefereeAI, PlayerFactory, initialize_player_factory
+from arena.cascade import as_vote, sweep_thresholds
+from main import load_config, load_words
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 0 表示只按一致率升級（文本回答的便宜模型沒有置信度，正的閾值會讓每道題都升級）
+CONFIDENCE_THRESHOLDS = [0.0, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.01]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="在抽樣題目上評估級聯閾值的延遲、成本與準確率")
+    parser.add_argument("--words", type=int, default=30, help="抽樣詞語數（默認 30）")
+    parser.add_argument("--seed", type=int, default=0, help="抽樣隨機種子")
+    parser.add_argument("--fast", action="store_true", help="大模型也用單 token 快速模式回答")
+    parser.add_argument("--save", default=None, help="保存基準樣本的 JSON 文件（可選）")
+    parser.add_argument("--samples", default=None, help="從保存的樣本重新掃描閾值（不調用 API）")
+    return parser.parse_args(argv)
+
+
+def _timed(fn, *args):
+    """調用並返回 (結果或 None, 秒)"""
+    started = time.perf_counter()
+    try:
+        result = fn(*args)
+    except Exception as e:
+        logger.warning(f"調用失敗: {e}")
+        result = None
+    return result, time.perf_counter() - started
+
+
+def collect_samples(player, words, attributes, referee: RefereeAI, fast: bool) -> list:
+    """把每道題分別問一遍全部檔位，記錄回答、置信度、延遲與對錯"""
+    policy = player.cascade_policy
+    expensive_method = player.answer_boolean_with_confidence if fast else player.answer_boolean_question
+    samples = []
+    for word in words:
+        for attr in attributes:
+            votes, cheap_correct, cheap_latency = [], [], 0.0
+            for tier in policy.cheap:
+                detail, latency = _timed(tier.answer_boolean_with_confidence, word, attr["description"])
+                cheap_latency = max(cheap_latency, latency)
+                if detail is None:
+                    votes.append(None)
+                    cheap_correct.append(False)
+                    continue
+                votes.append(as_vote(detail))
+                cheap_correct.append(referee.judge_boolean_question(word, attr["name"], detail.answer)["correct"])
+
+            answer, expensive_latency = _timed(expensive_method, word, attr["description"])
+            if answer is not None and fast:
+                answer = answer.answer
+            samples.append({
+                "word": word,
+                "attribute": attr["name"],
+                "votes": votes,
+                "cheap_correct": cheap_correct,
+                "cheap_latency": round(cheap_latency, 4),
+                "expensive_correct": answer is not None
+                and referee.judge_boolean_question(word, attr["name"], answer)["correct"],
+                "expensive_latency": round(expensive_latency, 4)
+            })
+    return samples
+
+
+def print_sweep(name: str, rows: list):
+    """打印閾值掃描表"""
+    print("\n" + "=" * 84)
+    print(f"{name} 級聯閾值掃描".center(84))
+    print("=" * 84)
+    print(f"{'置信度閾值':<12} {'一致率閾值':<12} {'升級率':<10} {'準確率':<10} {'平均延遲 (s)':<14} {'相對成本':<10}")
+    print("-" * 84)
+    for row in rows:
+        print(f"{row['confidence_threshold']:<12.2f} {row['min_agreement']:<12.2f} "
+              f"{row['escalation_rate']:<10.1%} {row['accuracy']:<10.1%} "
+              f"{row['mean_latency']:<14.3f} {row['relative_cost']:<10.3f}")
+    print("=" * 84 + "\n")
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    project_root = Path(__file__).parent.parent
+
+    if args.samples:
+        with open(args.samples, "r", encoding="utf-8") as f:
+            benchmarks = json.load(f)
+    else:
+        load_dotenv()
+        players_config = load_config(project_root / "config" / "players.yaml")
+        attributes = load_config(project_root / "data" / "base_attributes.yaml")["base_attributes"]
+        words = load_words(project_root / "data" / "test_words.txt")
+        words = random.Random(args.seed).sample(words, min(args.words, len(words)))
+
+        initialize_player_factory()
+        players = [
+            player for player in PlayerFactory.create_players(players_config.get("players", []))
+            if player.cascade_policy is not None and player.cascade_policy.cheap
+        ]
+        if not players:
+            logger.error("沒有配置了 cascade 的玩家")
+            return
+
+        referee = RefereeAI()
+        benchmarks = {}
+        for player in players:
+            logger.info(f"基準: {player.name} ({len(words)} 個詞語 × {len(attributes)} 個屬性)")
+            policy = player.cascade_policy
+            benchmarks[player.name] = {
+                "cheap_costs": policy.cheap_costs,
+                "expensive_cost": policy.expensive_cost,
+                "num_cheap": len(policy.cheap),
+                "samples": collect_samples(player, words, attributes, referee, args.fast)
+            }
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(benchmarks, f, ensure_ascii=False, indent=2)
+            logger.info(f"基準樣本已保存至: {args.save}")
+
+    for name, benchmark in benchmarks.items():
+        min_agreements = [1.0] if benchmark["num_cheap"] < 2 else [0.5, 0.67, 1.0]
+        rows = sweep_thresholds(
+            benchmark["samples"],
+            CONFIDENCE_THRESHOLDS,
+            min_agreements,
+            benchmark["cheap_costs"],
+            benchmark["expensive_cost"]
+        )
+        print_sweep(name, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+中文字詞屬性知識競技場 - TOON 與 JSON 對比基準
+生成一次大規模的合成運行結果，比較 JSON（save_results 的縮進格式與緊湊格式）
+和 TOON 的大小與編碼/解碼速度，並驗證 TOON 與 JSON 無損互轉
+
+用法:
+    python src/bench_toon.py
+    python src/bench_toon.py --rounds 100000 --players 5
+"""
+import os
+import sys
+import json
+import gzip
+import random
+import argparse
+import time
+from datetime import datetime, timedelta
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena import toon
+
+ATTRIBUTES = [
+    "結構屬性_並列結構", "結構屬性_偏正結構", "語義屬性_具體性", "語義屬性_抽象性",
+    "語用屬性_正式度", "語用屬性_口語化", "時態屬性_時代性", "情感屬性_褒義",
+    "情感屬性_貶義", "文化屬性_象徵義", "認知屬性_高頻詞", "認知屬性_專業詞"
+]
+CUSTOM_ATTRIBUTES = [
+    "常用於書面語", "可作定語", "含比喻義", "有時代色彩", "可重疊使用",
+    "多用於口語", "帶有敬意", "常與數量詞搭配", "可受程度副詞修飾", "有方言變體"
+]
+CHARACTERS = "天地人山水火木金土日月風雲雨雪花草鳥魚心手口目耳老師學生朋友國家"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="比較 TOON 與 JSON 的大小和編碼/解碼速度")
+    parser.add_argument("--rounds", type=int, default=20000, help="合成運行的輪數（默認 20000）")
+    parser.add_argument("--players", type=int, default=5, help="玩家數（默認 5）")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="調用失敗的回答比例（默認 0.01）")
+    parser.add_argument("--confidence", action="store_true", help="回答帶置信度（快速回答模式）")
+    parser.add_argument("--seed", type=int, default=0, help="隨機種子")
+    return parser.parse_args(argv)
+
+
+def synthetic_results(num_rounds: int, num_players: int, error_rate: float,
+                      confidence: bool, seed: int) -> dict:
+    """生成與 get_final_results 格式一致的合成結果"""
+    rng = random.Random(seed)
+    players = [f"Player-{index}" for index in range(num_players)]
+    accuracy = {name: rng.uniform(0.55, 0.9) for name in players}
+    start = datetime(2025, 1, 1)
+
+    game_history = []
+    for round_number in range(1, num_rounds + 1):
+        word = "".join(rng.choice(CHARACTERS) for _ in range(rng.choice((2, 2, 2, 3, 4))))
+        player_results = []
+        for name in players:
+            boolean_answers, round_score = [], 0
+            for attribute in ATTRIBUTES:
+                if rng.random() < error_rate:
+                    boolean_answers.append({
+                        "attribute": attribute,
+                        "error": "[deepseek/rate_limited] Rate limit reached",
+                        "error_kind": "rate_limited"
+                    })
+                    continue
+                correct = rng.random() < accuracy[name]
+                record = {"attribute": attribute, "answer": rng.random() < 0.5,
+                          "correct": correct, "score": int(correct)}
+                if confidence:
+                    record["confidence"] = round(rng.uniform(0.5, 1.0), 4)
+                    record["answer_source"] = "logprobs"
+                boolean_answers.append(record)
+                round_score += record["score"]
+            custom_attributes = [
+                {"attribute": attribute, "score": rng.choice((0, 1, 1, 2))}
+                for attribute in rng.sample(CUSTOM_ATTRIBUTES, 8)
+            ]
+            round_score += sum(record["score"] for record in custom_attributes)
+            player_results.append({
+                "player_name": name,
+                "boolean_answers": boolean_answers,
+                "custom_attributes": custom_attributes,
+                "round_score": round_score
+            })
+        game_history.append({
+            "round": round_number,
+            "word": word,
+            "timestamp": (start + timedelta(seconds=round_number * 3)).isoformat(),
+            "player_results": player_results
+        })
+
+    leaderboard = [
+        {"name": name, "model": "synthetic", "score": 0, "correct_answers": 0,
+         "total_answers": 0, "accuracy": accuracy[name], "api_calls": 0, "errors": 0}
+        for name in players
+    ]
+    return {
+        "metadata": {"timestamp": start.isoformat(), "total_rounds": num_rounds,
+                     "total_players": num_players},
+        "leaderboard": leaderboard,
+        "game_history": game_history
+    }
+
+
+def timed(fn, *args):
+    """運行一次並返回 (結果, 秒)"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    results = synthetic_results(args.rounds, args.players, args.error_rate, args.confidence, args.seed)
+    answers = args.rounds * args.players * len(ATTRIBUTES)
+    print(f"合成運行: {args.rounds} 輪 × {args.players} 玩家（{answers} 個布林回答）\n")
+
+    formats = [
+        ("JSON（indent=2）", lambda value: json.dumps(value, ensure_ascii=False, indent=2), json.loads),
+        ("JSON（緊湊）", lambda value: json.dumps(value, ensure_ascii=False), json.loads),
+        ("TOON", toon.encode, toon.decode),
+    ]
+    rows = []
+    baseline = None
+    for name, encode, decode in formats:
+        text, encode_seconds = timed(encode, results)
+        decoded, decode_seconds = timed(decode, text)
+        if decoded != results:
+            raise SystemExit(f"{name} 往返結果不一致")
+        data = text.encode("utf-8")
+        size = len(data)
+        baseline = baseline or size
+        rows.append((name, size, size / baseline, len(gzip.compress(data, 6)), encode_seconds, decode_seconds))
+
+    print(f"{'格式':<16} {'大小 (MB)':>10} {'相對':>8} {'gzip (MB)':>10} {'編碼 (s)':>9} {'解碼 (s)':>9}")
+    print("-" * 68)
+    for name, size, ratio, compressed, encode_seconds, decode_seconds in rows:
+        print(f"{name:<16} {size / 1e6:>10.2f} {ratio:>8.1%} {compressed / 1e6:>10.2f} "
+              f"{encode_seconds:>9.2f} {decode_seconds:>9.2f}")
+
+    # 無損互轉：JSON -> TOON -> JSON 文本完全一致
+    json_text = json.dumps(results, ensure_ascii=False)
+    assert toon.toon_to_json(toon.json_to_toon(json_text)) == json_text
+    print("\nJSON -> TOON -> JSON 往返一致")
+
+
+if __name__ == "__main__":
+    main()
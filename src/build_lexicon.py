@@ -0,0 +1,74 @@
+"""
+中文字詞屬性知識競技場 - 構詞詞典編譯
+把 data/char_lexicon.tsv 編譯為雙數組字典樹 data/char_lexicon.npz（規則裁判載入），
+並可列出詞語的結構判斷、測量判斷速度
+
+用法:
+    python src/build_lexicon.py
+    python src/build_lexicon.py --classify 快樂 高山 桌子 開門
+    python src/build_lexicon.py --bench
+"""
+import os
+import sys
+import random
+import argparse
+import logging
+import time
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.lexicon import CharLexicon, compile_lexicon, SOURCE_PATH, COMPILED_PATH
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="編譯構詞規則詞典並檢查結構判斷")
+    parser.add_argument("--source", default=str(SOURCE_PATH), help="詞典源文件（默認 data/char_lexicon.tsv）")
+    parser.add_argument("--output", default=str(COMPILED_PATH), help="編譯輸出（默認 data/char_lexicon.npz）")
+    parser.add_argument("--classify", nargs="+", default=None, help="列出這些詞語的結構判斷")
+    parser.add_argument("--bench", action="store_true", help="在隨機雙字組合上測量判斷速度")
+    return parser.parse_args(argv)
+
+
+def bench(lexicon: CharLexicon, characters: list, pairs: int = 200000):
+    """隨機雙字組合的平均判斷耗時與各結構佔比"""
+    rng = random.Random(0)
+    words = [rng.choice(characters) + rng.choice(characters) for _ in range(pairs)]
+    started = time.perf_counter()
+    structures = [lexicon.classify(word) for word in words]
+    elapsed = time.perf_counter() - started
+    print(f"\n{pairs} 個隨機雙字組合: 平均 {elapsed / pairs * 1e6:.2f} µs/詞")
+    counts = {}
+    for structure in structures:
+        counts[structure or "無法判斷"] = counts.get(structure or "無法判斷", 0) + 1
+    for structure, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {structure:<8} {count / pairs:.1%}")
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    stats = compile_lexicon(args.source, args.output)
+    logger.info(f"已編譯 {stats['characters']} 個單字、{stats['words']} 個詞條目 "
+                f"({stats['states']} 個狀態，{stats['bytes']} 字節) -> {args.output}")
+
+    lexicon = CharLexicon.load(args.output)
+    if args.classify:
+        for word in args.classify:
+            print(f"{word:<8} {lexicon.classify(word) or '無法判斷'}")
+    if args.bench:
+        characters = [line.split("\t")[0] for line in open(args.source, encoding="utf-8")
+                      if line.strip() and not line.startswith("#") and len(line.split("\t")[0]) == 1]
+        bench(lexicon, characters)
+
+
+if __name__ == "__main__":
+    main()
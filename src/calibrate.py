@@ -0,0 +1,139 @@
+"""
+中文字詞屬性知識競技場 - 置信度溫度擬合
+從已保存結果中裁判判定過的 logprobs 回答為每位玩家擬合校準溫度，
+可直接寫入玩家配置的 confidence_temperature（不調用任何 API）
+
+用法:
+    python src/calibrate.py results/game_results_*.json
+    python src/calibrate.py --write --min-samples 100
+"""
+import os
+import re
+import sys
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict
+
+import yaml
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.calibration import fit_player_temperatures
+from arena.sharding import load_results, find_results
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+_NAME_LINE = re.compile(r'^(\s*)- name:\s*["\']?(.+?)["\']?\s*$')
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="從保存的結果擬合每位玩家的置信度校準溫度")
+    parser.add_argument("inputs", nargs="*", help="結果文件或分片結果目錄（默認 results/game_results_*.json 及分片結果）")
+    parser.add_argument("--config", default=None, help="玩家配置文件（默認 config/players.yaml）")
+    parser.add_argument("--min-samples", type=int, default=50, help="擬合所需的最少 logprobs 回答數（默認 50）")
+    parser.add_argument("--write", action="store_true", help="把擬合的溫度寫入配置文件的 confidence_temperature")
+    return parser.parse_args(argv)
+
+
+def set_player_temperatures(config_text: str, temperatures: Dict[str, float]) -> str:
+    """
+    在配置文本中設置玩家的 confidence_temperature（逐行修改，保留註釋與格式）
+
+    已有該鍵時替換，否則插入在玩家條目的 model 行之後。
+
+    Args:
+        config_text: players.yaml 的內容
+        temperatures: 玩家名 -> 溫度
+
+    Returns:
+        str: 修改後的內容
+    """
+    lines = config_text.splitlines(keepends=True)
+    output = []
+    # 當前玩家條目：(玩家名, 鍵的縮進, 溫度是否已寫入)
+    current = None
+
+    def finish():
+        if current is not None and not current[2]:
+            name, indent, _ = current
+            line = f"{indent}confidence_temperature: {temperatures[name]}\n"
+            # 插在 model 行之後（沒有 model 行時插在條目末尾）
+            for index in range(len(output) - 1, -1, -1):
+                if output[index].startswith(f"{indent}model:"):
+                    output.insert(index + 1, line)
+                    return
+                if _NAME_LINE.match(output[index]):
+                    break
+            output.append(line)
+
+    for line in lines:
+        match = _NAME_LINE.match(line)
+        stripped = line.strip()
+        if current is not None and (match or (stripped and not stripped.startswith("#")
+                                              and len(line) - len(line.lstrip()) < len(current[1]))):
+            finish()
+            current = None
+        if match and match.group(2) in temperatures:
+            current = [match.group(2), match.group(1) + "  ", False]
+        elif current is not None and line.startswith(f"{current[1]}confidence_temperature:"):
+            line = f"{current[1]}confidence_temperature: {temperatures[current[0]]}\n"
+            current[2] = True
+        output.append(line)
+    # 文件末尾的空行之前結束最後一個條目
+    trailing = []
+    while output and not output[-1].strip():
+        trailing.insert(0, output.pop())
+    finish()
+    return "".join(output + trailing)
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    project_root = Path(__file__).parent.parent
+    config_path = Path(args.config) if args.config else project_root / "config" / "players.yaml"
+
+    inputs = args.inputs or find_results([str(project_root / "results" / "game_results_*.json")])
+    if not inputs:
+        logger.error("沒有找到結果文件")
+        return
+
+    fitted = fit_player_temperatures((load_results(path) for path in inputs), min_samples=args.min_samples)
+    if not fitted:
+        logger.error("結果中沒有 logprobs 回答（需以 game.fast_boolean_answers 運行支持 logprobs 的玩家）")
+        return
+
+    print("\n" + "=" * 48)
+    print("置信度校準溫度".center(48))
+    print("=" * 48)
+    for name, fit in sorted(fitted.items()):
+        temperature = "樣本不足" if fit["temperature"] is None else f"{fit['temperature']:.2f}"
+        print(f"{name:<20} {fit['samples']:>8} 條  {temperature:>8}")
+    print("=" * 48 + "\n")
+
+    temperatures = {name: fit["temperature"] for name, fit in fitted.items() if fit["temperature"] is not None}
+    if not args.write or not temperatures:
+        return
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        text = set_player_temperatures(f.read(), temperatures)
+    # 寫出前確認修改後的配置仍可解析且溫度已生效
+    players = {player["name"]: player for player in yaml.safe_load(text).get("players", [])}
+    missing = [name for name in temperatures if players.get(name, {}).get("confidence_temperature") != temperatures[name]]
+    if missing:
+        logger.warning(f"配置中沒有這些玩家，未寫入: {', '.join(missing)}")
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    logger.info(f"已寫入 {len(temperatures) - len(missing)} 位玩家的 confidence_temperature: {config_path}")
+
+
+if __name__ == "__main__":
+    main()
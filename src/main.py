@@ -5,7 +5,9 @@ import os
 import sys
 import json
 import yaml
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -19,12 +21,16 @@ from arena import (
     PlayerFactory,
     initialize_player_factory
 )
+from arena.llm_referee import LLMReferee
+from arena.distributed import Coordinator, Worker
+from arena.work_queue import create_work_queue, PENDING, LEASED
+from arena.profiling import ProfileSession, print_report
+from arena.preflight import preflight_players, check_player
+from arena.logging_setup import setup_logging
+from arena.experiments import QueryCache, share_clients, unique_players, model_key
+from arena.audit import AuditArchive, attach_audit
+from arena import toon
 
-# 配置日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -45,7 +51,7 @@ def load_words(words_path: str) -> list:
 
 
 def save_results(results: dict, output_path: str):
-    """保存遊戲結果"""
+    """保存遊戲結果（.toon 擴展名寫為 TOON，其餘寫為 JSON）"""
     logger.info(f"保存結果: {output_path}")
     
     # 確保輸出目錄存在
@@ -54,13 +60,379 @@ def save_results(results: dict, output_path: str):
         os.makedirs(output_dir, exist_ok=True)
     
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+        if output_path.endswith(".toon"):
+            f.write(toon.encode(results))
+        else:
+            json.dump(results, f, ensure_ascii=False, indent=2)
     
     logger.info("結果保存成功")
 
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="中文字詞屬性知識競技場")
+    parser.add_argument(
+        "--role",
+        choices=["local", "coordinator", "worker"],
+        default="local",
+        help="運行角色：local 單進程運行；coordinator 寫入工作隊列並匯總；worker 領取並執行工作單元"
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help="工作隊列 URL（默認 results/work_queue.db，可用 sqlite:///path 或已註冊的後端）"
+    )
+    parser.add_argument("--run-id", default=None, help="分佈式運行標識（coordinator 續跑或 worker 限定運行）")
+    parser.add_argument("--lease-timeout", type=float, default=300.0, help="worker 租約時長（秒）")
+    parser.add_argument("--submit-only", action="store_true", help="coordinator 只提交工作單元，不等待匯總")
+    parser.add_argument("--keep-polling", action="store_true", help="worker 在隊列空閒時繼續輪詢而不是退出")
+    parser.add_argument("--wait-timeout", type=float, default=None, help="coordinator 最長等待時間（秒，默認不限）")
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        default=None,
+        help="coordinator 在沒有單元在租也沒有進展多久後停止等待（秒，默認為租約時長的 2 倍）"
+    )
+    parser.add_argument(
+        "--config",
+        nargs="+",
+        default=None,
+        help="玩家配置文件（默認 config/players.yaml）；給出多份時作為實驗矩陣在同一進程中運行"
+    )
+    parser.add_argument("--rounds", type=int, default=None, help="運行輪數（默認使用詞表中的全部詞語）")
+    parser.add_argument("--resume", action="store_true", help="批處理模式下續接同一批請求最近一次運行的作業（不重新提交）")
+    parser.add_argument("--skip-preflight", action="store_true", help="跳過啟動預檢（不驗證密鑰與連通性、不預熱連接）")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="stages",
+        choices=["stages", "cprofile"],
+        default=None,
+        help="剖析本次運行：stages 分階段計時 + 棧採樣（低開銷）；cprofile 另外生成 cProfile 文件"
+    )
+    return parser.parse_args(argv)
+
+
+def create_referee(referee_config: dict, project_root: Path, preflight: bool = False) -> RefereeAI:
+    """
+    根據 game.referee 配置創建裁判
+    
+    mode 為 llm 時由 judge 配置的模型玩家評估自定義屬性，創建或預檢失敗則退回規則裁判。
+    """
+    if referee_config.get("mode", "heuristic") != "llm":
+        return RefereeAI()
+    
+    judge_config = {"name": "Referee", **(referee_config.get("judge") or {}), "enabled": True}
+    judges = PlayerFactory.create_players([judge_config])
+    if not judges:
+        logger.error("無法創建模型裁判，使用規則裁判")
+        return RefereeAI()
+    if preflight:
+        result = check_player(judges[0])
+        if not result.ok:
+            logger.error(f"模型裁判預檢失敗，使用規則裁判: {result.error}")
+            return RefereeAI()
+    
+    cache_path = referee_config.get("cache_path", "results/referee_cache.db")
+    return LLMReferee(
+        judges[0],
+        cache_path=str(project_root / cache_path) if cache_path else None,
+        max_concurrent=referee_config.get("max_concurrent", 4)
+    )
+
+
+def open_audit(game_config: dict, project_root: Path, run_id: str, players: list, referees: list):
+    """
+    根據 game.audit 配置打開審計歸檔，並設置到玩家（含備用/便宜模型）與模型裁判
+    
+    Returns:
+        AuditArchive: 審計歸檔（未啟用時為 None）
+    """
+    audit_config = game_config.get("audit") or {}
+    if not audit_config.get("enabled", False):
+        return None
+    archive = AuditArchive(
+        str(project_root / audit_config.get("path", "results/audit")),
+        run_id,
+        level=audit_config.get("level", 9),
+        train_samples=audit_config.get("train_samples", 2000),
+        dictionary_size=audit_config.get("dictionary_size", 32 * 1024)
+    )
+    judges = [referee.judge for referee in referees if isinstance(referee, LLMReferee)]
+    attach_audit(list(players) + judges, archive)
+    return archive
+
+
+def close_audit(archive):
+    """寫出審計歸檔（失敗只記錄，不影響結果保存）"""
+    if archive is None:
+        return
+    try:
+        archive.close()
+    except Exception as e:
+        logger.error(str(e))
+
+
+def run_coordinator(args, queue_url: str, players_config: dict, attributes: list, words: list, output_dir: Path):
+    """協調器：提交 (詞語, 玩家) 工作單元，等待 worker 完成後匯總結果"""
+    queue = create_work_queue(queue_url)
+    coordinator = Coordinator(queue, run_id=args.run_id)
+    
+    enabled_players = [config for config in players_config["players"] if config.get("enabled", True)]
+    coordinator.submit(words, enabled_players, attributes)
+    if args.submit_only:
+        logger.info(f"已提交運行 {coordinator.run_id}，使用 --role coordinator --run-id {coordinator.run_id} 匯總")
+        return
+    
+    stall_timeout = args.stall_timeout if args.stall_timeout is not None else 2 * args.lease_timeout
+    counts = coordinator.wait(timeout=args.wait_timeout, stall_timeout=stall_timeout)
+    if counts[PENDING] + counts[LEASED]:
+        logger.warning(f"仍有 {counts[PENDING] + counts[LEASED]} 個單元未完成，只匯總已完成的部分；"
+                       f"worker 完成後可用 --role coordinator --run-id {coordinator.run_id} 重新匯總")
+    results = coordinator.assemble()
+    ArenaGame.print_stats_table(results["leaderboard"])
+    
+    output_path = output_dir / f"game_results_{coordinator.run_id}.json"
+    save_results(results, str(output_path))
+    logger.info(f"結果已保存至: {output_path}")
+
+
+def resolve_config_path(config_path: str, project_root: Path) -> Path:
+    """配置路徑可相對於當前目錄或項目根目錄"""
+    path = Path(config_path)
+    if not path.exists() and (project_root / path).exists():
+        return project_root / path
+    return path
+
+
+def experiment_name(config_path: Path, config_paths: list) -> str:
+    """實驗名（用於結果文件名）：配置文件名，重名時附加序號"""
+    stems = [Path(path).stem for path in config_paths]
+    stem = config_path.stem
+    if stems.count(stem) > 1:
+        return f"{stem}_{[Path(path) for path in config_paths].index(config_path) + 1}"
+    return stem
+
+
+def create_game(
+    game_config: dict,
+    players: list,
+    referee: RefereeAI,
+    output_dir: Path,
+    run_label: str,
+    preflight_report=None,
+    query_cache=None,
+    experiment=None,
+    resume_batch: bool = False
+):
+    """
+    根據 game 配置段創建遊戲
+    
+    Args:
+        game_config: game 配置段
+        players: 玩家列表
+        referee: 裁判
+        output_dir: 結果目錄
+        run_label: 本次運行的輸出文件標識（時間戳，實驗矩陣中附加實驗名）
+        preflight_report: 預檢結果
+        query_cache: 實驗矩陣共享的查詢去重緩存
+        experiment: 實驗描述
+        resume_batch: 批處理模式下是否續接上次運行的作業
+        
+    Returns:
+        ArenaGame: 遊戲
+    """
+    pipeline_config = game_config.get("pipeline") or {}
+    batch_config = game_config.get("batch") or {}
+    batch = None
+    if batch_config.get("enabled", False):
+        batch = {
+            "state_dir": str(output_dir / "batch"),
+            "base_url": batch_config.get("base_url"),
+            "poll_interval": batch_config.get("poll_interval", 30),
+            "completion_window": batch_config.get("completion_window", "24h"),
+            "run_id": run_label,
+            "resume": resume_batch
+        }
+    consensus_config = game_config.get("consensus") or {}
+    consensus = None
+    if consensus_config.get("enabled", False):
+        consensus = {"update_every": consensus_config.get("update_every", 50)}
+    output_config = game_config.get("output") or {}
+    shard_output = None
+    if output_config.get("sharded", False):
+        shard_output = {
+            "output_dir": str(output_dir / f"game_results_{run_label}"),
+            "rounds_per_shard": output_config.get("rounds_per_shard", 1000),
+            "compression": output_config.get("compression", "zstd"),
+            "level": output_config.get("level")
+        }
+    persist_path = None
+    if pipeline_config.get("enabled", False):
+        os.makedirs(output_dir, exist_ok=True)
+        persist_path = str(output_dir / f"rounds_{run_label}.jsonl")
+    
+    return ArenaGame(
+        players=players,
+        referee=referee,
+        stream_custom_attributes=game_config.get("stream_custom_attributes", False),
+        fast_boolean_answers=game_config.get("fast_boolean_answers", False),
+        pipeline=pipeline_config.get("enabled", False),
+        max_in_flight=pipeline_config.get("max_in_flight", 8),
+        max_async_in_flight=pipeline_config.get("max_async_in_flight", 64),
+        persist_path=persist_path,
+        batch=batch,
+        consensus=consensus,
+        shard_output=shard_output,
+        preflight_report=preflight_report,
+        query_cache=query_cache,
+        experiment=experiment
+    )
+
+
+def save_game_results(results: dict, game_config: dict, output_dir: Path, run_label: str):
+    """保存結果（分片輸出時遊戲歷史已在運行中寫出，匯總在 manifest 中），返回輸出路徑"""
+    if "shards" in results["metadata"]:
+        return results["metadata"]["shards"]
+    output_config = game_config.get("output") or {}
+    extension = "toon" if output_config.get("format", "json") == "toon" else "json"
+    output_path = output_dir / f"game_results_{run_label}.{extension}"
+    save_results(results, str(output_path))
+    return output_path
+
+
+def create_experiment_players(players_config: dict) -> list:
+    """創建一份配置中的玩家（一個都創建不了時退回默認團隊）"""
+    players = PlayerFactory.create_players(players_config.get("players") or [])
+    if not players:
+        logger.warning("未能創建任何玩家，嘗試創建默認團隊")
+        players = PlayerFactory.create_default_chinese_team()
+    return players
+
+
+def run_experiments(args, configs: list, project_root: Path, output_dir: Path, words: list, attributes: list):
+    """
+    實驗矩陣：在一個進程中並發運行多份配置
+    
+    各實驗共用密鑰池、熔斷器與 SDK 客戶端；相同的 (供應商, 模型, 題目) 查詢只調用一次，
+    每個模型只預檢一次。每個實驗分別保存結果（文件名附加實驗名）。
+    
+    Args:
+        args: 命令行參數
+        configs: [(實驗名, 配置路徑, 配置)]
+        project_root: 項目根目錄
+        output_dir: 結果目錄
+        words: 詞語列表
+        attributes: 基礎屬性列表
+    """
+    experiments = []
+    for name, config_path, players_config in configs:
+        players = create_experiment_players(players_config)
+        if not players:
+            logger.error(f"實驗 {name} 無法創建玩家，已跳過")
+            continue
+        experiments.append((name, config_path, players_config, players))
+    if not experiments:
+        logger.error("無法創建玩家，請檢查 API 密鑰配置")
+        return
+    share_clients([players for _, _, _, players in experiments])
+    
+    # 每個 (供應商, 模型) 只預檢一次；任一實驗的預檢配置關閉即不預檢
+    run_preflight = not args.skip_preflight and all(
+        ((config.get("game") or {}).get("preflight") or {}).get("enabled", True)
+        for _, _, config, _ in experiments
+    )
+    reports = None
+    if run_preflight:
+        preflight_config = (experiments[0][2].get("game") or {}).get("preflight") or {}
+        _, preflight_results = preflight_players(
+            unique_players([players for _, _, _, players in experiments]),
+            timeout=preflight_config.get("timeout", 30),
+            warm_connections=preflight_config.get("warm_connections", 2)
+        )
+        reports = {(result.provider, result.model): result for result in preflight_results}
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    query_cache = QueryCache()
+    games = []
+    for name, config_path, players_config, created in experiments:
+        players, preflight_report = created, None
+        if reports is not None:
+            # 預檢按模型進行，報告中的玩家名換成本實驗的玩家名
+            preflight_report = [{**reports[model_key(player)].to_dict(), "name": player.name} for player in created]
+            players = [player for player in created if reports[model_key(player)].ok]
+            if not players:
+                logger.error(f"實驗 {name} 的玩家均未通過預檢，已跳過")
+                continue
+        game_config = players_config.get("game") or {}
+        referee = create_referee(game_config.get("referee") or {}, project_root, preflight=run_preflight)
+        game = create_game(
+            game_config, players, referee, output_dir, f"{timestamp}_{name}",
+            preflight_report=preflight_report,
+            query_cache=query_cache,
+            experiment={"name": name, "title": players_config.get("name", name), "config": str(config_path)},
+            resume_batch=args.resume
+        )
+        games.append((name, game_config, game, referee))
+    if not games:
+        logger.error("沒有可運行的實驗")
+        return
+    # 所有實驗寫入同一個審計歸檔（按第一份配置的 game.audit）；去重命中的查詢沒有發出，不會重複記錄
+    audit = open_audit(
+        experiments[0][2].get("game") or {}, project_root, timestamp,
+        [player for _, _, game, _ in games for player in game.players],
+        [referee for _, _, _, referee in games]
+    )
+    
+    logger.info(f"\n開始實驗矩陣：{len(games)} 個實驗（{', '.join(name for name, _, _, _ in games)}）\n")
+    profile_session = None
+    if args.profile:
+        profile_session = ProfileSession(
+            str(output_dir / f"profile_{timestamp}"),
+            use_cprofile=args.profile == "cprofile"
+        )
+        profile_session.start()
+    
+    def run(game):
+        return game.run_batch(words=words, attributes=attributes, num_rounds=len(words))
+    
+    executor = ThreadPoolExecutor(max_workers=len(games), thread_name_prefix="arena-experiment")
+    try:
+        futures = [executor.submit(run, game) for _, _, game, _ in games]
+        wait(futures)
+    except KeyboardInterrupt:
+        logger.info("\n實驗被用戶中斷")
+        return
+    finally:
+        executor.shutdown(wait=False)
+        if profile_session is not None:
+            print_report(profile_session.stop())
+            logger.info(f"剖析結果已保存至: {profile_session.output_dir}")
+        for _, _, _, referee in games:
+            referee.close()
+        close_audit(audit)
+    
+    for (name, game_config, game, _), future in zip(games, futures):
+        if future.exception() is not None:
+            logger.error(f"實驗 {name} 運行出錯: {future.exception()}", exc_info=future.exception())
+            continue
+        print(f"\n實驗: {name}")
+        game.print_leaderboard()
+        output_path = save_game_results(future.result(), game_config, output_dir, f"{timestamp}_{name}")
+        logger.info(f"實驗 {name} 結果已保存至: {output_path}")
+    
+    stats = query_cache.get_stats()
+    logger.info(f"查詢去重: {stats['queries']} 次查詢，實際調用 {stats['api_queries']} 次，"
+                f"去重 {stats['deduplicated']} 次 ({stats['dedup_rate']:.1%})")
+
+
+def main(argv=None):
     """主程序"""
+    args = parse_args(argv)
+    
+    # 配置日誌（後台線程寫出，載入配置後按 logging 段重新配置）
+    setup_logging()
+    
     logger.info("=" * 60)
     logger.info("中文字詞屬性知識競技場".center(60))
     logger.info("=" * 60)
@@ -73,13 +445,17 @@ def main():
     project_root = Path(__file__).parent.parent
     
     # 定義文件路徑
-    config_path = project_root / "config" / "players.yaml"
+    config_paths = [resolve_config_path(path, project_root) for path in args.config] \
+        if args.config else [project_root / "config" / "players.yaml"]
     words_path = project_root / "data" / "test_words.txt"
     attributes_path = project_root / "data" / "base_attributes.yaml"
     
     # 載入配置
     try:
-        players_config = load_config(config_path)
+        configs = [
+            (experiment_name(path, config_paths), path, load_config(path))
+            for path in config_paths
+        ]
         attributes_config = load_config(attributes_path)
         words = load_words(words_path)
     except FileNotFoundError as e:
@@ -88,18 +464,49 @@ def main():
     except Exception as e:
         logger.error(f"載入配置失敗: {e}")
         return
+    if args.rounds is not None:
+        words = words[:args.rounds]
+    if len(configs) > 1 and args.role != "local":
+        logger.error("多份配置（實驗矩陣）只支持 --role local")
+        return
+    players_config = configs[0][2]
+    
+    output_dir = project_root / "results"
+    
+    logging_config = players_config.get("logging") or {}
+    if logging_config:
+        json_path = logging_config.get("json_path")
+        if json_path:
+            json_path = project_root / json_path
+            os.makedirs(json_path.parent, exist_ok=True)
+        setup_logging(
+            level=logging_config.get("level", "INFO"),
+            json_path=str(json_path) if json_path else None,
+            debug_sample_rate=logging_config.get("debug_sample_rate", 0.01)
+        )
+    
+    queue_url = args.queue or str(output_dir / "work_queue.db")
+    if args.role != "local":
+        os.makedirs(output_dir, exist_ok=True)
+    
+    # 協調器不需要創建玩家（不持有 API 密鑰）
+    if args.role == "coordinator":
+        run_coordinator(
+            args, queue_url, players_config, attributes_config["base_attributes"], words, output_dir
+        )
+        return
     
     # 初始化玩家工廠
     initialize_player_factory()
     
+    # 實驗矩陣：多份配置在同一進程中運行，共享連接與去重查詢
+    if len(configs) > 1:
+        run_experiments(args, configs, project_root, output_dir, words, attributes_config["base_attributes"])
+        return
+    
     # 創建玩家
     try:
-        players = PlayerFactory.create_players(players_config["players"])
-        
-        if not players:
-            logger.warning("未能創建任何玩家，嘗試創建默認團隊")
-            players = PlayerFactory.create_default_chinese_team()
-        
+        players = create_experiment_players(players_config)
         if not players:
             logger.error("無法創建玩家，請檢查 API 密鑰配置")
             return
@@ -111,31 +518,75 @@ def main():
         logger.info("嘗試繼續運行，但可能無法正常工作")
         return
     
-    # 創建裁判
-    referee = RefereeAI()
+    game_config = players_config.get("game") or {}
+    
+    # 啟動預檢：並發驗證密鑰與連通性並預熱連接，剔除不可用的玩家
+    preflight_config = game_config.get("preflight") or {}
+    run_preflight = preflight_config.get("enabled", True) and not args.skip_preflight
+    preflight_report = None
+    if run_preflight:
+        players, preflight_results = preflight_players(
+            players,
+            timeout=preflight_config.get("timeout", 30),
+            warm_connections=preflight_config.get("warm_connections", 2)
+        )
+        preflight_report = [result.to_dict() for result in preflight_results]
+        if not players:
+            logger.error("所有玩家均未通過預檢，請檢查 API 密鑰與網絡")
+            return
     
     # 創建遊戲
-    game = ArenaGame(players=players, referee=referee)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # 創建裁判
+    referee = create_referee(game_config.get("referee") or {}, project_root, preflight=run_preflight)
+    game = create_game(game_config, players, referee, output_dir, timestamp,
+                       preflight_report=preflight_report, resume_batch=args.resume)
+    audit = open_audit(game_config, project_root, args.run_id or timestamp, players, [referee])
+    
+    # Worker：只處理本機持有密鑰的玩家的工作單元
+    if args.role == "worker":
+        worker = Worker(
+            create_work_queue(queue_url),
+            game,
+            visibility_timeout=args.lease_timeout,
+            run_id=args.run_id
+        )
+        try:
+            worker.run(exit_when_idle=not args.keep_polling)
+        finally:
+            referee.close()
+            close_audit(audit)
+        return
     
     # 運行遊戲
     logger.info("\n開始遊戲！\n")
     
-    try:
-        results = game.run_batch(
-            words=words,
-            attributes=attributes_config["base_attributes"],
-            num_rounds=len(words)
+    profile_session = None
+    if args.profile:
+        profile_session = ProfileSession(
+            str(output_dir / f"profile_{timestamp}"),
+            use_cprofile=args.profile == "cprofile"
         )
+        profile_session.start()
+    
+    try:
+        try:
+            results = game.run_batch(
+                words=words,
+                attributes=attributes_config["base_attributes"],
+                num_rounds=len(words)
+            )
+        finally:
+            if profile_session is not None:
+                print_report(profile_session.stop())
+                logger.info(f"剖析結果已保存至: {profile_session.output_dir}")
         
         # 打印排行榜
         game.print_leaderboard()
         
         # 保存結果
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = project_root / "results"
-        output_path = output_dir / f"game_results_{timestamp}.json"
-        
-        save_results(results, str(output_path))
+        output_path = save_game_results(results, game_config, output_dir, timestamp)
         
         logger.info("=" * 60)
         logger.info("遊戲結束！".center(60))
@@ -146,7 +597,9 @@ def main():
         logger.info("\n遊戲被用戶中斷")
     except Exception as e:
         logger.error(f"遊戲運行出錯: {e}", exc_info=True)
-
+    finally:
+        referee.close()
+        close_audit(audit)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+"""
+中文字詞屬性知識競技場 - 跨運行評級
+合併多個結果文件的遊戲歷史，重新擬合 Bradley–Terry 評級（不調用任何 API）；
+不同運行中的玩家只要回答過相同的 (詞語, 屬性) 即可比較
+
+用法:
+    python src/ratings.py results/game_results_*.json
+    python src/ratings.py --output results/ratings.json results/game_results_*.json
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+import time
+from pathlib import Path
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.game_engine import ArenaGame
+from arena.ratings import RatingEngine
+from arena.sharding import load_results, find_results
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="合併多個結果文件，重新擬合玩家評級")
+    parser.add_argument("inputs", nargs="*", help="結果文件或分片結果目錄（默認 results/game_results_*.json 及分片結果）")
+    parser.add_argument("--output", default=None, help="評級輸出 JSON 文件（可選）")
+    parser.add_argument("--confidence", type=float, default=0.95, help="置信區間水平（默認 0.95）")
+    parser.add_argument("--k-factor", type=float, default=16.0, help="Elo 的 K 值（默認 16）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    project_root = Path(__file__).parent.parent
+
+    inputs = args.inputs or find_results([str(project_root / "results" / "game_results_*.json")])
+    if not inputs:
+        logger.error("沒有找到結果文件")
+        return
+
+    start = time.perf_counter()
+    rounds = []
+    for input_path in inputs:
+        rounds.extend(load_results(input_path).get("game_history", []))
+
+    engine = RatingEngine.from_history(rounds, k_factor=args.k_factor, confidence=args.confidence)
+    ratings = engine.summary()
+    ratings["sources"] = inputs
+    ratings["rounds"] = len(rounds)
+    logger.info(f"{len(inputs)} 個文件、{len(rounds)} 輪，用時 {time.perf_counter() - start:.2f} 秒")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(ratings, f, ensure_ascii=False, indent=2)
+        logger.info(f"評級已保存至: {args.output}")
+    ArenaGame.print_ratings_table(ratings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+中文字詞屬性知識競技場 - 離線重新計分
+用當前的裁判規則重新評判已保存的遊戲結果（不調用任何 API）
+
+用法:
+    python src/rescore.py results/game_results_*.json
+    python src/rescore.py --consensus dawid-skene results/game_results_*.json
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+import time
+from pathlib import Path
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.judge import RefereeAI
+from arena.game_engine import ArenaGame
+from arena.rescore import rescore_results, merge_leaderboards, consensus_referee
+from arena import toon
+from arena.sharding import load_results, results_stem, find_results, is_sharded, manifest_path_for
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="用當前裁判規則重新計分已保存的遊戲結果")
+    parser.add_argument("inputs", nargs="*", help="結果文件或分片結果目錄（默認 results/game_results_*.json 及分片結果）")
+    parser.add_argument("--output-dir", default=None, help="輸出目錄（默認與輸入文件相同）")
+    parser.add_argument("--in-place", action="store_true", help="直接覆蓋輸入文件")
+    parser.add_argument("--pretty", action="store_true", help="縮進輸出（大文件明顯更慢）")
+    parser.add_argument(
+        "--consensus", choices=["dawid-skene", "majority"], default=None,
+        help="以玩家回答推斷的共識作為布林問題的參考答案（跨全部輸入文件推斷）"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    project_root = Path(__file__).parent.parent
+
+    inputs = args.inputs or find_results([str(project_root / "results" / "game_results_*.json")])
+    inputs = [path for path in inputs if not path.endswith(("_rescored.json", "_rescored.toon"))]
+    if not inputs:
+        logger.error("沒有找到結果文件")
+        return
+
+    start = time.perf_counter()
+    referee = RefereeAI()
+    loaded = {}
+    consensus = None
+    if args.consensus:
+        # 共識需要先看到全部回答
+        for input_path in inputs:
+            loaded[input_path] = load_results(input_path)
+        referee, consensus = consensus_referee(list(loaded.values()), args.consensus)
+    
+    rescored = []
+    for input_path in inputs:
+        results = loaded.pop(input_path, None) or load_results(input_path)
+        results = rescore_results(results, referee)
+        if consensus is not None:
+            results["metadata"]["consensus"] = consensus
+        rescored.append(results)
+
+        # 分片結果重新計分後寫成單個 JSON 文件，放在分片目錄旁
+        if args.in_place and not is_sharded(input_path):
+            output_path = input_path
+        else:
+            output_dir = args.output_dir or os.path.dirname(input_path)
+            if is_sharded(input_path) and not args.output_dir:
+                output_dir = os.path.dirname(os.path.dirname(os.path.abspath(manifest_path_for(input_path))))
+            os.makedirs(output_dir, exist_ok=True)
+            extension = ".toon" if input_path.endswith(".toon") else ".json"
+            output_path = os.path.join(output_dir, f"{results_stem(input_path)}_rescored{extension}")
+        if output_path.endswith(".toon"):
+            text = toon.encode(results)
+        else:
+            # 不縮進時 json 走 C 編碼器，大文件快數倍
+            text = json.dumps(results, ensure_ascii=False, indent=2 if args.pretty else None)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        logger.info(f"{input_path} -> {output_path}")
+
+    logger.info(f"重新計分 {len(inputs)} 個文件，用時 {time.perf_counter() - start:.2f} 秒")
+    ArenaGame.print_stats_table(merge_leaderboards(rescored))
+
+
+if __name__ == "__main__":
+    main()
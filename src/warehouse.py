@@ -0,0 +1,106 @@
+"""
+中文字詞屬性知識競技場 - 結果倉庫
+把 results/ 下的結果文件增量導入 SQLite，並提供跨運行的查詢
+
+用法:
+    python src/warehouse.py ingest
+    python src/warehouse.py accuracy --by model,attribute --since 2025-01-01
+    python src/warehouse.py sql "SELECT model, SUM(score) FROM run_players GROUP BY model"
+"""
+import os
+import sys
+import argparse
+import logging
+import time
+from pathlib import Path
+
+# 添加 src 目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(__file__))
+
+from arena.warehouse import ResultsWarehouse, GROUP_COLUMNS
+from arena.sharding import find_results
+
+# 配置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="跨運行結果倉庫")
+    parser.add_argument(
+        "--db",
+        default=str(PROJECT_ROOT / "results" / "warehouse.db"),
+        help="倉庫數據庫路徑（默認 results/warehouse.db）"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="增量導入結果文件")
+    ingest.add_argument("paths", nargs="*", help="結果文件或分片結果目錄（默認 results/*.json 及 results/*/manifest.json）")
+
+    subparsers.add_parser("runs", help="列出已導入的運行")
+
+    accuracy = subparsers.add_parser("accuracy", help="按維度統計準確率")
+    accuracy.add_argument(
+        "--by",
+        default="model,attribute",
+        help=f"分組維度，逗號分隔（可選: {', '.join(GROUP_COLUMNS)}）"
+    )
+    accuracy.add_argument("--since", default=None, help="只統計此日期之後的運行（如 2025-01-01）")
+    accuracy.add_argument("--until", default=None, help="只統計此日期之前的運行")
+
+    sql = subparsers.add_parser("sql", help="執行任意只讀 SQL")
+    sql.add_argument("statement", help="SQL 語句")
+    return parser.parse_args(argv)
+
+
+def print_table(columns, rows):
+    """打印查詢結果"""
+    if not columns:
+        return
+    cells = [[("" if value is None else str(value)) for value in row] for row in rows]
+    widths = [
+        max([len(column)] + [len(row[index]) for row in cells])
+        for index, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    print("  ".join("-" * width for width in widths))
+    for row in cells:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    """主程序"""
+    args = parse_args(argv)
+    warehouse = ResultsWarehouse(args.db)
+    try:
+        start = time.perf_counter()
+        if args.command == "ingest":
+            paths = args.paths or find_results([str(PROJECT_ROOT / "results" / "*.json")])
+            stats = warehouse.ingest(paths)
+            logger.info(f"導入完成: 新增 {stats['ingested']}，更新 {stats['updated']}，"
+                        f"跳過 {stats['skipped']}（{time.perf_counter() - start:.2f} 秒）")
+            return
+
+        if args.command == "runs":
+            columns, rows = warehouse.runs()
+        elif args.command == "accuracy":
+            group_by = [name.strip() for name in args.by.split(",") if name.strip()]
+            columns, rows = warehouse.accuracy(group_by, since=args.since, until=args.until)
+        else:
+            columns, rows = warehouse.query(args.statement)
+        elapsed = time.perf_counter() - start
+
+        print_table(columns, rows)
+        print(f"\n{len(rows)} 行，{elapsed * 1000:.1f} ms")
+    finally:
+        warehouse.close()
+
+
+if __name__ == "__main__":
+    main()
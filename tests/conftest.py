@@ -0,0 +1,6 @@
+"""測試共用設置：把 src 加入模塊搜索路徑"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
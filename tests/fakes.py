@@ -0,0 +1,51 @@
+"""
+測試用的假玩家（不發出網絡請求）
+
+回答只取決於 (詞語, 屬性)，因此不同執行方式的結果可以逐條比較。
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+
+from arena.player import AIPlayer
+
+WORDS = ["火焰", "老師", "快樂", "山水", "飛機", "國家"]
+
+ATTRIBUTES = [
+    {"name": "並列結構", "description": "詞語是否為並列結構"},
+    {"name": "偏正結構", "description": "詞語是否為偏正結構"},
+    {"name": "具體性", "description": "詞語是否指具體事物"},
+    {"name": "褒義", "description": "詞語是否帶褒義"},
+]
+
+
+class FakePlayer(AIPlayer):
+    """按提示內容確定性作答的玩家，可選地模擬延遲與失敗"""
+
+    __slots__ = ("delay", "fail_on", "calls", "_calls_lock")
+
+    provider = "fake"
+
+    def __init__(self, name: str, delay: float = 0.0, fail_on: Optional[str] = None):
+        super().__init__(name, f"{name.lower()}-model")
+        self.delay = delay
+        # 提示中包含該字串時拋出異常
+        self.fail_on = fail_on
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _get_api_key(self) -> str:
+        return "fake-key"
+
+    def _chat_completion(self, messages: List[Dict[str, str]], temperature: float, max_tokens: Optional[int]) -> str:
+        with self._calls_lock:
+            self.calls += 1
+        prompt = messages[-1]["content"]
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_on is not None and self.fail_on in prompt:
+            raise ConnectionError(f"模擬失敗: {self.fail_on}")
+        if max_tokens == 500:
+            return "\n".join(f"{i}. {self.name}屬性{i}" for i in range(1, 9))
+        # 與玩家名、提示內容相關的確定性回答
+        return "是" if sum(map(ord, self.name + prompt)) % 3 else "否"
@@ -0,0 +1,122 @@
+"""審計歸檔：追加寫入、提示去重、按 運行/詞語/玩家 隨機讀取、跨運行續寫"""
+import pytest
+
+from arena.audit import BOOLEAN, CUSTOM_ATTRIBUTES, LOGPROBS, AuditArchive, AuditReader
+
+from fakes import ATTRIBUTES, WORDS, FakePlayer
+
+
+def prompt(word, attribute):
+    return [{"role": "system", "content": "你是中文語言學專家。"},
+            {"role": "user", "content": f"詞語「{word}」是否具有「{attribute}」屬性？只回答是或否。"}]
+
+
+def record_game(archive, players):
+    """每位玩家對每個 (詞語, 屬性) 作答兩次（相同提示），並提出一次自定義屬性"""
+    expected = []
+    for word in WORDS:
+        for player in players:
+            for attribute in (attribute["name"] for attribute in ATTRIBUTES):
+                for _ in range(2):
+                    response = "是" if (len(word) + len(attribute) + len(player.name)) % 2 else "否"
+                    archive.record(player, word, BOOLEAN, prompt(word, attribute), response)
+                    expected.append((word, player.name, BOOLEAN, response))
+            archive.record(player, word, CUSTOM_ATTRIBUTES, [{"role": "user", "content": f"列出「{word}」的屬性"}],
+                           f"1. {word}的屬性\n2. 其他")
+            expected.append((word, player.name, CUSTOM_ATTRIBUTES, f"1. {word}的屬性\n2. 其他"))
+    return expected
+
+
+@pytest.fixture
+def players():
+    return [FakePlayer("Alpha"), FakePlayer("Beta")]
+
+
+@pytest.fixture
+def archive_path(tmp_path, players):
+    archive = AuditArchive(str(tmp_path), "run-1", train_samples=100)
+    expected = record_game(archive, players)
+    archive.close()
+    return str(tmp_path), expected
+
+
+def test_appends_and_reads_back_every_exchange(archive_path):
+    path, expected = archive_path
+    reader = AuditReader(path)
+    try:
+        rows = list(reader.query())
+        assert [(row["word"], row["player"], row["kind"], row["response"]) for row in rows] == expected
+        first = rows[0]
+        assert first["run_id"] == "run-1" and first["provider"] == "fake"
+        assert first["messages"] == prompt(WORDS[0], ATTRIBUTES[0]["name"])
+    finally:
+        reader.close()
+
+
+def test_identical_prompts_are_stored_once(archive_path, players):
+    path, expected = archive_path
+    reader = AuditReader(path)
+    try:
+        stats = reader.stats()
+        # 玩家之間、重複作答之間共用提示
+        assert stats["exchanges"] == len(expected)
+        assert stats["unique_prompts"] == len(WORDS) * (len(ATTRIBUTES) + 1)
+        # 小歸檔的大小主要是 SQLite 的固定頁面，只比較數據文件
+        assert stats["data_bytes"] * 5 < stats["naive_json_bytes"]
+    finally:
+        reader.close()
+
+
+def test_random_access_by_run_word_and_player(archive_path):
+    path, expected = archive_path
+    reader = AuditReader(path)
+    try:
+        rows = list(reader.query(word="快樂", player="Beta"))
+        assert [(row["kind"], row["response"]) for row in rows] == [
+            (kind, response) for word, player, kind, response in expected if (word, player) == ("快樂", "Beta")
+        ]
+        custom = list(reader.query(run_id="run-1", kind=CUSTOM_ATTRIBUTES))
+        assert [row["word"] for row in custom] == [word for word in WORDS for _ in range(2)]
+        assert len(list(reader.query(player="Alpha", limit=3))) == 3
+        assert list(reader.query(run_id="missing")) == []
+        assert list(reader.query(kind=LOGPROBS)) == []
+    finally:
+        reader.close()
+
+
+def test_second_run_appends_to_existing_archive(archive_path, players):
+    path, expected = archive_path
+    archive = AuditArchive(path, "run-2", train_samples=100)
+    archive.record(players[0], "火焰", LOGPROBS, prompt("火焰", "具體性"), {"是": -0.1, "否": -2.4})
+    archive.close()
+
+    reader = AuditReader(path)
+    try:
+        assert [(run["run_id"], run["exchanges"]) for run in reader.runs()] == \
+            [("run-1", len(expected)), ("run-2", 1)]
+        (row,) = reader.query(run_id="run-2")
+        assert row["response"] == {"是": -0.1, "否": -2.4}
+        # 舊記錄不受影響；新運行沿用已有字典，重複的提示不再寫入
+        assert len(list(reader.query(run_id="run-1"))) == len(expected)
+        assert reader.stats()["dictionaries"] <= 1
+        assert reader.stats()["unique_prompts"] == len(WORDS) * (len(ATTRIBUTES) + 1)
+    finally:
+        reader.close()
+
+
+def test_few_records_are_still_readable(tmp_path, players):
+    # 記錄太少時字典訓練失敗，退回無字典壓縮
+    archive = AuditArchive(str(tmp_path), "tiny")
+    archive.record(players[0], "火焰", BOOLEAN, prompt("火焰", "具體性"), "是")
+    archive.close()
+    reader = AuditReader(str(tmp_path))
+    try:
+        (row,) = reader.query()
+        assert row["response"] == "是"
+    finally:
+        reader.close()
+
+
+def test_reader_rejects_non_archive(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        AuditReader(str(tmp_path))
@@ -0,0 +1,92 @@
+"""批處理後端：對本地模擬服務運行，結果與順序執行一致；重複運行不靜默沿用舊輸出"""
+import pytest
+
+from arena.batch import BatchRunner
+from arena.batch_server import LocalBatchServer
+from arena.game_engine import ArenaGame
+from arena.judge import RefereeAI
+from arena.resilience import TRANSIENT
+
+from fakes import ATTRIBUTES, WORDS, FakePlayer
+
+
+def make_players():
+    return [FakePlayer("Alpha"), FakePlayer("Beta")]
+
+
+def serve(players, fail_on=None):
+    """模擬服務按模型名轉給對應假玩家作答（與交互式調用的回答相同）"""
+    by_model = {player.model: player for player in players}
+
+    def responder(body):
+        prompt = body["messages"][-1]["content"]
+        if fail_on is not None and fail_on in prompt:
+            raise RuntimeError("模擬服務端錯誤")
+        return by_model[body["model"]]._chat_completion(body["messages"], body["temperature"], body["max_tokens"])
+
+    return LocalBatchServer(responder=responder, polls_until_complete=2)
+
+
+def run_batch(server, state_dir, players, **kwargs):
+    game = ArenaGame(players, RefereeAI(), batch={
+        "state_dir": str(state_dir), "base_url": server.base_url, "poll_interval": 0.01, **kwargs
+    })
+    return game.run_batch(WORDS, ATTRIBUTES)
+
+
+def without_timestamps(history):
+    return [{key: value for key, value in round_results.items() if key != "timestamp"} for round_results in history]
+
+
+def test_batch_matches_sequential(tmp_path):
+    expected = ArenaGame(make_players(), RefereeAI()).run_batch(WORDS, ATTRIBUTES)
+    players = make_players()
+    with serve(players) as server:
+        actual = run_batch(server, tmp_path, players, run_id="r1")
+
+    assert without_timestamps(actual["game_history"]) == without_timestamps(expected["game_history"])
+    assert server.stats["batches"] == len(players)
+
+
+def test_failed_requests_are_errors(tmp_path):
+    players = make_players()
+    with serve(players, fail_on="褒義") as server:
+        result = run_batch(server, tmp_path, players, run_id="r1")
+
+    for round_results in result["game_history"]:
+        for player_result in round_results["player_results"]:
+            errors = [answer for answer in player_result["boolean_answers"] if "error" in answer]
+            assert [(answer["attribute"], answer["error_kind"]) for answer in errors] == [("褒義", TRANSIENT)]
+    assert all(player.errors == len(WORDS) for player in players)
+
+
+def test_rerun_does_not_reuse_old_outputs(tmp_path):
+    players = make_players()
+    with serve(players) as server:
+        run_batch(server, tmp_path, players, run_id="r1")
+        # 新的運行標識提交新作業
+        run_batch(server, tmp_path, make_players(), run_id="r2")
+        assert server.stats["batches"] == 2 * len(players)
+        # 同一運行標識不續接時拒絕運行
+        with pytest.raises(ValueError, match="--resume"):
+            run_batch(server, tmp_path, make_players(), run_id="r2")
+
+
+def test_resume_reuses_submitted_jobs(tmp_path, caplog):
+    players = make_players()
+    with serve(players) as server:
+        first = run_batch(server, tmp_path, players, run_id="r1")
+        with caplog.at_level("INFO"):
+            resumed = run_batch(server, tmp_path, make_players(), run_id="r2", resume=True)
+
+    assert server.stats["batches"] == len(players)
+    assert server.stats["uploads"] == len(players)
+    assert "續接批處理運行" in caplog.text and "重用已下載的批處理結果" in caplog.text
+    assert without_timestamps(resumed["game_history"]) == without_timestamps(first["game_history"])
+
+
+def test_resume_without_previous_run_submits(tmp_path):
+    players = make_players()
+    with serve(players) as server:
+        run_batch(server, tmp_path, players, run_id="r1", resume=True)
+    assert server.stats["batches"] == len(players)
@@ -0,0 +1,87 @@
+"""準確率 bootstrap：點估計與排行榜一致、錯誤不計、分層重抽樣、區間與 p 值的基本性質"""
+import numpy as np
+
+from arena.bootstrap import bootstrap_accuracy, build_word_tensors, resample_weights
+from arena.game_engine import ArenaGame
+from arena.judge import RefereeAI
+
+from fakes import ATTRIBUTES, WORDS, FakePlayer
+
+
+def synthetic_rounds(accuracies, num_words=200, attributes=("甲", "乙"), seed=0):
+    """每位玩家以給定概率答對的模擬遊戲歷史（雙字詞與四字詞各半）"""
+    rng = np.random.default_rng(seed)
+    rounds = []
+    for index in range(num_words):
+        word = f"詞{index:03d}" if index % 2 else f"{index:03d}"
+        rounds.append({"word": word, "player_results": [
+            {"player_name": name, "boolean_answers": [
+                {"attribute": attribute, "correct": bool(rng.random() < accuracy)}
+                for attribute in attributes
+            ]}
+            for name, accuracy in accuracies.items()
+        ]})
+    return rounds
+
+
+def test_estimates_match_leaderboard():
+    game = ArenaGame([FakePlayer("Alpha"), FakePlayer("Beta", fail_on="褒義")], RefereeAI())
+    game.players[1].retry_policy.max_attempts = 1
+    results = game.run_batch(WORDS, ATTRIBUTES)
+
+    summary = bootstrap_accuracy(results["game_history"], resamples=200, seed=0)
+    estimates = {player["name"]: player for player in summary["players"]}
+    for entry in results["leaderboard"]:
+        player = estimates[entry["name"]]
+        assert player["overall"]["estimate"] == round(entry["accuracy"], 4)
+        # 調用失敗的回答不計入
+        assert player["answers"] == entry["total_answers"]
+    assert estimates["Beta"]["attributes"]["褒義"]["estimate"] is None
+
+
+def test_repeated_words_are_merged():
+    rounds = synthetic_rounds({"A": 0.5}, num_words=10)
+    correct, counts, words, attributes, players, strata = build_word_tensors(rounds + rounds)
+    assert len(words) == 10 and counts.sum() == 2 * 10 * 2
+    assert counts.shape == (10, 2, 1)
+    assert len(set(strata)) == 2
+
+
+def test_resample_weights_stay_within_strata():
+    strata = np.array([0, 0, 0, 1, 1, 2])
+    weights = resample_weights(strata, 500, np.random.default_rng(0))
+    assert weights.shape == (500, 6)
+    assert np.all(weights[:, :3].sum(axis=1) == 3)
+    assert np.all(weights[:, 3:5].sum(axis=1) == 2)
+    assert np.all(weights[:, 5] == 1)
+
+
+def test_interval_covers_true_accuracy_and_is_reproducible():
+    rounds = synthetic_rounds({"A": 0.7, "B": 0.7}, num_words=300)
+    summary = bootstrap_accuracy(rounds, resamples=1000, seed=1)
+    assert summary == bootstrap_accuracy(rounds, resamples=1000, seed=1)
+    for player in summary["players"]:
+        overall = player["overall"]
+        assert overall["ci_low"] <= overall["estimate"] <= overall["ci_high"]
+        assert overall["ci_low"] < 0.7 < overall["ci_high"]
+        assert overall["ci_high"] - overall["ci_low"] < 0.12
+
+    [difference] = summary["differences"]
+    assert difference["overall"]["ci_low"] < 0 < difference["overall"]["ci_high"]
+    assert difference["overall"]["p_value"] > 0.05
+
+
+def test_clear_difference_is_significant():
+    rounds = synthetic_rounds({"Strong": 0.9, "Weak": 0.5}, num_words=200)
+    summary = bootstrap_accuracy(rounds, resamples=1000, seed=2)
+    assert [player["name"] for player in summary["players"]] == ["Strong", "Weak"]
+    [difference] = summary["differences"]
+    assert difference["players"] == ["Strong", "Weak"]
+    assert difference["overall"]["ci_low"] > 0.25
+    assert difference["overall"]["p_value"] < 0.01
+    assert difference["relative"]["estimate"] > 0.6
+
+
+def test_empty_history():
+    summary = bootstrap_accuracy([], resamples=10)
+    assert summary["words"] == 0 and summary["players"] == [] and summary["differences"] == []
@@ -0,0 +1,112 @@
+"""置信度校準：溫度擬合、從結果還原原始概率、無法解析的快速回答記為錯誤"""
+import random
+
+import yaml
+
+from arena.calibration import calibrate, fit_temperature, fit_player_temperatures, _logit, _sigmoid
+from arena.game_engine import ArenaGame
+from arena.judge import RefereeAI
+from arena.resilience import UNPARSEABLE
+from calibrate import set_player_temperatures
+
+from fakes import ATTRIBUTES, FakePlayer
+
+
+def overconfident_samples(n=4000, temperature=2.0, seed=7):
+    """真實概率為 p 的回答，模型報告的概率把 logit 放大 temperature 倍"""
+    rng = random.Random(seed)
+    probabilities, labels = [], []
+    for _ in range(n):
+        p = rng.uniform(0.05, 0.95)
+        labels.append(rng.random() < p)
+        probabilities.append(_sigmoid(_logit(p) * temperature))
+    return probabilities, labels
+
+
+def test_fit_temperature_recovers_overconfidence():
+    probabilities, labels = overconfident_samples()
+    assert abs(fit_temperature(probabilities, labels) - 2.0) <= 0.25
+
+
+def as_results(probabilities, labels, temperature):
+    """按 temperature 校準後寫成結果文件的結構"""
+    answers = []
+    for p_raw, label in zip(probabilities, labels):
+        p_yes = calibrate(p_raw, temperature)
+        answer = p_yes >= 0.5
+        answers.append({
+            "attribute": "並列結構", "answer": answer, "correct": answer == label, "score": int(answer == label),
+            "confidence": round(p_yes if answer else 1 - p_yes, 4), "answer_source": "logprobs"
+        })
+    answers.append({"attribute": "褒義", "answer": True, "correct": True, "score": 1,
+                    "confidence": 0.8, "answer_source": "text"})
+    stats = {"name": "Alpha", "score": 0}
+    if temperature != 1.0:
+        stats["confidence_temperature"] = temperature
+    return {
+        "leaderboard": [stats],
+        "game_history": [{"round": 1, "word": "火焰", "player_results": [
+            {"player_name": "Alpha", "boolean_answers": answers, "custom_attributes": [], "round_score": 0}
+        ]}]
+    }
+
+
+def test_fit_undoes_temperature_used_in_the_run():
+    probabilities, labels = overconfident_samples()
+    fitted = fit_player_temperatures([as_results(probabilities, labels, temperature=1.5)])
+
+    assert fitted["Alpha"]["samples"] == len(labels)
+    assert abs(fitted["Alpha"]["temperature"] - 2.0) <= 0.25
+
+
+def test_too_few_samples_are_not_fitted():
+    probabilities, labels = overconfident_samples(n=10)
+    fitted = fit_player_temperatures([as_results(probabilities, labels, 1.0)], min_samples=50)
+    assert fitted["Alpha"] == {"temperature": None, "samples": 10}
+
+
+def test_set_player_temperatures_keeps_comments():
+    text = (
+        "players:\n"
+        "  # 註釋\n"
+        "  - name: \"Alpha\"\n"
+        "    type: \"fake\"\n"
+        "    model: \"alpha\"\n"
+        "    hedge:\n"
+        "      enabled: false\n"
+        "\n"
+        "  - name: \"Beta\"\n"
+        "    model: \"beta\"\n"
+        "    confidence_temperature: 1.0\n"
+    )
+    updated = set_player_temperatures(text, {"Alpha": 1.75, "Beta": 0.5})
+
+    assert "  # 註釋\n" in updated
+    players = {player["name"]: player for player in yaml.safe_load(updated)["players"]}
+    assert players["Alpha"]["confidence_temperature"] == 1.75
+    assert players["Alpha"]["hedge"] == {"enabled": False}
+    assert players["Beta"]["confidence_temperature"] == 0.5
+    assert updated.count("confidence_temperature") == 2
+
+
+class MumblingPlayer(FakePlayer):
+    """快速模式下只回答無法識別的文本"""
+
+    __slots__ = ()
+
+    def _chat_completion(self, messages, temperature, max_tokens):
+        if max_tokens == 2:
+            return "嗯"
+        return super()._chat_completion(messages, temperature, max_tokens)
+
+
+def test_unparseable_fast_answer_is_an_error_not_a_wrong_answer():
+    player = MumblingPlayer("Mumble")
+    game = ArenaGame([player], RefereeAI(), fast_boolean_answers=True)
+
+    round_results = game.run_single_round("火焰", ATTRIBUTES).to_dict()
+
+    answers = round_results["player_results"][0]["boolean_answers"]
+    assert all(answer["error_kind"] == UNPARSEABLE for answer in answers)
+    assert player.total_answers == 0
+    assert player.errors == len(ATTRIBUTES)
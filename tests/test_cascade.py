@@ -0,0 +1,163 @@
+"""模型級聯：升級判斷、文本回答沒有置信度、升級路徑與統計、閾值掃描"""
+import logging
+import math
+
+import pytest
+
+from arena.cascade import (
+    CHEAP, CHEAP_ERROR, DISAGREEMENT, EXPENSIVE, LOW_CONFIDENCE,
+    CascadePolicy, decide, sweep_thresholds,
+)
+from arena.game_engine import ArenaGame
+from arena.judge import RefereeAI
+from arena.player import BooleanAnswer
+
+from fakes import ATTRIBUTES, WORDS, FakePlayer
+
+
+class LogprobPlayer(FakePlayer):
+    """首 token 以固定概率回答「是」的便宜模型"""
+
+    __slots__ = ("p_yes",)
+
+    supports_logprobs = True
+
+    def __init__(self, name, p_yes):
+        super().__init__(name)
+        self.p_yes = p_yes
+        self.use_logprobs = True
+
+    def _first_token_logprobs(self, messages, temperature):
+        return {"是": math.log(self.p_yes), "否": math.log(1 - self.p_yes)}
+
+
+@pytest.mark.parametrize("votes, threshold, agreement, expected", [
+    ([(True, 0.9), (True, 0.95)], 0.8, 1.0, (True, 0.925, None)),
+    ([(True, 0.6)], 0.8, 1.0, (True, 0.6, LOW_CONFIDENCE)),
+    ([(True, 0.9), (False, 0.95)], 0.8, 1.0, (False, 0.95, DISAGREEMENT)),
+    ([(True, 0.9), (True, 0.9), (False, 0.9)], 0.8, 0.6, (True, 0.9, None)),
+    ([None, None], 0.8, 1.0, (None, None, CHEAP_ERROR)),
+    ([None, (False, 0.99)], 0.8, 1.0, (False, 0.99, None)),
+    # 文本回答沒有置信度：正的閾值總會升級，閾值 0 時只看一致率
+    ([(True, None)], 0.8, 1.0, (True, None, LOW_CONFIDENCE)),
+    ([(True, None)], 0.5, 1.0, (True, None, LOW_CONFIDENCE)),
+    ([(True, None), (True, None)], 0.0, 1.0, (True, None, None)),
+    ([(True, None), (False, None)], 0.0, 1.0, (True, None, DISAGREEMENT)),
+])
+def test_decide(votes, threshold, agreement, expected):
+    answer, confidence, reason = decide(votes, threshold, agreement)
+    assert (answer, reason) == (expected[0], expected[2])
+    assert confidence == pytest.approx(expected[1]) if expected[1] is not None else confidence is None
+
+
+def escalate_to(answer=False, confidence=0.97):
+    calls = []
+
+    def escalate():
+        calls.append(1)
+        return answer, BooleanAnswer(answer, confidence, BooleanAnswer.LOGPROBS)
+
+    escalate.calls = calls
+    return escalate
+
+
+def test_text_tier_escalates_under_the_default_threshold():
+    """不支持 logprobs 的便宜模型的常數置信度（0.8）不能通過默認閾值 0.8"""
+    player = FakePlayer("Big")
+    policy = CascadePolicy([FakePlayer("Flash")], confidence_threshold=0.8)
+    escalate = escalate_to()
+    result = policy.answer(player, "火焰", "具體性", escalate)
+    assert escalate.calls and result.tier == EXPENSIVE
+    assert (result.answer, result.confidence, result.source) == (False, 0.97, BooleanAnswer.LOGPROBS)
+    assert policy.get_stats()["escalation_reasons"][LOW_CONFIDENCE] == 1
+
+
+def test_confident_logprob_tier_answers_without_escalation():
+    player = FakePlayer("Big")
+    policy = CascadePolicy([LogprobPlayer("Cheap", 0.95)], confidence_threshold=0.8)
+    escalate = escalate_to()
+    result = policy.answer(player, "火焰", "具體性", escalate)
+    assert not escalate.calls
+    assert (result.answer, result.tier, result.source) == (True, CHEAP, BooleanAnswer.CASCADE)
+    assert result.confidence == pytest.approx(0.95)
+    # 便宜模型的調用計入級聯玩家
+    assert player.api_calls == 1
+
+
+def test_failing_tiers_escalate_and_text_escalation_keeps_text_source():
+    player = FakePlayer("Big")
+    broken = FakePlayer("Broken", fail_on="火焰")
+    broken.retry_policy.max_attempts = 1
+    policy = CascadePolicy([broken], confidence_threshold=0.8)
+    result = policy.answer(player, "火焰", "具體性", lambda: (True, None))
+    assert (result.answer, result.tier, result.source) == (True, EXPENSIVE, BooleanAnswer.TEXT)
+    assert result.confidence == player.text_answer_confidence
+    assert policy.get_stats()["escalation_reasons"][CHEAP_ERROR] == 1
+
+
+def test_stats_track_escalation_rate_and_relative_cost():
+    player = FakePlayer("Big")
+    confident, unsure = LogprobPlayer("Sure", 0.95), LogprobPlayer("Unsure", 0.6)
+    policy = CascadePolicy([confident], confidence_threshold=0.8, cheap_costs=[0.1], expensive_cost=1.0)
+    policy.answer(player, "火焰", "具體性", escalate_to())
+    policy.cheap = [unsure]
+    policy.answer(player, "火焰", "具體性", escalate_to())
+
+    stats = policy.get_stats()
+    assert stats["questions"] == 2 and stats["escalations"] == 1
+    assert stats["escalation_rate"] == 0.5
+    # (0.1 + 0.1 + 1.0) / (2 × 1.0)
+    assert stats["relative_cost"] == 0.6
+
+
+def test_from_config_warns_about_thresholds_that_cannot_fire(caplog):
+    with caplog.at_level(logging.WARNING, logger="arena.cascade"):
+        CascadePolicy.from_config({"confidence_threshold": 0.8}, [FakePlayer("Flash")])
+    assert "logprobs" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="arena.cascade"):
+        CascadePolicy.from_config({"confidence_threshold": 0}, [FakePlayer("Flash")])
+    assert "一致率條件無法觸發" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="arena.cascade"):
+        CascadePolicy.from_config({"confidence_threshold": 0}, [FakePlayer("Flash"), FakePlayer("Turbo")])
+        CascadePolicy.from_config({"confidence_threshold": 0.8}, [LogprobPlayer("Cheap", 0.9)])
+    assert caplog.text == ""
+
+
+def test_game_records_tier_for_each_answer():
+    player = FakePlayer("Big")
+    player.cascade_policy = CascadePolicy([FakePlayer("Flash"), FakePlayer("Turbo")], confidence_threshold=0)
+    game = ArenaGame([player], RefereeAI(), fast_boolean_answers=True)
+    results = game.run_batch(WORDS, ATTRIBUTES)
+
+    answers = [answer for round_results in results["game_history"]
+               for answer in round_results["player_results"][0]["boolean_answers"]]
+    assert {answer["tier"] for answer in answers} <= {CHEAP, EXPENSIVE}
+    stats = results["leaderboard"][0]["cascade"]
+    assert stats["questions"] == len(answers)
+    assert sum(answer["tier"] == EXPENSIVE for answer in answers) == stats["escalations"]
+
+
+def test_sweep_thresholds():
+    samples = [
+        {"votes": [(True, 0.95)], "cheap_correct": [True], "cheap_latency": 0.1,
+         "expensive_correct": True, "expensive_latency": 1.0},
+        {"votes": [(False, 0.6)], "cheap_correct": [False], "cheap_latency": 0.1,
+         "expensive_correct": True, "expensive_latency": 1.0},
+        {"votes": [None], "cheap_correct": [False], "cheap_latency": 0.1,
+         "expensive_correct": False, "expensive_latency": 1.0},
+    ]
+    rows = {row["confidence_threshold"]: row for row in sweep_thresholds(samples, [0.5, 0.9], [1.0], [0.1])}
+
+    # 閾值 0.5：只有調用失敗的題升級
+    assert rows[0.5]["escalation_rate"] == pytest.approx(1 / 3, abs=1e-4)
+    assert rows[0.5]["accuracy"] == pytest.approx(1 / 3, abs=1e-4)
+    assert rows[0.5]["mean_latency"] == pytest.approx((0.3 + 1.0) / 3, abs=1e-4)
+    # 閾值 0.9：低置信度的題也升級並由大模型答對
+    assert rows[0.9]["escalation_rate"] == pytest.approx(2 / 3, abs=1e-4)
+    assert rows[0.9]["accuracy"] == pytest.approx(2 / 3, abs=1e-4)
+    assert rows[0.9]["relative_cost"] == pytest.approx((0.1 * 3 + 2) / 3, abs=1e-4)
+    assert sweep_thresholds([], [0.5], [1.0], [0.1]) == []
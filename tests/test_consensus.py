@@ -0,0 +1,93 @@
+"""共識真值：Dawid–Skene 還原人為設定的真值與玩家混淆矩陣，增量更新與全量擬合一致"""
+import numpy as np
+import pytest
+
+from arena.consensus import (
+    MISSING, NO, YES, DawidSkene, build_answer_tensor, infer_consensus, majority_vote,
+)
+
+PRIORS = np.array([0.2, 0.5, 0.8])
+# 每位玩家的靈敏度 P(是 | 是) 與特異度 P(否 | 否)：可靠、一般、傾向答「是」、接近隨機、可靠
+SENSITIVITY = np.array([0.95, 0.85, 0.98, 0.6, 0.9])
+SPECIFICITY = np.array([0.9, 0.75, 0.45, 0.6, 0.95])
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    """按設定的先驗與混淆矩陣生成的答案張量（10% 缺失）"""
+    rng = np.random.default_rng(7)
+    truth = (rng.random((3000, len(PRIORS))) < PRIORS).astype(np.int8)
+    draws = rng.random(truth.shape + (len(SENSITIVITY),))
+    answers = np.where(truth[..., None] == YES, draws < SENSITIVITY, draws >= SPECIFICITY).astype(np.int8)
+    answers[rng.random(answers.shape) < 0.1] = MISSING
+    return truth, answers
+
+
+def test_recovers_planted_truth_and_confusion(synthetic):
+    truth, answers = synthetic
+    labels, posterior, model = infer_consensus(answers)
+    majority, _ = majority_vote(answers)
+
+    accuracy = (labels == truth).mean()
+    assert accuracy > 0.95
+    assert accuracy > (majority == truth).mean() + 0.05
+    assert posterior.shape == truth.shape and ((posterior >= 0) & (posterior <= 1)).all()
+
+    np.testing.assert_allclose(model.confusion[:, YES, YES], SENSITIVITY, atol=0.03)
+    np.testing.assert_allclose(model.confusion[:, NO, NO], SPECIFICITY, atol=0.03)
+    np.testing.assert_allclose(model.priors[:, YES], PRIORS, atol=0.03)
+
+    stats = model.player_stats(["A", "B", "C", "D", "E"])
+    assert max(stats, key=lambda name: stats[name]["estimated_accuracy"]) in ("A", "E")
+    assert min(stats, key=lambda name: stats[name]["estimated_accuracy"]) == "D"
+
+
+def test_partial_fit_agrees_with_full_fit(synthetic):
+    _, answers = synthetic
+    full = DawidSkene(answers.shape[2], answers.shape[1])
+    full_posterior = full.fit(answers)
+
+    incremental = DawidSkene(answers.shape[2], answers.shape[1])
+    for chunk in np.array_split(answers, 6):
+        incremental.partial_fit(chunk)
+    incremental_posterior = incremental.predict_proba(answers)
+
+    np.testing.assert_allclose(incremental.confusion, full.confusion, atol=0.01)
+    np.testing.assert_allclose(incremental.priors, full.priors, atol=0.01)
+    assert np.abs(incremental_posterior - full_posterior).max() < 0.05
+    assert ((incremental_posterior > 0.5) == (full_posterior > 0.5)).mean() > 0.99
+
+
+def test_shape_mismatch_is_rejected(synthetic):
+    _, answers = synthetic
+    with pytest.raises(ValueError):
+        DawidSkene(answers.shape[2] + 1, answers.shape[1]).fit(answers)
+
+
+def test_answer_tensor_and_majority_vote():
+    rounds = [
+        {"word": "火焰", "player_results": [
+            {"player_name": "Alpha", "boolean_answers": [
+                {"attribute": "具體性", "answer": True},
+                {"attribute": "褒義", "answer": False, "error": "timeout"},
+            ]},
+            {"player_name": "Beta", "boolean_answers": [
+                {"attribute": "具體性", "answer": False},
+                {"attribute": "褒義", "answer": True},
+            ]},
+        ]},
+        {"word": "老師", "player_results": [
+            {"player_name": "Beta", "boolean_answers": [{"attribute": "具體性", "answer": True}]},
+        ]},
+    ]
+    answers, words, attributes, players = build_answer_tensor(rounds)
+    assert (words, attributes, players) == (["火焰", "老師"], ["具體性", "褒義"], ["Alpha", "Beta"])
+    # 調用失敗與未回答均記為缺失
+    assert answers.tolist() == [[[YES, NO], [MISSING, YES]], [[MISSING, YES], [MISSING, MISSING]]]
+
+    labels, fraction = majority_vote(answers)
+    assert labels.tolist() == [[MISSING, YES], [YES, MISSING]]
+    assert fraction.tolist() == [[0.5, 1.0], [1.0, 0.5]]
+
+    labels, _, _ = infer_consensus(answers)
+    assert labels[1, 1] == MISSING
@@ -0,0 +1,249 @@
+"""密鑰池：負載均衡、限流/認證隔離、速率上限，以及流式調用在整個流期間持有租約"""
+from types import SimpleNamespace
+
+import pytest
+
+from arena.credentials import CredentialPool, configure_credential_pool, load_credentials
+from arena.players import qwen_player
+from arena.resilience import AUTH, ProviderError, RetryPolicy, ThrottledError, TRANSIENT, call_with_resilience
+
+
+def http_error(status_code):
+    error = Exception(f"HTTP {status_code}")
+    error.status_code = status_code
+    return error
+
+
+def test_load_credentials_pairs_numbered_variables(monkeypatch):
+    monkeypatch.setenv("TEST_ID", "a")
+    monkeypatch.setenv("TEST_KEY", "b")
+    monkeypatch.setenv("TEST_ID_2", "c")
+    monkeypatch.setenv("TEST_KEY_2", "d")
+    monkeypatch.setenv("TEST_ID_10", "e")
+    assert load_credentials(["TEST_ID", "TEST_KEY"]) == [("TEST_ID", ("a", "b")), ("TEST_ID_2", ("c", "d"))]
+
+
+def test_leases_least_loaded_key():
+    pool = CredentialPool("p", [("A", "a"), ("B", "b")])
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.label, second.label} == {"A", "B"}
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_rate_limited_key_is_quarantined_and_call_moves_on():
+    pool = CredentialPool("p", [("A", "a"), ("B", "b")], cooldown=60)
+    used = []
+
+    def call():
+        with pool.lease() as credential:
+            used.append(credential.label)
+            if credential.label == "A":
+                raise http_error(429)
+            return credential.label
+
+    assert call_with_resilience("pool-test", call, sleep=lambda _: None) == "B"
+    assert used == ["A", "B"]
+    stats = {stat["label"]: stat for stat in pool.get_stats()}
+    assert stats["A"]["quarantined"] and stats["A"]["rate_limited"] == 1
+
+
+def test_single_key_rate_limit_is_not_quarantined_but_auth_is():
+    pool = CredentialPool("p", [("A", "a")])
+    with pytest.raises(Exception):
+        with pool.lease():
+            raise http_error(429)
+    assert pool.acquire().label == "A"
+
+    pool = CredentialPool("p", [("A", "a")])
+    with pytest.raises(Exception):
+        with pool.lease():
+            raise http_error(401)
+    with pytest.raises(ProviderError) as excinfo:
+        pool.acquire()
+    assert excinfo.value.kind == AUTH
+
+
+def test_rpm_limit_throttles_with_retry_after():
+    pool = CredentialPool("p", [("A", "a")], rpm=2)
+    pool.release(pool.acquire())
+    pool.release(pool.acquire())
+    with pytest.raises(ThrottledError) as excinfo:
+        pool.acquire()
+    assert 0 < excinfo.value.retry_after <= 60
+
+
+@pytest.mark.parametrize("rpm", [0, -5])
+def test_non_positive_rpm_is_rejected(rpm):
+    with pytest.raises(ValueError):
+        CredentialPool("p", [("A", "a")], rpm=rpm)
+    with pytest.raises(ValueError):
+        configure_credential_pool(CredentialPool("p", [("A", "a")]), {"rpm": rpm})
+
+
+def chunk(content, status_code=200):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(status_code=status_code, message="error",
+                           output=SimpleNamespace(choices=[SimpleNamespace(message=message)]))
+
+
+class FakeGeneration:
+    """惰性的流式接口：與 DashScope 一樣，迭代時才發出請求"""
+
+    def __init__(self, pool, chunks):
+        self.pool = pool
+        self.chunks = chunks
+        self.in_flight_seen = []
+        self.closed = False
+
+    def call(self, **kwargs):
+        assert kwargs["stream"] and kwargs["api_key"] == "k"
+        return self.stream()
+
+    def stream(self):
+        try:
+            for item in self.chunks:
+                self.in_flight_seen.append(self.pool.credentials[0].in_flight)
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def qwen(monkeypatch):
+    if not qwen_player.DASHSCOPE_AVAILABLE:
+        pytest.skip("dashscope 未安裝")
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "k")
+    player = qwen_player.QwenPlayer()
+    player.credentials = CredentialPool(player.provider, [("DASHSCOPE_API_KEY", "k")])
+    player.retry_policy = RetryPolicy(max_attempts=1)
+    return player
+
+
+def install(monkeypatch, player, chunks):
+    generation = FakeGeneration(player.credentials, chunks)
+    monkeypatch.setattr(qwen_player, "Generation", generation)
+    return generation
+
+
+def test_qwen_stream_holds_lease_until_exhausted(qwen, monkeypatch):
+    generation = install(monkeypatch, qwen, [chunk("1. 甲"), chunk(""), chunk("\n2. 乙")])
+    stream = qwen._open_chat_stream([], 0.7, 500)
+    assert generation.in_flight_seen == [1]
+    assert list(stream) == ["1. 甲", "\n2. 乙"]
+    assert generation.in_flight_seen == [1, 1, 1]
+    assert generation.closed and qwen.credentials.credentials[0].in_flight == 0
+
+
+def test_qwen_stream_releases_lease_on_close(qwen, monkeypatch):
+    generation = install(monkeypatch, qwen, [chunk("1. 甲"), chunk("\n2. 乙")])
+    stream = qwen._open_chat_stream([], 0.7, 500)
+    assert next(stream) == "1. 甲"
+    stream.close()
+    assert generation.closed and qwen.credentials.credentials[0].in_flight == 0
+
+
+def test_qwen_stream_connection_error_is_raised_before_return(qwen, monkeypatch):
+    install(monkeypatch, qwen, [ConnectionError("reset")])
+    with pytest.raises(ProviderError) as excinfo:
+        qwen._chat_stream([], 0.7, 500)
+    assert excinfo.value.kind == TRANSIENT
+    assert qwen.credentials.credentials[0].in_flight == 0
+
+
+def test_qwen_stream_error_midway_quarantines_key(qwen, monkeypatch):
+    qwen.credentials = CredentialPool(qwen.provider, [("A", "k"), ("B", "k")])
+    install(monkeypatch, qwen, [chunk("1. 甲"), chunk(None, status_code=401)])
+    stream = qwen._open_chat_stream([], 0.7, 500)
+    with pytest.raises(ProviderError):
+        list(stream)
+    stats = [stat for stat in qwen.credentials.get_stats() if stat["auth_failures"]]
+    assert len(stats) == 1 and stats[0]["quarantined"]
+
+
+def delta(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeStream:
+    """OpenAI 兼容的流式響應：create() 時已發出請求，迭代時逐塊讀取"""
+
+    def __init__(self, pool, chunks):
+        self.pool = pool
+        self.chunks = chunks
+        self.in_flight_seen = []
+        self.closed = False
+
+    def open(self, **kwargs):
+        assert kwargs["stream"]
+        self.in_flight_seen.append(self.pool.credentials[0].in_flight)
+        return self
+
+    def __iter__(self):
+        for item in self.chunks:
+            self.in_flight_seen.append(self.pool.credentials[0].in_flight)
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        self.closed = True
+
+
+def openai_player(monkeypatch, module_name, class_name, env_name, chunks):
+    """把玩家的 SDK 客戶端換成返回 FakeStream 的假客戶端"""
+    module = pytest.importorskip(f"arena.players.{module_name}")
+    monkeypatch.setenv(env_name, "k")
+    player = getattr(module, class_name)()
+    player.credentials = CredentialPool(player.provider, [("A", "k")])
+    stream = FakeStream(player.credentials, chunks)
+    completions = SimpleNamespace(create=stream.open)
+    player._clients["A"] = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return player, stream
+
+
+OPENAI_PLAYERS = [
+    ("deepseek_player", "DeepSeekPlayer", "DEEPSEEK_API_KEY"),
+    ("glm_player", "GLMPlayer", "ZHIPUAI_API_KEY"),
+    ("gpt4_player", "GPT4Player", "OPENAI_API_KEY"),
+]
+
+
+@pytest.mark.parametrize("module_name, class_name, env_name", OPENAI_PLAYERS)
+def test_openai_stream_holds_lease_until_exhausted(monkeypatch, module_name, class_name, env_name):
+    player, stream = openai_player(monkeypatch, module_name, class_name, env_name,
+                                   [delta("1. 甲"), delta(None), delta("\n2. 乙")])
+    deltas = player._open_chat_stream([], 0.7, 500)
+    assert stream.in_flight_seen == [1]
+    assert list(deltas) == ["1. 甲", "\n2. 乙"]
+    assert stream.in_flight_seen == [1, 1, 1, 1]
+    assert stream.closed and player.credentials.credentials[0].in_flight == 0
+
+
+@pytest.mark.parametrize("module_name, class_name, env_name", OPENAI_PLAYERS)
+def test_openai_stream_releases_lease_on_close(monkeypatch, module_name, class_name, env_name):
+    player, stream = openai_player(monkeypatch, module_name, class_name, env_name,
+                                   [delta("1. 甲"), delta("\n2. 乙")])
+    deltas = player._open_chat_stream([], 0.7, 500)
+    deltas.close()
+    assert stream.closed and player.credentials.credentials[0].in_flight == 0
+
+    player, stream = openai_player(monkeypatch, module_name, class_name, env_name,
+                                   [delta("1. 甲"), delta("\n2. 乙")])
+    deltas = player._open_chat_stream([], 0.7, 500)
+    assert next(deltas) == "1. 甲"
+    deltas.close()
+    assert stream.closed and player.credentials.credentials[0].in_flight == 0
+
+
+def test_openai_stream_error_midway_quarantines_key(monkeypatch):
+    player, stream = openai_player(monkeypatch, *OPENAI_PLAYERS[0], [delta("1. 甲"), http_error(401)])
+    deltas = player._open_chat_stream([], 0.7, 500)
+    with pytest.raises(Exception):
+        list(deltas)
+    stats = player.credentials.get_stats()[0]
+    assert stats["auth_failures"] == 1 and stats["quarantined"]
+    assert stream.closed and player.credentials.credentials[0].in_flight == 0
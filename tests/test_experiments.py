@@ -0,0 +1,76 @@
+"""實驗矩陣的查詢去重：只合併端點與設置都相同的查詢"""
+import threading
+
+import pytest
+
+from arena.experiments import QueryCache
+
+from fakes import FakePlayer
+
+ARGS = ("火焰", "詞語是否指具體事物")
+
+
+class EndpointPlayer(FakePlayer):
+    __slots__ = ("base_url",)
+
+    def __init__(self, name, base_url):
+        super().__init__(name)
+        self.base_url = base_url
+
+
+def ask(cache, player, method="answer_boolean_with_confidence"):
+    return cache.call(player, method, ARGS, lambda: getattr(player, method)(*ARGS))
+
+
+def test_identical_players_share_one_query():
+    cache = QueryCache()
+    first, second = FakePlayer("Alpha"), FakePlayer("Alpha")
+    assert ask(cache, first) is ask(cache, second)
+    assert first.calls + second.calls == 1
+    assert cache.get_stats()["deduplicated"] == 1
+
+
+@pytest.mark.parametrize("configure", [
+    lambda player: setattr(player, "confidence_temperature", 2.0),
+    lambda player: setattr(player, "use_logprobs", not player.use_logprobs),
+])
+def test_different_settings_do_not_share(configure):
+    cache = QueryCache()
+    first, second = FakePlayer("Alpha"), FakePlayer("Alpha")
+    configure(second)
+    ask(cache, first, "answer_boolean_question")
+    ask(cache, second, "answer_boolean_question")
+    assert first.calls == 1 and second.calls == 1
+
+
+def test_different_endpoints_do_not_share():
+    cache = QueryCache()
+    first = EndpointPlayer("Alpha", "https://a.example/v1")
+    second = EndpointPlayer("Alpha", "https://b.example/v1")
+    ask(cache, first)
+    ask(cache, second)
+    assert first.calls == 1 and second.calls == 1
+
+
+def test_concurrent_requests_wait_for_one_call():
+    cache = QueryCache()
+    players = [FakePlayer("Alpha", delay=0.2) for _ in range(4)]
+    results = []
+    threads = [threading.Thread(target=lambda p=player: results.append(ask(cache, p))) for player in players]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert sum(player.calls for player in players) == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
+
+
+def test_failures_are_not_cached():
+    cache = QueryCache()
+    failing = FakePlayer("Alpha", fail_on="火焰")
+    failing.retry_policy.max_attempts = 1
+    with pytest.raises(Exception):
+        ask(cache, failing, "answer_boolean_question")
+    healthy = FakePlayer("Alpha")
+    ask(cache, healthy, "answer_boolean_question")
+    assert healthy.calls == 1
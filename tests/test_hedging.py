@@ -0,0 +1,109 @@
+"""對沖請求：成本記在主玩家名下、延遲按玩家統計、落敗的異步請求被取消"""
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from arena.hedging import HedgePolicy, get_latency_tracker
+
+from fakes import FakePlayer
+
+_names = itertools.count()
+METHOD = "answer_boolean_question"
+
+
+def unique(name):
+    return f"{name}-{next(_names)}"
+
+
+def warm(player, seconds=0.01, samples=20):
+    tracker = get_latency_tracker(f"{player.name}:{METHOD}")
+    for _ in range(samples):
+        tracker.record(seconds)
+    return tracker
+
+
+class AsyncFakePlayer(FakePlayer):
+    """有原生異步傳輸的假玩家，記錄被取消的請求"""
+
+    __slots__ = ("cancelled",)
+
+    supports_async = True
+
+    def __init__(self, name, delay=0.0):
+        super().__init__(name, delay=delay)
+        self.cancelled = 0
+
+    async def _achat_completion(self, messages, temperature, max_tokens):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return "是"
+
+
+def test_hedge_is_charged_to_primary_and_tracked_per_player():
+    primary = FakePlayer(unique("Slow"), delay=0.5)
+    backup = FakePlayer(unique("Backup"))
+    policy = HedgePolicy(min_samples=5, max_hedge_ratio=1.0, backup=backup)
+    primary_tracker = warm(primary)
+
+    policy.call(primary, METHOD, "火焰", "具體性")
+
+    assert primary.api_calls == 2 and backup.api_calls == 0
+    assert policy.get_stats()["hedges"] == 1 and policy.get_stats()["hedge_wins"] == 1
+    # 備用模型的延遲記在自己名下，不混入主模型的統計
+    assert len(get_latency_tracker(f"{backup.name}:{METHOD}")) == 1
+    assert len(primary_tracker) == 20
+
+
+def test_no_hedge_without_samples_or_budget():
+    primary = FakePlayer(unique("Slow"), delay=0.05)
+    policy = HedgePolicy(min_samples=5, max_hedge_ratio=0.0)
+    assert policy.hedge_delay(primary, METHOD) is None
+
+    warm(primary)
+    policy.call(primary, METHOD, "火焰", "具體性")
+    assert primary.api_calls == 1 and policy.hedges == 0
+
+
+def test_losing_async_request_is_cancelled():
+    primary = AsyncFakePlayer(unique("Slow"), delay=5.0)
+    backup = AsyncFakePlayer(unique("Backup"), delay=0.0)
+    policy = HedgePolicy(min_samples=5, max_hedge_ratio=1.0, backup=backup)
+    warm(primary)
+
+    started = time.monotonic()
+    assert policy.call(primary, METHOD, "火焰", "具體性") is True
+    assert time.monotonic() - started < 2
+
+    deadline = time.monotonic() + 2
+    while not primary.cancelled and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert primary.cancelled == 1
+    assert policy.get_stats()["cancelled"] == 1
+
+
+@pytest.mark.parametrize("player_class", [FakePlayer, AsyncFakePlayer])
+def test_losing_primary_latency_is_recorded(player_class):
+    primary = player_class(unique("Slow"), delay=0.3)
+    backup = FakePlayer(unique("Backup"))
+    policy = HedgePolicy(min_samples=5, max_hedge_ratio=1.0, backup=backup)
+    primary_tracker = warm(primary)
+
+    policy.call(primary, METHOD, "火焰", "具體性")
+    assert policy.get_stats()["hedge_wins"] == 1
+
+    # 同步請求跑完後記錄真實延遲，異步請求被取消時記錄已等待的時間
+    deadline = time.monotonic() + 2
+    while len(primary_tracker) == 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(primary_tracker) == 21
+    assert primary_tracker.percentile(1.0) > 0.01
+
+
+def test_executor_size_comes_from_config():
+    policy = HedgePolicy.from_config({"max_workers": 3})
+    assert policy._get_executor()._max_workers == 3
@@ -0,0 +1,115 @@
+"""混元適配器：httpx 傳輸錯誤的分類、TC3 簽名向量、按 UTC 日期緩存的派生密鑰"""
+import itertools
+
+import httpx
+import pytest
+
+from arena.players import hunyuan_player
+from arena.players.hunyuan_player import HunyuanPlayer, TC3Signer
+from arena.resilience import TRANSIENT, UNKNOWN, ProviderError, RetryPolicy
+
+_endpoints = itertools.count()
+
+# 騰訊雲簽名文檔中的示例輸入；期望簽名用 openssl 按文檔步驟獨立計算
+# （本適配器簽名的 content-type 不帶 charset）
+SECRET_ID = "AKIDz8krbsJ5yKBZQpn74WFkmLPx3*******"
+SECRET_KEY = "Gu5t9xGARNpq86cd98joQYCN3*******"
+PAYLOAD = '{"Limit": 1, "Filters": [{"Values": ["未命名"], "Name": "instance-name"}]}'.encode("utf-8")
+TIMESTAMP = 1551113065  # 2019-02-25 16:44:25 UTC
+SIGNATURE = "01fc7bce0b6fe842886b2c1dd120f1ef24ceb8b40be376b6cc2c39ba4484ddd1"
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("refused"),
+    httpx.ReadError("reset"),
+    httpx.WriteError("broken pipe"),
+    httpx.RemoteProtocolError("peer closed connection"),
+    httpx.ReadTimeout("timed out"),
+    httpx.PoolTimeout("pool exhausted"),
+])
+def test_httpx_transport_errors_are_transient(error):
+    assert ProviderError.from_exception("hunyuan", error).kind == TRANSIENT
+
+
+@pytest.mark.parametrize("error", [
+    httpx.UnsupportedProtocol("ftp://"),
+    httpx.LocalProtocolError("bad header"),
+])
+def test_httpx_protocol_misuse_is_not_retried(error):
+    assert ProviderError.from_exception("hunyuan", error).kind == UNKNOWN
+
+
+def test_signer_matches_known_vector():
+    signer = TC3Signer(SECRET_ID, SECRET_KEY, "cvm", "cvm.tencentcloudapi.com")
+    assert signer.sign(PAYLOAD, TIMESTAMP) == (
+        f"TC3-HMAC-SHA256 Credential={SECRET_ID}/2019-02-25/cvm/tc3_request, "
+        f"SignedHeaders=content-type;host, Signature={SIGNATURE}"
+    )
+
+
+def test_signing_key_rolls_over_at_utc_midnight():
+    signer = TC3Signer(SECRET_ID, SECRET_KEY, "hunyuan", "hunyuan.tencentcloudapi.com")
+    midnight = 1551139200  # 2019-02-26 00:00:00 UTC（北京時間已是 08:00）
+
+    before = signer.sign(PAYLOAD, midnight - 1)
+    key_before = signer._cached_key
+    assert key_before[0] == "2019-02-25"
+    assert "/2019-02-25/hunyuan/tc3_request" in before
+
+    after = signer.sign(PAYLOAD, midnight)
+    assert signer._cached_key[0] == "2019-02-26"
+    assert signer._cached_key[1] != key_before[1]
+    assert "/2019-02-26/hunyuan/tc3_request" in after
+
+    # 緩存的密鑰與新簽名器從頭派生的結果一致
+    fresh = TC3Signer(SECRET_ID, SECRET_KEY, "hunyuan", "hunyuan.tencentcloudapi.com")
+    assert fresh.sign(PAYLOAD, midnight) == after
+
+
+@pytest.fixture
+def player(monkeypatch):
+    """指向模擬端點的混元玩家（不重試等待）"""
+    endpoint = f"http://hunyuan-{next(_endpoints)}.test"
+    monkeypatch.setenv("HUNYUAN_SECRET_ID", SECRET_ID)
+    monkeypatch.setenv("HUNYUAN_SECRET_KEY", SECRET_KEY)
+    monkeypatch.setenv("HUNYUAN_ENDPOINT", endpoint)
+    player = HunyuanPlayer()
+    player.retry_policy = RetryPolicy(base_delay=0.0)
+    yield player
+    hunyuan_player._clients.pop(endpoint, None)
+
+
+def mock_endpoint(player, *responses):
+    """依次返回 responses 中的響應（異常則拋出），記錄收到的請求"""
+    responses = list(responses)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    hunyuan_player._clients[player.endpoint] = httpx.AsyncClient(
+        base_url=player.endpoint, transport=httpx.MockTransport(handler)
+    )
+    return requests
+
+
+def completion(content):
+    return httpx.Response(200, json={"Response": {"Choices": [{"Message": {"Content": content}}]}})
+
+
+def test_connection_errors_are_retried(player):
+    requests = mock_endpoint(
+        player,
+        httpx.ConnectError("refused"),
+        httpx.RemoteProtocolError("peer closed connection"),
+        completion(" 是 "),
+    )
+
+    messages = [{"role": "user", "content": "火焰"}]
+    assert player._chat(messages, temperature=0.0) == "是"
+    assert len(requests) == 3
+    assert requests[-1].headers["Authorization"].startswith(f"TC3-HMAC-SHA256 Credential={SECRET_ID}/")
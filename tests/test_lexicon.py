@@ -0,0 +1,70 @@
+"""構詞詞典：雙數組查詢、結構規則、編譯文件與源文件一致、規則裁判的結構判斷"""
+import itertools
+
+import pytest
+
+from arena.judge import RefereeAI
+from arena.lexicon import (
+    AFFIXED, COMPILED_PATH, MODIFIER, PARALLEL, REDUPLICATED, SIMPLE, SOURCE_PATH,
+    CharLexicon, compile_lexicon, parse_source,
+)
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return CharLexicon.load(str(SOURCE_PATH))
+
+
+@pytest.mark.parametrize("word, structure", [
+    ("火焰", PARALLEL),      # 火、焰同為名詞性自然物
+    ("快樂", PARALLEL),
+    ("國家", PARALLEL),
+    ("思想", PARALLEL),
+    ("高山", MODIFIER),
+    ("飛機", MODIFIER),
+    ("醫生", MODIFIER),
+    ("老師", AFFIXED),
+    ("桌子", AFFIXED),
+    ("邏輯", SIMPLE),
+    ("天天", REDUPLICATED),
+])
+def test_classify(lexicon, word, structure):
+    assert lexicon.classify(word) == structure
+
+
+def test_unknown_or_non_disyllabic_words(lexicon):
+    assert lexicon.classify("火") is None
+    assert lexicon.classify("山水畫") is None
+    assert lexicon.classify("火𠀀") is None
+    assert lexicon.lookup("𠀀") == -1
+
+
+def test_rules_alone_derive_parallel_for_火焰(tmp_path):
+    """去掉詞條目後規則的判斷：火焰不需要覆蓋，單純詞則離不開詞條目"""
+    source = tmp_path / "rules_only.tsv"
+    lines = SOURCE_PATH.read_text(encoding="utf-8").splitlines()
+    source.write_text("\n".join(line for line in lines if "\t-\t-\t" not in line), encoding="utf-8")
+    rules = CharLexicon.load(str(source))
+    assert rules.classify("火焰") == PARALLEL
+    assert rules.classify("邏輯") is None
+
+
+def test_compiled_file_matches_source(lexicon, tmp_path):
+    compiled = CharLexicon.load(str(COMPILED_PATH))
+    characters = [entry for entry, *_ in parse_source(str(SOURCE_PATH)) if len(entry) == 1]
+    for pair in itertools.islice(itertools.product(characters[::7], characters[::11]), 3000):
+        word = "".join(pair)
+        assert compiled.classify(word) == lexicon.classify(word), word
+
+    output = tmp_path / "lexicon.npz"
+    stats = compile_lexicon(str(SOURCE_PATH), str(output))
+    assert stats["characters"] == len(characters)
+    assert CharLexicon.load(str(output)).classify("火焰") == PARALLEL
+
+
+def test_referee_uses_lexicon_for_structure_attributes():
+    referee = RefereeAI()
+    assert referee._evaluate_attribute("火焰", "詞語是否為並列結構")
+    assert not referee._evaluate_attribute("火焰", "詞語是否為偏正結構")
+    assert referee._evaluate_attribute("飛機", "詞語是否為偏正結構")
+    assert not referee._evaluate_attribute("𠀀𠀁", "詞語是否為並列結構")
@@ -0,0 +1,131 @@
+"""流水線執行：結果與順序執行一致，階段失敗時拋出異常而不是掛起"""
+import threading
+
+import pytest
+
+from arena.game_engine import ArenaGame
+from arena.judge import RefereeAI
+
+from fakes import ATTRIBUTES, WORDS, FakePlayer
+
+
+def make_game(pipeline: bool, **kwargs) -> ArenaGame:
+    players = [FakePlayer("Alpha", delay=0.002), FakePlayer("Beta")]
+    return ArenaGame(players, RefereeAI(), pipeline=pipeline, max_in_flight=4, **kwargs)
+
+
+def without_timestamps(history):
+    return [{key: value for key, value in round_results.items() if key != "timestamp"} for round_results in history]
+
+
+def run_with_timeout(game: ArenaGame, timeout: float = 20.0):
+    """在線程中運行，超時視為掛起"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = game.run_batch(WORDS, ATTRIBUTES)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "流水線掛起"
+    return outcome
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_pipeline_matches_sequential(stream):
+    sequential = make_game(False, stream_custom_attributes=stream)
+    pipelined = make_game(True, stream_custom_attributes=stream)
+
+    expected = run_with_timeout(sequential)["result"]
+    actual = run_with_timeout(pipelined)["result"]
+
+    assert without_timestamps(actual["game_history"]) == without_timestamps(expected["game_history"])
+    assert [p["score"] for p in actual["leaderboard"]] == [p["score"] for p in expected["leaderboard"]]
+    assert [round_results.round for round_results in pipelined.game_history] == list(range(1, len(WORDS) + 1))
+
+
+def test_player_errors_are_recorded_not_raised():
+    game = make_game(True)
+    game.players[1].fail_on = "褒義"
+    game.players[1].retry_policy.max_attempts = 1
+
+    result = run_with_timeout(game)["result"]
+
+    for round_results in result["game_history"]:
+        beta = round_results["player_results"][1]
+        errors = [answer for answer in beta["boolean_answers"] if "error" in answer]
+        assert [answer["attribute"] for answer in errors] == ["褒義"]
+    assert game.players[1].errors == len(WORDS)
+
+
+@pytest.mark.parametrize("method", ["_apply_judgment", "_apply_custom_attribute", "_record_round", "_start_round"])
+def test_stage_failure_raises_instead_of_hanging(method, monkeypatch):
+    game = make_game(True)
+    original = getattr(game, method)
+    calls = {"n": 0}
+
+    def failing(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise RuntimeError(f"{method} 失敗")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(game, method, failing)
+    outcome = run_with_timeout(game)
+
+    assert isinstance(outcome.get("error"), RuntimeError)
+    assert method in str(outcome["error"])
+
+
+def test_stage_failure_with_full_queues(monkeypatch):
+    """下游失敗時上游正阻塞在滿隊列上，也必須退出"""
+    from arena import pipeline as pipeline_module
+
+    game = make_game(True)
+    monkeypatch.setattr(game, "_record_round", lambda round_results: (_ for _ in ()).throw(RuntimeError("寫盤失敗")))
+    runner = pipeline_module.ArenaPipeline(game, max_in_flight=2, queue_size=1)
+
+    errors = []
+    thread = threading.Thread(target=lambda: _capture(errors, runner.run, WORDS * 5, ATTRIBUTES), daemon=True)
+    thread.start()
+    thread.join(20)
+    assert not thread.is_alive(), "流水線掛起"
+    assert len(errors) == 1 and "寫盤失敗" in str(errors[0])
+
+
+def _capture(errors, fn, *args):
+    try:
+        fn(*args)
+    except BaseException as e:
+        errors.append(e)
+
+
+def test_streamed_attributes_are_evaluated_while_generating(monkeypatch):
+    """流式模式下每個屬性產出後即交給裁判，不等整個流結束"""
+    game = make_game(False, stream_custom_attributes=True)
+    player = game.players[0]
+    evaluated = []
+    produced = []
+    original = game.referee.submit_custom_attributes
+
+    def submit(word, attributes):
+        evaluated.append((len(produced), list(attributes)))
+        return original(word, attributes)
+
+    def stream(self, word, num_slots):
+        for i in range(1, num_slots + 1):
+            produced.append(i)
+            yield f"屬性{i}"
+
+    monkeypatch.setattr(game.referee, "submit_custom_attributes", submit)
+    monkeypatch.setattr(FakePlayer, "stream_custom_attributes", stream)
+
+    records, error = game._collect_custom_attributes(player, "火焰")
+
+    assert error is None
+    assert evaluated == [(i, [f"屬性{i}"]) for i in range(1, 9)]
+    assert [record.attribute for record in records.result()] == [f"屬性{i}" for i in range(1, 9)]
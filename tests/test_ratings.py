@@ -0,0 +1,103 @@
+"""模型評級：兩兩勝負、Bradley–Terry 在已知勝負矩陣上的評分與置信區間、增量與重建一致"""
+import math
+
+import numpy as np
+import pytest
+
+from arena.ratings import BASE_RATING, RatingEngine, fit_bradley_terry, pairwise_outcomes
+
+ACCURACY = {"Strong": 0.9, "Middle": 0.7, "Weak": 0.5}
+
+
+def expected_outcomes(theta, games_per_pair):
+    """強度為 exp(theta) 的玩家兩兩對局 games_per_pair 場的期望勝場矩陣"""
+    strength = np.exp(np.asarray(theta, dtype=np.float64))
+    games = np.full((len(strength), len(strength)), float(games_per_pair))
+    np.fill_diagonal(games, 0.0)
+    wins = games * strength[:, None] / (strength[:, None] + strength[None, :])
+    return wins, games
+
+
+def test_two_player_rating_gap_matches_win_ratio():
+    # 3 勝 1 負：強度比 3，評分差 400·log10(3)（正則化可忽略）
+    wins = np.array([[0.0, 3.0], [1.0, 0.0]])
+    games = np.array([[0.0, 4.0], [4.0, 0.0]])
+    ratings, errors = fit_bradley_terry(wins, games, prior_games=1e-6)
+    assert ratings[0] - ratings[1] == pytest.approx(400 * math.log10(3), abs=0.01)
+    assert ratings.mean() == pytest.approx(BASE_RATING)
+    assert errors[0] == pytest.approx(errors[1]) and errors[0] > 0
+
+
+def test_recovers_planted_strengths():
+    theta = np.array([1.0, 0.3, 0.0, -0.8])
+    wins, games = expected_outcomes(theta, 2000)
+    ratings, _ = fit_bradley_terry(wins, games)
+    assert list(np.argsort(-ratings)) == [0, 1, 2, 3]
+    planted = 400 / math.log(10) * (theta - theta.mean())
+    np.testing.assert_allclose(ratings - BASE_RATING, planted, atol=2.0)
+
+
+def test_confidence_intervals_shrink_with_more_games():
+    theta = [0.5, 0.0, -0.5]
+    _, few = fit_bradley_terry(*expected_outcomes(theta, 50))
+    _, many = fit_bradley_terry(*expected_outcomes(theta, 800))
+    assert (many > 0).all()
+    # 標準誤約與 1/sqrt(局數) 成正比
+    np.testing.assert_allclose(few / many, 4.0, rtol=0.1)
+
+
+def test_uncompared_player_has_finite_rating_and_wide_interval():
+    wins, games = expected_outcomes([0.5, -0.5], 500)
+    wins = np.pad(wins, (0, 1))
+    games = np.pad(games, (0, 1))
+    ratings, errors = fit_bradley_terry(wins, games)
+    assert np.isfinite(ratings).all() and np.isfinite(errors).all()
+    assert abs(ratings[2] - BASE_RATING) < 5.0
+    assert errors[2] > 1.5 * errors[:2].max()
+
+
+def test_pairwise_outcomes_counts_draws_as_half():
+    correct = np.array([[1, 0], [1, 1], [0, 0], [1, 0]], dtype=np.float32)
+    answered = np.array([[1, 1], [1, 1], [1, 1], [1, 0]], dtype=bool)
+    wins, games = pairwise_outcomes(correct, answered)
+    # 第 4 格只有一人回答，不計入；其餘 1 勝 2 平
+    assert games.tolist() == [[0, 3], [3, 0]]
+    assert wins.tolist() == [[0, 2], [1, 0]]
+
+
+def make_rounds(num_words=150, seed=3):
+    rng = np.random.default_rng(seed)
+    rounds = []
+    for word in range(num_words):
+        rounds.append({
+            "word": f"詞{word}",
+            "player_results": [
+                {"player_name": name, "boolean_answers": [
+                    {"attribute": attribute, "correct": bool(rng.random() < accuracy)}
+                    for attribute in ("具體性", "褒義", "並列結構")
+                ]}
+                for name, accuracy in ACCURACY.items()
+            ]
+        })
+    return rounds
+
+
+def test_engine_orders_players_and_incremental_matches_rebuild():
+    rounds = make_rounds()
+    incremental = RatingEngine()
+    for round_results in rounds:
+        incremental.observe(round_results)
+    rebuilt = RatingEngine.from_history(rounds)
+
+    np.testing.assert_allclose(incremental.wins, rebuilt.wins)
+    np.testing.assert_allclose(incremental.games, rebuilt.games)
+    np.testing.assert_allclose(incremental.elo, rebuilt.elo)
+
+    summary = incremental.summary()
+    assert [player["name"] for player in summary["players"]] == list(ACCURACY)
+    for player in summary["players"]:
+        assert player["ci_low"] < player["rating"] < player["ci_high"]
+        assert player["comparisons"] == 2 * 3 * len(rounds)
+    strong, _, weak = summary["players"]
+    assert strong["ci_low"] > weak["ci_high"]
+    assert strong["elo"] > BASE_RATING > weak["elo"]
@@ -0,0 +1,185 @@
+"""韌性層：分類重試、熔斷器只統計供應商故障、本地限速的等待上限、流式增量"""
+import asyncio
+import itertools
+
+import pytest
+
+from arena.credentials import CredentialPool
+from arena.player import iter_stream_deltas
+from arena.resilience import (
+    AUTH, INVALID_REQUEST, RATE_LIMITED, TRANSIENT, UNKNOWN,
+    CircuitBreaker, CircuitOpenError, ProviderError, RetryPolicy, ThrottledError,
+    call_with_resilience, call_with_resilience_async, get_circuit_breaker,
+)
+
+_providers = itertools.count()
+
+
+@pytest.fixture
+def provider():
+    """每個測試一個獨立的供應商（熔斷器按供應商全局共享）"""
+    name = f"test-provider-{next(_providers)}"
+    get_circuit_breaker(name).failure_threshold = 3
+    return name
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+def failing(*errors, result="ok"):
+    """依次拋出 errors 中的異常，之後返回 result"""
+    errors = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+def test_classification():
+    assert ProviderError.from_exception("p", HTTPError(429)).kind == RATE_LIMITED
+    assert ProviderError.from_exception("p", HTTPError(503)).kind == TRANSIENT
+    assert ProviderError.from_exception("p", HTTPError(401)).kind == AUTH
+    assert ProviderError.from_exception("p", HTTPError(400)).kind == INVALID_REQUEST
+    assert ProviderError.from_exception("p", ConnectionError()).kind == TRANSIENT
+    assert ProviderError.from_exception("p", AttributeError()).kind == UNKNOWN
+    assert ProviderError.from_exception("p", HTTPError(429, {"retry-after": "7"})).retry_after == 7.0
+
+
+def test_retries_transient_errors(provider):
+    fn = failing(HTTPError(503), ConnectionError())
+    sleeps = []
+    assert call_with_resilience(provider, fn, RetryPolicy(max_attempts=3), sleep=sleeps.append) == "ok"
+    assert len(fn.calls) == 3 and len(sleeps) == 2
+
+
+def test_retries_stop_after_max_attempts(provider):
+    fn = failing(*[HTTPError(503)] * 5)
+    with pytest.raises(ProviderError):
+        call_with_resilience(provider, fn, RetryPolicy(max_attempts=2), sleep=lambda _: None)
+    assert len(fn.calls) == 2
+
+
+@pytest.mark.parametrize("max_attempts", [0, -1])
+def test_max_attempts_must_be_positive(max_attempts):
+    with pytest.raises(ValueError):
+        RetryPolicy.from_config({"max_attempts": max_attempts})
+
+
+def test_honours_retry_after(provider):
+    sleeps = []
+    call_with_resilience(provider, failing(HTTPError(429, {"retry-after": "3"})), sleep=sleeps.append)
+    assert sleeps == [3.0]
+
+
+@pytest.mark.parametrize("error", [HTTPError(401), HTTPError(400), AttributeError("'NoneType'")])
+def test_non_retryable_errors_raise_immediately(provider, error):
+    fn = failing(error)
+    with pytest.raises(ProviderError):
+        call_with_resilience(provider, fn, sleep=lambda _: None)
+    assert len(fn.calls) == 1
+
+
+def test_breaker_opens_on_transient_failures(provider):
+    policy = RetryPolicy(max_attempts=1)
+    for _ in range(3):
+        with pytest.raises(ProviderError):
+            call_with_resilience(provider, failing(HTTPError(503)), policy)
+    with pytest.raises(CircuitOpenError):
+        call_with_resilience(provider, failing())
+
+
+@pytest.mark.parametrize("error", [HTTPError(401), AttributeError("'NoneType'"), HTTPError(400)])
+def test_player_scoped_errors_do_not_open_breaker(provider, error):
+    """認證失敗與程序錯誤只影響出錯的玩家，不熔斷同一供應商的其他調用"""
+    for _ in range(5):
+        with pytest.raises(ProviderError):
+            call_with_resilience(provider, failing(error), RetryPolicy(max_attempts=1))
+    assert get_circuit_breaker(provider).state == CircuitBreaker.CLOSED
+    assert call_with_resilience(provider, failing()) == "ok"
+
+
+def test_half_open_probe_released_by_non_breaker_error(provider):
+    breaker = get_circuit_breaker(provider)
+    breaker.recovery_timeout = 0.0
+    for _ in range(3):
+        breaker.record_failure()
+    with pytest.raises(ProviderError):
+        call_with_resilience(provider, failing(AttributeError()), RetryPolicy(max_attempts=1))
+    # 探測名額已釋放，下一次調用可以放行
+    assert call_with_resilience(provider, failing()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_throttle_wait_is_capped(provider):
+    def throttled():
+        raise ThrottledError(provider, "busy", retry_after=10.0)
+
+    sleeps = []
+    with pytest.raises(ThrottledError):
+        call_with_resilience(provider, throttled, RetryPolicy(max_throttle_wait=25.0), sleep=sleeps.append)
+    assert sum(sleeps) == pytest.approx(25.0)
+    assert get_circuit_breaker(provider).state == CircuitBreaker.CLOSED
+
+
+def test_throttle_does_not_consume_attempts(provider):
+    fn = failing(*[ThrottledError(provider, "busy", retry_after=0.0)] * 5, HTTPError(503))
+    assert call_with_resilience(provider, fn, RetryPolicy(max_attempts=2), sleep=lambda _: None) == "ok"
+
+
+def test_async_throttle_wait_is_capped(provider):
+    async def throttled():
+        raise ThrottledError(provider, "busy", retry_after=0.01)
+
+    with pytest.raises(ThrottledError):
+        asyncio.run(call_with_resilience_async(provider, throttled, RetryPolicy(max_throttle_wait=0.05)))
+
+
+def test_rate_limited_pool_throttles_until_deadline(provider):
+    pool = CredentialPool(provider, [("KEY", "k")], rpm=1)
+
+    def call():
+        with pool.lease():
+            return "ok"
+
+    assert call_with_resilience(provider, call) == "ok"
+    with pytest.raises(ThrottledError):
+        call_with_resilience(provider, call, RetryPolicy(max_throttle_wait=5.0), sleep=lambda _: None)
+
+
+class Chunk:
+    def __init__(self, content):
+        delta = type("Delta", (), {"content": content})()
+        self.choices = [type("Choice", (), {"delta": delta})()] if content != "-" else []
+
+
+class Stream:
+    def __init__(self, contents):
+        self.contents = contents
+        self.closed = False
+
+    def __iter__(self):
+        return (Chunk(content) for content in self.contents)
+
+    def close(self):
+        self.closed = True
+
+
+def test_iter_stream_deltas_skips_empty_and_closes_early():
+    stream = Stream(["1. 甲", None, "-", "\n2. 乙", "\n3. 丙"])
+    deltas = iter_stream_deltas(stream)
+    assert [next(deltas), next(deltas)] == ["1. 甲", "\n2. 乙"]
+    deltas.close()
+    assert stream.closed
+
+    stream = Stream(["a", "b"])
+    assert list(iter_stream_deltas(stream)) == ["a", "b"] and stream.closed
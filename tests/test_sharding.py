@@ -0,0 +1,99 @@
+"""分片結果：manifest 校驗和、按分片或輪次讀取子集、發現損壞的分片"""
+import hashlib
+import json
+import os
+
+import pytest
+
+from arena import sharding
+from arena.sharding import ShardWriter, load_manifest, load_results, read_shards, verify_shards
+
+COMPRESSIONS = ["gzip"] + (["zstd"] if sharding.ZSTD_AVAILABLE else [])
+
+
+def make_round(number):
+    return {
+        "round": number,
+        "word": f"詞{number}",
+        "player_results": [{"player_name": "Alpha", "boolean_answers": [
+            {"attribute": "具體性", "answer": number % 2 == 0, "correct": True, "score": 1}
+        ]}]
+    }
+
+
+def write_rounds(directory, count=10, rounds_per_shard=3, compression="gzip", results=None):
+    writer = ShardWriter(str(directory), rounds_per_shard=rounds_per_shard, compression=compression)
+    for number in range(1, count + 1):
+        writer.add(make_round(number))
+    return writer.close(results)
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_manifest_records_shards_and_checksums(tmp_path, compression):
+    leaderboard = [{"name": "Alpha", "score": 10}]
+    manifest_path = write_rounds(tmp_path, compression=compression,
+                                 results={"leaderboard": leaderboard, "game_history": ["ignored"]})
+    manifest = load_manifest(manifest_path)
+
+    assert manifest["complete"] and manifest["compression"] == compression
+    assert manifest["total_rounds"] == 10
+    assert [(shard["first_round"], shard["last_round"]) for shard in manifest["shards"]] == \
+        [(1, 3), (4, 6), (7, 9), (10, 10)]
+    for shard in manifest["shards"]:
+        with open(tmp_path / shard["file"], "rb") as f:
+            data = f.read()
+        assert hashlib.sha256(data).hexdigest() == shard["sha256"]
+        assert len(data) == shard["bytes"]
+    assert manifest["results"] == {"leaderboard": leaderboard}
+    assert verify_shards(str(tmp_path)) == []
+
+    results = load_results(str(tmp_path))
+    assert results["leaderboard"] == leaderboard
+    assert results["game_history"] == [make_round(number) for number in range(1, 11)]
+
+
+def test_loads_a_subset_of_shards(tmp_path):
+    write_rounds(tmp_path)
+    assert [row["round"] for row in read_shards(str(tmp_path), shards=[1, 3])] == [4, 5, 6, 10]
+    assert [row["round"] for row in read_shards(str(tmp_path), rounds=(5, 7))] == [5, 6, 7]
+    assert read_shards(str(tmp_path), shards=[99]) == []
+
+
+def test_incomplete_run_is_readable(tmp_path):
+    writer = ShardWriter(str(tmp_path), rounds_per_shard=2, compression="gzip")
+    for number in range(1, 6):
+        writer.add(make_round(number))
+    writer.close()
+    results = load_results(str(tmp_path / "manifest.json"))
+    assert not load_manifest(str(tmp_path))["complete"]
+    assert results["metadata"] == {"total_rounds": 5}
+    assert len(results["game_history"]) == 5
+
+
+def test_detects_corrupt_and_missing_shards(tmp_path):
+    manifest = load_manifest(write_rounds(tmp_path))
+    corrupt, missing = manifest["shards"][1]["file"], manifest["shards"][2]["file"]
+    with open(tmp_path / corrupt, "r+b") as f:
+        f.seek(10)
+        byte = f.read(1)
+        f.seek(10)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    os.remove(tmp_path / missing)
+
+    assert verify_shards(str(tmp_path)) == [corrupt, missing]
+    with pytest.raises(ValueError, match="校驗和"):
+        read_shards(str(tmp_path), shards=[1])
+    # 只讀完好的分片不受影響
+    assert [row["round"] for row in read_shards(str(tmp_path), shards=[0])] == [1, 2, 3]
+
+
+def test_rejects_bad_settings_and_foreign_manifests(tmp_path):
+    with pytest.raises(ValueError):
+        ShardWriter(str(tmp_path), rounds_per_shard=0)
+    with pytest.raises(ValueError):
+        sharding.resolve_compression("lz4")
+    (tmp_path / "other").mkdir()
+    with open(tmp_path / "other" / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump({"format": "something-else"}, f)
+    with pytest.raises(ValueError):
+        load_manifest(str(tmp_path / "other"))
@@ -0,0 +1,98 @@
+"""TOON 序列化：與 JSON 無損往返，容易產生歧義的字符串加引號，真實結果寫成表格"""
+import json
+import math
+
+import pytest
+
+from arena import toon
+from arena.game_engine import ArenaGame
+from arena.judge import RefereeAI
+
+from fakes import ATTRIBUTES, WORDS, FakePlayer
+
+
+def round_trip(value):
+    text = toon.encode(value)
+    assert toon.decode(text) == value, text
+    return text
+
+
+@pytest.mark.parametrize("key", ["", "有空格 的鍵", "a:b", "[0]", "-lead", "#tag", '引號"', "123", "true"])
+def test_quoted_keys(key):
+    round_trip({key: 1, "nested": {key: [1, 2]}, "rows": [{key: "x", "b": 2}, {key: "y", "b": 3}]})
+
+
+@pytest.mark.parametrize("text", [
+    "1", "-1", "1.5", "1e5", "-2.5E-3", "007", ".5", "-.5",
+    "true", "false", "null", "",
+])
+def test_strings_that_look_like_numbers_or_literals_stay_strings(text):
+    value = {"value": text, "items": [text, 1], "rows": [{"a": text, "b": 1}]}
+    text_out = round_trip(value)
+    assert f'value: "{text}"' in text_out
+
+
+@pytest.mark.parametrize("text", ["-", "- item", "-leading", "#comment", "# 註釋", " padded ", "a,b", "a: b", "line\nbreak\t"])
+def test_strings_with_leading_markers_or_delimiters(text):
+    round_trip({"value": text, "items": [text, text], "rows": [{"a": text}, {"a": "plain"}]})
+    round_trip([text, {"a": text}])
+
+
+def test_numbers_and_literals_keep_their_types():
+    value = {"int": -3, "float": 0.1, "big": 1e300, "small": -2.5e-8, "whole": 2.0,
+             "yes": True, "no": False, "none": None}
+    decoded = toon.decode(round_trip(value))
+    assert type(decoded["whole"]) is float and type(decoded["int"]) is int
+
+
+def test_empty_arrays_and_objects():
+    round_trip({"empty_list": [], "empty_dict": {}, "nested": {"inner": {}}, "list_of_empty": [{}, [], {}]})
+    round_trip([])
+    assert toon.decode(toon.encode({})) == {}
+
+
+def test_nested_list_items():
+    value = {
+        "mixed": [1, "two", [3, 4], {"a": 1, "b": [5, 6]}, [[7], []], {}],
+        "objects": [
+            {"name": "甲", "children": [{"x": 1}, {"x": 2}]},
+            {"name": "乙", "meta": {"deep": {"deeper": [True, None]}}},
+        ],
+        "ragged": [{"a": 1}, {"b": 2}],
+    }
+    round_trip(value)
+    round_trip([[1, 2], [{"a": [1]}]])
+
+
+@pytest.mark.parametrize("number", [math.nan, math.inf, -math.inf])
+def test_non_finite_floats_are_rejected(number):
+    with pytest.raises(ValueError):
+        toon.encode({"value": number})
+    with pytest.raises(ValueError):
+        toon.encode([1.0, number])
+
+
+@pytest.mark.parametrize("text", [
+    "rows[2]{a,b}:\n  1,2\n",             # 行數少於聲明
+    "rows[1]{a,b}:\n  1\n",               # 字段數不一致
+    'key: "unterminated\n',
+    "a:\n   b: 1\n",                      # 縮進不是 2 的倍數
+])
+def test_malformed_text_raises(text):
+    with pytest.raises(ValueError):
+        toon.decode(text)
+
+
+@pytest.fixture(scope="module")
+def game_results():
+    """用假玩家跑一輪完整比賽得到的結果（與 main.save_results 寫出的結構相同）"""
+    game = ArenaGame([FakePlayer("Alpha"), FakePlayer("Beta")], RefereeAI())
+    return json.loads(json.dumps(game.run_batch(WORDS, ATTRIBUTES), ensure_ascii=False))
+
+
+def test_game_results_round_trip(game_results):
+    text = round_trip(game_results)
+    assert toon.toon_to_json(toon.json_to_toon(json.dumps(game_results))) == json.dumps(game_results, ensure_ascii=False)
+    # 每位玩家的 boolean_answers 寫成一行表頭加逐行數據
+    assert "boolean_answers[" in text and "]{" in text
+    assert len(text) < len(json.dumps(game_results, ensure_ascii=False))
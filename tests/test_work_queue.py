@@ -0,0 +1,145 @@
+"""工作隊列與分佈式運行：租約、過期重領、嘗試次數上限、無人領取的檢測"""
+import threading
+import time
+
+import pytest
+
+from arena.distributed import Coordinator, Worker
+from arena.game_engine import ArenaGame
+from arena.judge import RefereeAI
+from arena.work_queue import DONE, FAILED, LEASED, PENDING, InMemoryWorkQueue, SQLiteWorkQueue
+
+from fakes import ATTRIBUTES, WORDS, FakePlayer
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def queue(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    return InMemoryWorkQueue()
+
+
+def enqueue(queue, n=1, run_id="r"):
+    queue.create_run(run_id, {"attributes": ATTRIBUTES})
+    queue.enqueue(run_id, [{"round": i + 1, "word": WORDS[i], "player_name": "Alpha"} for i in range(n)])
+
+
+def test_lease_is_exclusive_until_expiry(queue):
+    enqueue(queue)
+    unit = queue.lease("w1", visibility_timeout=0.2)
+    assert unit is not None and unit.attempts == 1
+    assert queue.lease("w2", visibility_timeout=0.2) is None
+
+    time.sleep(0.25)
+    again = queue.lease("w2", visibility_timeout=10)
+    assert again.unit_id == unit.unit_id and again.attempts == 2
+    # 舊租約失效：確認與續約都被拒絕
+    assert not queue.ack(unit, {})
+    assert not queue.extend(unit, 10)
+    assert queue.ack(again, {"ok": True})
+    assert queue.counts("r")[DONE] == 1
+
+
+def test_expired_lease_respects_max_attempts(queue):
+    enqueue(queue)
+    for attempt in range(1, 3):
+        unit = queue.lease("w", visibility_timeout=0.05, max_attempts=2)
+        assert unit.attempts == attempt
+        time.sleep(0.1)
+
+    assert queue.lease("w", visibility_timeout=0.05, max_attempts=2) is None
+    counts = queue.counts("r")
+    assert counts[FAILED] == 1 and counts[LEASED] == 0
+    [result] = queue.results("r")
+    assert "最大嘗試次數" in result["error"]
+
+
+def test_fail_retries_until_max_attempts(queue):
+    enqueue(queue)
+    for _ in range(2):
+        unit = queue.lease("w", visibility_timeout=10, max_attempts=3)
+        assert queue.fail(unit, "boom", max_attempts=3)
+        assert queue.counts("r")[PENDING] == 1
+    unit = queue.lease("w", visibility_timeout=10, max_attempts=3)
+    assert queue.fail(unit, "boom", max_attempts=3)
+    assert queue.counts("r")[FAILED] == 1
+    assert queue.lease("w", visibility_timeout=10, max_attempts=3) is None
+
+
+def test_player_filter(queue):
+    enqueue(queue)
+    assert queue.lease("w", visibility_timeout=10, player_names=["Beta"]) is None
+    assert queue.lease("w", visibility_timeout=10, player_names=["Alpha"]) is not None
+
+
+def test_sqlite_concurrent_workers_lease_each_unit_once(tmp_path):
+    path = str(tmp_path / "queue.db")
+    enqueue(SQLiteWorkQueue(path), n=len(WORDS))
+    leased = []
+    lock = threading.Lock()
+
+    def worker(name):
+        queue = SQLiteWorkQueue(path)
+        while True:
+            unit = queue.lease(name, visibility_timeout=30)
+            if unit is None:
+                return
+            with lock:
+                leased.append(unit.unit_id)
+            queue.ack(unit, {})
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert sorted(leased) == list(range(1, len(WORDS) + 1))
+
+
+def make_game():
+    return ArenaGame([FakePlayer("Alpha"), FakePlayer("Beta")], RefereeAI())
+
+
+def test_distributed_run_matches_local(queue):
+    coordinator = Coordinator(queue, run_id="r")
+    coordinator.submit(WORDS, [{"name": "Alpha", "model": "alpha-model"}, {"name": "Beta", "model": "beta-model"}],
+                       ATTRIBUTES)
+    # 兩個 worker 各自只持有一位玩家
+    for name in ("Alpha", "Beta"):
+        game = ArenaGame([FakePlayer(name)], RefereeAI())
+        Worker(queue, game, worker_id=name, run_id="r").run()
+
+    assert coordinator.wait(poll_interval=0.01, timeout=1)[DONE] == 2 * len(WORDS)
+    results = coordinator.assemble()
+    expected = make_game().run_batch(WORDS, ATTRIBUTES)
+
+    def strip(history):
+        return [round_results["player_results"] for round_results in history]
+
+    assert strip(results["game_history"]) == strip(expected["game_history"])
+    assert [p["score"] for p in results["leaderboard"]] == [p["score"] for p in expected["leaderboard"]]
+
+
+def test_crashing_worker_unit_fails_after_max_attempts(queue, monkeypatch):
+    """worker 處理中反復退出（租約過期）的單元最終標記為失敗，而不是無限重領"""
+    enqueue(queue)
+    worker = Worker(queue, make_game(), visibility_timeout=0.05, max_attempts=2, run_id="r")
+    for _ in range(2):
+        assert queue.lease("crashed", 0.05, run_id="r", max_attempts=2) is not None
+        time.sleep(0.1)
+
+    assert worker.run() == 0
+    assert queue.counts("r")[FAILED] == 1
+
+
+def test_coordinator_stops_waiting_for_unclaimable_units(queue):
+    coordinator = Coordinator(queue, run_id="r")
+    coordinator.submit(WORDS[:2], [{"name": "Alpha"}, {"name": "Nobody"}], ATTRIBUTES)
+    Worker(queue, ArenaGame([FakePlayer("Alpha")], RefereeAI()), run_id="r").run()
+
+    started = time.monotonic()
+    counts = coordinator.wait(poll_interval=0.01, stall_timeout=0.2)
+
+    assert time.monotonic() - started < 5
+    assert counts[DONE] == 2 and counts[PENDING] == 2
+    assert len(coordinator.assemble()["game_history"]) == 2